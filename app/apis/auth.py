@@ -9,9 +9,10 @@ from app.database import get_db
 from app.auth import hash_password, verify_password, create_access_token, verify_access_token
 from app.schemas import SignupRequest, LoginRequest, TokenResponse, UserResponse
 from app.logger import get_logger
+from app.json_response import ORJSONRoute
 
 logger = get_logger(__name__)
-router = APIRouter(prefix="/api/auth", tags=["Authentication"])
+router = APIRouter(prefix="/api/auth", tags=["Authentication"], route_class=ORJSONRoute)
 security = HTTPBearer()
 
 def get_bearer_token(credentials = Depends(security)):
@@ -1,18 +1,228 @@
 import os
 import uuid
+import json
 import shutil
+import asyncio
+import logging
 import zipfile
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, AsyncIterator
 from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from app.utils.bajaj_po_parser import parse_bajaj_po, BajajPOParserError
-from app.repository.client_po_repo import insert_client_po
+from app.modules.file_uploads.services.parser_executor import parser_executor
+from app.repository.client_po_repo import insert_client_pos
 from app.repository.document_repo import insert_document
+from app.json_response import ORJSONRoute
 
-router = APIRouter(prefix="/api", tags=["Bajaj PO"])
+router = APIRouter(prefix="/api", tags=["Bajaj PO"], route_class=ORJSONRoute)
+
+logger = logging.getLogger(__name__)
 
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Parsed POs are written to the database in batches of at most this many
+BULK_INSERT_BATCH_SIZE = 25
+
+# Archiving (move + zip + project_document row) runs here, after the PO's
+# result has already been reported
+_archive_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="bajaj-archive")
+
+
+def _remove_quietly(path: str):
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+async def _save_uploads(files: List[UploadFile]) -> List[Dict[str, Any]]:
+    """
+    Spool every upload to disk before the pipeline starts.
+
+    Returns one entry per file, in upload order: either {"index", "filename",
+    "temp_path", "content_type"} or {"index", "filename", "error"} for files
+    that were rejected.
+    """
+    entries = []
+    for index, file in enumerate(files):
+        filename = file.filename if hasattr(file, 'filename') else 'unknown'
+        if not filename.lower().endswith((".xlsx", ".xls", ".pdf")):
+            entries.append({
+                "index": index,
+                "filename": filename,
+                "error": f"Only PDF and Excel files are allowed. Got {os.path.splitext(filename)[1]}"
+            })
+            continue
+
+        temp_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4()}_{filename}")
+        try:
+            with open(temp_path, "wb") as f:
+                while chunk := await file.read(1024 * 1024):
+                    f.write(chunk)
+            entries.append({
+                "index": index,
+                "filename": filename,
+                "temp_path": temp_path,
+                "content_type": file.content_type
+            })
+        except Exception as e:
+            _remove_quietly(temp_path)
+            entries.append({"index": index, "filename": filename, "error": str(e)})
+    return entries
+
+
+def _archive_upload(entry: Dict[str, Any], client_po_id: int, project_id: int | None):
+    """Move the upload into the uploads folder, zip it and map it to the PO"""
+    temp_path = entry["temp_path"]
+    stored_path = None
+    zip_path = None
+    try:
+        uploads_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..', 'uploads')
+        uploads_dir = os.path.normpath(os.path.abspath(uploads_dir))
+        os.makedirs(uploads_dir, exist_ok=True)
+
+        ext = os.path.splitext(entry["filename"])[1] or '.xlsx'
+        unique_name = f"{uuid.uuid4().hex}{ext}"
+        stored_path = os.path.join(uploads_dir, unique_name)
+        # The temp file is no longer needed, so move instead of copying
+        shutil.move(temp_path, stored_path)
+        original_size = os.path.getsize(stored_path)
+
+        zip_name = f"{uuid.uuid4().hex}.zip"
+        zip_path = os.path.join(uploads_dir, zip_name)
+        with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.write(stored_path, arcname=entry["filename"])
+
+        compressed_size = os.path.getsize(zip_path)
+
+        insert_document(
+            project_id=project_id,
+            client_po_id=client_po_id,
+            original_filename=entry["filename"],
+            stored_filename=unique_name,
+            compressed_filename=zip_name,
+            mime_type=entry["content_type"],
+            original_size=original_size,
+            compressed_size=compressed_size,
+            description="Bajaj PO bulk upload"
+        )
+    except Exception as e:
+        logger.warning(f"Could not archive {entry['filename']} for PO {client_po_id}: {e}")
+        _remove_quietly(stored_path)
+        _remove_quietly(zip_path)
+    finally:
+        _remove_quietly(temp_path)
+
+
+def _failure(entry: Dict[str, Any], error: Exception | str) -> Dict[str, Any]:
+    if isinstance(error, BajajPOParserError):
+        error = f"Parse error: {str(error)}"
+    return {
+        "type": "file",
+        "status": "FAILED",
+        "index": entry["index"],
+        "filename": entry["filename"],
+        "error": str(error)
+    }
+
+
+async def _ingest_bajaj_files(entries: List[Dict[str, Any]], client_id: int,
+                              project_id: int | None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Pipeline behind the bulk endpoints; yields one result per file as it
+    completes, then a summary.
+
+    Files are parsed concurrently in the parser process pool (never more at
+    once than it has workers, so the bulk request cannot fill its queue).
+    Whatever has finished parsing is inserted together via insert_client_pos
+    while the remaining files keep parsing, and archiving is handed to a
+    background thread after the PO is reported.
+    """
+    successful = 0
+    failed = 0
+    parse_slots = asyncio.Semaphore(parser_executor.max_workers)
+
+    async def parse(entry):
+        async with parse_slots:
+            try:
+                return entry, await parser_executor.run(parse_bajaj_po, entry["temp_path"]), None
+            except Exception as e:
+                return entry, None, e
+
+    pending = set()
+    task_entries = {}
+    try:
+        for entry in entries:
+            if "error" in entry:
+                failed += 1
+                yield _failure(entry, entry["error"])
+            else:
+                task = asyncio.ensure_future(parse(entry))
+                task_entries[task] = entry
+                pending.add(task)
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            # Settle the whole round (temp files, archive hand-off) before
+            # yielding, so a client disconnect cannot strand files
+            events = []
+            parsed_batch = []
+            for task in done:
+                entry, parsed, error = task.result()
+                if error is not None:
+                    _remove_quietly(entry["temp_path"])
+                    events.append(_failure(entry, error))
+                else:
+                    parsed_batch.append((entry, parsed))
+
+            for start in range(0, len(parsed_batch), BULK_INSERT_BATCH_SIZE):
+                batch = parsed_batch[start:start + BULK_INSERT_BATCH_SIZE]
+                try:
+                    outcomes = await run_in_threadpool(
+                        insert_client_pos, [parsed for _, parsed in batch], client_id, project_id
+                    )
+                except Exception as e:
+                    outcomes = [e] * len(batch)
+
+                for (entry, parsed), outcome in zip(batch, outcomes):
+                    if isinstance(outcome, Exception):
+                        _remove_quietly(entry["temp_path"])
+                        events.append(_failure(entry, outcome))
+                        continue
+
+                    _archive_executor.submit(_archive_upload, entry, outcome, project_id)
+                    events.append({
+                        "type": "file",
+                        "status": "SUCCESS",
+                        "index": entry["index"],
+                        "filename": entry["filename"],
+                        "client_po_id": outcome,
+                        "po_number": parsed["po_details"].get("po_number"),
+                        "po_value": parsed["po_details"].get("po_value", 0),
+                        "store_id": parsed["po_details"].get("store_id"),
+                        "line_item_count": parsed["line_item_count"]
+                    })
+
+            for event in events:
+                if event["status"] == "SUCCESS":
+                    successful += 1
+                else:
+                    failed += 1
+                yield event
+    finally:
+        # Client went away or something failed: stop outstanding parses and
+        # drop their temp files
+        for task in pending:
+            task.cancel()
+            _remove_quietly(task_entries[task]["temp_path"])
+
+    yield {"type": "summary", "total_files": len(entries), "successful": successful, "failed": failed}
+
 
 @router.post("/bajaj-po/bulk")
 async def bulk_upload_bajaj_po(
@@ -23,7 +233,8 @@ async def bulk_upload_bajaj_po(
     """
     Bulk upload multiple Bajaj PO files for a client.
     
-    Returns aggregated results for all uploaded files.
+    Returns aggregated results for all uploaded files. Use
+    /bajaj-po/bulk/stream to receive per-file results as they complete.
     """
     if not files:
         raise HTTPException(
@@ -40,116 +251,58 @@ async def bulk_upload_bajaj_po(
         "errors": []
     }
     
-    for file in files:
-        try:
-            if not file.filename.lower().endswith((".xlsx", ".xls", ".pdf")):
-                results["errors"].append({
-                    "filename": file.filename,
-                    "error": f"Only PDF and Excel files are allowed. Got {os.path.splitext(file.filename)[1]}"
-                })
-                results["failed"] += 1
-                continue
-            
-            temp_path = os.path.join(
-                UPLOAD_DIR,
-                f"{uuid.uuid4()}_{file.filename}"
-            )
-            
-            try:
-                # Save uploaded file
-                with open(temp_path, "wb") as f:
-                    f.write(await file.read())
-                
-                # Parse PO
-                parsed = parse_bajaj_po(temp_path)
-                
-                # Insert into DB
-                client_po_id = insert_client_po(
-                    parsed=parsed,
-                    client_id=client_id,
-                    project_id=project_id
-                )
-                
-                # Persist uploaded file
-                try:
-                    uploads_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..', 'uploads')
-                    uploads_dir = os.path.normpath(os.path.abspath(uploads_dir))
-                    os.makedirs(uploads_dir, exist_ok=True)
-                    
-                    ext = os.path.splitext(file.filename)[1] or '.xlsx'
-                    unique_name = f"{uuid.uuid4().hex}{ext}"
-                    stored_path = os.path.join(uploads_dir, unique_name)
-                    shutil.copyfile(temp_path, stored_path)
-                    original_size = os.path.getsize(stored_path)
-                    
-                    zip_name = f"{uuid.uuid4().hex}.zip"
-                    zip_path = os.path.join(uploads_dir, zip_name)
-                    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
-                        zf.write(stored_path, arcname=file.filename)
-                    
-                    compressed_size = os.path.getsize(zip_path)
-                    
-                    try:
-                        insert_document(
-                            project_id=project_id,
-                            client_po_id=client_po_id,
-                            original_filename=file.filename,
-                            stored_filename=unique_name,
-                            compressed_filename=zip_name,
-                            mime_type=file.content_type,
-                            original_size=original_size,
-                            compressed_size=compressed_size,
-                            description="Bajaj PO bulk upload"
-                        )
-                    except Exception:
-                        try:
-                            os.remove(stored_path)
-                        except:
-                            pass
-                        try:
-                            os.remove(zip_path)
-                        except:
-                            pass
-                except Exception:
-                    pass
-                
-                results["uploaded_pos"].append({
-                    "client_po_id": client_po_id,
-                    "filename": file.filename,
-                    "po_number": parsed["po_details"].get("po_number"),
-                    "po_value": parsed["po_details"] .get("po_value", 0),
-                    "store_id": parsed["po_details"].get("store_id"),
-                    "line_item_count": parsed["line_item_count"]
-                })
-                results["successful"] += 1
-            
-            except BajajPOParserError as e:
-                results["errors"].append({
-                    "filename": file.filename,
-                    "error": f"Parse error: {str(e)}"
-                })
-                results["failed"] += 1
-            
-            except Exception as e:
-                results["errors"].append({
-                    "filename": file.filename,
-                    "error": str(e)
-                })
-                results["failed"] += 1
-            
-            finally:
-                if os.path.exists(temp_path):
-                    try:
-                        os.remove(temp_path)
-                    except:
-                        pass
-        
-        except Exception as e:
-            results["errors"].append({
-                "filename": file.filename if hasattr(file, 'filename') else 'unknown',
-                "error": str(e)
+    entries = await _save_uploads(files)
+    events = [
+        event async for event in _ingest_bajaj_files(entries, client_id, project_id)
+        if event["type"] == "file"
+    ]
+    # Report in upload order, as before
+    for event in sorted(events, key=lambda e: e["index"]):
+        if event["status"] == "SUCCESS":
+            results["uploaded_pos"].append({
+                key: event[key]
+                for key in ("client_po_id", "filename", "po_number", "po_value", "store_id", "line_item_count")
             })
+            results["successful"] += 1
+        else:
+            results["errors"].append({"filename": event["filename"], "error": event["error"]})
             results["failed"] += 1
     
     return results
 
+
+@router.post("/bajaj-po/bulk/stream")
+async def bulk_upload_bajaj_po_stream(
+    files: List[UploadFile] = File(...),
+    client_id: int = Query(...),
+    project_id: int | None = Query(None),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$", description="ndjson or sse (server-sent events)")
+):
+    """
+    Bulk upload Bajaj PO files, streaming one result per file as it completes.
+    
+    Each message is a JSON object with "type": "file" (status SUCCESS with
+    the PO fields, or FAILED with an error; "index" is the file's position
+    in the upload), followed by a final "type": "summary" message with the
+    totals. Use format=sse for a text/event-stream response instead of
+    NDJSON.
+    """
+    if not files:
+        raise HTTPException(
+            status_code=400,
+            detail="At least one file must be provided"
+        )
+    
+    # Read the uploads now; they are closed once the endpoint returns
+    entries = await _save_uploads(files)
+    
+    async def body():
+        async for event in _ingest_bajaj_files(entries, client_id, project_id):
+            payload = json.dumps(event, default=str)
+            if format == "sse":
+                yield f"event: {event['type']}\ndata: {payload}\n\n"
+            else:
+                yield payload + "\n"
+    
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache"})
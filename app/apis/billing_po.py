@@ -14,8 +14,10 @@ from app.repository.billing_po_repo import (
     delete_billing_line_item
 )
 from app.repository.client_po_repo import get_client_po_with_items
+from app.response_cache import cached_response
+from app.json_response import ORJSONRoute
 
-router = APIRouter(prefix="/api", tags=["Billing PO"])
+router = APIRouter(prefix="/api", tags=["Billing PO"], route_class=ORJSONRoute)
 
 
 class BillingLineItemRequest(BaseModel):
@@ -90,6 +92,7 @@ def get_billing_po_details(billing_po_id: str):
 
 
 @router.get("/projects/{project_id}/billing-summary")
+@cached_response("billing-summary", lambda project_id: [f"project:{project_id}"])
 def get_project_billing_summary_endpoint(project_id: int):
     try:
         summary = get_project_billing_summary(project_id)
@@ -263,6 +266,7 @@ def get_project_profit_loss(project_id: int):
 
 
 @router.get("/projects/{project_id}/pl-analysis")
+@cached_response("pl-analysis", lambda project_id: [f"project:{project_id}"])
 def get_project_pl_analysis_endpoint(project_id: int):
     """Get P&L analysis for a project (alias for billing-pl-analysis)"""
     try:
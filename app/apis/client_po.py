@@ -1,13 +1,15 @@
 from fastapi import APIRouter, HTTPException, File, UploadFile, Query, Request, Form
 from typing import Optional
-from app.repository.client_po_repo import get_client_po_with_items, insert_client_po
+from app.repository.client_po_repo import get_client_po_with_items, get_or_create_project_id
 from app.modules.file_uploads.services.parser_factory import ParserFactory
 from app.modules.file_uploads.services.session_service import SessionService
 from app.modules.file_uploads.services.file_service import FileService
 from app.modules.file_uploads.services.parsing_service import FileParsingService
 from app.modules.file_uploads.schemas.requests import ParsedPOResponse
+from app.json_response import ORJSONRoute
+from starlette.concurrency import run_in_threadpool
 
-router = APIRouter(prefix="/api", tags=["Client PO"])
+router = APIRouter(prefix="/api", tags=["Client PO"], route_class=ORJSONRoute)
 file_service = FileService()
 
 
@@ -127,12 +129,13 @@ async def upload_and_parse_po(
         
         # Parse file using client-specific parser
         try:
-            parsed_data = FileParsingService.parse_uploaded_file(
+            parsed_data = await FileParsingService.parse_uploaded_file(
                 file_content=file_content,
                 filename=file.filename,
                 client_id=final_client_id,
                 session_id=session_id,
-                file_id=file_id
+                file_id=file_id,
+                file_hash=file_metadata['file_hash']
             )
             
             client_po_id = None
@@ -142,35 +145,18 @@ async def upload_and_parse_po(
             # Resolve project_name to project_id if provided
             if final_project_name:
                 try:
-                    from app.database import get_db
-                    conn = get_db()
-                    try:
-                        with conn.cursor() as cur:
-                            # Try to find existing project by name
-                            cur.execute(
-                                "SELECT id FROM project WHERE name = %s AND client_id = %s LIMIT 1",
-                                (final_project_name, final_client_id)
-                            )
-                            result = cur.fetchone()
-                            if result:
-                                project_id = result["id"]
-                            else:
-                                # Create new project if it doesn't exist
-                                cur.execute(
-                                    "INSERT INTO project (client_id, name, status) VALUES (%s, %s, 'Active') RETURNING id",
-                                    (final_client_id, final_project_name)
-                                )
-                                project_id = cur.fetchone()["id"]
-                                conn.commit()
-                    finally:
-                        conn.close()
+                    project_id = await run_in_threadpool(
+                        get_or_create_project_id, final_client_id, final_project_name
+                    )
                 except Exception as e:
                     print(f"Warning: Could not resolve project name '{project_name}': {str(e)}")
             
             if final_auto_save and parsed_data:
                 try:
                     # Insert into business database
-                    client_po_id = insert_client_po(parsed_data, final_client_id, project_id)
+                    client_po_id = await run_in_threadpool(
+                        FileParsingService.save_parsed_po, parsed_data, final_client_id, project_id
+                    )
                     print(f"✅ Successfully inserted PO into database with ID: {client_po_id}")
                 except ValueError as validation_error:
                     # Validation error - log but return it in response
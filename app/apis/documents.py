@@ -6,8 +6,9 @@ import zipfile
 from app.repository.document_repo import insert_document, get_documents_for_project, get_document_by_id
 from app.repository.document_repo import get_documents_for_po
 from app.database import get_db
+from app.json_response import ORJSONRoute
 
-router = APIRouter(prefix="/api", tags=["Documents"])
+router = APIRouter(prefix="/api", tags=["Documents"], route_class=ORJSONRoute)
 
 UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..', 'uploads')
 UPLOAD_DIR = os.path.normpath(os.path.abspath(UPLOAD_DIR))
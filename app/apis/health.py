@@ -3,13 +3,16 @@ Health check endpoints for system monitoring
 """
 from fastapi import APIRouter, HTTPException
 from datetime import datetime
-from app.database import get_db
+from app.database import get_db, get_pool_stats
+from app.async_database import get_async_pool_stats
+from app.modules.file_uploads.services.parser_executor import parser_executor
 from app.schemas import HealthCheckResponse
 from app.logger import get_logger
 from app.config import settings
+from app.json_response import ORJSONRoute
 
 logger = get_logger(__name__)
-router = APIRouter(prefix="/api", tags=["Health"])
+router = APIRouter(prefix="/api", tags=["Health"], route_class=ORJSONRoute)
 
 @router.get("/health", response_model=HealthCheckResponse)
 def health_check():
@@ -69,6 +72,8 @@ def detailed_health_check():
             
             health_info["components"]["database"] = "UP"
             health_info["database_tables"] = table_count
+            health_info["database_pool"] = get_pool_stats()
+            health_info["async_database_pool"] = get_async_pool_stats()
         finally:
             conn.close()
     except Exception as e:
@@ -76,5 +81,7 @@ def detailed_health_check():
         health_info["components"]["database"] = "DOWN"
         health_info["status"] = "DEGRADED"
     
+    health_info["parser_pool"] = parser_executor.stats()
+    
     return health_info
 
@@ -0,0 +1,16 @@
+"""
+Prometheus scrape endpoint
+"""
+from fastapi import APIRouter, Response
+
+from app.metrics import CONTENT_TYPE_LATEST, metrics_payload
+from app.json_response import ORJSONRoute
+
+router = APIRouter(tags=["Health"], route_class=ORJSONRoute)
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics for this worker, or for all workers in multiprocess mode"""
+    # Set as a header: media_type would append a second charset
+    return Response(content=metrics_payload(), headers={"Content-Type": CONTENT_TYPE_LATEST})
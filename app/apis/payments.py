@@ -1,10 +1,12 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, Query
 from typing import Optional
 from pydantic import BaseModel
 from datetime import date
 from app.repository import payment_repo
+from app.json_response import ORJSONRoute
 
-router = APIRouter(prefix="/api", tags=["Payments"])
+router = APIRouter(prefix="/api", tags=["Payments"], route_class=ORJSONRoute)
 
 
 class PaymentCreate(BaseModel):
@@ -68,19 +70,47 @@ def create_payment(po_id: int, payment: PaymentCreate):
 
 
 @router.get("/payments")
-def get_all_payments(skip: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500)):
-    """Get all payments with optional pagination"""
+async def get_all_payments(
+    status: Optional[str] = Query(None),
+    payment_mode: Optional[str] = Query(None),
+    po_id: Optional[int] = Query(None, description="Only payments against this client PO"),
+    date_from: Optional[date] = Query(None, description="Inclusive lower bound on payment_date"),
+    date_to: Optional[date] = Query(None, description="Inclusive upper bound on payment_date"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+    exact_count: bool = Query(False, description="Count matching payments exactly instead of estimating")
+):
+    """
+    Get payments, newest first, one keyset page at a time
+    
+    Pass `next_cursor` from the response as `cursor` to fetch the next page;
+    it is null on the last page. total_count is the planner's estimate for
+    the filters (total_count_exact is false) unless exact_count=true or the
+    first page already holds every match.
+    """
+    filters = dict(status=status, payment_mode=payment_mode, client_po_id=po_id,
+                   date_from=date_from, date_to=date_to)
     try:
-        payments = payment_repo.get_all_payments(skip=skip, limit=limit)
-        total_count = payment_repo.get_total_payment_count()
+        page, total_count = await asyncio.gather(
+            payment_repo.get_payments_page_async(cursor=cursor, limit=limit, **filters),
+            payment_repo.get_payment_count_async(exact=exact_count, **filters)
+        )
+        payments = page["payments"]
+        total_count_exact = exact_count
+        if cursor is None and page["next_cursor"] is None:
+            total_count, total_count_exact = len(payments), True
         return {
             "status": "SUCCESS",
             "payments": payments,
             "payment_count": len(payments),
             "total_count": total_count,
-            "skip": skip,
+            "total_count_exact": total_count_exact,
+            "next_cursor": page["next_cursor"],
+            "has_more": page["next_cursor"] is not None,
             "limit": limit
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch payments: {str(e)}")
 
@@ -8,33 +8,43 @@ PO Management APIs:
 - PO deletion
 """
 
-from fastapi import APIRouter, HTTPException, Query
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 from datetime import date
-from typing import Optional
+from typing import List, Optional
 
 from app.repository.po_management_repo import (
     add_line_item,
+    add_line_items_bulk,
     update_line_item,
     delete_line_item,
     get_line_items,
     get_all_pos,
-    get_po_by_id,
+    get_pos_page_async,
+    get_po_document,
     create_po_for_project,
     get_all_pos_for_project,
+    get_all_pos_for_project_async,
+    get_enriched_pos_for_project,
     attach_po_to_project,
     set_primary_po,
     create_verbal_agreement,
     get_verbal_agreements_for_project,
+    get_verbal_agreements_for_project_async,
     update_po_details,
     add_po_to_verbal_agreement,
     delete_po,
     delete_project,
     create_project
 )
-from app.repository.payment_repo import get_project_payment_summary
+from app.modules.file_uploads.utils.downloads import etag_matches
+from app.repository.project_financials_repo import get_project_financials_async
+from app.response_cache import cached_response
+from app.unit_of_work import read_only_snapshot
+from app.json_response import ORJSONRoute
 
-router = APIRouter(prefix="/api", tags=["PO Management"])
+router = APIRouter(prefix="/api", tags=["PO Management"], route_class=ORJSONRoute)
 
 
 # ==========================================
@@ -230,7 +240,11 @@ def add_bulk_line_items(client_po_id: int, bulk_request: BulkLineItemRequest):
         bulk_request: List of line items to add
     
     Returns:
-        List of created line items
+        List of created line items; items that fail validation are listed
+        in failed_items by their index in the request
+    
+    The valid items are inserted together in one transaction, so a
+    database error adds none of them.
     
     Example:
         POST /api/po/1/line-items/bulk
@@ -245,43 +259,48 @@ def add_bulk_line_items(client_po_id: int, bulk_request: BulkLineItemRequest):
         if not bulk_request.items or len(bulk_request.items) == 0:
             raise HTTPException(status_code=400, detail="Items list cannot be empty")
         
-        if len(bulk_request.items) > 100:
-            raise HTTPException(status_code=400, detail="Maximum 100 items per request")
-        
-        created_items = []
+        valid_items = []
+        valid_indexes = []
         failed_items = []
         
         for idx, item in enumerate(bulk_request.items):
-            try:
-                # Support both item_name and description
-                final_item_name = item.item_name or item.description
-
-                # Validate each item
-                if item.quantity <= 0:
-                    failed_items.append({"index": idx, "reason": "Quantity must be > 0"})
-                    continue
-                if item.unit_price < 0:
-                    failed_items.append({"index": idx, "reason": "Unit price cannot be negative"})
-                    continue
-                if not final_item_name or not final_item_name.strip():
-                    failed_items.append({"index": idx, "reason": "Item name or description is required"})
-                    continue
-                
-                result = add_line_item(
-                    client_po_id=client_po_id,
-                    item_name=final_item_name.strip(),
-                    quantity=item.quantity,
-                    unit_price=item.unit_price
-                )
-                created_items.append({
-                    "line_item_id": result["line_item_id"],
-                    "item_name": result["item_name"],
-                    "quantity": float(result["quantity"]),
-                    "unit_price": float(result["unit_price"]),
-                    "total_price": float(result["total_price"])
-                })
-            except Exception as e:
-                failed_items.append({"index": idx, "reason": str(e)})
+            # Support both item_name and description
+            final_item_name = item.item_name or item.description
+            
+            # Validate each item
+            if item.quantity <= 0:
+                failed_items.append({"index": idx, "reason": "Quantity must be > 0"})
+                continue
+            if item.unit_price < 0:
+                failed_items.append({"index": idx, "reason": "Unit price cannot be negative"})
+                continue
+            if not final_item_name or not final_item_name.strip():
+                failed_items.append({"index": idx, "reason": "Item name or description is required"})
+                continue
+            
+            valid_items.append({
+                "item_name": final_item_name.strip(),
+                "quantity": item.quantity,
+                "unit_price": item.unit_price
+            })
+            valid_indexes.append(idx)
+        
+        # All valid items go in together: one transaction, one PO total update
+        results = add_line_items_bulk(client_po_id, valid_items)
+        if results is None:
+            raise HTTPException(status_code=404, detail=f"PO {client_po_id} not found")
+        
+        created_items = [
+            {
+                "index": idx,
+                "line_item_id": result["line_item_id"],
+                "item_name": result["item_name"],
+                "quantity": float(result["quantity"]),
+                "unit_price": float(result["unit_price"]),
+                "total_price": float(result["total_price"])
+            }
+            for idx, result in zip(valid_indexes, results)
+        ]
         
         return {
             "status": "PARTIAL_SUCCESS" if failed_items else "SUCCESS",
@@ -467,24 +486,54 @@ def remove_line_item(line_item_id: int):
 # ==========================================
 
 @router.get("/po")
-def get_all_purchase_orders(client_id: int = Query(None)):
-    """Get all POs with optional client_id filter"""
+async def get_all_purchase_orders(
+    client_id: int = Query(None),
+    status: Optional[str] = Query(None),
+    project_id: Optional[int] = Query(None),
+    date_from: Optional[date] = Query(None, description="Inclusive lower bound on po_date"),
+    date_to: Optional[date] = Query(None, description="Inclusive upper bound on po_date"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Get POs aggregated by store, one keyset page at a time
+    
+    Filters: client_id, status, project_id, po_date range (date_from/date_to).
+    Pass `next_cursor` from the response as `cursor` to fetch the next page;
+    it is null on the last page. total_count and total_value cover the
+    current page only.
+    """
     try:
-        pos = get_all_pos(client_id=client_id)
+        page = await get_pos_page_async(
+            client_id=client_id,
+            status=status,
+            project_id=project_id,
+            date_from=date_from,
+            date_to=date_to,
+            cursor=cursor,
+            limit=limit
+        )
+        pos = page["pos"]
         total_value = sum(po["po_value"] for po in pos)
         return {
             "status": "SUCCESS",
             "data": {
                 "pos": pos,
                 "total_count": len(pos),
-                "total_value": total_value
+                "total_value": total_value,
+                "next_cursor": page["next_cursor"],
+                "has_more": page["next_cursor"] is not None,
+                "limit": limit
             }
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch POs: {str(e)}")
 
 
 @router.get("/po/aggregated/by-store")
+@cached_response("po-aggregated-by-store", lambda client_id: [f"client:{c}" for c in ([client_id] if client_id else [1, 2])])
 def get_aggregated_pos_by_store(client_id: int = Query(None)):
     """
     Get POs with different handling for each client:
@@ -521,8 +570,8 @@ def get_aggregated_pos_by_store(client_id: int = Query(None)):
                             cp.project_id,
                             cp.po_number,
                             cp.po_date,
-                            cp.po_value,
-                            cp.receivable_amount,
+                            COALESCE(cp.po_value, 0) AS po_value,
+                            COALESCE(cp.receivable_amount, 0) AS receivable_amount,
                             cp.status,
                             cp.created_at,
                             cp.store_id,
@@ -547,8 +596,8 @@ def get_aggregated_pos_by_store(client_id: int = Query(None)):
                             "project_name": row["project_name"],
                             "po_number": row["po_number"],
                             "po_date": row["po_date"],
-                            "po_value": float(row["po_value"]) if row["po_value"] else 0,
-                            "receivable_amount": float(row["receivable_amount"]) if row["receivable_amount"] else 0,
+                            "po_value": row["po_value"],
+                            "receivable_amount": row["receivable_amount"],
                             "status": row["status"],
                             "created_at": row["created_at"],
                             "po_ids": [row["id"]],  # Single PO
@@ -573,9 +622,7 @@ def get_aggregated_pos_by_store(client_id: int = Query(None)):
             # Alias po_value to total_po_value for consistency with frontend expectations if needed,
             # but frontend probably expects po_value since it's mapped to ClientPO.
             # However, po_management.py uses total_po_value below, so let's set it.
-            # Ensure it's float to avoid Decimal/float type mismatch in calculations
-            po_val = bundle.get("po_value", 0)
-            bundle["total_po_value"] = float(po_val) if po_val else 0
+            bundle["total_po_value"] = bundle["po_value"]
 
             if is_bundled:
                 # Add badge for bundled POs
@@ -600,7 +647,7 @@ def get_aggregated_pos_by_store(client_id: int = Query(None)):
         bundled_count = sum(1 for b in bundles if b.get("is_bundled"))
         single_count = len(bundles) - bundled_count
         
-        total_value = sum(float(b.get("total_po_value", 0)) for b in bundles)
+        total_value = sum(b["total_po_value"] for b in bundles)
         total_line_items = sum(int(b.get("line_count", 0)) for b in bundles)
         
         return {
@@ -622,17 +669,41 @@ def get_aggregated_pos_by_store(client_id: int = Query(None)):
         raise HTTPException(status_code=500, detail=f"Failed to fetch aggregated POs: {str(e)}")
 
 
+def _if_none_match_versions(header: Optional[str]) -> List[str]:
+    """Opaque values of the entity tags in an If-None-Match header"""
+    if not header:
+        return []
+    return [tag.strip().removeprefix("W/").strip('"') for tag in header.split(",")]
+
+
+def _po_document_response(request: Request, po_id: int, with_payments: bool) -> Response:
+    """
+    Serve a PO detail document with a weak ETag from its row versions
+    
+    Postgres renders the document as JSON text, which goes out wrapped in
+    the SUCCESS envelope without being decoded. A client sending a current
+    ETag in If-None-Match gets a 304 and the document is never built.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    po = get_po_document(po_id, _if_none_match_versions(if_none_match), with_payments=with_payments)
+    if not po:
+        raise HTTPException(status_code=404, detail=f"PO {po_id} not found")
+    
+    headers = {"ETag": f'W/"{po["version"]}"', "Cache-Control": "private, no-cache"}
+    if po["document"] is None or etag_matches(if_none_match, f'"{po["version"]}"'):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=f'{{"status":"SUCCESS","data":{po["document"]}}}',
+        media_type="application/json",
+        headers=headers
+    )
+
+
 @router.get("/po/{po_id}")
-def get_single_po(po_id: int):
-    """Get a single PO by ID with all details including line items"""
+def get_single_po(po_id: int, request: Request):
+    """Get a single PO by ID with all details including line items (conditional GET via ETag)"""
     try:
-        po = get_po_by_id(po_id)
-        if not po:
-            raise HTTPException(status_code=404, detail=f"PO {po_id} not found")
-        return {
-            "status": "SUCCESS",
-            "data": po
-        }
+        return _po_document_response(request, po_id, with_payments=False)
     except HTTPException:
         raise
     except Exception as e:
@@ -640,31 +711,10 @@ def get_single_po(po_id: int):
 
 
 @router.get("/po/{po_id}/details")
-def get_po_order_details(po_id: int):
-    """Get order details for a specific PO (enhanced response)"""
+def get_po_order_details(po_id: int, request: Request):
+    """Get order details for a specific PO with cleared-payment totals (conditional GET via ETag)"""
     try:
-        po = get_po_by_id(po_id)
-        if not po:
-            raise HTTPException(status_code=404, detail=f"PO {po_id} not found")
-        
-        # Get payment info if available
-        from app.repository.payment_repo import get_payment_summary
-        try:
-            payment_summary = get_payment_summary(po_id)
-        except:
-            payment_summary = {"total_paid": 0, "total_tds": 0}
-        
-        return {
-            "status": "SUCCESS",
-            "data": {
-                **po,
-                "payment_status": "paid" if payment_summary.get("total_paid", 0) >= po["po_value"] else 
-                                  "partial" if payment_summary.get("total_paid", 0) > 0 else "pending",
-                "total_paid": payment_summary.get("total_paid", 0),
-                "total_tds": payment_summary.get("total_tds", 0),
-                "outstanding_amount": po["po_value"] - payment_summary.get("total_paid", 0)
-            }
-        }
+        return _po_document_response(request, po_id, with_payments=True)
     except HTTPException:
         raise
     except Exception as e:
@@ -876,29 +926,48 @@ def get_project_verbal_agreements(project_id: int):
 # FINANCIAL SUMMARY
 # ==========================================
 
-@router.get("/projects/{project_id}/financial-summary")
-def get_project_financial_summary(project_id: int):
+@router.get("/projects/{project_id}/financial-summary", dependencies=[Depends(read_only_snapshot)])
+@cached_response("financial-summary", lambda project_id, include_orders: [f"project:{project_id}"])
+async def get_project_financial_summary(
+    project_id: int,
+    include_orders: bool = Query(True, description="Include the PO and verbal agreement lists (totals come from the rollup either way)")
+):
     try:
-        pos = get_all_pos_for_project(project_id)
-        agreements = get_verbal_agreements_for_project(project_id)
-
-        po_value = sum(po["po_value"] for po in pos)
-        agreement_value = sum(a["value"] for a in agreements)
+        # Totals are one project_financials row; the lists are read in the
+        # same snapshot only when asked for
+        if include_orders:
+            totals, pos, agreements = await asyncio.gather(
+                get_project_financials_async(project_id),
+                get_all_pos_for_project_async(project_id),
+                get_verbal_agreements_for_project_async(project_id)
+            )
+        else:
+            totals = await get_project_financials_async(project_id)
+        if not totals:
+            raise HTTPException(status_code=404, detail="Project not found")
+
+        po_value = float(totals["linked_po_value"])
+        agreement_value = float(totals["agreement_value"])
         total_project_value = po_value + agreement_value
 
-        payment_summary = get_project_payment_summary(project_id)
-        total_collected = payment_summary["total_collected"]
+        total_collected = float(totals["total_collected"])
         outstanding_amount = total_project_value - total_collected
 
-        vendor_count = len(set(po.get("vendor_name") for po in pos if po.get("vendor_name"))) + \
-                       len(set(a.get("vendor_name") for a in agreements if a.get("vendor_name")))
-        client_count = len(set(po.get("client_name") for po in pos if po.get("client_name"))) + \
-                       len(set(a.get("client_name") for a in agreements if a.get("client_name")))
-        active_orders = sum(1 for po in pos if po.get("status") == "active")
-
         net_profit = total_collected - outstanding_amount
         profit_margin = ((net_profit / total_project_value) * 100) if total_project_value > 0 else 0
 
+        purchase_orders = {
+            "count": totals["linked_po_count"],
+            "total_value": po_value
+        }
+        verbal_agreements = {
+            "count": totals["agreement_count"],
+            "total_value": agreement_value
+        }
+        if include_orders:
+            purchase_orders["orders"] = pos
+            verbal_agreements["agreements"] = agreements
+
         return {
             "status": "SUCCESS",
             "project_id": project_id,
@@ -906,27 +975,21 @@ def get_project_financial_summary(project_id: int):
                 "total_po_value": po_value,
                 "total_agreement_value": agreement_value,
                 "total_project_value": total_project_value,
-                "documents": len(pos),
-                "verbal_agreements": len(agreements),
+                "documents": totals["linked_po_count"],
+                "verbal_agreements": totals["agreement_count"],
                 "total_collected": total_collected,
                 "outstanding_amount": outstanding_amount,
                 "net_profit": net_profit,
                 "profit_margin_percentage": round(profit_margin, 2),
-                "active_orders": active_orders,
-                "vendor_count": vendor_count,
-                "client_count": client_count
-            },
-            "purchase_orders": {
-                "count": len(pos),
-                "total_value": po_value,
-                "orders": pos
+                "active_orders": totals["active_po_count"],
+                "vendor_count": totals["po_vendor_count"],
+                "client_count": totals["po_client_count"]
             },
-            "verbal_agreements": {
-                "count": len(agreements),
-                "total_value": agreement_value,
-                "agreements": agreements
-            }
+            "purchase_orders": purchase_orders,
+            "verbal_agreements": verbal_agreements
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch financial summary: {str(e)}")
 
@@ -938,18 +1001,12 @@ def get_project_financial_summary(project_id: int):
 @router.get("/projects/{project_id}/po/enriched")
 def get_enriched_project_pos(project_id: int):
     try:
-        from app.repository.payment_repo import get_payments_for_po, get_payment_summary
-
-        pos = get_all_pos_for_project(project_id)
+        pos = get_enriched_pos_for_project(project_id)
         enriched_pos = []
 
         for po in pos:
-            po_id = po.get("po_id") or po.get("client_po_id")
-            payments = get_payments_for_po(po_id)
-            payment_summary = get_payment_summary(po_id)
-
-            total_paid = payment_summary["total_paid"]
-            total_tds = payment_summary["total_tds"]
+            payments = po.pop("payments")
+            total_paid = po["total_paid"]
             receivable = po["po_value"] - total_paid
 
             if total_paid >= po["po_value"]:
@@ -961,10 +1018,8 @@ def get_enriched_project_pos(project_id: int):
 
             enriched_pos.append({
                 **po,
-                "total_paid": total_paid,
                 "receivable_amount": receivable,
                 "payment_status": payment_status,
-                "total_tds": total_tds,
                 "payment_details": payments,
                 "payment_count": len(payments)
             })
@@ -19,10 +19,12 @@ import uuid
 import zipfile
 from typing import List
 from app.utils.proforma_invoice_parser import parse_proforma_invoice, ProformaInvoiceParserError
-from app.repository.client_po_repo import insert_client_po
+from app.modules.file_uploads.services.parser_executor import parser_executor
+from app.repository.client_po_repo import get_or_create_project_id, insert_client_po
 from app.repository.document_repo import insert_document
+from app.json_response import ORJSONRoute
 
-router = APIRouter(prefix="/api", tags=["Proforma Invoice"])
+router = APIRouter(prefix="/api", tags=["Proforma Invoice"], route_class=ORJSONRoute)
 
 
 @router.post("/proforma-invoice/upload")
@@ -68,7 +70,7 @@ async def upload_proforma_invoice(
         # Parse the Proforma Invoice
         # ========================================
         try:
-            parsed = parse_proforma_invoice(temp_file_path)
+            parsed = await parser_executor.run(parse_proforma_invoice, temp_file_path)
         except ProformaInvoiceParserError as e:
             raise HTTPException(
                 status_code=400,
@@ -97,28 +99,7 @@ async def upload_proforma_invoice(
         project_id = None
         if project_name:
             try:
-                from app.database import get_db
-                conn = get_db()
-                try:
-                    with conn.cursor() as cur:
-                        # Try to find existing project by name
-                        cur.execute(
-                            "SELECT id FROM project WHERE name = %s AND client_id = %s LIMIT 1",
-                            (project_name, client_id)
-                        )
-                        result = cur.fetchone()
-                        if result:
-                            project_id = result["id"]
-                        else:
-                            # Create new project if it doesn't exist
-                            cur.execute(
-                                "INSERT INTO project (client_id, name, status) VALUES (%s, %s, 'Active') RETURNING id",
-                                (client_id, project_name)
-                            )
-                            project_id = cur.fetchone()["id"]
-                            conn.commit()
-                finally:
-                    conn.close()
+                project_id = get_or_create_project_id(client_id, project_name)
             except Exception as e:
                 # Log error but don't fail - project_id will be None
                 print(f"Warning: Could not resolve project name '{project_name}': {str(e)}")
@@ -377,7 +358,7 @@ async def bulk_upload_proforma_invoice(
             
             # Parse the Proforma Invoice
             try:
-                parsed = parse_proforma_invoice(temp_file_path)
+                parsed = await parser_executor.run(parse_proforma_invoice, temp_file_path)
                 
                 # Insert into DB
                 client_po_id = insert_client_po(
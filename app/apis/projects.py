@@ -6,7 +6,7 @@ from pydantic import BaseModel
 from typing import Optional
 
 from app.repository.project_repo import (
-    get_all_projects,
+    get_all_projects_async,
     get_project_by_id,
     get_project_by_name,
     create_project,
@@ -15,8 +15,10 @@ from app.repository.project_repo import (
     delete_project_by_name,
     search_projects
 )
+from app.exceptions import ConflictError
+from app.json_response import ORJSONRoute
 
-router = APIRouter(prefix="/api", tags=["Projects"])
+router = APIRouter(prefix="/api", tags=["Projects"], route_class=ORJSONRoute)
 
 
 class ProjectRequest(BaseModel):
@@ -40,10 +42,10 @@ class ProjectUpdateRequest(BaseModel):
 
 
 @router.get("/projects")
-def get_projects(skip: int = Query(0, ge=0), limit: int = Query(1000, ge=1, le=5000)):
+async def get_projects(skip: int = Query(0, ge=0), limit: int = Query(1000, ge=1, le=5000)):
     """Get all projects with pagination"""
     try:
-        projects = get_all_projects(skip=skip, limit=limit)
+        projects = await get_all_projects_async(skip=skip, limit=limit)
         return {
             "status": "SUCCESS",
             "project_count": len(projects),
@@ -108,6 +110,8 @@ def update_project_by_id(project_id: int, project: ProjectUpdateRequest):
         }
     except HTTPException:
         raise
+    except ConflictError as e:
+        raise HTTPException(status_code=409, detail=e.message)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update project: {str(e)}")
 
@@ -8,8 +8,9 @@ from app.repository.quotation_repo import (
     get_quotation_details,
     delete_quotation
 )
+from app.json_response import ORJSONRoute
 
-router = APIRouter(prefix="/api/quotations", tags=["Quotations"])
+router = APIRouter(prefix="/api/quotations", tags=["Quotations"], route_class=ORJSONRoute)
 
 class QuotationHeader(BaseModel):
     storeId: str
@@ -0,0 +1,44 @@
+"""
+Global search API endpoint
+"""
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+
+from app.repository import search_repo
+from app.json_response import ORJSONRoute
+
+router = APIRouter(prefix="/api", tags=["Search"], route_class=ORJSONRoute)
+
+
+@router.get("/search")
+async def search(
+    q: str = Query(..., min_length=search_repo.MIN_TERM_LENGTH, description="Search term"),
+    type: Optional[List[str]] = Query(
+        None, description=f"Entity types to search (repeatable): {', '.join(search_repo.SEARCH_TYPES)}"
+    ),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    Search projects, client POs (PO/PI number, store ID), vendors and PO
+    line items, best match first
+
+    Each result carries its type and id plus project_id / client_po_id to
+    link to. Pass `next_cursor` from the response as `cursor` to fetch the
+    next page; it is null on the last page.
+    """
+    try:
+        page = await search_repo.search_async(q, types=type, cursor=cursor, limit=limit)
+        return {
+            "status": "SUCCESS",
+            "query": q,
+            "results": page["results"],
+            "result_count": len(page["results"]),
+            "next_cursor": page["next_cursor"],
+            "has_more": page["next_cursor"] is not None,
+            "limit": limit
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search: {str(e)}")
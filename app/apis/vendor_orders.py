@@ -18,8 +18,9 @@ from app.repository.vendor_order_repo import (
     get_vendor_order_payment_summary,
     link_payment_to_vendor_order
 )
+from app.json_response import ORJSONRoute
 
-router = APIRouter(prefix="/api", tags=["Vendor Orders"])
+router = APIRouter(prefix="/api", tags=["Vendor Orders"], route_class=ORJSONRoute)
 
 
 class VendorOrderRequest(BaseModel):
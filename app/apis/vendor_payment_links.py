@@ -8,8 +8,9 @@ from app.repository.vendor_order_repo import (
     get_vendor_order_payment_summary,
     unlink_payment_by_payment_id
 )
+from app.json_response import ORJSONRoute
 
-router = APIRouter(prefix="/api", tags=["Payment Links"])
+router = APIRouter(prefix="/api", tags=["Payment Links"], route_class=ORJSONRoute)
 
 
 class PaymentLinkRequest(BaseModel):
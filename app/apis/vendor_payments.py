@@ -9,8 +9,9 @@ from app.repository.vendor_order_repo import (
     update_vendor_payment,
     delete_vendor_payment
 )
+from app.json_response import ORJSONRoute
 
-router = APIRouter(prefix="/api", tags=["Vendor Payments"])
+router = APIRouter(prefix="/api", tags=["Vendor Payments"], route_class=ORJSONRoute)
 
 
 class VendorPaymentRequest(BaseModel):
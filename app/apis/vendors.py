@@ -12,8 +12,10 @@ from app.repository.vendor_order_repo import (
     get_vendor_payment_summary,
     get_project_vendor_summary
 )
+from app.response_cache import cached_response
+from app.json_response import ORJSONRoute
 
-router = APIRouter(prefix="/api", tags=["Vendors"])
+router = APIRouter(prefix="/api", tags=["Vendors"], route_class=ORJSONRoute)
 
 
 class VendorRequest(BaseModel):
@@ -140,6 +142,7 @@ def get_vendor_payment_history(vendor_id: int):
 
 
 @router.get("/vendors/{vendor_id}/payment-summary")
+@cached_response("vendor-payment-summary", lambda vendor_id: [f"vendor:{vendor_id}"])
 def get_vendor_summary(vendor_id: int):
     try:
         summary = get_vendor_payment_summary(vendor_id)
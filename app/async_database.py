@@ -0,0 +1,183 @@
+"""
+Asyncio database access for async FastAPI endpoints
+Uses psycopg 3's AsyncConnectionPool so a request awaits the database
+instead of holding a Starlette threadpool worker for its whole duration
+"""
+from contextlib import asynccontextmanager
+from psycopg import AsyncCursor
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from app.config import settings
+from app import metrics, sql_trace, unit_of_work
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Async connection pool (one per worker process, bound to its event loop)
+_async_pool = None
+_async_pool_loop = None
+_async_pool_lock = None
+
+
+class InstrumentedAsyncCursor(AsyncCursor):
+    """AsyncCursor that records statement timings like app.database.InstrumentedCursor"""
+    
+    async def execute(self, query, params=None, **kwargs):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await super().execute(query, params, **kwargs)
+            failed = False
+            return result
+        finally:
+            self._observe(query, time.perf_counter() - start, failed)
+    
+    async def executemany(self, query, params_seq, **kwargs):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await super().executemany(query, params_seq, **kwargs)
+            failed = False
+            return result
+        finally:
+            self._observe(query, time.perf_counter() - start, failed)
+    
+    def _observe(self, query, seconds: float, failed: bool):
+        metrics.observe_query(query, seconds, failed)
+        sql_trace.record_statement(query, seconds, self)
+
+
+def _get_pool_lock() -> asyncio.Lock:
+    """Lock guarding pool creation, created for the running event loop"""
+    global _async_pool_lock
+    loop = asyncio.get_running_loop()
+    if _async_pool_lock is None or getattr(_async_pool_lock, "_pool_loop", None) is not loop:
+        _async_pool_lock = asyncio.Lock()
+        _async_pool_lock._pool_loop = loop
+    return _async_pool_lock
+
+
+def _build_conninfo() -> str:
+    """Connection string matching the sync pool's settings"""
+    return make_conninfo(
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        dbname=settings.DB_NAME,
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        connect_timeout=settings.DB_POOL_TIMEOUT,
+        # Set the schema once per physical connection
+        options=f'-c search_path="{settings.DB_SCHEMA}"',
+        keepalives=1,
+        keepalives_idle=30,
+        keepalives_interval=10,
+        keepalives_count=5
+    )
+
+
+async def init_async_pool():
+    """Initialize the async database connection pool"""
+    global _async_pool, _async_pool_loop
+    
+    loop = asyncio.get_running_loop()
+    async with _get_pool_lock():
+        if _async_pool and _async_pool_loop is loop:
+            return  # Already initialized
+        
+        if _async_pool:
+            # The pool belongs to an event loop that is gone (e.g. a test
+            # client that started a new loop); its connections cannot be
+            # awaited from here, so drop it and start a fresh one
+            logger.warning("Async pool was created on another event loop, re-initializing")
+            _async_pool = None
+        
+        try:
+            async_pool = AsyncConnectionPool(
+                conninfo=_build_conninfo(),
+                min_size=settings.DB_ASYNC_POOL_SIZE // 2,
+                max_size=settings.DB_ASYNC_POOL_SIZE + settings.DB_ASYNC_MAX_OVERFLOW,
+                timeout=settings.DB_POOL_TIMEOUT,
+                max_idle=settings.DB_POOL_OVERFLOW_IDLE_SECONDS,
+                kwargs={"row_factory": dict_row, "cursor_factory": InstrumentedAsyncCursor},
+                open=False
+            )
+            await async_pool.open()
+            _async_pool = async_pool
+            _async_pool_loop = loop
+            logger.info(
+                f"Async database connection pool initialized: "
+                f"{settings.DB_ASYNC_POOL_SIZE // 2}-{settings.DB_ASYNC_POOL_SIZE + settings.DB_ASYNC_MAX_OVERFLOW} connections"
+            )
+        except Exception as e:
+            logger.error(f"Failed to initialize async database connection pool: {e}")
+            raise
+
+
+async def close_async_pool():
+    """Close the async pool (call on app shutdown)"""
+    global _async_pool, _async_pool_loop
+    
+    async with _get_pool_lock():
+        if _async_pool and _async_pool_loop is asyncio.get_running_loop():
+            try:
+                await _async_pool.close()
+                _async_pool = None
+                _async_pool_loop = None
+                logger.info("Async database connection pool closed")
+            except Exception as e:
+                logger.error(f"Error closing async connection pool: {e}")
+
+
+async def async_pool_connection():
+    """The pool's connection() context manager, initializing the pool first if needed"""
+    if not _async_pool or _async_pool_loop is not asyncio.get_running_loop():
+        await init_async_pool()
+    return _async_pool.connection()
+
+
+@asynccontextmanager
+async def get_async_db():
+    """
+    Async equivalent of get_db().
+    
+    Usage:
+        async with get_async_db() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT ...", params)
+                rows = await cur.fetchall()
+    
+    Rows are dicts. The transaction is committed when the block exits
+    normally, rolled back on error, and the connection is returned to the
+    pool either way. Waits up to DB_POOL_TIMEOUT for a free connection.
+    
+    Inside a unit of work (app/unit_of_work.py) this is the request's
+    shared connection instead, and the transaction stays open until the
+    request ends.
+    """
+    uow = unit_of_work.current()
+    if uow is not None:
+        conn = await uow.async_connection()
+        try:
+            yield conn
+        except BaseException:
+            if uow.async_transaction_aborted():
+                await uow.rollback_async()
+            raise
+        return
+    
+    context = await async_pool_connection()
+    start = time.perf_counter()
+    async with context as conn:
+        wait = time.perf_counter() - start
+        if wait > 1:
+            logger.warning(f"Waited {wait:.3f}s for an async database connection")
+        yield conn
+
+
+def get_async_pool_stats() -> dict:
+    """Get async pool metrics (empty if the pool is not initialized)"""
+    pool_ref = _async_pool
+    return dict(pool_ref.get_stats()) if pool_ref else {}
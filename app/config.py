@@ -24,11 +24,35 @@ class Settings:
         self.DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
         self.DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
         self.DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+        # Overflow connections idle longer than this are closed
+        self.DB_POOL_OVERFLOW_IDLE_SECONDS = int(os.getenv("DB_POOL_OVERFLOW_IDLE_SECONDS", "30"))
+        # Connections idle longer than this are pinged before being handed out
+        self.DB_POOL_PRE_PING_SECONDS = int(os.getenv("DB_POOL_PRE_PING_SECONDS", "60"))
+        # The async pool (app/async_database.py) only serves the async read endpoints on one
+        # event loop, so it stays small; it is opened in every worker on top of the sync pool
+        self.DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", "4"))
+        self.DB_ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "6"))
         
         # Application Configuration
         self.APP_ENVIRONMENT = os.getenv("APP_ENVIRONMENT", "development")
         self.DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() in ("true", "1", "yes")
         self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+        # Records wait here for the background writer thread; when it is full new records are dropped
+        self.LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+        # Share of successful requests that get an access log line (errors and slow requests always do)
+        self.LOG_ACCESS_SAMPLE_RATE = float(os.getenv("LOG_ACCESS_SAMPLE_RATE", "1.0"))
+        self.LOG_SLOW_REQUEST_MS = float(os.getenv("LOG_SLOW_REQUEST_MS", "1000"))
+        
+        # Per-request SQL tracing (app/sql_trace.py): requests over these limits log a summary
+        self.SQL_TRACE_ENABLED = os.getenv("SQL_TRACE_ENABLED", "true").lower() in ("true", "1", "yes")
+        self.SQL_TRACE_MAX_QUERIES = int(os.getenv("SQL_TRACE_MAX_QUERIES", "50"))
+        self.SQL_TRACE_MAX_DB_MS = float(os.getenv("SQL_TRACE_MAX_DB_MS", "500"))
+        # The same statement shape this many times in one request is flagged as likely N+1
+        self.SQL_TRACE_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_TRACE_N_PLUS_ONE_THRESHOLD", "5"))
+        # X-DB-Query-Count / X-DB-Time-Ms / X-DB-N-Plus-One response headers
+        self.SQL_TRACE_HEADERS = os.getenv(
+            "SQL_TRACE_HEADERS", "true" if self.APP_ENVIRONMENT == "development" else "false"
+        ).lower() in ("true", "1", "yes")
         
         # API Configuration
         self.API_TITLE = "Nexgen ERP - Finance API"
@@ -52,6 +76,27 @@ class Settings:
         self.UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
         self.ALLOWED_FILE_TYPES = ["xlsx", "xls", "csv", "pdf"]
         
+        # Parser process pool (PDF/Excel parsing runs off the event loop)
+        self.PARSER_MAX_WORKERS = int(os.getenv("PARSER_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.PARSER_MAX_QUEUE_DEPTH = int(os.getenv("PARSER_MAX_QUEUE_DEPTH", "32"))
+        self.PARSER_TIMEOUT_SECONDS = float(os.getenv("PARSER_TIMEOUT_SECONDS", "120"))
+        # Recycle a worker process after this many parses (bounds parser memory growth)
+        self.PARSER_MAX_TASKS_PER_CHILD = int(os.getenv("PARSER_MAX_TASKS_PER_CHILD", "50"))
+        
+        # Background PO ingestion jobs
+        self.INGESTION_WORKER_ENABLED = os.getenv("INGESTION_WORKER_ENABLED", "true").lower() in ("true", "1", "yes")
+        self.INGESTION_WORKER_CONCURRENCY = int(os.getenv("INGESTION_WORKER_CONCURRENCY", "2"))
+        self.INGESTION_POLL_SECONDS = float(os.getenv("INGESTION_POLL_SECONDS", "2"))
+        # A running job that has not heartbeated for this long is re-queued
+        self.INGESTION_STALE_SECONDS = int(os.getenv("INGESTION_STALE_SECONDS", "300"))
+        self.INGESTION_MAX_ATTEMPTS = int(os.getenv("INGESTION_MAX_ATTEMPTS", "3"))
+        
+        # Response cache for summary endpoints (app/response_cache.py), invalidated across workers via LISTEN/NOTIFY
+        self.RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("true", "1", "yes")
+        self.RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+        # Upper bound on staleness for writes that bypass the repository invalidation hooks
+        self.RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+        
         # Pagination
         self.DEFAULT_PAGE_SIZE = 20
         self.MAX_PAGE_SIZE = 100
@@ -1,14 +1,20 @@
 """
 Database connection management with pooling for production
-Uses ThreadedConnectionPool for better thread safety
+Uses BlockingConnectionPool: callers queue for a bounded time instead of
+failing as soon as the pool is exhausted, and the pool can grow temporary
+overflow connections under bursts
 """
 import psycopg2
 from psycopg2 import pool
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
 from psycopg2.extras import RealDictCursor
 from app.config import settings
+from app import metrics, sql_trace, unit_of_work
+from collections import deque
 import logging
 import atexit
 import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +22,330 @@ logger = logging.getLogger(__name__)
 _connection_pool = None
 _pool_lock = threading.Lock()
 
+
+class PoolStats:
+    """
+    Thread-safe counters for pool checkouts and returns.
+    
+    Tracks how long callers wait for a connection, how many connections are
+    in use, and the checkout rate over a sliding window.
+    """
+    
+    RATE_WINDOW_SECONDS = 60
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recent_checkouts = deque()
+        self.checkouts = 0
+        self.returns = 0
+        self.discarded = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+    
+    def record_checkout(self, wait_seconds: float):
+        now = time.monotonic()
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.total_wait += wait_seconds
+            self.max_wait = max(self.max_wait, wait_seconds)
+            self._recent_checkouts.append(now)
+            self._prune(now)
+    
+    def record_return(self, discarded: bool = False):
+        with self._lock:
+            self.returns += 1
+            self.in_use = max(self.in_use - 1, 0)
+            if discarded:
+                self.discarded += 1
+    
+    def _prune(self, now: float):
+        cutoff = now - self.RATE_WINDOW_SECONDS
+        while self._recent_checkouts and self._recent_checkouts[0] < cutoff:
+            self._recent_checkouts.popleft()
+    
+    def snapshot(self) -> dict:
+        """Return a point-in-time copy of the counters"""
+        with self._lock:
+            self._prune(time.monotonic())
+            return {
+                "checkouts": self.checkouts,
+                "returns": self.returns,
+                "discarded": self.discarded,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "checkouts_per_second": round(len(self._recent_checkouts) / self.RATE_WINDOW_SECONDS, 3)
+            }
+
+
+class InstrumentedCursor(RealDictCursor):
+    """
+    RealDictCursor that records statement timings in app.metrics and,
+    during a request, in its SQL trace (app.sql_trace)
+    """
+    
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = super().execute(query, vars)
+            failed = False
+            return result
+        finally:
+            self._observe(query, time.perf_counter() - start, failed)
+    
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = super().executemany(query, vars_list)
+            failed = False
+            return result
+        finally:
+            self._observe(query, time.perf_counter() - start, failed)
+    
+    def _observe(self, query, seconds: float, failed: bool):
+        metrics.observe_query(query, seconds, failed)
+        sql_trace.record_statement(query, seconds, self)
+
+
+class PoolTimeoutError(pool.PoolError):
+    """Raised when no connection becomes available within the pool timeout"""
+
+
+class BlockingConnectionPool:
+    """
+    Thread-safe connection pool that blocks when exhausted.
+    
+    - Up to `maxconn` long-lived connections (`minconn` opened eagerly)
+    - Up to `max_overflow` extra connections under bursts; idle overflow
+      connections are closed after `overflow_idle_seconds`
+    - `getconn()` waits up to `timeout` seconds for a free connection and
+      raises PoolTimeoutError after that
+    - Connections are validated on checkout: broken ones are replaced, open
+      transactions are rolled back, and long-idle ones are pinged
+    
+    Same getconn/putconn/closeall interface as psycopg2's pools.
+    """
+    
+    def __init__(self, minconn: int, maxconn: int, max_overflow: int = 0, timeout: float = 30,
+                 overflow_idle_seconds: float = 30, pre_ping_seconds: float = 60, **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.overflow_idle_seconds = overflow_idle_seconds
+        self.pre_ping_seconds = pre_ping_seconds
+        self._connect_kwargs = connect_kwargs
+        
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, returned_at), most recently used on the right
+        self._size = 0        # open connections, idle + in use
+        self._waiting = 0
+        self._closed = False
+        
+        self.waits = 0
+        self.timeouts = 0
+        self.reaped = 0
+        
+        for _ in range(minconn):
+            conn = self._connect()
+            self._size += 1
+            self._idle.append((conn, time.monotonic()))
+        
+        self._reaper = threading.Thread(target=self._reap_loop, name="db-pool-reaper", daemon=True)
+        self._reaper.start()
+    
+    def _connect(self):
+        return psycopg2.connect(**self._connect_kwargs)
+    
+    @property
+    def capacity(self) -> int:
+        return self.maxconn + self.max_overflow
+    
+    def getconn(self):
+        """Check out a healthy connection, waiting up to `timeout` seconds"""
+        deadline = time.monotonic() + self.timeout
+        
+        while True:
+            conn = None
+            returned_at = None
+            with self._cond:
+                waited = False
+                while True:
+                    if self._closed:
+                        raise pool.PoolError("connection pool is closed")
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                        break
+                    if self._size < self.capacity:
+                        # Reserve a slot and connect outside the lock
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {self.timeout}s waiting for a database connection "
+                            f"({self.capacity} in use)"
+                        )
+                    if not waited:
+                        self.waits += 1
+                        waited = True
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+            
+            if conn is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+            
+            if self._validate(conn, returned_at):
+                return conn
+            
+            # Broken connection: drop it and try again with the freed slot
+            self._discard(conn)
+    
+    def _validate(self, conn, returned_at: float) -> bool:
+        """Return True if the connection is usable, resetting it if needed"""
+        if conn.closed:
+            return False
+        
+        status = conn.get_transaction_status()
+        if status == TRANSACTION_STATUS_UNKNOWN:
+            return False
+        
+        try:
+            if status != TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            elif self.pre_ping_seconds and time.monotonic() - returned_at > self.pre_ping_seconds:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+        except Exception as e:
+            logger.warning(f"Discarding unhealthy pooled connection: {e}")
+            return False
+        
+        return True
+    
+    def putconn(self, conn, close: bool = False):
+        """Return a connection to the pool, or close it if `close` is set"""
+        if close or conn.closed or self._closed:
+            self._discard(conn)
+            return
+        
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+    
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._release_slot()
+    
+    def _release_slot(self):
+        with self._cond:
+            self._size = max(self._size - 1, 0)
+            self._cond.notify()
+    
+    def reap_idle(self) -> int:
+        """Close overflow connections that have been idle too long"""
+        now = time.monotonic()
+        to_close = []
+        with self._cond:
+            # Oldest idle connections are on the left
+            while (self._size > self.maxconn and self._idle
+                   and now - self._idle[0][1] > self.overflow_idle_seconds):
+                conn, _ = self._idle.popleft()
+                self._size -= 1
+                to_close.append(conn)
+            self.reaped += len(to_close)
+        
+        for conn in to_close:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        return len(to_close)
+    
+    def _reap_loop(self):
+        interval = max(self.overflow_idle_seconds / 2, 1)
+        while True:
+            time.sleep(interval)
+            if self._closed:
+                return
+            try:
+                self.reap_idle()
+            except Exception as e:
+                logger.warning(f"Error reaping idle pool connections: {e}")
+    
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+    
+    def status(self) -> dict:
+        """Point-in-time pool occupancy and wait counters"""
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "size": self._size,
+                "idle": idle,
+                "checked_out": self._size - idle,
+                "overflow": max(self._size - self.maxconn, 0),
+                "max_size": self.maxconn,
+                "max_overflow": self.max_overflow,
+                "waiting": self._waiting,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "reaped": self.reaped
+            }
+
+
+pool_stats = PoolStats()
+
+
+def _publish_pool_state(pool_ref):
+    """Copy pool occupancy into the Prometheus gauges (on every checkout and return)"""
+    if not isinstance(pool_ref, BlockingConnectionPool):
+        return
+    status = pool_ref.status()
+    metrics.DB_POOL_CONNECTIONS.labels("in_use").set(status["checked_out"])
+    metrics.DB_POOL_CONNECTIONS.labels("idle").set(status["idle"])
+    metrics.DB_POOL_WAITING.set(status["waiting"])
+
+
+def get_pool_stats() -> dict:
+    """Get connection pool checkout/return metrics"""
+    stats = pool_stats.snapshot()
+    stats["pool_size"] = settings.DB_POOL_SIZE
+    pool_ref = _connection_pool
+    if pool_ref:
+        stats.update(pool_ref.status())
+    return stats
+
 def init_connection_pool():
     """Initialize database connection pool"""
     global _connection_pool
@@ -25,16 +355,22 @@ def init_connection_pool():
             return  # Already initialized
         
         try:
-            _connection_pool = psycopg2.pool.ThreadedConnectionPool(
+            _connection_pool = BlockingConnectionPool(
                 minconn=settings.DB_POOL_SIZE // 2,
                 maxconn=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+                timeout=settings.DB_POOL_TIMEOUT,
+                overflow_idle_seconds=settings.DB_POOL_OVERFLOW_IDLE_SECONDS,
+                pre_ping_seconds=settings.DB_POOL_PRE_PING_SECONDS,
                 host=settings.DB_HOST,
                 port=settings.DB_PORT,
                 database=settings.DB_NAME,
                 user=settings.DB_USER,
                 password=settings.DB_PASSWORD,
-                cursor_factory=RealDictCursor,
+                cursor_factory=InstrumentedCursor,
                 connect_timeout=settings.DB_POOL_TIMEOUT,
+                # Set the schema once per physical connection
+                options=f'-c search_path="{settings.DB_SCHEMA}"',
                 # Keep connections alive
                 keepalives=1,
                 keepalives_idle=30,
@@ -43,7 +379,10 @@ def init_connection_pool():
                 # Disable TCP_NODELAY for better batching
                 tcp_user_timeout=30000
             )
-            logger.info(f"Database connection pool initialized: {settings.DB_POOL_SIZE // 2}-{settings.DB_POOL_SIZE} connections")
+            logger.info(
+                f"Database connection pool initialized: {settings.DB_POOL_SIZE // 2}-{settings.DB_POOL_SIZE} connections "
+                f"(+{settings.DB_MAX_OVERFLOW} overflow, {settings.DB_POOL_TIMEOUT}s timeout)"
+            )
             # Register cleanup on exit
             atexit.register(close_pool)
         except Exception as e:
@@ -53,37 +392,40 @@ def init_connection_pool():
 def get_db():
     """
     Get a database connection from the pool.
-    Uses ThreadedConnectionPool for better safety.
+    Waits up to DB_POOL_TIMEOUT seconds if every connection is in use.
     Must be used with context manager or close() must be called.
+    
+    Inside a unit of work (app/unit_of_work.py) this is the request's
+    shared connection instead, and closing it does not end its transaction.
     """
+    uow = unit_of_work.current()
+    if uow is not None:
+        return uow.sync_connection()
+    return checkout_connection()
+
+def checkout_connection():
+    """Check a connection out of the pool, bypassing any unit of work"""
     global _connection_pool
     
     if not _connection_pool:
         init_connection_pool()
     
     try:
+        start = time.perf_counter()
+        # Blocks up to DB_POOL_TIMEOUT; the pool validates and resets the
+        # connection before handing it out
         conn = _connection_pool.getconn()
-        
-        # Check if connection is working
-        if conn.closed:
-            logger.warning("Got closed connection from pool, creating new one")
-            _connection_pool.putconn(conn, close=True)
-            conn = _connection_pool.getconn()
-        
-        # Reset connection state
-        try:
-            with conn.cursor() as cur:
-                # Clear any previous transaction state
-                cur.execute('ROLLBACK')
-                # Set schema
-                cur.execute(f'SET search_path TO "{settings.DB_SCHEMA}";')
-            conn.commit()
-        except Exception as e:
-            logger.warning(f"Error resetting connection: {e}")
-            conn.rollback()
+        wait = time.perf_counter() - start
+        pool_stats.record_checkout(wait)
+        metrics.DB_POOL_CHECKOUT_SECONDS.observe(wait)
+        _publish_pool_state(_connection_pool)
         
         # Return a wrapped connection that knows about the pool
         return PooledConnection(conn, _connection_pool)
+    except PoolTimeoutError as e:
+        metrics.DB_POOL_TIMEOUTS.inc()
+        logger.error(f"Connection pool exhausted: {e}")
+        raise
     except pool.PoolError as e:
         logger.error(f"Connection pool exhausted: {e}")
         raise
@@ -105,7 +447,7 @@ def close_pool():
 
 class PooledConnection:
     """
-    Wrapper for psycopg2 connections obtained from ThreadedConnectionPool.
+    Wrapper for psycopg2 connections obtained from BlockingConnectionPool.
     Ensures proper return to pool when closed.
     """
     
@@ -130,27 +472,35 @@ class PooledConnection:
         if not self._real_conn or not self._pool:
             return
         
+        discarded = False
         try:
-            # NOTE: Do NOT call rollback() here!
-            # The __exit__ method already handles commit/rollback appropriately.
-            # Calling rollback() here would undo committed transactions.
+            # End any transaction the caller left open (e.g. plain reads) so
+            # the connection does not sit "idle in transaction" in the pool.
+            # Committed work is unaffected: an idle connection is left alone.
+            if self._real_conn.get_transaction_status() not in (TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN):
+                self._real_conn.rollback()
             
-            # Return to pool - ThreadedConnectionPool handles this properly
+            # Return to pool (wakes up one waiting caller)
             self._pool.putconn(self._real_conn, close=False)
         except psycopg2.OperationalError as e:
             # Connection is broken, close it
             logger.warning(f"Connection broken, closing instead of returning to pool: {e}")
+            discarded = True
             try:
-                self._real_conn.close()
+                self._pool.putconn(self._real_conn, close=True)
             except:
                 pass
         except Exception as e:
             # Any other error, try to close the connection
             logger.error(f"Error returning connection to pool, closing instead: {e}")
+            discarded = True
             try:
-                self._real_conn.close()
+                self._pool.putconn(self._real_conn, close=True)
             except:
                 pass
+        finally:
+            pool_stats.record_return(discarded=discarded)
+            _publish_pool_state(self._pool)
     
     def __enter__(self):
         return self
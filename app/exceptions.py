@@ -29,6 +29,11 @@ class NotFoundError(APIError):
     def __init__(self, message: str):
         super().__init__(message, 404, "NOT_FOUND")
 
+class ConflictError(APIError):
+    """Resource conflicts with an existing one"""
+    def __init__(self, message: str):
+        super().__init__(message, 409, "CONFLICT")
+
 class UnauthorizedError(APIError):
     """Unauthorized access error"""
     def __init__(self, message: str = "Unauthorized"):
@@ -0,0 +1,101 @@
+"""
+Fast JSON responses (orjson)
+
+FastAPI normally walks every return value with jsonable_encoder, a
+recursive pure-Python pass, and then serializes the copy with json.dumps.
+Routers created with route_class=ORJSONRoute skip both: a plain return
+value goes straight to ORJSONResponse, which serializes repository rows
+as the driver returns them:
+
+    router = APIRouter(prefix="/api", tags=["Payments"], route_class=ORJSONRoute)
+
+orjson handles dict subclasses (RealDictRow), date, datetime and UUID
+natively, and Decimal is written as a JSON number. Anything else (pydantic
+models, sets, ...) falls back to jsonable_encoder, so repositories can
+return rows without converting fields by hand.
+
+Routes with a response_model, a Response parameter (in the endpoint or a
+dependency), a non-JSON response class or a status code without a body
+keep FastAPI's normal path.
+"""
+import functools
+import inspect
+from decimal import Decimal
+from typing import Any, Callable
+
+import orjson
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.dependencies.models import Dependant
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from fastapi.utils import is_body_allowed_for_status_code
+from starlette.responses import JSONResponse, Response
+from starlette.routing import request_response
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    return jsonable_encoder(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content the way ORJSONResponse does"""
+    return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (Decimal as number, rows as-is)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _uses_response_param(dependant: Dependant) -> bool:
+    if dependant.response_param_name:
+        return True
+    return any(_uses_response_param(sub) for sub in dependant.dependencies)
+
+
+def _respond_with(call: Callable, status_code: int) -> Callable:
+    """Wrap an endpoint so plain return values become ORJSONResponses"""
+    if inspect.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def async_wrapper(*args, **kwargs):
+            content = await call(*args, **kwargs)
+            if isinstance(content, Response):
+                return content
+            return ORJSONResponse(content, status_code=status_code)
+        return async_wrapper
+
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        content = call(*args, **kwargs)
+        if isinstance(content, Response):
+            return content
+        return ORJSONResponse(content, status_code=status_code)
+    return wrapper
+
+
+class ORJSONRoute(APIRoute):
+    """APIRoute whose plain return values bypass jsonable_encoder (see module docstring)"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+
+        response_class = self.response_class
+        if isinstance(response_class, DefaultPlaceholder):
+            response_class = response_class.value
+        status_code = self.status_code or 200
+        if (
+            self.response_model is not None
+            or not issubclass(response_class, JSONResponse)
+            or not is_body_allowed_for_status_code(status_code)
+            or _uses_response_param(self.dependant)
+        ):
+            return
+
+        self.dependant.call = _respond_with(self.dependant.call, status_code)
+        self.app = request_response(self.get_route_handler())
@@ -1,11 +1,22 @@
 """
 Production-ready logging configuration
+
+Handlers are configured below as usual, then moved behind a queue: the
+loggers only get a QueueHandler, and a QueueListener thread does the
+formatting and the console/file writes. Logging from a request (or the
+event loop) costs a queue put, never disk I/O. Records logged while the
+queue is full (LOG_QUEUE_SIZE) are dropped and counted in
+log_records_dropped_total.
 """
+import atexit
 import logging
 import logging.config
+import logging.handlers
+import queue
 import json
 from pythonjsonlogger import jsonlogger
 from app.config import settings
+from app import metrics
 from datetime import datetime
 
 # Ensure logs directory exists
@@ -72,6 +83,92 @@ logging.config.dictConfig({
     }
 })
 
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full and keeps tracebacks for the JSON formatter"""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.LOG_RECORDS_DROPPED.inc()
+
+    def prepare(self, record):
+        # The stdlib version merges the traceback into msg; keep it in exc_text,
+        # where both formatters (and the JSON "exc_info" field) pick it up
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _LogPipeline:
+    """One handler set behind a queue: the QueueHandler loggers use and the QueueListener writing to the handlers"""
+
+    def __init__(self, handlers):
+        self.handlers = handlers
+        self.queue_handler = _DroppingQueueHandler(None)
+        self.rebuild()
+
+    def rebuild(self):
+        """Fresh queue and (stopped) listener thread"""
+        log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        self.queue_handler.queue = log_queue
+        self.listener = logging.handlers.QueueListener(log_queue, *self.handlers, respect_handler_level=True)
+        self.started = False
+
+
+# One pipeline per distinct handler set; root and "app" share theirs
+_pipelines = []
+
+
+def _install_queue_handlers(logger_names=("", "app", "uvicorn.access")):
+    pipelines = {}
+    for name in logger_names:
+        target = logging.getLogger(name)
+        handlers = tuple(target.handlers)
+        if not handlers:
+            continue
+        if handlers not in pipelines:
+            pipelines[handlers] = _LogPipeline(handlers)
+            _pipelines.append(pipelines[handlers])
+        target.handlers = [pipelines[handlers].queue_handler]
+
+
+def start_log_listener():
+    for pipeline in _pipelines:
+        if not pipeline.started:
+            pipeline.listener.start()
+            pipeline.started = True
+
+
+def stop_log_listener():
+    """Write out queued records and stop the writer threads"""
+    for pipeline in _pipelines:
+        if pipeline.started:
+            pipeline.listener.stop()
+            pipeline.started = False
+
+
+def _restart_after_fork():
+    # Only the forking thread survives fork(): the writer threads are gone and
+    # their queues' locks may be held, so the child starts with fresh ones
+    for pipeline in _pipelines:
+        pipeline.rebuild()
+    start_log_listener()
+
+
+_install_queue_handlers()
+start_log_listener()
+atexit.register(stop_log_listener)
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
 def get_logger(name: str) -> logging.Logger:
     """Get a logger instance"""
     return logging.getLogger(name)
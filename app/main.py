@@ -5,17 +5,23 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from starlette.middleware.gzip import GZipMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from app.apis import health, auth
+from app.apis import health, auth, metrics
 from app.apis import bajaj_po, client_po, po_management, proforma_invoice, documents, payments
-from app.apis import vendors, vendor_orders, vendor_payment_links, vendor_payments, billing_po, projects, quotations
+from app.apis import vendors, vendor_orders, vendor_payment_links, vendor_payments, billing_po, projects, quotations, search
 
 from app.modules.file_uploads.controllers.routes import router as file_uploads_router
 from app.config import settings
 from app.logger import get_logger
+from app.access_log import AccessLogMiddleware
+from app.metrics import PrometheusMiddleware
+from app.sql_trace import SqlTraceMiddleware
 from app.exceptions import register_error_handlers
+from app.json_response import ORJSONResponse
 from app.database import init_connection_pool, close_pool
+from app.async_database import init_async_pool, close_async_pool
+from app.modules.file_uploads.services.parser_executor import parser_executor
+from app.modules.file_uploads.services.ingestion_service import ingestion_worker
+from app.response_cache import invalidation_listener
 from fastapi.staticfiles import StaticFiles
 import os
 import logging
@@ -30,7 +36,8 @@ app = FastAPI(
     description="Finance management API for Nexgen ERP",
     openapi_url=f"{settings.API_PREFIX}/openapi.json" if not settings.is_production else None,
     docs_url="/api/docs" if not settings.is_production else None,
-    redoc_url="/api/redoc" if not settings.is_production else None
+    redoc_url="/api/redoc" if not settings.is_production else None,
+    default_response_class=ORJSONResponse
 )
 
 # Initialize database pool on startup (lazy if fails)
@@ -41,6 +48,11 @@ async def startup_event():
     try:
         # Try to initialize pool, but don't fail if database unavailable
         # Pool will be initialized on first use
+        if settings.INGESTION_WORKER_ENABLED:
+            await ingestion_worker.start()
+        if settings.RESPONSE_CACHE_ENABLED:
+            await invalidation_listener.start()
+        await init_async_pool()
         logger.info("Application startup complete")
     except Exception as e:
         logger.warning(f"Could not pre-initialize database: {e} (will retry on first use)")
@@ -50,24 +62,17 @@ async def shutdown_event():
     """Clean up resources on shutdown"""
     logger.info("Shutting down application")
     try:
+        await ingestion_worker.stop()
+        await invalidation_listener.stop()
         close_pool()
+        await close_async_pool()
+        parser_executor.shutdown(wait=False)
     except Exception as e:
         logger.error(f"Error during shutdown: {e}")
 
-# Add middleware for logging
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        import time
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        logger.info(
-            f"{request.method} {request.url.path} - Status: {response.status_code} - Time: {process_time:.3f}s"
-        )
-        response.headers["X-Process-Time"] = str(process_time)
-        return response
-
 # Add security middleware
+# File downloads always set Content-Encoding (gzip, zstd or identity), which
+# GZipMiddleware leaves alone, so Range offsets stay valid
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 # Add CORS middleware FIRST (before other middleware) with secure configuration
@@ -81,14 +86,21 @@ app.add_middleware(
     max_age=3600,  # Cache preflight requests for 1 hour
 )
 
-# Add logging middleware
-app.add_middleware(LoggingMiddleware)
+# Access log (sampled, see LOG_ACCESS_SAMPLE_RATE) and X-Process-Time
+app.add_middleware(AccessLogMiddleware)
+
+# Per-request SQL statement counts, N+1 detection
+app.add_middleware(SqlTraceMiddleware)
+
+# Outermost, so route latency covers every other middleware
+app.add_middleware(PrometheusMiddleware)
 
 # Register error handlers
 register_error_handlers(app)
 
 # Register API routers
 app.include_router(health.router)
+app.include_router(metrics.router)
 app.include_router(auth.router)
 app.include_router(bajaj_po.router)
 app.include_router(client_po.router)
@@ -103,6 +115,7 @@ app.include_router(vendor_payments.router)
 app.include_router(billing_po.router)
 app.include_router(projects.router)
 app.include_router(quotations.router)
+app.include_router(search.router)
 app.include_router(file_uploads_router, prefix="/api")
 
 
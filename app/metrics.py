@@ -0,0 +1,237 @@
+"""
+Prometheus metrics
+
+All metrics are defined here and exported at GET /metrics (app/apis/metrics.py).
+
+Under gunicorn every worker (and every parser process) has its own
+counters. Set PROMETHEUS_MULTIPROC_DIR to a writable, empty directory
+before the app starts (gunicorn.conf.py does this) and prometheus_client
+keeps the values in per-process files there, which /metrics aggregates.
+Without it metrics are per process, which is fine for a single
+uvicorn process, except that parser processes are not included.
+"""
+import functools
+import os
+import time
+from typing import Callable, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.routing import Match
+
+# Route latency: requests are mostly 5 ms - 2 s, uploads and parsing up to a minute
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being served",
+    multiprocess_mode="livesum"
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Connections in the sync pool by state",
+    ["state"],
+    multiprocess_mode="livesum"
+)
+DB_POOL_WAITING = Gauge(
+    "db_pool_waiting",
+    "Callers blocked waiting for a pooled connection",
+    multiprocess_mode="livesum"
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time to get a connection from the pool (including waiting)",
+    buckets=QUERY_BUCKETS
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts",
+    "Checkouts that gave up waiting for a connection"
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Statement execution time on get_db() / get_async_db() connections",
+    ["operation"],
+    buckets=QUERY_BUCKETS
+)
+DB_QUERY_ERRORS = Counter(
+    "db_query_errors",
+    "Statements that raised",
+    ["operation"]
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Statements run while serving one request (see app/sql_trace.py)",
+    ["route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+
+PARSER_DURATION = Histogram(
+    "parser_duration_seconds",
+    "Time spent in a document parser",
+    ["parser"],
+    buckets=LATENCY_BUCKETS
+)
+PARSER_RUNS = Counter(
+    "parser_runs",
+    "Parser runs by outcome",
+    ["parser", "outcome"]
+)
+
+UPLOAD_BYTES = Counter(
+    "upload_bytes",
+    "Upload bytes received from clients and written to storage",
+    ["kind"]
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped",
+    "Log records discarded because the log queue was full"
+)
+
+RESPONSE_CACHE_REQUESTS = Counter(
+    "response_cache_requests",
+    "Cached endpoint calls by result (hit, miss, or bypass while invalidations are not being received)",
+    ["endpoint", "result"]
+)
+RESPONSE_CACHE_INVALIDATIONS = Counter(
+    "response_cache_invalidations",
+    "Cache entries dropped by scope notifications, TTL expiry or LRU eviction",
+    ["reason"]
+)
+RESPONSE_CACHE_ENTRIES = Gauge(
+    "response_cache_entries",
+    "Responses held in the cache",
+    multiprocess_mode="livesum"
+)
+
+# First keyword of a statement -> operation label (anything else is "other")
+_OPERATIONS = frozenset({"select", "insert", "update", "delete", "with", "begin", "commit", "rollback"})
+
+
+def query_operation(query) -> str:
+    """Low-cardinality label for a statement: its first keyword"""
+    if isinstance(query, bytes):
+        query = query[:32].decode("utf-8", "ignore")
+    elif not isinstance(query, str):
+        # psycopg2.sql.Composed and friends
+        return "other"
+    words = query.lstrip(" \t\r\n(").split(None, 1)
+    keyword = words[0].lower() if words else ""
+    return keyword if keyword in _OPERATIONS else "other"
+
+
+def observe_query(query, seconds: float, failed: bool = False):
+    operation = query_operation(query)
+    DB_QUERY_DURATION.labels(operation).observe(seconds)
+    if failed:
+        DB_QUERY_ERRORS.labels(operation).inc()
+
+
+def observe_parser(name: str) -> Callable:
+    """
+    Decorator recording duration and outcome of a parser. A parser fails
+    by raising or, like parse_bajaj_po, by returning {"status": "ERROR"}.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = func(*args, **kwargs)
+                if not (isinstance(result, dict) and result.get("status") == "ERROR"):
+                    outcome = "success"
+                return result
+            finally:
+                PARSER_DURATION.labels(name).observe(time.perf_counter() - start)
+                PARSER_RUNS.labels(name, outcome).inc()
+        return wrapper
+    return decorator
+
+
+def route_template(scope) -> str:
+    """
+    Path template of the route that handled scope ("/api/po/{po_id}"), so
+    ids do not become label values. Requests no route matched are
+    grouped as "unmatched".
+    """
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return "unmatched"
+
+    routes_by_endpoint = getattr(app.state, "metrics_routes", None)
+    if routes_by_endpoint is None or endpoint not in routes_by_endpoint:
+        routes_by_endpoint = {}
+        for route in app.router.routes:
+            key = getattr(route, "endpoint", None) or getattr(route, "app", None)
+            routes_by_endpoint.setdefault(key, []).append(route)
+        app.state.metrics_routes = routes_by_endpoint
+
+    candidates = routes_by_endpoint.get(endpoint, [])
+    if len(candidates) == 1:
+        return candidates[0].path
+    # Same function behind several paths: take the one matching this request
+    for route in candidates:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class PrometheusMiddleware:
+    """ASGI middleware recording per-route latency and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], route_template(scope), str(status_code)
+            ).observe(time.perf_counter() - start)
+
+
+def metrics_payload(registry: Optional[CollectorRegistry] = None) -> bytes:
+    """Metrics in the Prometheus text format, aggregated across processes in multiprocess mode"""
+    if registry is None:
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+    return generate_latest(registry)
+
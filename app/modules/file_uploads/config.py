@@ -22,6 +22,11 @@ class FileUploadConfig:
     # File upload limits
     MAX_FILE_SIZE_MB: int = 100  # Max file size in MB
     MAX_FILES_PER_SESSION: int = 50  # Max files in a session
+    UPLOAD_CHUNK_SIZE_BYTES: int = 1024 * 1024  # Read/hash/compress uploads in chunks of this size
+    
+    # Stored-file compression (see services/compression.py)
+    COMPRESSION_CODEC: str = "zstd"  # Preferred codec: zstd, gzip or none (zstd falls back to gzip if not installed)
+    COMPRESSION_MAX_ENTROPY: float = 7.5  # Bits/byte above which a sample is treated as already compressed
     
     # Allowed file extensions
     ALLOWED_EXTENSIONS: set = None
@@ -2,7 +2,7 @@
 FastAPI routes for file upload system
 """
 
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Request, Form
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Request, Form, Header
 from fastapi.responses import FileResponse, StreamingResponse
 from typing import Optional, List
 from app.modules.file_uploads.schemas.requests import (
@@ -16,18 +16,23 @@ from app.modules.file_uploads.schemas.requests import (
     ErrorResponse,
     FileMetadata,
     SessionStatsResponse,
-    ParsedPOResponse
+    ParsedPOResponse,
+    IngestionJobResponse
 )
 from app.modules.file_uploads.services.session_service import SessionService
 from app.modules.file_uploads.services.file_service import FileService
+from app.modules.file_uploads.services.compression import stored_codec
 from app.modules.file_uploads.services.parser_factory import ParserFactory
 from app.modules.file_uploads.services.parsing_service import FileParsingService
-from app.repository.client_po_repo import insert_client_po
+from app.modules.file_uploads.services.ingestion_service import IngestionJobService
+from app.modules.file_uploads.utils.downloads import build_download_response
+from app.json_response import ORJSONRoute
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime
 import io
 
 # Create router
-router = APIRouter(prefix="/uploads", tags=["file-uploads"])
+router = APIRouter(prefix="/uploads", tags=["file-uploads"], route_class=ORJSONRoute)
 file_service = FileService()
 
 
@@ -141,23 +146,26 @@ async def upload_file(
         parse_status = "SKIPPED"
         parse_error = None
         client_po_id = None
+        parse_cache_hit = False
         
         if auto_parse and client_id:
             try:
                 file.file.seek(0)
                 file_content = file.file.read()
                 
-                parsed_data = FileParsingService.parse_uploaded_file(
+                parsed_data = await FileParsingService.parse_uploaded_file(
                     file_content=file_content,
                     filename=file.filename,
                     client_id=client_id,
                     session_id=session_id,
-                    file_id=file_id
+                    file_id=file_id,
+                    file_hash=file_metadata['file_hash']
                 )
                 
                 # Parsing successful - now insert into database
                 if parsed_data:
                     parse_status = "SUCCESS"
+                    parse_cache_hit = parsed_data.get('parse_cache_hit', False)
                     try:
                         # Get project info from session metadata if available
                         project_id = None
@@ -167,7 +175,9 @@ async def upload_file(
                             project_name = session['metadata'].get('project_name') or session['metadata'].get('project')
                         
                         # Insert parsed data into client_po table
-                        client_po_id = insert_client_po(parsed_data, client_id, project_id, project_name)
+                        client_po_id = await run_in_threadpool(
+                            FileParsingService.save_parsed_po, parsed_data, client_id, project_id, project_name
+                        )
                         print(f"✅ Successfully inserted PO into database with ID: {client_po_id}")
                     except Exception as db_error:
                         # Log DB error but don't fail the upload (graceful degradation)
@@ -200,6 +210,7 @@ async def upload_file(
             file_size=file_metadata['file_size'],
             compressed_size=file_metadata.get('compressed_size'),
             is_compressed=file_metadata.get('is_compressed', True),
+            compression_codec=file_metadata.get('compression_codec'),
             mime_type=file_metadata['mime_type'],
             original_mime_type=file_metadata.get('original_mime_type'),
             file_hash=file_metadata['file_hash'],
@@ -210,7 +221,9 @@ async def upload_file(
             direct_url=direct_url,
             parse_status=parse_status,
             parse_error=parse_error,
-            po_id=client_po_id
+            po_id=client_po_id,
+            deduplicated=file_metadata.get('deduplicated', False),
+            parse_cache_hit=parse_cache_hit
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -274,12 +287,13 @@ async def upload_and_parse_po(
         
         # Parse file using client-specific parser
         try:
-            parsed_data = FileParsingService.parse_uploaded_file(
+            parsed_data = await FileParsingService.parse_uploaded_file(
                 file_content=file_content,
                 filename=file.filename,
                 client_id=client_id,
                 session_id=session_id,
-                file_id=file_id
+                file_id=file_id,
+                file_hash=file_metadata['file_hash']
             )
             
             client_po_id = None
@@ -287,7 +301,9 @@ async def upload_and_parse_po(
             if auto_save and parsed_data:
                 try:
                     # Insert into business database
-                    client_po_id = insert_client_po(parsed_data, client_id, project_id, project_name)
+                    client_po_id = await run_in_threadpool(
+                        FileParsingService.save_parsed_po, parsed_data, client_id, project_id, project_name
+                    )
                     print(f"✅ Successfully inserted PO into database with ID: {client_po_id}")
                 except ValueError as validation_error:
                     # Validation error - log but return it in response
@@ -321,7 +337,9 @@ async def upload_and_parse_po(
                 line_item_count=parsed_data.get('line_item_count', 0),
                 client_po_id=client_po_id,
                 original_filename=file.filename,
-                upload_timestamp=file_metadata['upload_timestamp']
+                upload_timestamp=file_metadata['upload_timestamp'],
+                deduplicated=file_metadata.get('deduplicated', False),
+                parse_cache_hit=parsed_data.get('parse_cache_hit', False)
             )
         except Exception as parse_error:
             # Upload succeeded but parsing failed
@@ -345,6 +363,61 @@ async def upload_and_parse_po(
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
+@router.post("/po/jobs", response_model=IngestionJobResponse, status_code=202)
+async def submit_po_ingestion_job(
+    request_obj: Request,
+    file: UploadFile = File(..., description="The PO file to upload (Excel or PDF)"),
+    client_id: int = Form(..., ge=1, description="Client ID (Bajaj=1, Dava India=2)"),
+    project_id: Optional[int] = Form(None, description="Optional Project ID to link PO"),
+    project_name: Optional[str] = Form(None, description="Optional Project Name to link/create"),
+    uploaded_by: Optional[str] = Form(None),
+    auto_save: bool = Form(True, description="Automatically save parsed PO to database"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """
+    Upload a PO file and parse/insert it in the background
+    
+    Same inputs as /po/upload, but returns 202 with a job as soon as the file
+    is stored. Poll status_url for per-stage progress (load, parse, insert)
+    and the result. Re-submitting the same file while its job is still
+    queued or running returns the existing job.
+    """
+    try:
+        # Hashing, compressing and storing the upload block: keep them off the event loop
+        job, created = await run_in_threadpool(
+            IngestionJobService.submit_po_job,
+            file_content=file.file,
+            original_filename=file.filename,
+            client_id=client_id,
+            project_id=project_id,
+            project_name=project_name,
+            uploaded_by=uploaded_by,
+            auto_save=auto_save,
+            idempotency_key=idempotency_key
+        )
+        
+        response = await run_in_threadpool(IngestionJobService.get_job, job['id'])
+        response['status_url'] = str(request_obj.url_for("get_po_ingestion_job", job_id=job['id']).path)
+        return response
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue upload: {str(e)}")
+
+
+@router.get("/po/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_po_ingestion_job(request_obj: Request, job_id: str):
+    """
+    Get status, per-stage progress and result of a PO ingestion job
+    """
+    job = await run_in_threadpool(IngestionJobService.get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    job['status_url'] = str(request_obj.url.path)
+    return job
+
+
 @router.get("/po/{po_number}", response_model=POFilesResponse)
 async def get_po_files(po_number: str):
     """
@@ -446,6 +519,7 @@ async def list_session_files(
 
 @router.get("/session/{session_id}/files/{file_id}/download")
 async def download_file(
+    request_obj: Request,
     session_id: str,
     file_id: str,
     token: Optional[str] = Query(None)
@@ -453,26 +527,41 @@ async def download_file(
     """
     Download a file from a session
     
-    Returns file as binary stream with proper Content-Disposition header
+    Streams the original content with a Content-Disposition header, in
+    constant memory (gzip blobs are decompressed chunk by chunk).
+    Supports Range requests and conditional GET: the ETag is the file's
+    SHA-256, so If-None-Match on a repeat download returns 304.
     """
     try:
         # In production, validate token for additional security
         
-        file_content = file_service.download_file(
+        download = await run_in_threadpool(
+            file_service.prepare_download,
             file_id=file_id,
             session_id=session_id
         )
-        
-        # Return as streaming response
-        return StreamingResponse(
-            iter([file_content]),
-            media_type="application/octet-stream",
-            headers={"Content-Disposition": f"attachment; filename=file-{file_id}"}
-        )
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    try:
+        codec = stored_codec(bool(download.get('is_compressed')), download.get('compression_codec'))
+    except ValueError as e:
+        # Stored with a codec this server cannot decode (e.g. zstandard not installed)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    response = build_download_response(
+        request_obj,
+        path=download['local_path'],
+        size=download['file_size'],
+        codec=codec,
+        file_hash=download.get('file_hash'),
+        headers={"Content-Disposition": f"attachment; filename=file-{file_id}"}
+    )
+    if response.status_code in (200, 206):
+        await run_in_threadpool(file_service.record_download, session_id)
+    return response
 
 
 @router.delete("/session/{session_id}/files/{file_id}", response_model=DeleteFileResponse)
@@ -3,12 +3,18 @@ Repository layer for file upload database operations
 """
 
 from app.database import get_db
-from typing import Optional, List, Dict, Any
+from typing import Callable, Optional, List, Dict, Any
 from datetime import datetime, timedelta
 import uuid
 import json
 from psycopg2.extras import Json
 
+
+def _dumps_default_str(value) -> str:
+    """json.dumps that stringifies dates/decimals found in parser output"""
+    return json.dumps(value, default=str)
+
+
 class UploadSessionRepository:
     """Repository for upload session database operations"""
     
@@ -165,7 +171,8 @@ class UploadFileRepository:
         compressed_size: Optional[int] = None,
         is_compressed: bool = True,
         original_mime_type: Optional[str] = None,
-        compressed_hash: Optional[str] = None
+        compressed_hash: Optional[str] = None,
+        compression_codec: Optional[str] = None
     ) -> Dict[str, Any]:
         """Save file metadata to database"""
         conn = get_db()
@@ -176,15 +183,16 @@ class UploadFileRepository:
                     cur.execute("""
                         INSERT INTO upload_file 
                         (id, session_id, po_number, original_filename, storage_filename, storage_path,
-                         file_size, compressed_size, is_compressed, mime_type, original_mime_type, 
+                         file_size, compressed_size, is_compressed, compression_codec, mime_type, original_mime_type, 
                          file_hash, compressed_hash, uploaded_by, metadata, status)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'active')
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'active')
                         RETURNING id, session_id, po_number, original_filename, storage_filename, storage_path,
-                                  file_size, compressed_size, is_compressed, mime_type, original_mime_type,
+                                  file_size, compressed_size, is_compressed, compression_codec, mime_type, original_mime_type,
                                   file_hash, compressed_hash, upload_timestamp, uploaded_by, status
                     """, (
                         file_id, session_id, po_number, original_filename, storage_filename, storage_path,
-                        file_size, compressed_size or file_size, is_compressed, mime_type, 
+                        file_size, compressed_size or file_size, is_compressed,
+                        compression_codec or ('gzip' if is_compressed else 'none'), mime_type, 
                         original_mime_type or mime_type, file_hash, compressed_hash or file_hash, 
                         uploaded_by, Json(metadata or {})
                     ))
@@ -202,7 +210,8 @@ class UploadFileRepository:
                 with conn.cursor() as cur:
                     cur.execute("""
                         SELECT id, session_id, original_filename, storage_filename, storage_path,
-                               file_size, mime_type, file_hash, upload_timestamp, uploaded_by, status
+                               file_size, compressed_size, is_compressed, compression_codec, mime_type, original_mime_type,
+                               file_hash, upload_timestamp, uploaded_by, status
                         FROM upload_file
                         WHERE id = %s AND status = 'active'
                     """, (file_id,))
@@ -220,7 +229,8 @@ class UploadFileRepository:
                 with conn.cursor() as cur:
                     cur.execute("""
                         SELECT id, session_id, original_filename, storage_filename, storage_path,
-                               file_size, mime_type, file_hash, upload_timestamp, uploaded_by, status
+                               file_size, compressed_size, is_compressed, compression_codec, mime_type, original_mime_type,
+                               file_hash, upload_timestamp, uploaded_by, status
                         FROM upload_file
                         WHERE id = %s AND session_id = %s AND status = 'active'
                     """, (file_id, session_id))
@@ -307,7 +317,7 @@ class UploadFileRepository:
                     if include_deleted:
                         cur.execute("""
                             SELECT id, session_id, po_number, original_filename, storage_filename, storage_path,
-                                   file_size, compressed_size, is_compressed, mime_type, original_mime_type,
+                                   file_size, compressed_size, is_compressed, compression_codec, mime_type, original_mime_type,
                                    file_hash, compressed_hash, upload_timestamp, uploaded_by, status, metadata
                             FROM upload_file
                             WHERE po_number = %s
@@ -316,7 +326,7 @@ class UploadFileRepository:
                     else:
                         cur.execute("""
                             SELECT id, session_id, po_number, original_filename, storage_filename, storage_path,
-                                   file_size, compressed_size, is_compressed, mime_type, original_mime_type,
+                                   file_size, compressed_size, is_compressed, compression_codec, mime_type, original_mime_type,
                                    file_hash, compressed_hash, upload_timestamp, uploaded_by, status, metadata
                             FROM upload_file
                             WHERE po_number = %s AND status = 'active'
@@ -443,3 +453,397 @@ class UploadStatsRepository:
                     return result
         finally:
             conn.close()
+
+
+class UploadBlobRepository:
+    """Repository for content-addressed upload blobs (see migration 0012)"""
+    
+    BLOB_COLUMNS = """
+        file_hash, storage_path, storage_filename, file_size, compressed_size,
+        is_compressed, compression_codec, compressed_hash, ref_count
+    """
+    
+    @staticmethod
+    def add_reference(file_hash: str) -> Optional[Dict[str, Any]]:
+        """Add a reference to an existing blob; None if no blob has this hash"""
+        conn = get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(f"""
+                        UPDATE upload_blob
+                        SET ref_count = ref_count + 1, last_referenced_at = CURRENT_TIMESTAMP
+                        WHERE file_hash = %s
+                        RETURNING {UploadBlobRepository.BLOB_COLUMNS}
+                    """, (file_hash,))
+                    
+                    return cur.fetchone()
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def create_or_add_reference(
+        file_hash: str,
+        storage_path: str,
+        storage_filename: str,
+        file_size: int,
+        compressed_size: int,
+        is_compressed: bool,
+        compressed_hash: str,
+        compression_codec: str
+    ) -> Dict[str, Any]:
+        """
+        Register a newly stored blob with one reference. If a concurrent
+        upload registered the same content first, add a reference to that
+        blob instead and return it.
+        """
+        conn = get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(f"""
+                        INSERT INTO upload_blob
+                        (file_hash, storage_path, storage_filename, file_size, compressed_size,
+                         is_compressed, compression_codec, compressed_hash, ref_count)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 1)
+                        ON CONFLICT (file_hash) DO UPDATE SET
+                            ref_count = upload_blob.ref_count + 1,
+                            last_referenced_at = CURRENT_TIMESTAMP
+                        RETURNING {UploadBlobRepository.BLOB_COLUMNS}
+                    """, (
+                        file_hash, storage_path, storage_filename, file_size, compressed_size,
+                        is_compressed, compression_codec, compressed_hash
+                    ))
+                    
+                    return cur.fetchone()
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def update_stored_file(
+        file_hash: str,
+        compressed_size: int,
+        is_compressed: bool,
+        compressed_hash: str,
+        compression_codec: str
+    ) -> Optional[Dict[str, Any]]:
+        """Record how a blob's file was rewritten after it went missing from storage"""
+        conn = get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(f"""
+                        UPDATE upload_blob
+                        SET compressed_size = %s, is_compressed = %s, compression_codec = %s,
+                            compressed_hash = %s
+                        WHERE file_hash = %s
+                        RETURNING {UploadBlobRepository.BLOB_COLUMNS}
+                    """, (compressed_size, is_compressed, compression_codec, compressed_hash, file_hash))
+                    
+                    return cur.fetchone()
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def release(file_hash: str, on_last_reference: Callable[[Dict[str, Any]], Any]) -> Optional[int]:
+        """
+        Drop one reference to a blob. When it was the last one the row is
+        deleted and on_last_reference(blob) is called before commit, while
+        the row is still locked, so a concurrent upload of the same content
+        waits and then stores a fresh copy.
+        
+        Returns: references left, or None if no blob has this hash
+        """
+        conn = get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(f"""
+                        UPDATE upload_blob
+                        SET ref_count = GREATEST(ref_count - 1, 0)
+                        WHERE file_hash = %s
+                        RETURNING {UploadBlobRepository.BLOB_COLUMNS}
+                    """, (file_hash,))
+                    blob = cur.fetchone()
+                    if not blob:
+                        return None
+                    
+                    if blob['ref_count'] == 0:
+                        cur.execute("DELETE FROM upload_blob WHERE file_hash = %s", (file_hash,))
+                        on_last_reference(blob)
+                    return blob['ref_count']
+        finally:
+            conn.close()
+
+
+class ParseResultRepository:
+    """Repository for parse results cached by file content (see migration 0012)"""
+    
+    @staticmethod
+    def get(file_hash: str, client_id: int, parser_version: int) -> Optional[Dict[str, Any]]:
+        """
+        Get the cached parse of this content for a client. client_po_id is
+        only returned while that client_po still exists.
+        """
+        conn = get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT prc.parsed_data, cp.id AS client_po_id, cp.project_id AS client_po_project_id
+                        FROM parse_result_cache prc
+                        LEFT JOIN client_po cp ON cp.id = prc.client_po_id
+                        WHERE prc.file_hash = %s AND prc.client_id = %s AND prc.parser_version = %s
+                    """, (file_hash, client_id, parser_version))
+                    
+                    return cur.fetchone()
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def save(file_hash: str, client_id: int, parser_version: int, parsed_data: Dict[str, Any]) -> bool:
+        """Cache a parse result, replacing any result from an older parser version"""
+        conn = get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        INSERT INTO parse_result_cache (file_hash, client_id, parser_version, parsed_data)
+                        VALUES (%s, %s, %s, %s)
+                        ON CONFLICT (file_hash, client_id) DO UPDATE SET
+                            parser_version = EXCLUDED.parser_version,
+                            parsed_data = EXCLUDED.parsed_data,
+                            client_po_id = NULL,
+                            updated_at = CURRENT_TIMESTAMP
+                    """, (file_hash, client_id, parser_version, Json(parsed_data, dumps=_dumps_default_str)))
+                    
+                    return True
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def set_client_po_id(file_hash: str, client_id: int, client_po_id: int) -> bool:
+        """Remember the client_po created from this content"""
+        conn = get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        UPDATE parse_result_cache
+                        SET client_po_id = %s, updated_at = CURRENT_TIMESTAMP
+                        WHERE file_hash = %s AND client_id = %s
+                    """, (client_po_id, file_hash, client_id))
+                    
+                    return cur.rowcount > 0
+        finally:
+            conn.close()
+
+
+class IngestionJobRepository:
+    """Repository for background ingestion jobs (see migration 0011)"""
+    
+    JOB_COLUMNS = """
+        id, job_type, status, client_id, session_id, file_id, file_hash, params, stages,
+        result, error, attempts, locked_by, heartbeat_at, created_at, started_at,
+        finished_at, updated_at
+    """
+    
+    @staticmethod
+    def create_job(
+        client_id: int,
+        session_id: str,
+        file_id: str,
+        file_hash: Optional[str],
+        params: Dict[str, Any],
+        dedup_key: Optional[str] = None,
+        job_type: str = 'po_upload'
+    ) -> tuple:
+        """
+        Queue a job. If a queued/running job already has the same dedup_key,
+        no new job is created and that job is returned instead.
+        
+        Returns: (job, created)
+        """
+        conn = get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(f"""
+                        INSERT INTO ingestion_job
+                        (id, job_type, status, client_id, session_id, file_id, file_hash, dedup_key, params)
+                        VALUES (%s, %s, 'queued', %s, %s, %s, %s, %s, %s)
+                        ON CONFLICT (dedup_key) WHERE status IN ('queued', 'running') DO NOTHING
+                        RETURNING {IngestionJobRepository.JOB_COLUMNS}
+                    """, (
+                        str(uuid.uuid4()), job_type, client_id, session_id, file_id,
+                        file_hash, dedup_key, Json(params or {})
+                    ))
+                    job = cur.fetchone()
+                    if job:
+                        return job, True
+                    
+                    cur.execute(f"""
+                        SELECT {IngestionJobRepository.JOB_COLUMNS}
+                        FROM ingestion_job
+                        WHERE dedup_key = %s AND status IN ('queued', 'running')
+                    """, (dedup_key,))
+                    return cur.fetchone(), False
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def find_active_job(dedup_key: str) -> Optional[Dict[str, Any]]:
+        """Get the queued/running job with this dedup_key, if any"""
+        conn = get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(f"""
+                        SELECT {IngestionJobRepository.JOB_COLUMNS}
+                        FROM ingestion_job
+                        WHERE dedup_key = %s AND status IN ('queued', 'running')
+                    """, (dedup_key,))
+                    
+                    return cur.fetchone()
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+        """Get job by ID"""
+        conn = get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(f"""
+                        SELECT {IngestionJobRepository.JOB_COLUMNS}
+                        FROM ingestion_job
+                        WHERE id = %s
+                    """, (job_id,))
+                    
+                    return cur.fetchone()
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def claim_next_job(worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Atomically move the oldest queued job to running and return it.
+        SKIP LOCKED lets any number of workers poll the table concurrently.
+        """
+        conn = get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(f"""
+                        UPDATE ingestion_job
+                        SET status = 'running',
+                            attempts = attempts + 1,
+                            locked_by = %s,
+                            started_at = CURRENT_TIMESTAMP,
+                            heartbeat_at = CURRENT_TIMESTAMP,
+                            updated_at = CURRENT_TIMESTAMP
+                        WHERE id = (
+                            SELECT id FROM ingestion_job
+                            WHERE status = 'queued'
+                            ORDER BY created_at
+                            FOR UPDATE SKIP LOCKED
+                            LIMIT 1
+                        )
+                        RETURNING {IngestionJobRepository.JOB_COLUMNS}
+                    """, (worker_id,))
+                    
+                    return cur.fetchone()
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def update_stage(job_id: str, worker_id: str, stage: str, stage_info: Dict[str, Any]) -> bool:
+        """
+        Record progress of one stage (also serves as the job heartbeat).
+        
+        Returns False if worker_id no longer holds the job (it was re-queued
+        as stale and possibly claimed by another worker).
+        """
+        conn = get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        UPDATE ingestion_job
+                        SET stages = stages || jsonb_build_object(%s::text, %s::jsonb),
+                            heartbeat_at = CURRENT_TIMESTAMP,
+                            updated_at = CURRENT_TIMESTAMP
+                        WHERE id = %s AND locked_by = %s AND status = 'running'
+                    """, (stage, Json(stage_info), job_id, worker_id))
+                    
+                    return cur.rowcount > 0
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def heartbeat(job_id: str, worker_id: str) -> bool:
+        """Refresh the lease on a running job; False if worker_id no longer holds it"""
+        conn = get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        UPDATE ingestion_job
+                        SET heartbeat_at = CURRENT_TIMESTAMP
+                        WHERE id = %s AND locked_by = %s AND status = 'running'
+                    """, (job_id, worker_id))
+                    
+                    return cur.rowcount > 0
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def finish_job(job_id: str, worker_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+                   error: Optional[str] = None) -> bool:
+        """Mark a job succeeded or failed; False if worker_id no longer holds it"""
+        conn = get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        UPDATE ingestion_job
+                        SET status = %s,
+                            result = %s,
+                            error = %s,
+                            locked_by = NULL,
+                            finished_at = CURRENT_TIMESTAMP,
+                            updated_at = CURRENT_TIMESTAMP
+                        WHERE id = %s AND locked_by = %s AND status = 'running'
+                    """, (status, Json(result) if result is not None else None, error, job_id, worker_id))
+                    
+                    return cur.rowcount > 0
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def requeue_stale_jobs(stale_after_seconds: int, max_attempts: int) -> int:
+        """
+        Recover jobs whose worker stopped heartbeating (crash or restart).
+        They are queued again, or failed once they have used max_attempts.
+        """
+        conn = get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        UPDATE ingestion_job
+                        SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'queued' END,
+                            error = CASE WHEN attempts >= %s
+                                         THEN 'Worker stopped responding; giving up after ' || attempts || ' attempts'
+                                         ELSE error END,
+                            finished_at = CASE WHEN attempts >= %s THEN CURRENT_TIMESTAMP ELSE NULL END,
+                            locked_by = NULL,
+                            updated_at = CURRENT_TIMESTAMP
+                        WHERE status = 'running'
+                          AND heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+                    """, (max_attempts, max_attempts, max_attempts, stale_after_seconds))
+                    
+                    return cur.rowcount
+        finally:
+            conn.close()
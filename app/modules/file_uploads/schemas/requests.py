@@ -56,6 +56,8 @@ class ParsedPOResponse(BaseModel):
     original_filename: str
     upload_timestamp: datetime
     dashboard_info: Optional[Dict[str, Any]] = None
+    deduplicated: bool = False  # Same content was already stored
+    parse_cache_hit: bool = False  # Parse result reused from an earlier upload of the same content
     
     class Config:
         json_schema_extra = {
@@ -147,6 +149,7 @@ class FileUploadResponse(BaseModel):
     file_size: int
     compressed_size: Optional[int] = None
     is_compressed: bool = True
+    compression_codec: Optional[str] = None
     mime_type: Optional[str] = None
     original_mime_type: Optional[str] = None
     file_hash: Optional[str] = None
@@ -159,6 +162,8 @@ class FileUploadResponse(BaseModel):
     parse_status: Optional[str] = None  # "SUCCESS", "SKIPPED", "FAILED"
     parse_error: Optional[str] = None  # Error message if parse failed
     po_id: Optional[int] = None  # ID of created PO if successful
+    deduplicated: bool = False  # Same content was already stored
+    parse_cache_hit: bool = False  # Parse result reused from an earlier upload of the same content
     
     class Config:
         json_schema_extra = {
@@ -323,3 +328,53 @@ class SessionStatsResponse(BaseModel):
                 "status": "active"
             }
         }
+
+
+class IngestionJobStage(BaseModel):
+    """Progress of one ingestion job stage"""
+    name: str
+    status: str  # pending, running, succeeded, failed, skipped
+    started_at: Optional[str] = None
+    duration_ms: Optional[float] = None
+    error: Optional[str] = None
+
+
+class IngestionJobResponse(BaseModel):
+    """Status of a background PO ingestion job"""
+    job_id: str
+    job_type: str
+    status: str  # queued, running, succeeded, failed
+    client_id: int
+    session_id: Optional[str] = None
+    file_id: Optional[str] = None
+    original_filename: Optional[str] = None
+    stages: List[IngestionJobStage]
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[float] = None
+    status_url: Optional[str] = None
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "job_id": "5b0c7c1e-0d7a-4c38-9d0e-7f0b1f6a2c11",
+                "job_type": "po_upload",
+                "status": "running",
+                "client_id": 1,
+                "session_id": "sess_abc123def456",
+                "file_id": "file_xyz789",
+                "original_filename": "bajaj_po.pdf",
+                "stages": [
+                    {"name": "load", "status": "succeeded", "duration_ms": 3.2},
+                    {"name": "parse", "status": "running"},
+                    {"name": "insert", "status": "pending"}
+                ],
+                "attempts": 1,
+                "created_at": "2026-02-09T10:00:00Z",
+                "status_url": "/api/uploads/po/jobs/5b0c7c1e-0d7a-4c38-9d0e-7f0b1f6a2c11"
+            }
+        }
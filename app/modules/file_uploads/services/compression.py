@@ -0,0 +1,211 @@
+"""
+Compression policy and codecs for stored uploads
+
+Most uploads are PDFs and xlsx/docx files, which are already compressed
+(xlsx/docx are zip containers, PDF streams are usually deflated), so
+compressing them again burns CPU for nothing. CompressionPolicy picks a
+codec per upload from the original MIME type and the byte entropy of a
+small sample; codecs are pluggable via register_codec.
+
+zstd needs the optional `zstandard` package; without it the policy falls
+back to gzip.
+"""
+
+import gzip
+import math
+from collections import Counter
+from typing import BinaryIO, Dict, Iterable, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+class Codec:
+    """A stored-blob compression format"""
+
+    name: str = ""
+    mime_type: Optional[str] = None
+    content_encoding: Optional[str] = None  # HTTP Content-Encoding token, if browsers can decode it
+    magic: bytes = b""
+
+    def open_writer(self, out: BinaryIO) -> BinaryIO:
+        """Writable stream that compresses into out; closing it does not close out"""
+        raise NotImplementedError
+
+    def open_reader(self, src: BinaryIO) -> BinaryIO:
+        """Readable stream of the decompressed content of src"""
+        raise NotImplementedError
+
+    def decompress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+
+class NoneCodec(Codec):
+    """Store as-is"""
+
+    name = "none"
+
+    def open_writer(self, out: BinaryIO) -> BinaryIO:
+        return _Uncloseable(out)
+
+    def open_reader(self, src: BinaryIO) -> BinaryIO:
+        return src
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+class GzipCodec(Codec):
+    name = "gzip"
+    mime_type = "application/gzip"
+    content_encoding = "gzip"
+    magic = b"\x1f\x8b"
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def open_writer(self, out: BinaryIO) -> BinaryIO:
+        # mtime=0 keeps the output (and compressed_hash) the same for the same content
+        return gzip.GzipFile(fileobj=out, mode="wb", compresslevel=self.level, mtime=0)
+
+    def open_reader(self, src: BinaryIO) -> BinaryIO:
+        return gzip.GzipFile(fileobj=src, mode="rb")
+
+    def decompress(self, data: bytes) -> bytes:
+        return gzip.decompress(data)
+
+
+class ZstdCodec(Codec):
+    name = "zstd"
+    mime_type = "application/zstd"
+    content_encoding = "zstd"
+    magic = b"\x28\xb5\x2f\xfd"
+
+    def __init__(self, level: int = 3):
+        self.level = level
+
+    def open_writer(self, out: BinaryIO) -> BinaryIO:
+        return zstandard.ZstdCompressor(level=self.level).stream_writer(out, closefd=False)
+
+    def open_reader(self, src: BinaryIO) -> BinaryIO:
+        return zstandard.ZstdDecompressor().stream_reader(src, closefd=False)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+class _Uncloseable:
+    """Pass-through writer whose close() leaves the target open"""
+
+    def __init__(self, out: BinaryIO):
+        self.out = out
+
+    def write(self, data: bytes) -> int:
+        return self.out.write(data)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_codecs: Dict[str, Codec] = {}
+
+
+def register_codec(codec: Codec):
+    """Make a codec available to the policy and for reading stored blobs"""
+    _codecs[codec.name] = codec
+
+
+def get_codec(name: Optional[str]) -> Codec:
+    """
+    Codec by name. Rows stored before codecs were recorded have no name;
+    treat them as gzip, which was the only format then.
+
+    Raises:
+        ValueError: If the codec is unknown or its library is not installed
+    """
+    codec = _codecs.get(name or "gzip")
+    if codec is None:
+        raise ValueError(f"Compression codec '{name}' is not available")
+    return codec
+
+
+def detect_codec(data: bytes) -> Codec:
+    """Codec whose magic bytes start data, or NoneCodec"""
+    for codec in _codecs.values():
+        if codec.magic and data.startswith(codec.magic):
+            return codec
+    return _codecs["none"]
+
+
+def available_codecs() -> Iterable[str]:
+    return list(_codecs)
+
+
+def stored_codec(is_compressed: bool, codec_name: Optional[str]) -> Codec:
+    """Codec of a stored file, from its is_compressed/compression_codec columns"""
+    return get_codec(codec_name) if is_compressed else _codecs["none"]
+
+
+register_codec(NoneCodec())
+register_codec(GzipCodec())
+if zstandard is not None:
+    register_codec(ZstdCodec())
+
+
+def byte_entropy(sample: bytes) -> float:
+    """Shannon entropy of sample in bits per byte (0 = constant, 8 = random)"""
+    if not sample:
+        return 0.0
+    total = len(sample)
+    return -sum(
+        (count / total) * math.log2(count / total)
+        for count in Counter(sample).values()
+    )
+
+
+class CompressionPolicy:
+    """
+    Choose a codec for an upload.
+
+    Formats that are compressed containers are stored as-is without
+    looking at the content. Everything else is sampled: data that already
+    looks random (entropy above max_entropy bits/byte) is stored as-is,
+    the rest uses the preferred codec.
+    """
+
+    # Zip containers, archives, images and media: compressing again saves ~nothing
+    PRECOMPRESSED_MIME_TYPES = frozenset({
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+        "application/zip",
+        "application/gzip",
+        "application/zstd",
+        "application/x-7z-compressed",
+        "application/x-rar-compressed",
+        "image/jpeg",
+        "image/png",
+        "image/gif",
+        "image/webp",
+    })
+
+    def __init__(self, preferred_codec: str = "zstd", max_entropy: float = 7.5, sample_size: int = 16 * 1024):
+        self.preferred_codec = preferred_codec if preferred_codec in _codecs else "gzip"
+        self.max_entropy = max_entropy
+        self.sample_size = sample_size
+
+    def choose(self, original_mime_type: Optional[str], sample: bytes) -> Codec:
+        """Codec for content of this type whose first bytes are sample"""
+        if original_mime_type in self.PRECOMPRESSED_MIME_TYPES:
+            return _codecs["none"]
+        if byte_entropy(sample[:self.sample_size]) > self.max_entropy:
+            return _codecs["none"]
+        return _codecs[self.preferred_codec]
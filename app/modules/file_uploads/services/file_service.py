@@ -5,10 +5,10 @@ Service layer for file upload management
 from typing import Optional, BinaryIO, Dict, Any, List, Tuple
 from pathlib import Path
 import uuid
-import gzip
-import io
 import hashlib
+import shutil
 from app.modules.file_uploads.repositories.file_repository import (
+    UploadBlobRepository,
     UploadFileRepository,
     UploadStatsRepository
 )
@@ -19,8 +19,33 @@ from app.modules.file_uploads.utils.security import (
     AccessTokenValidator
 )
 from app.modules.file_uploads.config import upload_config
+from app.metrics import UPLOAD_BYTES
+from .compression import Codec, CompressionPolicy, stored_codec
 from .session_service import SessionService
 
+# Uploaded content is stored once per SHA-256 under blobs/<hash[:2]>/<hash>
+BLOB_STORAGE_DIR = "blobs"
+
+
+class _HashingWriter:
+    """Write-through file wrapper that counts and hashes what passes through"""
+    
+    def __init__(self, fileobj: BinaryIO):
+        self.fileobj = fileobj
+        self.size = 0
+        self._hash = hashlib.sha256()
+    
+    def write(self, data: bytes) -> int:
+        self._hash.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
+    
+    def flush(self):
+        self.fileobj.flush()
+    
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
 
 class FileService:
     """Service for managing file uploads and downloads"""
@@ -30,6 +55,10 @@ class FileService:
         self.storage = LocalStorageProvider()
         self.rate_limiter = RateLimiter()
         self.validator = FileSecurityValidator()
+        self.compression_policy = CompressionPolicy(
+            preferred_codec=upload_config.COMPRESSION_CODEC,
+            max_entropy=upload_config.COMPRESSION_MAX_ENTROPY
+        )
     
     def upload_file(
         self,
@@ -106,43 +135,42 @@ class FileService:
         ):
             raise ValueError(f"File type not allowed")
         
-        # Generate secure storage filename
-        secure_filename = self.validator.generate_secure_filename(sanitized_filename)
+        # Calculate original file hash (streamed; the upload is never fully in memory)
+        file_hash = self.validator.calculate_stream_hash(file_content, chunk_size=upload_config.UPLOAD_CHUNK_SIZE_BYTES)
         
-        # Calculate original file hash
-        file_content.seek(0)
-        original_content = file_content.read()
-        file_hash = self.validator.calculate_file_hash(original_content)
-        file_content.seek(0)
+        # Store the content once per hash; duplicates only add a reference
+        blob, deduplicated = self._store_blob(file_content, file_hash, file_size, original_mime_type)
+        codec = stored_codec(blob['is_compressed'], blob['compression_codec'])
         
-        # Compress file
-        compressed_content, compressed_size, is_compressed, compressed_hash = self._compress_file(
-            original_content, format='gzip'
-        )
+        # Save metadata to database
+        try:
+            file_metadata = UploadFileRepository.create_file(
+                session_id=session_id,
+                po_number=po_number,
+                original_filename=sanitized_filename,
+                storage_filename=blob['storage_filename'],
+                storage_path=blob['storage_path'],
+                file_size=file_size,
+                compressed_size=blob['compressed_size'],
+                is_compressed=blob['is_compressed'],
+                compression_codec=codec.name,
+                mime_type=codec.mime_type or original_mime_type,
+                original_mime_type=original_mime_type,
+                file_hash=file_hash,
+                compressed_hash=blob['compressed_hash'],
+                uploaded_by=uploaded_by,
+                metadata=metadata or {}
+            )
+        except Exception:
+            self.release_storage(file_hash, blob['storage_path'])
+            raise
         
-        # Save compressed file to storage
-        storage_path = f"{session_id}"
-        content_to_save = io.BytesIO(compressed_content)
-        if not self.storage.save_file(content_to_save, storage_path, secure_filename):
-            raise ValueError("Failed to save file to storage")
+        # Duplicates are received but write nothing to storage
+        UPLOAD_BYTES.labels("received").inc(file_size)
+        if not deduplicated:
+            UPLOAD_BYTES.labels("stored").inc(blob['compressed_size'])
         
-        # Save metadata to database
-        file_metadata = UploadFileRepository.create_file(
-            session_id=session_id,
-            po_number=po_number,
-            original_filename=sanitized_filename,
-            storage_filename=secure_filename,
-            storage_path=storage_path,
-            file_size=file_size,
-            compressed_size=compressed_size,
-            is_compressed=is_compressed,
-            mime_type='application/gzip' if is_compressed else original_mime_type,
-            original_mime_type=original_mime_type,
-            file_hash=file_hash,
-            compressed_hash=compressed_hash,
-            uploaded_by=uploaded_by,
-            metadata=metadata or {}
-        )
+        file_metadata['deduplicated'] = deduplicated
         
         return file_metadata
     
@@ -190,13 +218,62 @@ class FileService:
         
         # Decompress if needed
         is_compressed = file_data.get('is_compressed', False)
-        decompressed_content = self._decompress_file(file_content, is_compressed)
+        decompressed_content = self._decompress_file(file_content, is_compressed, file_data.get('compression_codec'))
         
         # Increment download count
         UploadStatsRepository.increment_download_count(session_id)
         
         return decompressed_content
     
+    def prepare_download(
+        self,
+        file_id: str,
+        session_id: str,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Validate a download and locate the stored blob, without reading it
+        
+        Args:
+            file_id: File ID to download
+            session_id: Session ID (for validation)
+            user_id: Optional user ID for access control
+            
+        Returns:
+            dict: File metadata plus local_path of the stored blob
+        """
+        # Validate access
+        if not AccessTokenValidator.validate_file_access(file_id, session_id, user_id):
+            raise ValueError("Access denied to file")
+        
+        # Check rate limit
+        if not self.rate_limiter.check_download_limit(
+            session_id,
+            upload_config.RATE_LIMIT_DOWNLOADS_PER_HOUR
+        ):
+            raise ValueError("Download rate limit exceeded")
+        
+        # Get file metadata
+        file_data = UploadFileRepository.get_file_if_belongs_to_session(file_id, session_id)
+        if not file_data:
+            raise ValueError("File not found or does not belong to session")
+        
+        local_path = self.storage.get_local_path(
+            file_data['storage_path'],
+            file_data['storage_filename']
+        )
+        if local_path is None:
+            raise ValueError("File not found in storage")
+        
+        return {**file_data, 'local_path': str(local_path)}
+    
+    def record_download(self, session_id: str) -> None:
+        """Count a completed download in the session stats (best effort)"""
+        try:
+            UploadStatsRepository.increment_download_count(session_id)
+        except Exception as e:
+            print(f"Error recording download for session {session_id}: {e}")
+    
     def delete_file(
         self,
         file_id: str,
@@ -223,8 +300,9 @@ class FileService:
         if not file_data:
             raise ValueError("File not found")
         
-        # Delete from storage
-        self.storage.delete_file(
+        # Delete from storage (shared blobs only once unreferenced)
+        self.release_storage(
+            file_data.get('file_hash'),
             file_data['storage_path'],
             file_data['storage_filename']
         )
@@ -360,7 +438,7 @@ class FileService:
         
         # Decompress if needed
         is_compressed = file_data.get('is_compressed', False)
-        decompressed_content = self._decompress_file(file_content, is_compressed)
+        decompressed_content = self._decompress_file(file_content, is_compressed, file_data.get('compression_codec'))
         
         # Increment download count
         UploadStatsRepository.increment_download_count(
@@ -384,8 +462,9 @@ class FileService:
         if not file_data:
             raise ValueError("File not found for this PO number")
         
-        # Delete from storage
-        self.storage.delete_file(
+        # Delete from storage (shared blobs only once unreferenced)
+        self.release_storage(
+            file_data.get('file_hash'),
             file_data['storage_path'],
             file_data['storage_filename']
         )
@@ -395,64 +474,142 @@ class FileService:
         
         return True
     
-    @staticmethod
-    def _compress_file(
-        file_content: bytes,
-        format: str = 'gzip',
-        compression_level: int = 6
-    ) -> Tuple[bytes, int, bool, str]:
+    def _store_blob(
+        self,
+        file_content: BinaryIO,
+        file_hash: str,
+        file_size: int,
+        original_mime_type: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], bool]:
         """
-        Compress file content using gzip
+        Store content under its hash, once. A repeat upload of the same
+        content only adds a reference to the existing blob, skipping
+        compression and the disk write. The codec is chosen by
+        compression_policy from the MIME type and a sample of the content.
         
-        Args:
-            file_content: Original file content as bytes
-            format: Compression format ('gzip' by default)
-            compression_level: Compression level (1-9, default 6)
-            
         Returns:
-            Tuple[compressed_bytes, compressed_size, is_compressed, compressed_hash]
+            Tuple[blob, deduplicated]
         """
+        blob = UploadBlobRepository.add_reference(file_hash)
+        if blob and self.storage.file_exists(blob['storage_path'], blob['storage_filename']):
+            return blob, True
+        
+        storage_path = f"{BLOB_STORAGE_DIR}/{file_hash[:2]}"
+        if blob:
+            # Row survived but the file went missing: restore it in place
+            storage_path, storage_filename = blob['storage_path'], blob['storage_filename']
+        else:
+            storage_filename = file_hash
+        
+        codec = None
+        if blob:
+            # Keep the row's codec so other readers of the row can still decode
+            # the file; pick a new one only if that codec is not installed here
+            try:
+                codec = stored_codec(blob['is_compressed'], blob['compression_codec'])
+            except ValueError:
+                pass
+        if codec is None:
+            file_content.seek(0)
+            sample = file_content.read(self.compression_policy.sample_size)
+            codec = self.compression_policy.choose(original_mime_type, sample)
+        
         try:
-            if format == 'gzip':
-                # Compress with gzip
-                compressed_buffer = io.BytesIO()
-                with gzip.GzipFile(fileobj=compressed_buffer, mode='wb', compresslevel=compression_level) as gz:
-                    gz.write(file_content)
-                
-                compressed_data = compressed_buffer.getvalue()
-                compressed_size = len(compressed_data)
-                
-                # Calculate compression ratio
-                original_size = len(file_content)
-                compression_ratio = (1 - (compressed_size / original_size)) * 100 if original_size > 0 else 0
-                
-                # Only use compression if it saves space (>10% reduction)
-                if compression_ratio > 10:
-                    compressed_hash = hashlib.sha256(compressed_data).hexdigest()
-                    return compressed_data, compressed_size, True, compressed_hash
-                else:
-                    # Return uncompressed if compression doesn't help
-                    original_hash = hashlib.sha256(file_content).hexdigest()
-                    return file_content, original_size, False, original_hash
-            else:
-                # Unsupported format, return original
-                original_hash = hashlib.sha256(file_content).hexdigest()
-                return file_content, len(file_content), False, original_hash
-                
+            compressed_size, compression_codec, compressed_hash = self.storage.write_file(
+                storage_path,
+                storage_filename,
+                lambda out: self._write_stream(file_content, out, file_hash, file_size, codec)
+            )
         except Exception as e:
-            # If compression fails, return original file
-            print(f"Compression error: {e}")
-            original_hash = hashlib.sha256(file_content).hexdigest()
-            return file_content, len(file_content), False, original_hash
+            if blob:
+                self.release_storage(file_hash, storage_path)
+            raise ValueError(f"Failed to save file to storage: {e}")
+        
+        if blob:
+            blob = UploadBlobRepository.update_stored_file(
+                file_hash=file_hash,
+                compressed_size=compressed_size,
+                is_compressed=compression_codec != 'none',
+                compressed_hash=compressed_hash,
+                compression_codec=compression_codec
+            )
+            return blob, False
+        
+        blob = UploadBlobRepository.create_or_add_reference(
+            file_hash=file_hash,
+            storage_path=storage_path,
+            storage_filename=storage_filename,
+            file_size=file_size,
+            compressed_size=compressed_size,
+            is_compressed=compression_codec != 'none',
+            compressed_hash=compressed_hash,
+            compression_codec=compression_codec
+        )
+        return blob, False
+    
+    @staticmethod
+    def _write_stream(
+        file_content: BinaryIO,
+        out: BinaryIO,
+        file_hash: str,
+        file_size: int,
+        codec: Codec
+    ) -> Tuple[int, str, str]:
+        """
+        Compress file_content into out with codec chunk by chunk, hashing
+        the compressed bytes on the way. Compression is kept only if it
+        makes the file more than 10% smaller; otherwise out is rewritten
+        with the original bytes. With the "none" codec the bytes are copied
+        as-is.
+        
+        Returns:
+            Tuple[stored_size, codec_name, stored_hash]
+        """
+        chunk_size = upload_config.UPLOAD_CHUNK_SIZE_BYTES
+        
+        if codec.name != 'none':
+            hashing_out = _HashingWriter(out)
+            file_content.seek(0)
+            with codec.open_writer(hashing_out) as writer:
+                for chunk in iter(lambda: file_content.read(chunk_size), b''):
+                    writer.write(chunk)
+            
+            compressed_size = hashing_out.size
+            compression_ratio = (1 - (compressed_size / file_size)) * 100 if file_size > 0 else 0
+            if compression_ratio > 10:
+                return compressed_size, codec.name, hashing_out.hexdigest()
+            
+            # Compression doesn't help: store the original bytes
+            out.seek(0)
+            out.truncate()
+        
+        file_content.seek(0)
+        shutil.copyfileobj(file_content, out, chunk_size)
+        file_content.seek(0)
+        return file_size, 'none', file_hash
+    
+    def release_storage(self, file_hash: Optional[str], storage_path: str, storage_filename: Optional[str] = None):
+        """
+        Drop a file's reference to its stored content. Files stored before
+        content addressing own their storage file and delete it directly.
+        """
+        if file_hash and storage_path.startswith(f"{BLOB_STORAGE_DIR}/"):
+            UploadBlobRepository.release(
+                file_hash,
+                lambda blob: self.storage.delete_file(blob['storage_path'], blob['storage_filename'])
+            )
+        elif storage_filename:
+            self.storage.delete_file(storage_path, storage_filename)
     
     @staticmethod
-    def _decompress_file(file_content: bytes, is_compressed: bool) -> bytes:
+    def _decompress_file(file_content: bytes, is_compressed: bool, compression_codec: Optional[str] = None) -> bytes:
         """
         Decompress file content if it was compressed
         
         Args:
             file_content: File content (possibly compressed)
             is_compressed: Flag indicating if file was compressed
+            compression_codec: Codec it was compressed with (gzip if not recorded)
             
         Returns:
             bytes: Decompressed file content
@@ -461,10 +618,7 @@ class FileService:
             return file_content
         
         try:
-            # Decompress gzip
-            compressed_buffer = io.BytesIO(file_content)
-            with gzip.GzipFile(fileobj=compressed_buffer, mode='rb') as gz:
-                return gz.read()
+            return stored_codec(is_compressed, compression_codec).decompress(file_content)
         except Exception as e:
             print(f"Decompression error: {e}")
             # Return original if decompression fails
@@ -0,0 +1,390 @@
+"""
+Ingestion Job Service - Background PO upload processing
+
+POST /api/uploads/po/jobs stores the file and queues an ingestion_job row,
+then returns immediately. IngestionWorker picks queued jobs up and runs the
+load -> parse -> insert stages, recording per-stage status and timings on
+the job so clients can poll GET /api/uploads/po/jobs/{job_id}.
+
+Jobs live in Postgres, so they survive restarts: a job left 'running' by a
+worker that died stops heartbeating and is re-queued (up to
+INGESTION_MAX_ATTEMPTS). A worker heartbeats while each stage runs, and all
+its job updates require that it still holds the job (locked_by), so a
+worker whose job was re-queued from under it stops instead of overwriting
+the new owner's progress. The worker runs inside each API process by default;
+scripts/run_ingestion_worker.py runs it as a separate local process instead.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.modules.file_uploads.repositories.file_repository import (
+    IngestionJobRepository,
+    UploadFileRepository
+)
+from app.modules.file_uploads.services.file_service import FileService
+from app.modules.file_uploads.services.parser_factory import ParserFactory
+from app.modules.file_uploads.services.parsing_service import FileParsingService
+from app.modules.file_uploads.services.session_service import SessionService
+from app.modules.file_uploads.utils.security import FileSecurityValidator
+
+logger = logging.getLogger(__name__)
+
+JOB_STAGES = ("load", "parse", "insert")
+
+file_service = FileService()
+
+
+class IngestionJobService:
+    """Submit and inspect PO ingestion jobs"""
+
+    @staticmethod
+    def submit_po_job(
+        file_content: BinaryIO,
+        original_filename: str,
+        client_id: int,
+        project_id: Optional[int] = None,
+        project_name: Optional[str] = None,
+        uploaded_by: Optional[str] = None,
+        auto_save: bool = True,
+        idempotency_key: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Store the upload and queue a job for it.
+
+        Submitting the same file with the same options while an earlier job
+        for it is still queued or running returns that job instead of
+        storing and parsing the file again. Pass idempotency_key (unique per
+        client) to control this explicitly.
+
+        Returns:
+            (job, created)
+
+        Raises:
+            ValueError: If client not found or the file is rejected
+        """
+        client_config = ParserFactory.get_parser_for_client(client_id)
+
+        file_hash = FileSecurityValidator.calculate_stream_hash(file_content)
+
+        if idempotency_key:
+            # Scoped to the job type and client, so different clients'
+            # keys never collide
+            key = f"po_upload:{client_id}:{idempotency_key}"
+        else:
+            key = ":".join(
+                str(part) for part in ("po_upload", client_id, project_id or "", project_name or "", auto_save, file_hash)
+            )
+        # Fixed length, whatever the client sends (dedup_key is VARCHAR(255))
+        dedup_key = hashlib.sha256(key.encode()).hexdigest()
+        # Cheap early exit; create_job's unique index settles concurrent submits
+        existing = IngestionJobRepository.find_active_job(dedup_key)
+        if existing:
+            return existing, False
+
+        session = SessionService.create_session(
+            metadata={
+                'client_id': client_id,
+                'client_name': client_config['name'],
+                'parser_type': client_config['parser_type'],
+                'upload_type': 'po',
+                'project_id': project_id
+            },
+            ttl_hours=24
+        )
+
+        file_metadata = file_service.upload_file(
+            session_id=session['session_id'],
+            file_content=file_content,
+            original_filename=original_filename,
+            uploaded_by=uploaded_by,
+            po_number=None
+        )
+
+        job, created = IngestionJobRepository.create_job(
+            client_id=client_id,
+            session_id=session['session_id'],
+            file_id=str(file_metadata['id']),
+            file_hash=file_hash,
+            params={
+                'project_id': project_id,
+                'project_name': project_name,
+                'auto_save': auto_save,
+                'original_filename': original_filename
+            },
+            dedup_key=dedup_key
+        )
+
+        if created:
+            ingestion_worker.wake()
+        else:
+            # An identical submit queued its job first: drop our copy of the upload
+            try:
+                SessionService.delete_session(session['session_id'])
+            except Exception as e:
+                logger.warning(f"Could not clean up duplicate upload session {session['session_id']}: {e}")
+        return job, created
+
+    @staticmethod
+    def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job formatted for the status endpoint"""
+        job = IngestionJobRepository.get_job(job_id)
+        return format_job(job) if job else None
+
+
+def format_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape an ingestion_job row for API responses"""
+    duration_ms = None
+    if job.get("started_at") and job.get("finished_at"):
+        duration_ms = round((job["finished_at"] - job["started_at"]).total_seconds() * 1000, 1)
+
+    stages = job.get("stages") or {}
+    return {
+        "job_id": job["id"],
+        "job_type": job["job_type"],
+        "status": job["status"],
+        "client_id": job["client_id"],
+        "session_id": job.get("session_id"),
+        "file_id": job.get("file_id"),
+        "original_filename": (job.get("params") or {}).get("original_filename"),
+        "stages": [
+            {"name": name, **stages.get(name, {"status": "pending"})}
+            for name in JOB_STAGES
+        ],
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "attempts": job.get("attempts", 0),
+        "created_at": job.get("created_at"),
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at"),
+        "duration_ms": duration_ms
+    }
+
+
+class StageFailed(Exception):
+    """A job stage failed; the message is recorded as the job error"""
+
+
+class LeaseLost(Exception):
+    """The job was re-queued and may belong to another worker; stop working on it"""
+
+
+class IngestionWorker:
+    """
+    Runs queued ingestion jobs with bounded concurrency.
+
+    Each runner claims one job at a time (FOR UPDATE SKIP LOCKED), so several
+    API processes or a separate worker process can share the queue safely.
+    Idle runners poll every poll_interval seconds, or immediately when a job
+    is submitted in this process.
+    """
+
+    def __init__(self, concurrency: int, poll_interval: float, stale_after_seconds: int, max_attempts: int):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stale_after_seconds = stale_after_seconds
+        self.max_attempts = max_attempts
+        # Well inside stale_after_seconds, so a slow stage is never mistaken for a dead worker
+        self.heartbeat_interval = max(stale_after_seconds / 3, 0.1)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks = []
+        self._wakeup = None
+        self._loop = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        """Start the runners and the stale-job reaper on the current event loop"""
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._reap_stale_jobs()))
+        logger.info(f"Ingestion worker {self.worker_id} started with {self.concurrency} runners")
+
+    async def stop(self):
+        """Stop the runners; jobs in progress are re-queued once stale"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if tasks:
+            logger.info(f"Ingestion worker {self.worker_id} stopped")
+
+    def wake(self):
+        """Tell idle runners a job was just queued (safe from any thread)"""
+        if self._wakeup is not None and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while True:
+            try:
+                job = await run_in_threadpool(IngestionJobRepository.claim_next_job, self.worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ingestion worker could not claim a job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self.process_job(job)
+
+    async def _reap_stale_jobs(self):
+        while True:
+            try:
+                requeued = await run_in_threadpool(
+                    IngestionJobRepository.requeue_stale_jobs, self.stale_after_seconds, self.max_attempts
+                )
+                if requeued:
+                    logger.warning(f"Recovered {requeued} stale ingestion job(s)")
+                    self.wake()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Stale ingestion job check failed: {e}")
+            await asyncio.sleep(max(self.stale_after_seconds / 2, self.poll_interval))
+
+    async def _update_stage(self, job_id: str, name: str, stage_info: Dict[str, Any]):
+        if not await run_in_threadpool(IngestionJobRepository.update_stage, job_id, self.worker_id, name, stage_info):
+            raise LeaseLost(f"lost job {job_id} during {name}")
+
+    async def _with_heartbeat(self, job_id: str, coro):
+        """Await coro, refreshing the job's heartbeat every heartbeat_interval"""
+        task = asyncio.ensure_future(coro)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.heartbeat_interval)
+                if done:
+                    return task.result()
+                try:
+                    held = await run_in_threadpool(IngestionJobRepository.heartbeat, job_id, self.worker_id)
+                except Exception as e:
+                    logger.warning(f"Heartbeat for ingestion job {job_id} failed: {e}")
+                    continue
+                if not held:
+                    raise LeaseLost(f"lost job {job_id} while a stage was running")
+        finally:
+            if not task.done():
+                task.cancel()
+
+    async def _stage(self, job_id: str, name: str, func, *args):
+        """Run one stage, recording running/succeeded/failed with timings"""
+        started_at = datetime.utcnow().isoformat()
+        await self._update_stage(job_id, name, {"status": "running", "started_at": started_at})
+        start = time.perf_counter()
+        try:
+            value = await self._with_heartbeat(job_id, func(*args))
+        except LeaseLost:
+            raise
+        except Exception as e:
+            await self._update_stage(job_id, name, {
+                "status": "failed",
+                "started_at": started_at,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+                "error": str(e)
+            })
+            raise StageFailed(f"{name} failed: {e}") from e
+        await self._update_stage(job_id, name, {
+            "status": "succeeded",
+            "started_at": started_at,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1)
+        })
+        return value
+
+    async def process_job(self, job: Dict[str, Any]):
+        """Run the load -> parse -> insert stages for one claimed job"""
+        job_id = job["id"]
+        params = job.get("params") or {}
+
+        async def load():
+            file_data = await run_in_threadpool(UploadFileRepository.get_file, job["file_id"])
+            if not file_data:
+                raise ValueError("Uploaded file not found")
+            content = await run_in_threadpool(
+                file_service.storage.get_file, file_data["storage_path"], file_data["storage_filename"]
+            )
+            if content is None:
+                raise ValueError("File not found in storage")
+            return file_data, content
+
+        async def parse(file_data, content):
+            return await FileParsingService.parse_uploaded_file(
+                file_content=content,
+                filename=file_data["original_filename"],
+                client_id=job["client_id"],
+                session_id=job["session_id"],
+                file_id=job["file_id"],
+                file_hash=job.get("file_hash")
+            )
+
+        async def insert(parsed):
+            return await run_in_threadpool(
+                FileParsingService.save_parsed_po, parsed, job["client_id"],
+                params.get("project_id"), params.get("project_name")
+            )
+
+        try:
+            file_data, content = await self._stage(job_id, "load", load)
+            parsed = await self._stage(job_id, "parse", parse, file_data, content)
+
+            client_po_id = None
+            if params.get("auto_save", True):
+                client_po_id = await self._stage(job_id, "insert", insert, parsed)
+            else:
+                await self._update_stage(job_id, "insert", {"status": "skipped"})
+
+            result = {
+                "client_po_id": client_po_id,
+                "client_name": parsed.get("client_name"),
+                "parser_type": parsed.get("parser_type"),
+                "po_details": parsed.get("po_details", {}),
+                "line_item_count": parsed.get("line_item_count", 0),
+                "parse_cache_hit": parsed.get("parse_cache_hit", False)
+            }
+            if not await run_in_threadpool(
+                IngestionJobRepository.finish_job, job_id, self.worker_id, "succeeded", result
+            ):
+                raise LeaseLost(f"lost job {job_id} before recording its result")
+        except asyncio.CancelledError:
+            # Shutting down; leave the job running so it is re-queued when stale
+            raise
+        except LeaseLost as e:
+            logger.warning(f"Ingestion worker {self.worker_id} stopped working on a re-queued job: {e}")
+        except Exception as e:
+            logger.warning(f"Ingestion job {job_id} failed: {e}")
+            try:
+                if not await run_in_threadpool(
+                    IngestionJobRepository.finish_job, job_id, self.worker_id, "failed", None, str(e)
+                ):
+                    logger.warning(f"Ingestion job {job_id} was re-queued; not recording its failure")
+            except Exception as finish_error:
+                logger.error(f"Could not record failure of ingestion job {job_id}: {finish_error}")
+
+
+# Global worker (started by the app on startup when INGESTION_WORKER_ENABLED)
+ingestion_worker = IngestionWorker(
+    concurrency=settings.INGESTION_WORKER_CONCURRENCY,
+    poll_interval=settings.INGESTION_POLL_SECONDS,
+    stale_after_seconds=settings.INGESTION_STALE_SECONDS,
+    max_attempts=settings.INGESTION_MAX_ATTEMPTS
+)
@@ -0,0 +1,231 @@
+"""
+Parser Executor - Runs CPU-heavy PDF/Excel parsers in a process pool
+
+Parsing a large PDF with pdfplumber (or a large workbook with openpyxl) can
+take seconds of pure CPU. Running that inside an async endpoint blocks the
+event loop, so every other request on the worker stalls. All parse call
+sites go through ParserExecutor.run(), which hands the work to a bounded
+ProcessPoolExecutor and awaits the result.
+
+Limits:
+- At most PARSER_MAX_WORKERS parses run at once (one per process)
+- At most PARSER_MAX_QUEUE_DEPTH more wait for a free process; beyond that
+  new jobs are rejected with ParserBusyError (503) instead of piling up
+- Each job is given PARSER_TIMEOUT_SECONDS; the caller gets
+  ParserTimeoutError (504) when it expires
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+from app.config import settings
+from app.exceptions import APIError
+
+logger = logging.getLogger(__name__)
+
+
+class ParserBusyError(APIError):
+    """Raised when the parser queue is full"""
+    def __init__(self, message: str = "Parser is busy, please retry shortly"):
+        super().__init__(message, 503, "PARSER_BUSY")
+
+
+class ParserTimeoutError(APIError):
+    """Raised when a parse job does not finish within its timeout"""
+    def __init__(self, message: str):
+        super().__init__(message, 504, "PARSER_TIMEOUT")
+
+
+class ParserExecutor:
+    """Bounded process pool for parser functions"""
+
+    def __init__(self, max_workers: int, max_queue_depth: int, timeout: float,
+                 max_tasks_per_child: Optional[int] = None):
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor = None
+        self._lock = threading.Lock()
+        # Jobs wait here (not inside ProcessPoolExecutor) so they can still be
+        # cancelled; the executor only ever receives max_workers jobs
+        self._waiters = deque()
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._timed_out = 0
+        self._rejected = 0
+        self._cancelled = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Create the process pool on first use"""
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the API process holds DB pool threads and
+                # sockets that must not be duplicated into the children
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    max_tasks_per_child=self.max_tasks_per_child
+                )
+                logger.info(
+                    f"Parser process pool started: {self.max_workers} workers, "
+                    f"queue depth {self.max_queue_depth}"
+                )
+            return self._executor
+
+    async def _acquire_worker(self, timeout: float):
+        """Wait for a free worker slot, or raise if the queue is full"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._running < self.max_workers:
+                self._running += 1
+                return
+            if len(self._waiters) >= self.max_queue_depth:
+                self._rejected += 1
+                raise ParserBusyError()
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+
+        try:
+            await asyncio.wait_for(waiter, timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            with self._lock:
+                self._cancelled += 1
+                try:
+                    self._waiters.remove((loop, waiter))
+                except ValueError:
+                    # Already handed a slot; _grant sees the cancelled
+                    # waiter and passes the slot on
+                    pass
+            raise
+
+    def _release_worker(self):
+        """Hand the worker slot to the next live waiter, or free it"""
+        while True:
+            with self._lock:
+                if self._waiters:
+                    loop, waiter = self._waiters.popleft()
+                else:
+                    self._running -= 1
+                    return
+            try:
+                loop.call_soon_threadsafe(self._grant, waiter)
+                return
+            except RuntimeError:
+                # The waiter's event loop is closed; try the next one
+                continue
+
+    def _grant(self, waiter):
+        if waiter.done():
+            self._release_worker()
+        else:
+            waiter.set_result(None)
+
+    def _job_done(self, future):
+        with self._lock:
+            if future.cancelled():
+                self._cancelled += 1
+            elif future.exception() is not None:
+                self._failed += 1
+            else:
+                self._completed += 1
+        self._release_worker()
+
+    def _submit(self, func: Callable, args: tuple):
+        try:
+            return self._get_executor().submit(func, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM kill); start a fresh pool and retry once
+            logger.error("Parser process pool is broken, restarting it")
+            self._reset_executor()
+            return self._get_executor().submit(func, *args)
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None):
+        """
+        Run func(*args) in a worker process and await its result.
+
+        func and its arguments must be picklable (module-level functions,
+        plain data). Exceptions raised by func are re-raised here.
+
+        The timeout covers queueing and parsing. A job still waiting for a
+        worker when it times out, or when the awaiting request is cancelled,
+        is dropped without running. A job that is already running cannot be
+        interrupted; it keeps its worker until it finishes.
+
+        Raises:
+            ParserBusyError: If the queue is full
+            ParserTimeoutError: If the job exceeds its timeout
+        """
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        name = getattr(func, "__name__", repr(func))
+
+        try:
+            await self._acquire_worker(timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timed_out += 1
+            logger.warning(f"Parse job {name} timed out after {timeout}s waiting for a worker")
+            raise ParserTimeoutError(f"Parsing did not start within {timeout} seconds")
+
+        try:
+            future = self._submit(func, args)
+        except Exception:
+            self._release_worker()
+            raise
+        future.add_done_callback(self._job_done)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=max(0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timed_out += 1
+            logger.warning(f"Parse job {name} timed out after {timeout}s")
+            raise ParserTimeoutError(f"Parsing did not finish within {timeout} seconds")
+
+    def _reset_executor(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker processes (call on app shutdown)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+            logger.info("Parser process pool stopped")
+
+    def stats(self) -> dict:
+        """Current load and lifetime job counters"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue_depth": self.max_queue_depth,
+                "timeout_seconds": self.timeout,
+                "running": self._running,
+                "queued": len(self._waiters),
+                "completed": self._completed,
+                "failed": self._failed,
+                "timed_out": self._timed_out,
+                "cancelled": self._cancelled,
+                "rejected": self._rejected
+            }
+
+
+# Global parser executor (worker processes start on first use)
+parser_executor = ParserExecutor(
+    max_workers=settings.PARSER_MAX_WORKERS,
+    max_queue_depth=settings.PARSER_MAX_QUEUE_DEPTH,
+    timeout=settings.PARSER_TIMEOUT_SECONDS,
+    max_tasks_per_child=settings.PARSER_MAX_TASKS_PER_CHILD
+)
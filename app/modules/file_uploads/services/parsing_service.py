@@ -2,91 +2,196 @@
 File Parsing Service - Handles automatic parsing of uploaded files based on client
 """
 
+import copy
 import os
 import tempfile
-import gzip
-import io
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from app.modules.file_uploads.repositories.file_repository import ParseResultRepository
+from app.modules.file_uploads.services.compression import detect_codec
 from app.modules.file_uploads.services.parser_factory import ParserFactory
+from app.modules.file_uploads.services.parser_executor import parser_executor
+from app.repository.client_po_repo import find_project_id_by_name, insert_client_po
 from app.database import get_db
 
+# Bump when parser output changes so cached parse results are not reused
+PARSER_VERSION = 1
+
+
+def _parse_file_content(file_content: bytes, filename: str, client_id: int) -> dict:
+    """
+    Decompress, spool to a temp file and parse. Runs inside a parser worker
+    process, so it must stay a module-level function.
+    """
+    # Handle compressed files (decompress first)
+    decompressed_content = FileParsingService._decompress_if_compressed(file_content)
+    
+    # Create temporary file
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
+        tmp.write(decompressed_content)
+        tmp_path = tmp.name
+    
+    try:
+        # Parse using factory
+        return ParserFactory.parse_file(tmp_path, client_id)
+    finally:
+        # Clean up temporary file
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 
 class FileParsingService:
     """Service for parsing uploaded files based on client configuration"""
     
     @staticmethod
-    def _decompress_if_gzipped(file_content: bytes) -> bytes:
+    def _decompress_if_compressed(file_content: bytes) -> bytes:
         """
-        Decompress file content if it was gzipped, otherwise return as-is
+        Decompress file content if it is gzip or zstd (detected by its magic
+        bytes), otherwise return as-is
         
         Args:
-            file_content: File content (possibly gzipped)
+            file_content: File content (possibly compressed)
             
         Returns:
             bytes: Decompressed file content
         """
+        codec = detect_codec(file_content)
         try:
-            # Try to decompress as gzip
-            compressed_buffer = io.BytesIO(file_content)
-            with gzip.GzipFile(fileobj=compressed_buffer, mode='rb') as gz:
-                return gz.read()
-        except (OSError, gzip.BadGzipFile, EOFError):
-            # Not a gzip file, return as-is
-            return file_content
+            return codec.decompress(file_content)
         except Exception as e:
             print(f"Decompression error (returning original): {e}")
             return file_content
     
     @staticmethod
-    def parse_uploaded_file(file_content: bytes, filename: str, client_id: int, session_id: str, file_id: str) -> dict:
+    async def parse_uploaded_file(
+        file_content: bytes,
+        filename: str,
+        client_id: int,
+        session_id: str,
+        file_id: str,
+        file_hash: Optional[str] = None
+    ) -> dict:
         """
         Parse an uploaded file using the appropriate parser for the client
         
+        Decompression and parsing run in the parser process pool so the
+        event loop stays free while large files are parsed. When file_hash
+        is given, a previous parse of the same content for this client is
+        returned instead of parsing again (parse_cache_hit=True).
+        
         Args:
             file_content: File content as bytes
             filename: Original filename
             client_id: ID of the client
             session_id: ID of the upload session
             file_id: ID of the uploaded file
+            file_hash: SHA-256 of the original content (optional)
             
         Returns:
             dict with parsing results
             
         Raises:
             ValueError: If client not found
+            ParserBusyError: If the parser queue is full
+            ParserTimeoutError: If parsing takes too long
             Exception: If parsing fails
         """
+        # Fail fast on unknown clients without occupying a worker
+        ParserFactory.get_parser_for_client(client_id)
         
-        # Handle gzipped files (decompress first)
-        decompressed_content = FileParsingService._decompress_if_gzipped(file_content)
+        # The cache and result tables are written with blocking calls: keep them off the event loop
+        cached = await run_in_threadpool(FileParsingService._get_cached_result, file_hash, client_id)
+        if cached:
+            parsed_data = copy.deepcopy(cached['parsed_data'])
+            parsed_data["parse_cache_hit"] = True
+            parsed_data["cached_client_po_id"] = cached.get('client_po_id')
+            parsed_data["cached_client_po_project_id"] = cached.get('client_po_project_id')
+        else:
+            parsed_data = await parser_executor.run(_parse_file_content, file_content, filename, client_id)
+            await run_in_threadpool(FileParsingService._cache_result, file_hash, client_id, parsed_data)
+            parsed_data["parse_cache_hit"] = False
         
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
-            tmp.write(decompressed_content)
-            tmp_path = tmp.name
+        # Add metadata
+        parsed_data["file_id"] = file_id
+        parsed_data["session_id"] = session_id
+        parsed_data["file_hash"] = file_hash
+        parsed_data["original_filename"] = filename
+        parsed_data["parsing_status"] = "SUCCESS"
         
-        try:
-            # Parse using factory
-            parsed_data = ParserFactory.parse_file(tmp_path, client_id)
-            
-            # Add metadata
-            parsed_data["file_id"] = file_id
-            parsed_data["session_id"] = session_id
-            parsed_data["original_filename"] = filename
-            parsed_data["parsing_status"] = "SUCCESS"
-            
-            # Store parsing result in database
-            FileParsingService._store_parsing_result(
-                file_id=file_id,
-                client_id=client_id,
-                parsed_data=parsed_data
-            )
-            
-            return parsed_data
+        # Store parsing result in database
+        await run_in_threadpool(
+            FileParsingService._store_parsing_result,
+            file_id=file_id,
+            client_id=client_id,
+            parsed_data=parsed_data
+        )
+        
+        return parsed_data
+    
+    @staticmethod
+    def save_parsed_po(
+        parsed_data: dict,
+        client_id: int,
+        project_id: Optional[int] = None,
+        project_name: Optional[str] = None
+    ) -> int:
+        """
+        Insert a parsed PO, or return the client_po already created from the
+        same file content.
+        
+        The earlier client_po is reused when it still exists and either no
+        project was requested or the requested project (by project_id, or
+        else by project_name) is the one it belongs to.
+        
+        Returns:
+            client_po_id
             
-        finally:
-            # Clean up temporary file
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
+        Raises:
+            ValueError: If required fields are missing
+        """
+        cached_id = parsed_data.get("cached_client_po_id")
+        if cached_id:
+            cached_project_id = parsed_data.get("cached_client_po_project_id")
+            requested_project_id = project_id
+            if not requested_project_id and project_name:
+                requested_project_id = find_project_id_by_name(client_id, project_name)
+                if requested_project_id is None:
+                    # A project that does not exist yet cannot be the cached PO's project
+                    requested_project_id = False
+            if requested_project_id is None or requested_project_id == cached_project_id:
+                return cached_id
+        
+        client_po_id = insert_client_po(parsed_data, client_id, project_id, project_name)
+        
+        file_hash = parsed_data.get("file_hash")
+        if file_hash:
+            try:
+                ParseResultRepository.set_client_po_id(file_hash, client_id, client_po_id)
+            except Exception as e:
+                print(f"Error caching client_po_id for {file_hash}: {e}")
+        return client_po_id
+    
+    @staticmethod
+    def _get_cached_result(file_hash: Optional[str], client_id: int) -> Optional[dict]:
+        """Cached parse of this content for the client, if any"""
+        if not file_hash:
+            return None
+        try:
+            return ParseResultRepository.get(file_hash, client_id, PARSER_VERSION)
+        except Exception as e:
+            # Cache is an optimisation; parse normally if it is unavailable
+            print(f"Error reading parse cache: {e}")
+            return None
+    
+    @staticmethod
+    def _cache_result(file_hash: Optional[str], client_id: int, parsed_data: dict):
+        """Cache a fresh parse result by content hash"""
+        if not file_hash:
+            return
+        try:
+            ParseResultRepository.save(file_hash, client_id, PARSER_VERSION, parsed_data)
+        except Exception as e:
+            print(f"Error caching parse result: {e}")
     
     @staticmethod
     def _store_parsing_result(file_id: str, client_id: int, parsed_data: dict):
@@ -168,6 +168,16 @@ class SessionService:
         Returns:
             bool: True if successful
         """
+        # File rows go with the session (ON DELETE CASCADE); drop their blob references first
+        from .file_service import FileService
+        file_service = FileService()
+        for file_data in UploadFileRepository.get_session_files(session_id):
+            file_service.release_storage(
+                file_data.get('file_hash'),
+                file_data['storage_path'],
+                file_data['storage_filename']
+            )
+        
         return UploadSessionRepository.delete_session(session_id)
     
     @staticmethod
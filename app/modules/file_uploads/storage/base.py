@@ -3,7 +3,7 @@ Abstract storage interface for file uploads
 """
 
 from abc import ABC, abstractmethod
-from typing import Optional, BinaryIO, Dict, Any
+from typing import Optional, BinaryIO, Dict, Any, Callable
 from pathlib import Path
 
 
@@ -30,6 +30,30 @@ class StorageProvider(ABC):
         """
         pass
     
+    @abstractmethod
+    def write_file(
+        self,
+        file_path: str,
+        file_name: str,
+        writer: Callable[[BinaryIO], Any]
+    ) -> Any:
+        """
+        Atomically create a file by streaming into it
+        
+        writer(fileobj) writes the content incrementally; the file only
+        appears under file_name once writer returns. If writer raises,
+        nothing is stored and the exception propagates.
+        
+        Args:
+            file_path: Directory path where file should be saved
+            file_name: Name of the file to save
+            writer: Callable that writes the content to the given file object
+            
+        Returns:
+            Whatever writer returned
+        """
+        pass
+    
     @abstractmethod
     def delete_file(self, file_path: str, file_name: str) -> bool:
         """
@@ -58,6 +82,21 @@ class StorageProvider(ABC):
         """
         pass
     
+    @abstractmethod
+    def get_local_path(self, file_path: str, file_name: str) -> Optional[Path]:
+        """
+        Get the local filesystem path of a stored file, for streaming it
+        without loading it into memory
+        
+        Args:
+            file_path: Directory path where file is stored
+            file_name: Name of the file
+            
+        Returns:
+            Path: Absolute path, or None if not found
+        """
+        pass
+    
     @abstractmethod
     def list_files(self, file_path: str) -> list:
         """
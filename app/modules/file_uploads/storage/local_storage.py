@@ -3,12 +3,16 @@ Local file system storage provider implementation
 """
 
 from .base import StorageProvider
-from typing import Optional, BinaryIO
+from typing import Optional, BinaryIO, Any, Callable
 from pathlib import Path
 import os
+import shutil
+import tempfile
 import hashlib
 from datetime import datetime
 
+COPY_CHUNK_SIZE = 1024 * 1024
+
 
 class LocalStorageProvider(StorageProvider):
     """Local file system implementation of storage provider"""
@@ -58,24 +62,54 @@ class LocalStorageProvider(StorageProvider):
             bool: True if successful
         """
         try:
-            full_path = self._get_full_path(file_path, file_name)
-            
-            # Create directory if it doesn't exist
-            full_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Save file
             if hasattr(file_content, 'read'):
-                with open(full_path, 'wb') as f:
-                    f.write(file_content.read())
+                self.write_file(file_path, file_name, lambda f: shutil.copyfileobj(file_content, f, COPY_CHUNK_SIZE))
             else:
-                with open(full_path, 'wb') as f:
-                    f.write(file_content)
+                self.write_file(file_path, file_name, lambda f: f.write(file_content))
             
             return True
         except Exception as e:
             print(f"Error saving file: {e}")
             return False
     
+    def write_file(
+        self,
+        file_path: str,
+        file_name: str,
+        writer: Callable[[BinaryIO], Any]
+    ) -> Any:
+        """
+        Atomically create a file by streaming into it
+        
+        Content goes to a temp file in the target directory, which is
+        renamed into place once writer returns, so readers never see a
+        partial file.
+        
+        Args:
+            file_path: Directory path where file should be saved
+            file_name: Name of the file to save
+            writer: Callable that writes the content to the given file object
+            
+        Returns:
+            Whatever writer returned
+        """
+        full_path = self._get_full_path(file_path, file_name)
+        
+        # Create directory if it doesn't exist
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        fd, tmp_path = tempfile.mkstemp(dir=full_path.parent, prefix=".upload-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                result = writer(f)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        
+        return result
+    
     def delete_file(self, file_path: str, file_name: str) -> bool:
         """
         Delete file from local storage
@@ -120,6 +154,24 @@ class LocalStorageProvider(StorageProvider):
             print(f"Error reading file: {e}")
             return None
     
+    def get_local_path(self, file_path: str, file_name: str) -> Optional[Path]:
+        """
+        Get the local filesystem path of a stored file
+        
+        Args:
+            file_path: Directory path where file is stored
+            file_name: Name of the file
+            
+        Returns:
+            Path: Absolute path, or None if not found
+        """
+        try:
+            full_path = self._get_full_path(file_path, file_name)
+            return full_path.resolve() if full_path.is_file() else None
+        except Exception as e:
+            print(f"Error resolving file path: {e}")
+            return None
+    
     def list_files(self, file_path: str) -> list:
         """
         List all files in a directory
@@ -0,0 +1,232 @@
+"""
+HTTP helpers for serving stored upload blobs
+
+Downloads run in constant memory: blobs are streamed from disk in
+chunks (compressed blobs go out as-is to clients that accept their
+Content-Encoding, and are decompressed chunk by chunk otherwise). Single byte ranges and
+conditional GET on an ETag built from the content hash are supported.
+"""
+
+from typing import Iterator, Mapping, Optional, Tuple
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.modules.file_uploads.services.compression import Codec
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(ValueError):
+    """Range header does not overlap the content"""
+
+
+def make_etag(file_hash: str) -> str:
+    """Strong ETag for a file's original (decompressed) content"""
+    return f'"{file_hash}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match / If-Range value matches etag
+    (weak comparison, so W/"..." validators match too)
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def accepts_encoding(header: Optional[str], encoding: str) -> bool:
+    """Whether an Accept-Encoding value allows encoding (q=0 excludes it)"""
+    for item in (header or "").split(","):
+        token, _, params = item.partition(";")
+        if token.strip().lower() != encoding:
+            continue
+        q = params.strip()
+        return not (q.startswith("q=") and q[2:].strip().rstrip("0").rstrip(".") in ("", "0"))
+    return False
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a Range header into an inclusive (start, end) byte range.
+
+    Returns None when the whole content should be sent: no header, a unit
+    other than bytes, malformed syntax or several ranges (which servers
+    may answer with the full content).
+
+    Raises:
+        RangeNotSatisfiable: If the range lies outside the content
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+
+    first, last = (part.strip() for part in spec.split("-", 1))
+    if not (first or last) or not (first or "0").isdigit() or not (last or "0").isdigit():
+        return None
+
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+        if last and end < start:
+            return None
+    else:
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiable(header)
+        start, end = max(size - suffix, 0), size - 1
+
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
+
+
+def iter_decompressed(path: str, codec: Codec, start: int = 0, end: Optional[int] = None,
+                      chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield decompressed bytes start..end (inclusive) of a file stored with codec"""
+    position = 0
+    with open(path, "rb") as src, codec.open_reader(src) as reader:
+        while end is None or position <= end:
+            chunk = reader.read(chunk_size)
+            if not chunk:
+                break
+            chunk_start, position = position, position + len(chunk)
+            if position <= start:
+                continue
+            lo = max(start - chunk_start, 0)
+            hi = len(chunk) if end is None else min(end + 1 - chunk_start, len(chunk))
+            yield chunk[lo:hi]
+
+
+class BlobFileResponse(FileResponse):
+    """FileResponse that can send a single byte range of the file"""
+
+    def __init__(self, path: str, byte_range: Optional[Tuple[int, int]] = None, **kwargs):
+        super().__init__(path, **kwargs)
+        self.byte_range = byte_range
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.byte_range is None:
+            await super().__call__(scope, receive, send)
+            return
+
+        start, end = self.byte_range
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def build_download_response(
+    request: Request,
+    path: str,
+    size: int,
+    codec: Codec,
+    file_hash: Optional[str],
+    media_type: str = "application/octet-stream",
+    headers: Optional[Mapping[str, str]] = None
+) -> Response:
+    """
+    Response for a stored file, honouring If-None-Match, If-Range and Range
+
+    A compressed blob is sent as-is with its Content-Encoding (gzip, zstd)
+    to clients that accept it (no decompression at all); ranges and other
+    clients get the original bytes, decompressed on the fly.
+
+    Args:
+        request: Incoming request (for the conditional/range headers)
+        path: Local path of the stored blob
+        size: Size of the original (decompressed) content
+        codec: Codec of the blob on disk
+        file_hash: SHA-256 of the original content (ETag source)
+        media_type: Content-Type to send
+        headers: Extra headers (e.g. Content-Disposition)
+    """
+    response_headers = dict(headers or {})
+    response_headers["Accept-Ranges"] = "bytes"
+    # Clients may keep a copy but must revalidate, which is a cheap 304
+    response_headers["Cache-Control"] = "private, no-cache"
+    is_compressed = codec.name != "none"
+    if is_compressed:
+        response_headers["Vary"] = "Accept-Encoding"
+
+    # Each representation gets its own strong ETag; either one proves the client is current
+    etag = make_etag(file_hash) if file_hash else None
+    encoded_etag = make_etag(f"{file_hash}-{codec.name}") if file_hash and is_compressed else None
+    if etag:
+        if_none_match = request.headers.get("if-none-match")
+        for candidate in filter(None, (etag, encoded_etag)):
+            if etag_matches(if_none_match, candidate):
+                response_headers["ETag"] = candidate
+                return Response(status_code=304, headers=response_headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range is not None and (not etag or not etag_matches(if_range, etag)):
+        range_header = None
+
+    if (
+        codec.content_encoding
+        and range_header is None
+        and accepts_encoding(request.headers.get("accept-encoding"), codec.content_encoding)
+    ):
+        if encoded_etag:
+            response_headers["ETag"] = encoded_etag
+        response_headers["Content-Encoding"] = codec.content_encoding
+        return BlobFileResponse(path, headers=response_headers, media_type=media_type, method=request.method)
+
+    if etag:
+        response_headers["ETag"] = etag
+    # The original bytes: byte ranges index into these, so the response must
+    # not be compressed on the way out (GZipMiddleware passes through any
+    # response that already has a Content-Encoding)
+    response_headers["Content-Encoding"] = "identity"
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        response_headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=response_headers)
+
+    status_code = 200
+    if byte_range:
+        start, end = byte_range
+        status_code = 206
+        response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response_headers["Content-Length"] = str(end - start + 1)
+    else:
+        response_headers["Content-Length"] = str(size)
+
+    if not is_compressed:
+        return BlobFileResponse(
+            path,
+            byte_range=byte_range,
+            status_code=status_code,
+            headers=response_headers,
+            media_type=media_type,
+            method=request.method
+        )
+
+    start, end = byte_range or (0, None)
+    return StreamingResponse(
+        iter_decompressed(path, codec, start, end),
+        status_code=status_code,
+        headers=response_headers,
+        media_type=media_type
+    )
@@ -6,7 +6,7 @@ import re
 import hashlib
 import secrets
 from pathlib import Path
-from typing import Optional, List
+from typing import BinaryIO, Optional, List
 from datetime import datetime
 
 
@@ -173,6 +173,26 @@ class FileSecurityValidator:
         hash_obj.update(file_content)
         return hash_obj.hexdigest()
     
+    @staticmethod
+    def calculate_stream_hash(file_obj: BinaryIO, algorithm: str = 'sha256', chunk_size: int = 1024 * 1024) -> str:
+        """
+        Calculate hash of a file object in chunks, from the start
+        
+        Args:
+            file_obj: Seekable binary file object
+            algorithm: Hash algorithm to use
+            chunk_size: Bytes read per chunk
+            
+        Returns:
+            str: Hex digest of file hash
+        """
+        hash_obj = hashlib.new(algorithm)
+        file_obj.seek(0)
+        for chunk in iter(lambda: file_obj.read(chunk_size), b''):
+            hash_obj.update(chunk)
+        file_obj.seek(0)
+        return hash_obj.hexdigest()
+    
     @staticmethod
     def generate_access_token(length: int = 32) -> str:
         """
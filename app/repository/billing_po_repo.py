@@ -4,6 +4,8 @@ Handles database operations for billing POs and final billing workflows
 """
 
 from app.database import get_db
+from app.repository.project_financials_repo import get_project_financials
+from app.response_cache import notify_invalidation
 from typing import Dict, Optional, List, Any
 from datetime import datetime
 import uuid
@@ -44,7 +46,9 @@ def create_billing_po(
                     billing_notes
                 ))
                 
-                return cur.fetchone()
+                billing_po = cur.fetchone()
+                notify_invalidation(cur, projects=[project_id])
+                return billing_po
     finally:
         conn.close()
 
@@ -136,80 +140,46 @@ def get_project_billing_po(project_id: int) -> Optional[Dict[str, Any]]:
 
 
 def get_project_billing_summary(project_id: int) -> Optional[Dict[str, Any]]:
-    """Get comprehensive billing summary for a project"""
-    conn = get_db()
-    try:
-        with conn:
-            with conn.cursor() as cur:
-                # Get original PO details
-                cur.execute("""
-                    SELECT COALESCE(SUM(po_value), 0) as original_po_value,
-                           COALESCE(SUM(total_tax), 0) as original_tax,
-                           COALESCE(SUM(po_value), 0) as original_total
-                    FROM client_po
-                    WHERE project_id = %s
-                """, (project_id,))
-                
-                original = cur.fetchone()
-                
-                # Get billing PO details
-                cur.execute("""
-                    SELECT COALESCE(SUM(billed_value), 0) as billed_value,
-                           COALESCE(SUM(billed_gst), 0) as billed_gst,
-                           COALESCE(SUM(billed_total), 0) as billed_total,
-                           COUNT(*) as billing_po_count
-                    FROM billing_po
-                    WHERE project_id = %s AND status = 'FINAL'
-                """, (project_id,))
-                
-                billing = cur.fetchone()
-                
-                # Get vendor costs
-                cur.execute("""
-                    SELECT COALESCE(SUM(amount), 0) as vendor_total
-                    FROM vendor_order
-                    WHERE project_id = %s
-                """, (project_id,))
-                
-                vendor = cur.fetchone()
-                
-                # Calculate P&L
-                original_total = original['original_total'] or 0
-                billed_total = billing['billed_total'] or 0
-                vendor_total = vendor['vendor_total'] or 0
-                
-                profit = billed_total - vendor_total
-                margin_percent = ((profit / billed_total) * 100) if billed_total > 0 else 0
-                delta = billed_total - original_total
-                
-                return {
-                    "project_id": project_id,
-                    "original_po": {
-                        "value": original['original_po_value'] or 0,
-                        "tax": original['original_tax'] or 0,
-                        "total": original_total
-                    },
-                    "billing_po": {
-                        "value": billing['billed_value'] or 0,
-                        "gst": billing['billed_gst'] or 0,
-                        "total": billed_total,
-                        "count": billing['billing_po_count'] or 0
-                    },
-                    "vendor_costs": {
-                        "total": vendor_total
-                    },
-                    "financial_summary": {
-                        "delta_value": delta,
-                        "delta_percent": ((delta / original_total) * 100) if original_total > 0 else 0,
-                        "final_revenue": billed_total,
-                        "original_budget": original_total,
-                        "vendor_costs": vendor_total,
-                        "profit": profit,
-                        "profit_margin_percent": round(margin_percent, 2)
-                    }
-                }
-    finally:
-        conn.close()
+    """Get comprehensive billing summary for a project (from the project_financials rollup)"""
+    totals = get_project_financials(project_id)
+    if not totals:
+        return None
+    
+    # Calculate P&L
+    original_total = totals['original_po_value']
+    billed_total = totals['billed_total']
+    vendor_total = totals['vendor_order_value']
+    
+    profit = billed_total - vendor_total
+    margin_percent = ((profit / billed_total) * 100) if billed_total > 0 else 0
+    delta = billed_total - original_total
+    
+    return {
+        "project_id": project_id,
+        "original_po": {
+            "value": totals['original_po_value'],
+            "tax": totals['original_tax'],
+            "total": original_total
+        },
+        "billing_po": {
+            "value": totals['billed_value'],
+            "gst": totals['billed_gst'],
+            "total": billed_total,
+            "count": totals['billing_po_count']
+        },
+        "vendor_costs": {
+            "total": vendor_total
+        },
+        "financial_summary": {
+            "delta_value": delta,
+            "delta_percent": ((delta / original_total) * 100) if original_total > 0 else 0,
+            "final_revenue": billed_total,
+            "original_budget": original_total,
+            "vendor_costs": vendor_total,
+            "profit": profit,
+            "profit_margin_percent": round(margin_percent, 2)
+        }
+    }
 
 
 def update_billing_po(
@@ -260,7 +230,10 @@ def update_billing_po(
                 """
                 
                 cur.execute(query, params)
-                return cur.fetchone()
+                billing_po = cur.fetchone()
+                if billing_po:
+                    notify_invalidation(cur, projects=[billing_po["project_id"]])
+                return billing_po
     finally:
         conn.close()
 
@@ -300,8 +273,9 @@ def approve_billing_po(billing_po_id: str, notes: str = None) -> Optional[Dict[s
                     UPDATE billing_po
                     SET {', '.join(update_fields)}
                     WHERE id = %s
-                    RETURNING id, client_po_id, project_id, po_number, billed_value, billed_gst,
-                              billed_total, billing_notes, status, created_at, updated_at
+                    RETURNING id AS billing_po_id, client_po_id, project_id, po_number,
+                              COALESCE(billed_value, 0) AS billed_value, COALESCE(billed_gst, 0) AS billed_gst,
+                              COALESCE(billed_total, 0) AS billed_total, billing_notes, status, created_at, updated_at
                 """
                 
                 cur.execute(query, params)
@@ -310,19 +284,9 @@ def approve_billing_po(billing_po_id: str, notes: str = None) -> Optional[Dict[s
                 if not result:
                     return None
                 
-                return {
-                    "billing_po_id": result["id"],
-                    "client_po_id": result["client_po_id"],
-                    "project_id": result["project_id"],
-                    "po_number": result["po_number"],
-                    "billed_value": float(result["billed_value"]) if result["billed_value"] else 0,
-                    "billed_gst": float(result["billed_gst"]) if result["billed_gst"] else 0,
-                    "billed_total": float(result["billed_total"]) if result["billed_total"] else 0,
-                    "billing_notes": result["billing_notes"],
-                    "status": result["status"],
-                    "created_at": result["created_at"].isoformat() if result["created_at"] else None,
-                    "updated_at": result["updated_at"].isoformat() if result["updated_at"] else None
-                }
+                notify_invalidation(cur, projects=[result["project_id"]])
+                
+                return result
     finally:
         conn.close()
 
@@ -1,13 +1,37 @@
 import json
+from psycopg2.extras import execute_values
 from app.database import get_db
-from typing import Dict, Any, Optional
+from app.response_cache import notify_invalidation
+from typing import Dict, Any, List, Optional
 
 
-def _get_or_create_project(cur, project_id: Optional[int], client_id: int) -> Optional[int]:
+# Rows per multi-row INSERT when writing a PO's line items
+LINE_ITEM_PAGE_SIZE = 1000
+
+
+def _memoized(memo: Optional[Dict], key: tuple, resolve) -> Any:
+    """
+    Return memo[key], resolving (and remembering) it on first use.
+    
+    The memo lives for one transaction (insert_client_pos passes one dict
+    for the whole batch), so a vendor or site shared by many POs is looked
+    up once. Without a memo every call resolves.
+    """
+    if memo is None:
+        return resolve()
+    if key not in memo:
+        memo[key] = resolve()
+    return memo[key]
+
+
+def _get_or_create_project(cur, project_id: Optional[int], client_id: int, memo: Optional[Dict] = None) -> Optional[int]:
     """Get or create project record. Returns project_id or None if not provided."""
     if project_id is None:
         return None
-    
+    return _memoized(memo, ("project_id", project_id), lambda: _resolve_project_id(cur, project_id, client_id))
+
+
+def _resolve_project_id(cur, project_id: int, client_id: int) -> int:
     # Check if project exists
     cur.execute("SELECT id FROM project WHERE id = %s", (project_id,))
     result = cur.fetchone()
@@ -15,60 +39,140 @@ def _get_or_create_project(cur, project_id: Optional[int], client_id: int) -> Op
         return project_id
     
     # Create project if it doesn't exist
-    cur.execute("""
-        INSERT INTO project (client_id, name, status)
-        VALUES (%s, %s, 'Active')
-        ON CONFLICT (id) DO UPDATE SET id = EXCLUDED.id
-        RETURNING id
-    """, (client_id, f"Project {project_id}"))
-    return cur.fetchone()["id"]
+    return _get_or_create_project_by_name(cur, f"Project {project_id}", client_id)
 
 
-def _get_or_create_vendor(cur, vendor_name: str, vendor_gstin: str = None, vendor_address: str = None) -> int:
+def _get_or_create_project_by_name(cur, project_name: str, client_id: int, memo: Optional[Dict] = None) -> int:
+    """Get or create the client's project with this name. Returns project_id."""
+    def resolve():
+        # DO NOTHING leaves an existing row untouched (no dead tuple, no row
+        # lock); RETURNING is then empty and the row is read instead
+        cur.execute("""
+            INSERT INTO project (client_id, name, status)
+            VALUES (%s, %s, 'Active')
+            ON CONFLICT (client_id, name) DO NOTHING
+            RETURNING id
+        """, (client_id, project_name))
+        row = cur.fetchone()
+        if row is None:
+            cur.execute("SELECT id FROM project WHERE client_id = %s AND name = %s", (client_id, project_name))
+            row = cur.fetchone()
+        return row["id"]
+    
+    return _memoized(memo, ("project", client_id, project_name), resolve)
+
+
+def _get_or_create_vendor(cur, vendor_name: str, vendor_gstin: str = None, vendor_address: str = None,
+                          memo: Optional[Dict] = None) -> int:
     """Get or create vendor record. Returns vendor_id."""
-    # Try to find existing vendor
-    cur.execute("SELECT id FROM vendor WHERE name = %s", (vendor_name,))
-    result = cur.fetchone()
-    if result:
-        return result["id"]
+    def resolve():
+        # Vendor names are not unique, so no ON CONFLICT: find the first
+        # vendor with this name or insert one, in a single statement
+        cur.execute("""
+            WITH existing AS (
+                SELECT id FROM vendor WHERE name = %(name)s ORDER BY id LIMIT 1
+            ), inserted AS (
+                INSERT INTO vendor (name, gstin, address)
+                SELECT %(name)s, %(gstin)s, %(address)s
+                WHERE NOT EXISTS (SELECT 1 FROM existing)
+                RETURNING id
+            )
+            SELECT id FROM existing
+            UNION ALL
+            SELECT id FROM inserted
+        """, {"name": vendor_name, "gstin": vendor_gstin, "address": vendor_address})
+        return cur.fetchone()["id"]
     
-    # Create new vendor
-    cur.execute("""
-        INSERT INTO vendor (name, gstin, address)
-        VALUES (%s, %s, %s)
-        RETURNING id
-    """, (vendor_name, vendor_gstin, vendor_address))
-    return cur.fetchone()["id"]
+    return _memoized(memo, ("vendor", vendor_name), resolve)
 
 
-def _get_or_create_site(cur, store_id: str = None, site_name: str = None, address: str = None) -> Optional[int]:
+def _get_or_create_site(cur, store_id: str = None, site_name: str = None, address: str = None,
+                        memo: Optional[Dict] = None) -> Optional[int]:
     """Get or create site record. Returns site_id or None."""
     if not store_id and not site_name:
         return None
     
-    # Try to find by store_id first
-    if store_id:
-        cur.execute("SELECT id FROM site WHERE store_id = %s", (store_id,))
-        result = cur.fetchone()
-        if result:
-            return result["id"]
-    
-    # Try to find by site_name
-    if site_name:
-        cur.execute("SELECT id FROM site WHERE site_name = %s", (site_name,))
-        result = cur.fetchone()
-        if result:
-            return result["id"]
-    
     # Create new site - use store_id as site_name if site_name not provided (required field)
     site_name_to_insert = site_name or store_id or "Unknown Site"
     
-    cur.execute("""
-        INSERT INTO site (store_id, site_name, address)
-        VALUES (%s, %s, %s)
-        RETURNING id
-    """, (store_id, site_name_to_insert, address))
-    return cur.fetchone()["id"]
+    def resolve_by_store_id():
+        # Same precedence as a lookup by store_id, then by site_name, then an
+        # insert; store_id is unique, so a concurrent insert of the same
+        # store is read back instead
+        cur.execute("""
+            WITH by_store AS (
+                SELECT id FROM site WHERE store_id = %(store_id)s
+            ), by_name AS (
+                SELECT id FROM site
+                WHERE %(site_name)s::TEXT IS NOT NULL AND site_name = %(site_name)s
+                  AND NOT EXISTS (SELECT 1 FROM by_store)
+                ORDER BY id LIMIT 1
+            ), inserted AS (
+                INSERT INTO site (store_id, site_name, address)
+                SELECT %(store_id)s, %(site_name_to_insert)s, %(address)s
+                WHERE NOT EXISTS (SELECT 1 FROM by_store) AND NOT EXISTS (SELECT 1 FROM by_name)
+                ON CONFLICT (store_id) WHERE store_id IS NOT NULL DO NOTHING
+                RETURNING id
+            )
+            SELECT id FROM by_store
+            UNION ALL
+            SELECT id FROM by_name
+            UNION ALL
+            SELECT id FROM inserted
+        """, {"store_id": store_id, "site_name": site_name, "site_name_to_insert": site_name_to_insert,
+              "address": address})
+        row = cur.fetchone()
+        if row is None:
+            cur.execute("SELECT id FROM site WHERE store_id = %s", (store_id,))
+            row = cur.fetchone()
+        return row["id"]
+    
+    def resolve_by_name():
+        cur.execute("""
+            WITH existing AS (
+                SELECT id FROM site WHERE site_name = %(site_name)s ORDER BY id LIMIT 1
+            ), inserted AS (
+                INSERT INTO site (store_id, site_name, address)
+                SELECT NULL, %(site_name)s, %(address)s
+                WHERE NOT EXISTS (SELECT 1 FROM existing)
+                RETURNING id
+            )
+            SELECT id FROM existing
+            UNION ALL
+            SELECT id FROM inserted
+        """, {"site_name": site_name, "address": address})
+        return cur.fetchone()["id"]
+    
+    if store_id:
+        return _memoized(memo, ("site", store_id, site_name), resolve_by_store_id)
+    return _memoized(memo, ("site_name", site_name), resolve_by_name)
+
+
+def find_project_id_by_name(client_id: int, project_name: str) -> Optional[int]:
+    """Id of the client's project with this name, without creating it"""
+    conn = get_db()
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id FROM project WHERE client_id = %s AND name = %s", (client_id, project_name))
+            row = cur.fetchone()
+            return row["id"] if row else None
+
+    finally:
+        conn.close()
+
+
+def get_or_create_project_id(client_id: int, project_name: str) -> int:
+    """Id of the client's project with this name, creating it if needed (safe under concurrent uploads)"""
+    conn = get_db()
+
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                return _get_or_create_project_by_name(cur, project_name, client_id)
+
+    finally:
+        conn.close()
 
 
 def insert_client_po(parsed: Dict[str, Any], client_id: int, project_id: Optional[int] = None, project_name: Optional[str] = None) -> int:
@@ -86,6 +190,69 @@ def insert_client_po(parsed: Dict[str, Any], client_id: int, project_id: Optiona
     Raises:
         ValueError: If required fields are missing
     """
+    _validate_parsed_po(parsed)
+    
+    conn = get_db()
+
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                return _insert_client_po(cur, parsed, client_id, project_id, project_name)
+
+    finally:
+        conn.close()
+
+
+def insert_client_pos(parsed_pos: List[Dict[str, Any]], client_id: int, project_id: Optional[int] = None) -> List[Any]:
+    """
+    Insert several parsed POs on one connection in a single transaction.
+    
+    Each PO is written inside its own savepoint, so a PO that fails
+    validation or violates a constraint is rolled back on its own and the
+    rest of the batch still commits. Projects, vendors and sites are
+    resolved once per batch (see _memoized).
+    
+    Returns:
+        List aligned with parsed_pos holding either the new client_po_id or
+        the exception raised for that PO
+    """
+    results: List[Any] = []
+    if not parsed_pos:
+        return results
+    
+    conn = get_db()
+
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                memo: Dict = {}
+                for parsed in parsed_pos:
+                    try:
+                        _validate_parsed_po(parsed)
+                    except ValueError as e:
+                        results.append(e)
+                        continue
+                    
+                    cur.execute("SAVEPOINT bulk_po")
+                    memo_before = dict(memo)
+                    try:
+                        client_po_id = _insert_client_po(cur, parsed, client_id, project_id, memo=memo)
+                        cur.execute("RELEASE SAVEPOINT bulk_po")
+                        results.append(client_po_id)
+                    except Exception as e:
+                        cur.execute("ROLLBACK TO SAVEPOINT bulk_po")
+                        # Rows created inside the savepoint are gone; forget their ids too
+                        memo.clear()
+                        memo.update(memo_before)
+                        results.append(e)
+        return results
+
+    finally:
+        conn.close()
+
+
+def _validate_parsed_po(parsed: Dict[str, Any]):
+    """Raise ValueError if a parsed PO is missing what insert_client_po needs"""
     # Validate required fields
     if not parsed.get("po_details"):
         raise ValueError("po_details is required")
@@ -100,177 +267,170 @@ def insert_client_po(parsed: Dict[str, Any], client_id: int, project_id: Optiona
     line_items = parsed.get("line_items", [])
     if not line_items or len(line_items) == 0:
         raise ValueError(f"PO {po_details.get('po_number')} has no line items - cannot create PO")
+
+
+def _insert_client_po(cur, parsed: Dict[str, Any], client_id: int, project_id: Optional[int] = None,
+                      project_name: Optional[str] = None, memo: Optional[Dict] = None) -> int:
+    """Insert one validated PO and its line items using the given cursor"""
+    po = parsed["po_details"]
+
+    # ========================================
+    # Calculate totals
+    # ========================================
     
-    conn = get_db()
+    # Support both 'amount' and 'gross_amount' keys
+    po_total = sum(
+        item.get("gross_amount") or item.get("amount") or 0
+        for item in parsed["line_items"]
+    )
+    
+    # Get tax totals if available
+    subtotal = po.get("subtotal") or sum(
+        item.get("taxable_amount") or item.get("amount") or 0
+        for item in parsed["line_items"]
+    )
+    cgst = po.get("cgst")
+    sgst = po.get("sgst")
+    igst = po.get("igst")
+    total_tax = (cgst or 0) + (sgst or 0) + (igst or 0)
 
-    try:
-        with conn:
-            with conn.cursor() as cur:
+    # ========================================
+    # Get or create project if needed
+    # ========================================
+    if not project_id and not project_name:
+        # Fallback: create/link project based on store_id or site_name extracted from PO
+        fallback_name = po.get("store_id") or po.get("site_name")
+        if fallback_name and fallback_name not in ("UNKNOWN_STORE", "UNKNOWN_SITE"):
+            project_name = fallback_name
+        else:
+            project_name = f"Unassigned PO Project ({po.get('po_number')})"
+
+    if project_id:
+        project_id = _get_or_create_project(cur, project_id, client_id, memo)
+    elif project_name:
+        project_id = _get_or_create_project_by_name(cur, project_name, client_id, memo)
+
+    # ========================================
+    # Get or create vendor and site
+    # ========================================
+    vendor_id = None
+    site_id = None
+    
+    if po.get("vendor_name"):
+        vendor_id = _get_or_create_vendor(
+            cur,
+            po.get("vendor_name"),
+            po.get("vendor_gstin"),
+            po.get("vendor_address"),
+            memo=memo
+        )
+    
+    if po.get("site_name") or po.get("store_id"):
+        site_id = _get_or_create_site(
+            cur,
+            po.get("store_id"),
+            po.get("site_name"),
+            memo=memo
+        )
+
+    # ========================================
+    # Insert client_po
+    # ========================================
+    cur.execute("""
+        INSERT INTO client_po (
+            client_id,
+            project_id,
+            po_number,
+            po_date,
+            pi_number,
+            pi_date,
+            po_value,
+            subtotal,
+            cgst,
+            sgst,
+            igst,
+            total_tax,
+            receivable_amount,
+            vendor_id,
+            vendor_gstin,
+            vendor_address,
+            bill_to_gstin,
+            bill_to_address,
+            ship_to_address,
+            site_id,
+            store_id,
+            status
+        )
+        VALUES (
+            %s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s
+        )
+        RETURNING id
+    """, (
+        client_id,
+        project_id,
+        po.get("client_po_number") or po.get("po_number"),
+        po.get("po_date"),
+        po.get("pi_number"),
+        po.get("pi_date"),
+        po_total,
+        subtotal,
+        cgst,
+        sgst,
+        igst,
+        total_tax,
+        po_total,
+        vendor_id,
+        po.get("vendor_gstin"),
+        po.get("vendor_address"),
+        po.get("bill_to_gstin"),
+        po.get("bill_to_address"),
+        po.get("ship_to_address"),
+        site_id,
+        po.get("store_id"),
+        "pending"
+    ))
+
+    client_po_id = cur.fetchone()["id"]
+
+    # ========================================
+    # Insert line items with extended fields
+    # ========================================
+    # Multi-row INSERTs of LINE_ITEM_PAGE_SIZE rows instead of one per item
+    execute_values(cur, """
+        INSERT INTO client_po_line_item (
+            client_po_id,
+            item_name,
+            quantity,
+            unit,
+            unit_price,
+            total_price,
+            hsn_code,
+            rate,
+            gst_amount,
+            gross_amount
+        )
+        VALUES %s
+    """, [
+        (
+            client_po_id,
+            item.get("boq_name") or item.get("description"),
+            item.get("quantity"),
+            item.get("unit"),
+            item.get("rate") or item.get("unit_price"),
+            item.get("taxable_amount") or item.get("amount"),
+            item.get("hsn_code"),
+            item.get("rate"),
+            item.get("gst_amount"),
+            item.get("gross_amount")
+        )
+        for item in parsed["line_items"]
+    ], page_size=LINE_ITEM_PAGE_SIZE)
+
+    notify_invalidation(cur, clients=[client_id], client_pos=[client_po_id])
+
+    return client_po_id
 
-                po = parsed["po_details"]
-
-                # ========================================
-                # Calculate totals
-                # ========================================
-                
-                # Support both 'amount' and 'gross_amount' keys
-                po_total = sum(
-                    item.get("gross_amount") or item.get("amount") or 0
-                    for item in parsed["line_items"]
-                )
-                
-                # Get tax totals if available
-                subtotal = po.get("subtotal") or sum(
-                    item.get("taxable_amount") or item.get("amount") or 0
-                    for item in parsed["line_items"]
-                )
-                cgst = po.get("cgst")
-                sgst = po.get("sgst")
-                igst = po.get("igst")
-                total_tax = (cgst or 0) + (sgst or 0) + (igst or 0)
-
-                # ========================================
-                # Get or create project if needed
-                # ========================================
-                if not project_id and not project_name:
-                    # Fallback: create/link project based on store_id or site_name extracted from PO
-                    fallback_name = po.get("store_id") or po.get("site_name")
-                    if fallback_name and fallback_name not in ("UNKNOWN_STORE", "UNKNOWN_SITE"):
-                        project_name = fallback_name
-                    else:
-                        project_name = f"Unassigned PO Project ({po.get('po_number')})"
-
-                if project_id:
-                    project_id = _get_or_create_project(cur, project_id, client_id)
-                elif project_name:
-                    # Try to find or create by name
-                    cur.execute("SELECT id FROM project WHERE name = %s AND client_id = %s", (project_name, client_id))
-                    p_result = cur.fetchone()
-                    if p_result:
-                        project_id = p_result["id"]
-                    else:
-                        cur.execute("""
-                            INSERT INTO project (client_id, name, status)
-                            VALUES (%s, %s, 'Active')
-                            RETURNING id
-                        """, (client_id, project_name))
-                        project_id = cur.fetchone()["id"]
-
-                # ========================================
-                # Get or create vendor and site
-                # ========================================
-                vendor_id = None
-                site_id = None
-                
-                if po.get("vendor_name"):
-                    vendor_id = _get_or_create_vendor(
-                        cur,
-                        po.get("vendor_name"),
-                        po.get("vendor_gstin"),
-                        po.get("vendor_address")
-                    )
-                
-                if po.get("site_name") or po.get("store_id"):
-                    site_id = _get_or_create_site(
-                        cur,
-                        po.get("store_id"),
-                        po.get("site_name")
-                    )
-
-                # ========================================
-                # Insert client_po
-                # ========================================
-                cur.execute("""
-                    INSERT INTO client_po (
-                        client_id,
-                        project_id,
-                        po_number,
-                        po_date,
-                        pi_number,
-                        pi_date,
-                        po_value,
-                        subtotal,
-                        cgst,
-                        sgst,
-                        igst,
-                        total_tax,
-                        receivable_amount,
-                        vendor_id,
-                        vendor_gstin,
-                        vendor_address,
-                        bill_to_gstin,
-                        bill_to_address,
-                        ship_to_address,
-                        site_id,
-                        store_id,
-                        status
-                    )
-                    VALUES (
-                        %s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s
-                    )
-                    RETURNING id
-                """, (
-                    client_id,
-                    project_id,
-                    po.get("client_po_number") or po.get("po_number"),
-                    po.get("po_date"),
-                    po.get("pi_number"),
-                    po.get("pi_date"),
-                    po_total,
-                    subtotal,
-                    cgst,
-                    sgst,
-                    igst,
-                    total_tax,
-                    po_total,
-                    vendor_id,
-                    po.get("vendor_gstin"),
-                    po.get("vendor_address"),
-                    po.get("bill_to_gstin"),
-                    po.get("bill_to_address"),
-                    po.get("ship_to_address"),
-                    site_id,
-                    po.get("store_id"),
-                    "pending"
-                ))
-
-                client_po_id = cur.fetchone()["id"]
-
-                # ========================================
-                # Insert line items with extended fields
-                # ========================================
-                for item in parsed["line_items"]:
-                    cur.execute("""
-                        INSERT INTO client_po_line_item (
-                            client_po_id,
-                            item_name,
-                            quantity,
-                            unit,
-                            unit_price,
-                            total_price,
-                            hsn_code,
-                            rate,
-                            gst_amount,
-                            gross_amount
-                        )
-                        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                    """, (
-                        client_po_id,
-                        item.get("boq_name") or item.get("description"),
-                        item.get("quantity"),
-                        item.get("unit"),
-                        item.get("rate") or item.get("unit_price"),
-                        item.get("taxable_amount") or item.get("amount"),
-                        item.get("hsn_code"),
-                        item.get("rate"),
-                        item.get("gst_amount"),
-                        item.get("gross_amount")
-                    ))
-
-                return client_po_id
 
-    finally:
-        conn.close()
 def get_client_po_with_items(client_po_id: int) -> Optional[Dict[str, Any]]:
     """
     Fetch PO details with line items.
@@ -62,24 +62,7 @@ def get_documents_for_project(project_id: int):
                 ORDER BY created_at DESC
             """, (project_id,))
 
-            rows = cur.fetchall()
-            return [
-                {
-                    "id": r["id"],
-                    "project_id": r["project_id"],
-                    "client_po_id": r.get("client_po_id"),
-                    "original_filename": r["original_filename"],
-                    "stored_filename": r["stored_filename"],
-                    "compressed_filename": r["compressed_filename"],
-                    "mime_type": r["mime_type"],
-                    "original_size": r["original_size"],
-                    "compressed_size": r["compressed_size"],
-                    "description": r["description"],
-                    "uploaded_by": r["uploaded_by"],
-                    "created_at": r["created_at"].isoformat() if r["created_at"] else None
-                }
-                for r in rows
-            ]
+            return cur.fetchall()
     finally:
         conn.close()
 
@@ -96,23 +79,7 @@ def get_document_by_id(doc_id: int):
                 WHERE id = %s
             """, (doc_id,))
 
-            row = cur.fetchone()
-            if not row:
-                return None
-            return {
-                "id": row["id"],
-                "project_id": row["project_id"],
-                "client_po_id": row.get("client_po_id"),
-                "original_filename": row["original_filename"],
-                "stored_filename": row["stored_filename"],
-                "compressed_filename": row["compressed_filename"],
-                "mime_type": row["mime_type"],
-                "original_size": row["original_size"],
-                "compressed_size": row["compressed_size"],
-                "description": row["description"],
-                "uploaded_by": row["uploaded_by"],
-                "created_at": row["created_at"].isoformat() if row["created_at"] else None
-            }
+            return cur.fetchone()
     finally:
         conn.close()
 
@@ -130,23 +97,6 @@ def get_documents_for_po(client_po_id: int):
                 ORDER BY created_at DESC
             """, (client_po_id,))
 
-            rows = cur.fetchall()
-            return [
-                {
-                    "id": r["id"],
-                    "project_id": r["project_id"],
-                    "client_po_id": r.get("client_po_id"),
-                    "original_filename": r["original_filename"],
-                    "stored_filename": r["stored_filename"],
-                    "compressed_filename": r["compressed_filename"],
-                    "mime_type": r["mime_type"],
-                    "original_size": r["original_size"],
-                    "compressed_size": r["compressed_size"],
-                    "description": r["description"],
-                    "uploaded_by": r["uploaded_by"],
-                    "created_at": r["created_at"].isoformat() if r["created_at"] else None
-                }
-                for r in rows
-            ]
+            return cur.fetchall()
     finally:
         conn.close()
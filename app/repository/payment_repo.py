@@ -1,6 +1,9 @@
 from app.database import get_db
+from app.async_database import get_async_db
+from app.response_cache import notify_invalidation
 from datetime import date
 from typing import List, Dict, Optional
+from app.utils.pagination import decode_cursor, estimated_count_query, keyset_predicate, planned_rows, split_page
 
 def create_payment(client_po_id: int, payment_date: date, amount: float, 
                   payment_mode: str, status: str = "pending",
@@ -51,6 +54,8 @@ def create_payment(client_po_id: int, payment_date: date, amount: float,
                 payment_id_row = cur.fetchone()
                 payment_id = payment_id_row["id"] if payment_id_row else None
                 
+                notify_invalidation(cur, client_pos=[client_po_id])
+                
                 # Update PO status logic could go here if needed, or stick to manual update
                 
                 return payment_id
@@ -68,14 +73,14 @@ def get_payments_for_po(client_po_id: int):
                     id,
                     client_po_id,
                     payment_date,
-                    amount,
+                    COALESCE(amount, 0) AS amount,
                     payment_mode,
                     reference_number,
                     status,
                     payment_stage,
                     notes,
                     is_tds_deducted,
-                    tds_amount,
+                    COALESCE(tds_amount, 0) AS tds_amount,
                     received_by_account,
                     transaction_type,
                     created_at
@@ -84,26 +89,7 @@ def get_payments_for_po(client_po_id: int):
                 ORDER BY payment_date DESC, created_at DESC
             """, (client_po_id,))
             
-            payments = cur.fetchall()
-            return [
-                {
-                    "id": p["id"],
-                    "client_po_id": p["client_po_id"],
-                    "payment_date": p["payment_date"].isoformat() if p["payment_date"] else None,
-                    "amount": float(p["amount"]) if p["amount"] else 0,
-                    "payment_mode": p["payment_mode"],
-                    "reference_number": p["reference_number"],
-                    "status": p["status"],
-                    "payment_stage": p["payment_stage"],
-                    "notes": p["notes"],
-                    "is_tds_deducted": p["is_tds_deducted"],
-                    "tds_amount": float(p["tds_amount"]) if p["tds_amount"] else 0,
-                    "received_by_account": p["received_by_account"],
-                    "transaction_type": p["transaction_type"],
-                    "created_at": p["created_at"].isoformat()
-                }
-                for p in payments
-            ]
+            return cur.fetchall()
     finally:
         conn.close()
 
@@ -133,9 +119,15 @@ def update_payment(payment_id: int, **kwargs):
                     UPDATE client_payment
                     SET {set_clause}
                     WHERE id = %s
+                    RETURNING client_po_id
                 """, values)
                 
-                return cur.rowcount > 0
+                row = cur.fetchone()
+                if not row:
+                    return False
+                
+                notify_invalidation(cur, client_pos=[row["client_po_id"]])
+                return True
     finally:
         conn.close()
 
@@ -146,8 +138,13 @@ def delete_payment(payment_id: int):
     try:
         with conn:
             with conn.cursor() as cur:
-                cur.execute("DELETE FROM client_payment WHERE id = %s", (payment_id,))
-                return cur.rowcount > 0
+                cur.execute("DELETE FROM client_payment WHERE id = %s RETURNING client_po_id", (payment_id,))
+                row = cur.fetchone()
+                if not row:
+                    return False
+                
+                notify_invalidation(cur, client_pos=[row["client_po_id"]])
+                return True
     finally:
         conn.close()
 
@@ -174,6 +171,31 @@ def get_payment_summary(client_po_id: int):
         conn.close()
 
 
+PROJECT_PAYMENT_SUMMARY_QUERY = """
+    SELECT 
+        SUM(CASE WHEN cp.transaction_type = 'debit' THEN -cp.amount ELSE cp.amount END) as total_collected,
+        SUM(CASE WHEN cp.is_tds_deducted AND cp.status = 'cleared' THEN cp.tds_amount ELSE 0 END) as total_tds,
+        COUNT(DISTINCT CASE WHEN cp.status = 'cleared' THEN cp.id END) as cleared_payments,
+        COUNT(DISTINCT CASE WHEN cp.status = 'pending' THEN cp.id END) as pending_payments,
+        COUNT(DISTINCT CASE WHEN cp.status = 'bounced' THEN cp.id END) as bounced_payments
+    FROM client_payment cp
+    JOIN client_po cpo ON cp.client_po_id = cpo.id
+    LEFT JOIN po_project_mapping ppm ON cpo.id = ppm.client_po_id
+    WHERE (cpo.project_id = %s OR ppm.project_id = %s)
+"""
+
+
+def _format_project_payment_summary(result) -> Dict:
+    """Shape the project payment summary row for the API"""
+    return {
+        "total_collected": float(result["total_collected"]) if result and result["total_collected"] is not None else 0.0,
+        "total_tds": float(result["total_tds"]) if result and result["total_tds"] is not None else 0.0,
+        "cleared_payments": result["cleared_payments"] if result else 0,
+        "pending_payments": result["pending_payments"] if result else 0,
+        "bounced_payments": result["bounced_payments"] if result else 0
+    }
+
+
 def get_project_payment_summary(project_id: int):
     """Get detailed payment summary for an entire project (across all POs)
     
@@ -184,88 +206,192 @@ def get_project_payment_summary(project_id: int):
     try:
         with conn.cursor() as cur:
             # Get comprehensive payment metrics for project
-            cur.execute("""
-                SELECT 
-                    SUM(CASE WHEN cp.transaction_type = 'debit' THEN -cp.amount ELSE cp.amount END) as total_collected,
-                    SUM(CASE WHEN cp.is_tds_deducted AND cp.status = 'cleared' THEN cp.tds_amount ELSE 0 END) as total_tds,
-                    COUNT(DISTINCT CASE WHEN cp.status = 'cleared' THEN cp.id END) as cleared_payments,
-                    COUNT(DISTINCT CASE WHEN cp.status = 'pending' THEN cp.id END) as pending_payments,
-                    COUNT(DISTINCT CASE WHEN cp.status = 'bounced' THEN cp.id END) as bounced_payments
-                FROM client_payment cp
-                JOIN client_po cpo ON cp.client_po_id = cpo.id
-                LEFT JOIN po_project_mapping ppm ON cpo.id = ppm.client_po_id
-                WHERE (cpo.project_id = %s OR ppm.project_id = %s)
-            """, (project_id, project_id))
-            
-            result = cur.fetchone()
-            return {
-                "total_collected": float(result["total_collected"]) if result and result["total_collected"] is not None else 0.0,
-                "total_tds": float(result["total_tds"]) if result and result["total_tds"] is not None else 0.0,
-                "cleared_payments": result["cleared_payments"] if result else 0,
-                "pending_payments": result["pending_payments"] if result else 0,
-                "bounced_payments": result["bounced_payments"] if result else 0
-            }
+            cur.execute(PROJECT_PAYMENT_SUMMARY_QUERY, (project_id, project_id))
+            return _format_project_payment_summary(cur.fetchone())
     finally:
         conn.close()
 
 
-def get_all_payments(skip: int = 0, limit: int = 50) -> List[Dict]:
-    """Get all payments with pagination"""
+async def get_project_payment_summary_async(project_id: int):
+    """Async variant of get_project_payment_summary"""
+    async with get_async_db() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(PROJECT_PAYMENT_SUMMARY_QUERY, (project_id, project_id))
+            return _format_project_payment_summary(await cur.fetchone())
+
+
+PAYMENT_COLUMNS = """
+        id,
+        client_po_id,
+        payment_date,
+        amount,
+        payment_mode,
+        status,
+        payment_stage,
+        notes,
+        is_tds_deducted,
+        tds_amount,
+        received_by_account,
+        transaction_type,
+        reference_number,
+        COALESCE(payment_date, 'epoch'::date) AS sort_payment_date
+"""
+
+# Sort key of GET /api/payments, served by idx_client_payment_date_id (migration 0016)
+PAYMENT_SORT_COLUMNS = ["COALESCE(payment_date, 'epoch'::date)", "id"]
+
+
+def _build_payment_filters(status: str = None, payment_mode: str = None, client_po_id: int = None,
+                           date_from: date = None, date_to: date = None):
+    """WHERE conditions and parameters shared by the payment page and its count"""
+    conditions = []
+    params = []
+    
+    if status:
+        conditions.append("status = %s")
+        params.append(status)
+    if payment_mode:
+        conditions.append("payment_mode = %s")
+        params.append(payment_mode)
+    if client_po_id:
+        conditions.append("client_po_id = %s")
+        params.append(client_po_id)
+    if date_from:
+        conditions.append("payment_date >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("payment_date <= %s")
+        params.append(date_to)
+    
+    return conditions, params
+
+
+def _build_payments_page_query(status: str = None, payment_mode: str = None, client_po_id: int = None,
+                               date_from: date = None, date_to: date = None,
+                               cursor: str = None, limit: int = 50):
+    """Build the SQL and parameters for get_payments_page"""
+    conditions, params = _build_payment_filters(status, payment_mode, client_po_id, date_from, date_to)
+    
+    predicate, cursor_params = keyset_predicate(PAYMENT_SORT_COLUMNS, decode_cursor(cursor, 2))
+    if predicate:
+        conditions.append(predicate)
+        params.extend(cursor_params)
+    
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    # Fetch one extra row to know whether another page exists
+    query = f"""
+        SELECT {PAYMENT_COLUMNS}
+        FROM client_payment
+        {where_clause}
+        ORDER BY {PAYMENT_SORT_COLUMNS[0]} DESC, id DESC
+        LIMIT %s
+    """
+    return query, params + [limit + 1]
+
+
+def _build_payment_count_query(status: str = None, payment_mode: str = None, client_po_id: int = None,
+                               date_from: date = None, date_to: date = None, exact: bool = False):
+    """COUNT(*) over the filtered payments, or the EXPLAIN giving its estimate"""
+    conditions, params = _build_payment_filters(status, payment_mode, client_po_id, date_from, date_to)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    if exact:
+        return f"SELECT COUNT(*) AS total FROM client_payment {where_clause}", params
+    return estimated_count_query(f"SELECT 1 FROM client_payment {where_clause}"), params
+
+
+def _format_payment_row(row) -> Dict:
+    """Shape a client_payment row for the API"""
+    return {
+        "id": row["id"],
+        "client_po_id": row["client_po_id"],
+        "payment_date": row["payment_date"],
+        "amount": row["amount"],
+        "payment_mode": row["payment_mode"],
+        "status": row["status"],
+        "payment_stage": row["payment_stage"],
+        "notes": row["notes"],
+        "is_tds_deducted": row["is_tds_deducted"],
+        "tds_amount": row["tds_amount"],
+        "received_by_account": row["received_by_account"],
+        "transaction_type": row["transaction_type"],
+        "reference_number": row["reference_number"]
+    }
+
+
+def _format_payments_page(rows, limit: int) -> Dict:
+    """Trim a get_payments_page result to one page and compute next_cursor"""
+    rows, next_cursor = split_page(rows, limit, lambda row: [row["sort_payment_date"], row["id"]])
+    return {"payments": [_format_payment_row(row) for row in rows], "next_cursor": next_cursor}
+
+
+def get_payments_page(status: str = None, payment_mode: str = None, client_po_id: int = None,
+                      date_from: date = None, date_to: date = None,
+                      cursor: str = None, limit: int = 50) -> Dict:
+    """
+    Get one keyset page of payments, newest payment_date first (ties by id).
+    
+    Filters: status, payment_mode, client_po_id and an inclusive
+    payment_date range. Pass the returned next_cursor back in to fetch the
+    following page.
+    
+    Returns: Dict with "payments" and "next_cursor" (None on the last page)
+    
+    Raises: ValueError if the cursor is malformed
+    """
+    query, params = _build_payments_page_query(status, payment_mode, client_po_id, date_from, date_to, cursor, limit)
     conn = get_db()
     
     try:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT 
-                    id,
-                    client_po_id,
-                    payment_date,
-                    amount,
-                    payment_mode,
-                    status,
-                    payment_stage,
-                    notes,
-                    is_tds_deducted,
-                    tds_amount,
-                    received_by_account,
-                    transaction_type,
-                    reference_number
-                FROM client_payment
-                ORDER BY payment_date DESC
-                LIMIT %s OFFSET %s
-            """, (limit, skip))
-            
-            payments = []
-            for row in cur.fetchall():
-                payments.append({
-                    "id": row["id"],
-                    "client_po_id": row["client_po_id"],
-                    "payment_date": row["payment_date"].isoformat() if row["payment_date"] else None,
-                    "amount": float(row["amount"]),
-                    "payment_mode": row["payment_mode"],
-                    "status": row["status"],
-                    "payment_stage": row["payment_stage"],
-                    "notes": row["notes"],
-                    "is_tds_deducted": row["is_tds_deducted"],
-                    "tds_amount": float(row["tds_amount"]),
-                    "received_by_account": row["received_by_account"],
-                    "transaction_type": row["transaction_type"],
-                    "reference_number": row["reference_number"]
-                })
-            return payments
+            cur.execute(query, params)
+            return _format_payments_page(cur.fetchall(), limit)
     finally:
         conn.close()
 
 
-def get_total_payment_count() -> int:
-    """Get total count of all payments"""
+async def get_payments_page_async(status: str = None, payment_mode: str = None, client_po_id: int = None,
+                                  date_from: date = None, date_to: date = None,
+                                  cursor: str = None, limit: int = 50) -> Dict:
+    """Async variant of get_payments_page"""
+    query, params = _build_payments_page_query(status, payment_mode, client_po_id, date_from, date_to, cursor, limit)
+    async with get_async_db() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, params)
+            return _format_payments_page(await cur.fetchall(), limit)
+
+
+def _count_result(row, exact: bool) -> int:
+    if exact:
+        return row["total"] if row else 0
+    return max(planned_rows(row), 0)
+
+
+def get_payment_count(status: str = None, payment_mode: str = None, client_po_id: int = None,
+                      date_from: date = None, date_to: date = None, exact: bool = False) -> int:
+    """
+    Number of payments matching the filters.
+    
+    By default this is the planner's estimate, which costs no scan but is
+    only as fresh as the table statistics; exact=True runs COUNT(*).
+    """
+    query, params = _build_payment_count_query(status, payment_mode, client_po_id, date_from, date_to, exact)
     conn = get_db()
     
     try:
         with conn.cursor() as cur:
-            cur.execute("SELECT COUNT(*) as total FROM client_payment")
-            result = cur.fetchone()
-            return result["total"] if result else 0
+            cur.execute(query, params)
+            return _count_result(cur.fetchone(), exact)
     finally:
         conn.close()
 
+
+async def get_payment_count_async(status: str = None, payment_mode: str = None, client_po_id: int = None,
+                                  date_from: date = None, date_to: date = None, exact: bool = False) -> int:
+    """Async variant of get_payment_count"""
+    query, params = _build_payment_count_query(status, payment_mode, client_po_id, date_from, date_to, exact)
+    async with get_async_db() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, params)
+            return _count_result(await cur.fetchone(), exact)
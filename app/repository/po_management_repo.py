@@ -5,15 +5,85 @@ Enhanced PO Repository with support for:
 3. Verbal agreements
 """
 
+import json
+from psycopg2.extras import execute_values
 from app.database import get_db
+from app.async_database import get_async_db
+from app.response_cache import notify_invalidation
+from app.utils.pagination import decode_cursor, keyset_predicate, split_page
 from datetime import date
 from typing import List, Dict, Optional
 
 
+# ==========================================
+# BULK LOADERS
+# ==========================================
+
+# Maximum number of PO ids sent in a single bulk line-item query
+LINE_ITEM_BATCH_SIZE = 1000
+
+LINE_ITEM_COLUMNS = (
+    "id, client_po_id, item_name, quantity, unit_price, total_price, "
+    "hsn_code, unit, rate, gst_amount, gross_amount"
+)
+
+
+def _line_item_batches(po_ids: List[int]):
+    """Split PO ids into de-duplicated batches of LINE_ITEM_BATCH_SIZE"""
+    unique_ids = list(dict.fromkeys(po_id for po_id in po_ids if po_id is not None))
+    for start in range(0, len(unique_ids), LINE_ITEM_BATCH_SIZE):
+        yield unique_ids[start:start + LINE_ITEM_BATCH_SIZE]
+
+
+def _line_items_query(columns: str) -> str:
+    return f"""
+        SELECT {columns}
+        FROM client_po_line_item
+        WHERE client_po_id = ANY(%s)
+        ORDER BY client_po_id, id ASC
+    """
+
+
+def _get_line_items_for_pos(cur, po_ids: List[int], columns: str = LINE_ITEM_COLUMNS) -> Dict[int, List[Dict]]:
+    """
+    Fetch line items for many POs using the given cursor.
+    
+    Runs one set-based query per LINE_ITEM_BATCH_SIZE PO ids (instead of one
+    query per PO) and groups the rows in memory by client_po_id. Items keep
+    their id order within each PO. `columns` must include client_po_id.
+    
+    Returns: Dict mapping client_po_id -> list of raw line item rows
+    """
+    grouped: Dict[int, List[Dict]] = {}
+    
+    for batch in _line_item_batches(po_ids):
+        cur.execute(_line_items_query(columns), (batch,))
+        for item in cur.fetchall():
+            grouped.setdefault(item["client_po_id"], []).append(item)
+    
+    return grouped
+
+
+async def _get_line_items_for_pos_async(cur, po_ids: List[int], columns: str = LINE_ITEM_COLUMNS) -> Dict[int, List[Dict]]:
+    """Async variant of _get_line_items_for_pos for psycopg 3 async cursors"""
+    grouped: Dict[int, List[Dict]] = {}
+    
+    for batch in _line_item_batches(po_ids):
+        await cur.execute(_line_items_query(columns), (batch,))
+        for item in await cur.fetchall():
+            grouped.setdefault(item["client_po_id"], []).append(item)
+    
+    return grouped
+
+
 # ==========================================
 # LINE ITEMS MANAGEMENT
 # ==========================================
 
+# Rows per multi-row INSERT in add_line_items_bulk
+LINE_ITEM_INSERT_PAGE_SIZE = 1000
+
+
 def add_line_item(client_po_id: int, item_name: str, quantity: float, unit_price: float):
     """Add a new line item to an existing PO"""
     conn = get_db()
@@ -47,6 +117,8 @@ def add_line_item(client_po_id: int, item_name: str, quantity: float, unit_price
                     WHERE id = %s
                 """, (total_price, total_price, client_po_id))
                 
+                notify_invalidation(cur, client_pos=[client_po_id])
+                
                 return {
                     "line_item_id": line_item_id,
                     "item_name": item_name,
@@ -59,6 +131,72 @@ def add_line_item(client_po_id: int, item_name: str, quantity: float, unit_price
         conn.close()
 
 
+def add_line_items_bulk(client_po_id: int, items: List[Dict]) -> Optional[List[Dict]]:
+    """
+    Add many line items to a PO in one transaction.
+    
+    `items` are already validated dicts with item_name, quantity and
+    unit_price. The PO total is raised once by the sum of the new items
+    (which also locks the PO row), then all rows are inserted with
+    multi-row INSERTs of LINE_ITEM_INSERT_PAGE_SIZE rows each.
+    
+    Returns: created items in input order, or None if the PO does not exist
+    """
+    if not items:
+        return []
+    
+    rows = [
+        (client_po_id, item["item_name"], item["quantity"], item["unit_price"],
+         item["quantity"] * item["unit_price"])
+        for item in items
+    ]
+    added_value = sum(row[4] for row in rows)
+    
+    conn = get_db()
+    
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE client_po
+                    SET po_value = po_value + %s,
+                        receivable_amount = receivable_amount + %s
+                    WHERE id = %s
+                    RETURNING id
+                """, (added_value, added_value, client_po_id))
+                
+                if not cur.fetchone():
+                    return None
+                
+                # RETURNING follows the VALUES order, so ids line up with rows
+                inserted = execute_values(cur, """
+                    INSERT INTO client_po_line_item (
+                        client_po_id,
+                        item_name,
+                        quantity,
+                        unit_price,
+                        total_price
+                    )
+                    VALUES %s
+                    RETURNING id
+                """, rows, page_size=LINE_ITEM_INSERT_PAGE_SIZE, fetch=True)
+                
+                notify_invalidation(cur, client_pos=[client_po_id])
+                return [
+                    {
+                        "line_item_id": inserted_row["id"],
+                        "item_name": row[1],
+                        "quantity": row[2],
+                        "unit_price": row[3],
+                        "total_price": row[4]
+                    }
+                    for row, inserted_row in zip(rows, inserted)
+                ]
+    
+    finally:
+        conn.close()
+
+
 def update_line_item(line_item_id: int, item_name: str = None, quantity: float = None, unit_price: float = None):
     """Update an existing line item"""
     conn = get_db()
@@ -125,6 +263,8 @@ def update_line_item(line_item_id: int, item_name: str = None, quantity: float =
                     query = f"UPDATE client_po_line_item SET {', '.join(update_fields)} WHERE id = %s"
                     cur.execute(query, values)
                 
+                notify_invalidation(cur, client_pos=[client_po_id])
+                
                 # Fetch updated item
                 cur.execute("""
                     SELECT * FROM client_po_line_item WHERE id = %s
@@ -174,6 +314,8 @@ def delete_line_item(line_item_id: int):
                     WHERE id = %s
                 """, (total_price, total_price, client_po_id))
                 
+                notify_invalidation(cur, client_pos=[client_po_id])
+                
                 return True
     
     finally:
@@ -187,28 +329,13 @@ def get_line_items(client_po_id: int):
     try:
         with conn.cursor() as cur:
             cur.execute("""
-                SELECT id, item_name, quantity, unit_price, total_price, hsn_code, unit, rate, gst_amount, gross_amount
+                SELECT id AS line_item_id, item_name, quantity, unit_price, total_price, hsn_code, unit, rate, gst_amount, gross_amount
                 FROM client_po_line_item
                 WHERE client_po_id = %s
                 ORDER BY id
             """, (client_po_id,))
             
-            items = cur.fetchall()
-            return [
-                {
-                    "line_item_id": item["id"],
-                    "item_name": item["item_name"],
-                    "quantity": float(item["quantity"]) if item["quantity"] else None,
-                    "unit_price": float(item["unit_price"]) if item["unit_price"] else None,
-                    "total_price": float(item["total_price"]) if item["total_price"] else None,
-                    "hsn_code": item.get("hsn_code"),
-                    "unit": item.get("unit"),
-                    "rate": float(item["rate"]) if item.get("rate") else None,
-                    "gst_amount": float(item["gst_amount"]) if item.get("gst_amount") else None,
-                    "gross_amount": float(item["gross_amount"]) if item.get("gross_amount") else None
-                }
-                for item in items
-            ]
+            return cur.fetchall()
     
     finally:
         conn.close()
@@ -218,201 +345,385 @@ def get_line_items(client_po_id: int):
 # GET ALL POs
 # ==========================================
 
-def get_po_by_id(po_id: int):
-    """Get a single PO by ID with all details"""
+# Fields of the PO detail document, in response order: (key, SQL expression)
+_PO_DOCUMENT_FIELDS = [
+    ("id", "cp.id"),
+    ("client_po_id", "cp.id"),
+    ("client_id", "cp.client_id"),
+    ("client_name", "c.name"),
+    ("project_id", "cp.project_id"),
+    ("project_name", "p.name"),
+    ("store_id", "cp.store_id"),
+    ("po_number", "cp.po_number"),
+    ("po_date", "cp.po_date"),
+    ("po_value", "COALESCE(cp.po_value, 0)"),
+    ("receivable_amount", "COALESCE(cp.receivable_amount, 0)"),
+    ("status", "cp.status"),
+    ("po_type", "cp.po_type"),
+    ("parent_po_id", "cp.parent_po_id"),
+    ("pi_number", "cp.pi_number"),
+    ("pi_date", "cp.pi_date"),
+    ("notes", "cp.notes"),
+    ("created_at", "cp.created_at"),
+    ("line_items", """COALESCE((
+        SELECT json_agg(json_build_object(
+            'line_item_id', item.id,
+            'item_name', item.item_name,
+            'quantity', item.quantity,
+            'unit_price', item.unit_price,
+            'total_price', item.total_price,
+            'hsn_code', item.hsn_code,
+            'unit', item.unit,
+            'rate', item.rate,
+            'gst_amount', item.gst_amount,
+            'gross_amount', item.gross_amount
+        ) ORDER BY item.id)
+        FROM client_po_line_item item
+        WHERE item.client_po_id = cp.id
+    ), '[]'::json)"""),
+    ("line_item_count", "li.line_item_count"),
+]
+
+# Extra fields of /po/{id}/details: cleared payments against the PO
+_PO_PAYMENT_FIELDS = [
+    ("payment_status", """CASE
+        WHEN pay.total_paid >= COALESCE(cp.po_value, 0) THEN 'paid'
+        WHEN pay.total_paid > 0 THEN 'partial'
+        ELSE 'pending'
+    END"""),
+    ("total_paid", "pay.total_paid"),
+    ("total_tds", "pay.total_tds"),
+    ("outstanding_amount", "COALESCE(cp.po_value, 0) - pay.total_paid"),
+]
+
+_PO_PAYMENTS_LATERAL = """
+    CROSS JOIN LATERAL (
+        SELECT
+            COALESCE(SUM(CASE WHEN status = 'cleared' THEN
+                CASE WHEN transaction_type = 'debit' THEN -amount ELSE amount END END), 0) AS total_paid,
+            COALESCE(SUM(CASE WHEN status = 'cleared' AND is_tds_deducted THEN
+                CASE WHEN transaction_type = 'debit' THEN -tds_amount ELSE tds_amount END END), 0) AS total_tds,
+            string_agg(id || '.' || xmin, ',' ORDER BY id) AS row_versions
+        FROM client_payment
+        WHERE client_po_id = cp.id
+    ) pay
+"""
+
+
+def _build_po_document_query(with_payments: bool = False) -> str:
+    """
+    One statement returning a PO's version and its detail document.
+    
+    The version is a hash of the xmin (row version) of every row the
+    document is built from, so it changes with any committed write to
+    them. The document (JSON text, built by Postgres) is NULL when the
+    version is in %(known_versions)s, so an unchanged PO is not rendered.
+    """
+    fields = _PO_DOCUMENT_FIELDS + (_PO_PAYMENT_FIELDS if with_payments else [])
+    document = ",\n            ".join(f"'{key}', {expression}" for key, expression in fields)
+    payment_versions = ", pay.row_versions" if with_payments else ""
+    
+    return f"""
+        SELECT
+            v.version,
+            CASE WHEN v.version = ANY(%(known_versions)s::text[]) THEN NULL ELSE json_build_object(
+            {document}
+            )::text END AS document
+        FROM client_po cp
+        LEFT JOIN client c ON cp.client_id = c.id
+        LEFT JOIN project p ON cp.project_id = p.id
+        CROSS JOIN LATERAL (
+            SELECT
+                COUNT(*) AS line_item_count,
+                string_agg(id || '.' || xmin, ',' ORDER BY id) AS row_versions
+            FROM client_po_line_item
+            WHERE client_po_id = cp.id
+        ) li
+        {_PO_PAYMENTS_LATERAL if with_payments else ""}
+        CROSS JOIN LATERAL (
+            SELECT md5(concat_ws(':', cp.xmin, c.xmin, p.xmin, li.row_versions{payment_versions})) AS version
+        ) v
+        WHERE cp.id = %(po_id)s
+    """
+
+
+PO_DOCUMENT_QUERY = _build_po_document_query()
+PO_DETAILS_DOCUMENT_QUERY = _build_po_document_query(with_payments=True)
+
+
+def get_po_document(po_id: int, known_versions: List[str] = (), with_payments: bool = False) -> Optional[Dict]:
+    """
+    Get a PO with its line items as a JSON document rendered by Postgres.
+    
+    with_payments adds the cleared-payment totals of /po/{id}/details.
+    Pass the versions the client already holds (from If-None-Match) as
+    known_versions: when the current version is one of them the document
+    is not built.
+    
+    Returns: Dict with "version" and "document" (JSON text, or None if the
+    version is known), or None if the PO does not exist
+    """
+    query = PO_DETAILS_DOCUMENT_QUERY if with_payments else PO_DOCUMENT_QUERY
     conn = get_db()
     
     try:
         with conn.cursor() as cur:
-            # Fetch PO header
-            cur.execute("""
-                SELECT 
-                    cp.id,
-                    cp.client_id,
-                    cp.project_id,
-                    cp.po_number,
-                    cp.po_date,
-                    cp.po_value,
-                    cp.receivable_amount,
-                    cp.status,
-                    cp.po_type,
-                    cp.parent_po_id,
-                    cp.pi_number,
-                    cp.pi_date,
-                    cp.notes,
-                    cp.created_at,
-                    cp.store_id,
-                    c.name as client_name,
-                    p.name as project_name
-                FROM client_po cp
-                LEFT JOIN client c ON cp.client_id = c.id
-                LEFT JOIN project p ON cp.project_id = p.id
-                WHERE cp.id = %s
-            """, (po_id,))
-            
-            po = cur.fetchone()
-            if not po:
-                return None
-            
-            # Fetch line items
-            cur.execute("""
-                SELECT id, item_name, quantity, unit_price, total_price, hsn_code, unit, rate, gst_amount, gross_amount
-                FROM client_po_line_item
-                WHERE client_po_id = %s
-                ORDER BY id
-            """, (po_id,))
-            
-            line_items = cur.fetchall()
-            
-            return {
-                "id": po["id"],
-                "client_po_id": po["id"],
-                "client_id": po["client_id"],
-                "client_name": po["client_name"],
-                "project_id": po["project_id"],
-                "project_name": po["project_name"],
-                "store_id": po["store_id"],
-                "po_number": po["po_number"],
-                "po_date": po["po_date"].isoformat() if po["po_date"] else None,
-                "po_value": float(po["po_value"]) if po["po_value"] else 0,
-                "receivable_amount": float(po["receivable_amount"]) if po["receivable_amount"] else 0,
-                "status": po["status"],
-                "po_type": po["po_type"],
-                "parent_po_id": po["parent_po_id"],
-                "pi_number": po["pi_number"],
-                "pi_date": po["pi_date"].isoformat() if po["pi_date"] else None,
-                "notes": po["notes"],
-                "created_at": po["created_at"].isoformat() if po["created_at"] else None,
-                "line_items": [
-                    {
-                        "line_item_id": item["id"],
-                        "item_name": item["item_name"],
-                        "quantity": float(item["quantity"]) if item["quantity"] else None,
-                        "unit_price": float(item["unit_price"]) if item["unit_price"] else None,
-                        "total_price": float(item["total_price"]) if item["total_price"] else None,
-                        "hsn_code": item.get("hsn_code"),
-                        "unit": item.get("unit"),
-                        "rate": float(item["rate"]) if item.get("rate") else None,
-                        "gst_amount": float(item["gst_amount"]) if item.get("gst_amount") else None,
-                        "gross_amount": float(item["gross_amount"]) if item.get("gross_amount") else None
-                    }
-                    for item in line_items
-                ],
-                "line_item_count": len(line_items)
-            }
+            cur.execute(query, {"po_id": po_id, "known_versions": list(known_versions)})
+            row = cur.fetchone()
+            return dict(row) if row else None
     
     finally:
         conn.close()
 
 
-def get_all_pos(client_id: int = None):
-    """Get all POs, optionally filtered by client_id. Aggregates POs with same store_id."""
-    conn = get_db()
+def get_po_by_id(po_id: int):
+    """Get a single PO by ID with all details"""
+    po = get_po_document(po_id)
+    return json.loads(po["document"]) if po else None
+
+
+def _build_pos_page_query(client_id: int = None, status: str = None, project_id: int = None,
+                           date_from: date = None, date_to: date = None,
+                           cursor: str = None, limit: Optional[int] = None):
+    """
+    Build the SQL and parameters for get_pos_page
+
+    Only the rows of the page are grouped. The next limit + 1 store keys
+    are read in index order (idx_client_po_store_created, migration 0018)
+    and only those stores' POs are aggregated. POs without a store_id each
+    form their own entry, sort after every store and are read by a
+    separate keyset branch of at most limit + 1 rows.
+    """
+    cursor_values = decode_cursor(cursor, 3)
     
-    try:
-        with conn.cursor() as cur:
-            # Query with safe handling of optional columns (may not exist in old schema)
-            if client_id:
-                cur.execute("""
-                    SELECT 
-                        cp.id,
-                        cp.client_id,
-                        cp.project_id,
-                        cp.po_number,
-                        cp.po_date,
-                        cp.po_value,
-                        cp.receivable_amount,
-                        cp.status,
-                        cp.po_type,
-                        cp.parent_po_id,
-                        cp.pi_number,
-                        cp.pi_date,
-                        cp.notes,
-                        cp.created_at,
-                        cp.store_id,
-                        c.name as client_name,
-                        p.name as project_name
-                    FROM client_po cp
-                    LEFT JOIN client c ON cp.client_id = c.id
-                    LEFT JOIN project p ON cp.project_id = p.id
-                    WHERE cp.client_id = %s
-                    ORDER BY cp.store_id DESC, cp.created_at DESC
-                """, (client_id,))
-            else:
-                cur.execute("""
-                    SELECT 
-                        cp.id,
-                        cp.client_id,
-                        cp.project_id,
-                        cp.po_number,
-                        cp.po_date,
-                        cp.po_value,
-                        cp.receivable_amount,
-                        cp.status,
-                        cp.po_type,
-                        cp.parent_po_id,
-                        cp.pi_number,
-                        cp.pi_date,
-                        cp.notes,
-                        cp.created_at,
-                        cp.store_id,
-                        c.name as client_name,
-                        p.name as project_name
-                    FROM client_po cp
-                    LEFT JOIN client c ON cp.client_id = c.id
-                    LEFT JOIN project p ON cp.project_id = p.id
-                    ORDER BY cp.store_id DESC, cp.created_at DESC
-                """)
-            
-            pos = cur.fetchall()
-            
-            # Aggregate POs with same store_id
-            aggregated = {}
-            for po in pos:
-                store_key = po["store_id"] or po["id"]  # Use store_id if available, otherwise use po.id
-                
-                if store_key not in aggregated:
-                    aggregated[store_key] = {
-                        "id": po["id"],
-                        "client_po_id": po["id"],
-                        "client_id": po["client_id"],
-                        "client_name": po["client_name"],
-                        "project_id": po["project_id"],
-                        "project_name": po["project_name"],
-                        "store_id": po["store_id"],
-                        "po_number": po["po_number"],
-                        "po_date": po["po_date"].isoformat() if po["po_date"] else None,
-                        "po_value": float(po["po_value"]) if po["po_value"] else 0,
-                        "receivable_amount": float(po["receivable_amount"]) if po["receivable_amount"] else 0,
-                        "status": po["status"],
-                        "po_type": po["po_type"],
-                        "parent_po_id": po["parent_po_id"],
-                        "pi_number": po["pi_number"],
-                        "pi_date": po["pi_date"].isoformat() if po["pi_date"] else None,
-                        "notes": po["notes"],
-                        "created_at": po["created_at"].isoformat() if po["created_at"] else None,
-                        "line_count": 0,
-                        "po_ids": [po["id"]]  # Track all PO IDs for same store
+    conditions = []
+    params = []
+    
+    if client_id:
+        conditions.append("cp.client_id = %s")
+        params.append(client_id)
+    if status:
+        conditions.append("cp.status = %s")
+        params.append(status)
+    if project_id:
+        conditions.append("cp.project_id = %s")
+        params.append(project_id)
+    if date_from:
+        conditions.append("cp.po_date >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("cp.po_date <= %s")
+        params.append(date_to)
+    
+    # Stores after the cursor. Each store is one entry, so the cursor's own
+    # store is skipped; '' (an empty store_id) sorts last and is kept for
+    # the page predicate to decide.
+    key_conditions = conditions + ["cp.store_id IS NOT NULL"]
+    key_params = list(params)
+    if cursor_values:
+        if cursor_values[0]:
+            key_conditions.append("cp.store_id < %s")
+            key_params.append(cursor_values[0])
+        else:
+            key_conditions.append("cp.store_id = ''")
+    
+    # POs without a store sort after every store (their store key is ''),
+    # so only a cursor already among them limits this branch
+    storeless_conditions = conditions + ["cp.store_id IS NULL"]
+    storeless_params = []
+    if cursor_values and not cursor_values[0]:
+        storeless_predicate, storeless_params = keyset_predicate(
+            ["COALESCE(cp.created_at, 'epoch'::timestamp)", "cp.id"], cursor_values[1:]
+        )
+        storeless_conditions.append(storeless_predicate)
+    
+    page_predicate, page_params = keyset_predicate(["g.store_key", "g.created_at", "g.head_id"], cursor_values)
+    page_conditions = f"WHERE {page_predicate}" if page_predicate else ""
+    
+    limit_clause = ""
+    limit_params = []
+    if limit is not None:
+        # Fetch one extra row to know whether another page exists
+        limit_clause = "LIMIT %s"
+        limit_params = [limit + 1]
+    
+    filtered_columns = """
+                cp.id,
+                cp.project_id,
+                cp.po_value,
+                cp.receivable_amount,
+                COALESCE(cp.created_at, 'epoch'::timestamp) AS created_at,
+                COALESCE(cp.store_id, '') AS store_key,
+                COALESCE(cp.store_id, 'po:' || cp.id::text) AS group_key,
+                p.name AS project_name
+    """
+    stored_conditions = conditions + ["cp.store_id IN (SELECT store_key FROM store_keys)"]
+    
+    query = f"""
+        WITH store_keys AS (
+            SELECT DISTINCT cp.store_id AS store_key
+            FROM client_po cp
+            WHERE {' AND '.join(key_conditions)}
+            ORDER BY 1 DESC NULLS LAST
+            {limit_clause}
+        ),
+        filtered AS (
+            SELECT {filtered_columns}
+            FROM client_po cp
+            LEFT JOIN project p ON cp.project_id = p.id
+            WHERE {' AND '.join(stored_conditions)}
+            UNION ALL
+            SELECT {filtered_columns}
+            FROM (
+                SELECT cp.*
+                FROM client_po cp
+                WHERE {' AND '.join(storeless_conditions)}
+                ORDER BY cp.store_id DESC NULLS LAST, COALESCE(cp.created_at, 'epoch'::timestamp) DESC, cp.id DESC
+                {limit_clause}
+            ) cp
+            LEFT JOIN project p ON cp.project_id = p.id
+        ),
+        grouped AS (
+            SELECT
+                f.group_key,
+                MAX(f.store_key) AS store_key,
+                MAX(f.created_at) AS created_at,
+                (array_agg(f.id ORDER BY f.created_at DESC, f.id DESC))[1] AS head_id,
+                COALESCE(SUM(f.po_value), 0) AS po_value,
+                COALESCE(SUM(f.receivable_amount), 0) AS receivable_amount,
+                array_agg(f.id ORDER BY f.created_at DESC, f.id DESC) AS po_ids,
+                (array_agg(f.project_id ORDER BY f.created_at DESC, f.id DESC)
+                    FILTER (WHERE f.project_name IS NOT NULL))[1] AS fallback_project_id,
+                (array_agg(f.project_name ORDER BY f.created_at DESC, f.id DESC)
+                    FILTER (WHERE f.project_name IS NOT NULL))[1] AS fallback_project_name
+            FROM filtered f
+            GROUP BY f.group_key
+        )
+        SELECT
+            g.store_key,
+            g.created_at AS sort_created_at,
+            g.head_id,
+            g.po_value AS total_po_value,
+            g.receivable_amount AS total_receivable_amount,
+            g.po_ids,
+            g.fallback_project_id,
+            g.fallback_project_name,
+            cp.id,
+            cp.client_id,
+            cp.project_id,
+            cp.po_number,
+            cp.po_date,
+            cp.status,
+            cp.po_type,
+            cp.parent_po_id,
+            cp.pi_number,
+            cp.pi_date,
+            cp.notes,
+            cp.created_at,
+            cp.store_id,
+            c.name as client_name,
+            p.name as project_name
+        FROM grouped g
+        JOIN client_po cp ON cp.id = g.head_id
+        LEFT JOIN client c ON cp.client_id = c.id
+        LEFT JOIN project p ON cp.project_id = p.id
+        {page_conditions}
+        ORDER BY g.store_key DESC, g.created_at DESC, g.head_id DESC
+        {limit_clause}
+    """
+    return query, (key_params + limit_params + params + params + storeless_params + limit_params
+                   + page_params + limit_params)
 
-                    }
-                else:
-                    # Aggregate values for same store
-                    aggregated[store_key]["po_value"] += float(po["po_value"]) if po["po_value"] else 0
-                    aggregated[store_key]["receivable_amount"] += float(po["receivable_amount"]) if po["receivable_amount"] else 0
-                    aggregated[store_key]["po_ids"].append(po["id"])
 
-                    # If project info was missing in the first PO, try to fill it from this one
-                    if not aggregated[store_key].get("project_name") and po.get("project_name"):
-                         aggregated[store_key]["project_name"] = po["project_name"]
-                         aggregated[store_key]["project_id"] = po["project_id"]
+def _format_pos_page(rows, limit: Optional[int]):
+    """Helper function to format get_pos_page rows and compute next_cursor"""
+    rows, next_cursor = split_page(rows, limit, lambda row: [row["store_key"], row["sort_created_at"], row["head_id"]])
+    
+    pos = []
+    for po in rows:
+        # If project info is missing on the head PO, fill it from another PO of the store
+        project_id_value = po["project_id"]
+        project_name = po["project_name"]
+        if not project_name and po["fallback_project_name"]:
+            project_id_value = po["fallback_project_id"]
+            project_name = po["fallback_project_name"]
 
-            
-            return list(aggregated.values())
+        pos.append({
+            "id": po["id"],
+            "client_po_id": po["id"],
+            "client_id": po["client_id"],
+            "client_name": po["client_name"],
+            "project_id": project_id_value,
+            "project_name": project_name,
+            "store_id": po["store_id"],
+            "po_number": po["po_number"],
+            "po_date": po["po_date"],
+            "po_value": po["total_po_value"],
+            "receivable_amount": po["total_receivable_amount"],
+            "status": po["status"],
+            "po_type": po["po_type"],
+            "parent_po_id": po["parent_po_id"],
+            "pi_number": po["pi_number"],
+            "pi_date": po["pi_date"],
+            "notes": po["notes"],
+            "created_at": po["created_at"],
+            "line_count": 0,
+            "po_ids": list(po["po_ids"])  # Track all PO IDs for same store
+        })
+    
+    return {"pos": pos, "next_cursor": next_cursor}
+
+
+def get_pos_page(client_id: int = None, status: str = None, project_id: int = None,
+                 date_from: date = None, date_to: date = None,
+                 cursor: str = None, limit: Optional[int] = None):
+    """
+    Get one keyset page of POs aggregated by store_id.
+    
+    POs sharing a store_id are folded into a single entry in SQL: the header
+    fields come from the most recently created PO of the store, po_value and
+    receivable_amount are summed and po_ids is collected with array_agg. POs
+    without a store_id are returned individually.
+    
+    Entries are ordered by (store_id, created_at, id) descending; pass the
+    returned next_cursor back in to fetch the following page. A limit of None
+    returns every entry after the cursor.
+    
+    Filters: client_id, status, project_id and an inclusive po_date range.
+    
+    Returns: Dict with "pos" and "next_cursor" (None on the last page)
+    
+    Raises: ValueError if the cursor is malformed
+    """
+    query, params = _build_pos_page_query(client_id, status, project_id, date_from, date_to, cursor, limit)
+    conn = get_db()
+    
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            return _format_pos_page(cur.fetchall(), limit)
     
     finally:
         conn.close()
 
 
+async def get_pos_page_async(client_id: int = None, status: str = None, project_id: int = None,
+                             date_from: date = None, date_to: date = None,
+                             cursor: str = None, limit: Optional[int] = None):
+    """Async variant of get_pos_page for async endpoints"""
+    query, params = _build_pos_page_query(client_id, status, project_id, date_from, date_to, cursor, limit)
+    
+    async with get_async_db() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, params)
+            return _format_pos_page(await cur.fetchall(), limit)
+
+
+def get_all_pos(client_id: int = None):
+    """Get all POs, optionally filtered by client_id. Aggregates POs with same store_id."""
+    return get_pos_page(client_id=client_id)["pos"]
+
+
 # ==========================================
 # MULTIPLE POs PER PROJECT
 # ==========================================
@@ -457,84 +768,141 @@ def create_po_for_project(client_id: int, project_id: int, po_number: str = None
                     VALUES (%s, %s)
                 """, (project_id, client_po_id))
                 
+                notify_invalidation(cur, client_pos=[client_po_id])
+                
                 return client_po_id
     
     finally:
         conn.close()
 
 
+PROJECT_POS_QUERY = """
+    SELECT 
+        cp.id,
+        cp.po_number,
+        cp.po_date,
+        COALESCE(cp.po_value, 0) AS po_value,
+        cp.status,
+        cp.po_type,
+        cp.parent_po_id,
+        cp.notes,
+        cp.store_id
+    FROM client_po cp
+    LEFT JOIN po_project_mapping ppm ON cp.id = ppm.client_po_id AND ppm.project_id = %s
+    WHERE ppm.project_id = %s OR cp.project_id = %s
+    ORDER BY cp.created_at
+"""
+
+
 def get_all_pos_for_project(project_id: int):
     """Get all POs linked to a project with their details"""
     conn = get_db()
     
     try:
         with conn.cursor() as cur:
-            # Get project details (basic info only - location columns may not exist yet)
-            try:
-                cur.execute("""
-                    SELECT name FROM project WHERE id = %s
-                """, (project_id,))
-                project_info = cur.fetchone()
-            except:
-                project_info = None
+            cur.execute(PROJECT_POS_QUERY, (project_id, project_id, project_id))
+            pos = cur.fetchall()
+            
+            # Get line items for all POs in one bulk query
+            line_items_by_po = _get_line_items_for_pos(cur, [po["id"] for po in pos])
+            
+            return [_format_project_po(po, line_items_by_po.get(po["id"], [])) for po in pos]
+    
+    finally:
+        conn.close()
+
+
+async def get_all_pos_for_project_async(project_id: int):
+    """Async variant of get_all_pos_for_project for async endpoints"""
+    async with get_async_db() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(PROJECT_POS_QUERY, (project_id, project_id, project_id))
+            pos = await cur.fetchall()
             
+            line_items_by_po = await _get_line_items_for_pos_async(cur, [po["id"] for po in pos])
+            
+            return [_format_project_po(po, line_items_by_po.get(po["id"], [])) for po in pos]
+
+
+def get_enriched_pos_for_project(project_id: int):
+    """
+    Get all POs linked to a project together with their payments.
+    
+    Payments and their cleared paid/TDS totals are aggregated per PO with a
+    LATERAL subquery over client_payment, so the whole view is served by two
+    queries on one connection (POs + payments, then bulk line items)
+    regardless of how many POs the project has.
+    
+    Returns: List of PO dicts as in get_all_pos_for_project, plus
+    "payments", "total_paid" and "total_tds" per PO
+    """
+    conn = get_db()
+    
+    try:
+        with conn.cursor() as cur:
             cur.execute("""
                 SELECT 
                     cp.id,
                     cp.po_number,
                     cp.po_date,
-                    cp.po_value,
+                    COALESCE(cp.po_value, 0) AS po_value,
                     cp.status,
                     cp.po_type,
                     cp.parent_po_id,
                     cp.notes,
-                    cp.store_id
+                    cp.store_id,
+                    pay.payments,
+                    COALESCE(pay.total_paid, 0) AS total_paid,
+                    COALESCE(pay.total_tds, 0) AS total_tds
                 FROM client_po cp
                 LEFT JOIN po_project_mapping ppm ON cp.id = ppm.client_po_id AND ppm.project_id = %s
+                LEFT JOIN LATERAL (
+                    SELECT
+                        COALESCE(
+                            json_agg(
+                                json_build_object(
+                                    'id', p.id,
+                                    'client_po_id', p.client_po_id,
+                                    'payment_date', p.payment_date,
+                                    'amount', COALESCE(p.amount, 0),
+                                    'payment_mode', p.payment_mode,
+                                    'reference_number', p.reference_number,
+                                    'status', p.status,
+                                    'payment_stage', p.payment_stage,
+                                    'notes', p.notes,
+                                    'is_tds_deducted', p.is_tds_deducted,
+                                    'tds_amount', COALESCE(p.tds_amount, 0),
+                                    'received_by_account', p.received_by_account,
+                                    'transaction_type', p.transaction_type,
+                                    'created_at', p.created_at
+                                )
+                                ORDER BY p.payment_date DESC, p.created_at DESC
+                            ),
+                            '[]'::json
+                        ) AS payments,
+                        SUM(CASE WHEN p.status = 'cleared'
+                                 THEN (CASE WHEN p.transaction_type = 'debit' THEN -p.amount ELSE p.amount END)
+                                 ELSE 0 END) AS total_paid,
+                        SUM(CASE WHEN p.status = 'cleared' AND p.is_tds_deducted
+                                 THEN (CASE WHEN p.transaction_type = 'debit' THEN -p.tds_amount ELSE p.tds_amount END)
+                                 ELSE 0 END) AS total_tds
+                    FROM client_payment p
+                    WHERE p.client_po_id = cp.id
+                ) pay ON TRUE
                 WHERE ppm.project_id = %s OR cp.project_id = %s
                 ORDER BY cp.created_at
             """, (project_id, project_id, project_id))
             
             pos = cur.fetchall()
-            result = []
+            line_items_by_po = _get_line_items_for_pos(cur, [po["id"] for po in pos])
             
+            result = []
             for po in pos:
-                # Get line items for each PO
-                cur.execute("""
-                    SELECT id, item_name, quantity, unit_price, total_price, hsn_code, unit, rate, gst_amount, gross_amount
-                    FROM client_po_line_item
-                    WHERE client_po_id = %s
-                """, (po["id"],))
-                
-                line_items = cur.fetchall()
-                
-                result.append({
-                    "po_id": po["id"],
-                    "po_number": po["po_number"],
-                    "po_date": po["po_date"].isoformat() if po["po_date"] else None,
-                    "po_value": float(po["po_value"]) if po["po_value"] else 0,
-                    "status": po["status"],
-                    "po_type": po["po_type"],
-                    "parent_po_id": po["parent_po_id"],
-                    "notes": po["notes"],
-                    "store_id": po["store_id"],
-                    "line_items": [
-                        {
-                            "line_item_id": item["id"],
-                            "item_name": item["item_name"],
-                            "quantity": float(item["quantity"]) if item["quantity"] else None,
-                            "unit_price": float(item["unit_price"]) if item["unit_price"] else None,
-                            "total_price": float(item["total_price"]) if item["total_price"] else None,
-                            "hsn_code": item.get("hsn_code"),
-                            "unit": item.get("unit"),
-                            "rate": float(item["rate"]) if item.get("rate") else None,
-                            "gst_amount": float(item["gst_amount"]) if item.get("gst_amount") else None,
-                            "gross_amount": float(item["gross_amount"]) if item.get("gross_amount") else None
-                        }
-                        for item in line_items
-                    ],
-                    "line_item_count": len(line_items)
-                })
+                formatted = _format_project_po(po, line_items_by_po.get(po["id"], []))
+                formatted["payments"] = po["payments"] or []
+                formatted["total_paid"] = po["total_paid"]
+                formatted["total_tds"] = po["total_tds"]
+                result.append(formatted)
             
             return result
     
@@ -542,6 +910,37 @@ def get_all_pos_for_project(project_id: int):
         conn.close()
 
 
+def _format_project_po(po, line_items):
+    """Helper function to format a project PO row with its line items"""
+    return {
+        "po_id": po["id"],
+        "po_number": po["po_number"],
+        "po_date": po["po_date"],
+        "po_value": po["po_value"],
+        "status": po["status"],
+        "po_type": po["po_type"],
+        "parent_po_id": po["parent_po_id"],
+        "notes": po["notes"],
+        "store_id": po["store_id"],
+        "line_items": [
+            {
+                "line_item_id": item["id"],
+                "item_name": item["item_name"],
+                "quantity": item["quantity"],
+                "unit_price": item["unit_price"],
+                "total_price": item["total_price"],
+                "hsn_code": item["hsn_code"],
+                "unit": item["unit"],
+                "rate": item["rate"],
+                "gst_amount": item["gst_amount"],
+                "gross_amount": item["gross_amount"]
+            }
+            for item in line_items
+        ],
+        "line_item_count": len(line_items)
+    }
+
+
 def attach_po_to_project(client_po_id: int, project_id: int, sequence_order: int = None):
     """Attach an existing PO to a project (sequence_order parameter ignored - not in schema)"""
     conn = get_db()
@@ -567,6 +966,9 @@ def attach_po_to_project(client_po_id: int, project_id: int, sequence_order: int
                     VALUES (%s, %s)
                 """, (project_id, client_po_id))
 
+                # Before the move, so the project it leaves is invalidated too
+                notify_invalidation(cur, projects=[project_id], client_pos=[client_po_id])
+                
                 # Also update the direct project_id in client_po for simpler lookups
                 cur.execute("""
                     UPDATE client_po
@@ -646,56 +1048,69 @@ def create_verbal_agreement(client_id: int, project_id: int, pi_number: str,
                     VALUES (%s, %s)
                 """, (project_id, agreement_id))
                 
+                notify_invalidation(cur, client_pos=[agreement_id])
+                
                 return agreement_id
     
     finally:
         conn.close()
 
 
+VERBAL_AGREEMENTS_QUERY = """
+    SELECT 
+        cp.id,
+        cp.pi_number,
+        cp.pi_date,
+        cp.po_number,
+        cp.po_date,
+        COALESCE(cp.po_value, 0) AS po_value,
+        cp.status,
+        cp.notes,
+        cp.created_at
+    FROM client_po cp
+    JOIN po_project_mapping ppm ON cp.id = ppm.client_po_id
+    WHERE ppm.project_id = %s AND cp.po_type = 'verbal_agreement'
+    ORDER BY cp.pi_date DESC
+"""
+
+
 def get_verbal_agreements_for_project(project_id: int):
     """Get all verbal agreements for a project"""
     conn = get_db()
     
     try:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT 
-                    cp.id,
-                    cp.pi_number,
-                    cp.pi_date,
-                    cp.po_number,
-                    cp.po_date,
-                    cp.po_value,
-                    cp.status,
-                    cp.notes,
-                    cp.created_at
-                FROM client_po cp
-                JOIN po_project_mapping ppm ON cp.id = ppm.client_po_id
-                WHERE ppm.project_id = %s AND cp.po_type = 'verbal_agreement'
-                ORDER BY cp.pi_date DESC
-            """, (project_id,))
-            
-            agreements = cur.fetchall()
-            return [
-                {
-                    "agreement_id": a["id"],
-                    "pi_number": a["pi_number"],
-                    "pi_date": a["pi_date"].isoformat() if a["pi_date"] else None,
-                    "po_number": a["po_number"],  # Will be NULL until PO is issued
-                    "po_date": a["po_date"].isoformat() if a["po_date"] else None,
-                    "value": float(a["po_value"]) if a["po_value"] else 0,
-                    "status": a["status"],
-                    "has_po": a["po_number"] is not None,  # Indicates if PO has been issued
-                    "notes": a["notes"],
-                    "created_at": a["created_at"].isoformat()
-                }
-                for a in agreements
-            ]
+            cur.execute(VERBAL_AGREEMENTS_QUERY, (project_id,))
+            return [_format_verbal_agreement(a) for a in cur.fetchall()]
     
     finally:
         conn.close()
 
 
+async def get_verbal_agreements_for_project_async(project_id: int):
+    """Async variant of get_verbal_agreements_for_project for async endpoints"""
+    async with get_async_db() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(VERBAL_AGREEMENTS_QUERY, (project_id,))
+            return [_format_verbal_agreement(a) for a in await cur.fetchall()]
+
+
+def _format_verbal_agreement(a):
+    """Helper function to format a verbal agreement row"""
+    return {
+        "agreement_id": a["id"],
+        "pi_number": a["pi_number"],
+        "pi_date": a["pi_date"],
+        "po_number": a["po_number"],  # Will be NULL until PO is issued
+        "po_date": a["po_date"],
+        "value": a["po_value"],
+        "status": a["status"],
+        "has_po": a["po_number"] is not None,  # Indicates if PO has been issued
+        "notes": a["notes"],
+        "created_at": a["created_at"]
+    }
+
+
 def update_po_details(client_po_id: int, po_number: str = None, po_date: date = None,
                       po_value: float = None, pi_number: str = None, pi_date: date = None,
                       notes: str = None, status: str = None):
@@ -754,6 +1169,8 @@ def update_po_details(client_po_id: int, po_number: str = None, po_date: date =
                 query = f"UPDATE client_po SET {', '.join(update_fields)} WHERE id = %s"
                 cur.execute(query, values)
                 
+                notify_invalidation(cur, client_pos=[client_po_id])
+                
                 # Fetch updated PO
                 cur.execute("SELECT * FROM client_po WHERE id = %s", (client_po_id,))
                 po = cur.fetchone()
@@ -787,6 +1204,8 @@ def add_po_to_verbal_agreement(agreement_id: int, po_number: str, po_date: date)
                     WHERE id = %s
                 """, (po_number, po_date, agreement_id))
                 
+                notify_invalidation(cur, client_pos=[agreement_id])
+                
                 return {
                     "agreement_id": agreement_id,
                     "pi_number": agreement["pi_number"],
@@ -803,10 +1222,10 @@ def _format_po_result(po):
     return {
         "client_po_id": po["id"],
         "po_number": po["po_number"],
-        "po_date": po["po_date"].isoformat() if po["po_date"] else None,
-        "po_value": float(po["po_value"]) if po["po_value"] else 0,
+        "po_date": po["po_date"],
+        "po_value": po["po_value"] or 0,
         "pi_number": po.get("pi_number"),
-        "pi_date": po["pi_date"].isoformat() if po.get("pi_date") else None,
+        "pi_date": po.get("pi_date"),
         "status": po["status"],
         "po_type": po.get("po_type", "standard"),
         "notes": po.get("notes")
@@ -843,6 +1262,9 @@ def delete_po(client_po_id: int):
                 
                 project_id = po_row["project_id"]
                 
+                # Resolve the affected projects and client while the PO still exists
+                notify_invalidation(cur, client_pos=[client_po_id])
+                
                 # 1. Delete client payments for this PO
                 cur.execute("SAVEPOINT sp_payments")
                 try:
@@ -868,6 +1290,8 @@ def delete_po(client_po_id: int):
                 # 3. Delete vendor order data if linked
                 cur.execute("SAVEPOINT sp_vendor")
                 try:
+                    cur.execute("SELECT id FROM vendor_order WHERE client_po_id = %s", (client_po_id,))
+                    notify_invalidation(cur, vendor_orders=[row["id"] for row in cur.fetchall()])
                     cur.execute("""
                         DELETE FROM payment_vendor_link 
                         WHERE vendor_order_id IN (
@@ -992,6 +1416,8 @@ def delete_project(project_name: str):
                 
                 po_ids = [row["id"] for row in cur.fetchall()]
                 
+                notify_invalidation(cur, projects=[project_id], client_pos=po_ids)
+                
                 # 3. Delete all data associated with these POs (correct FK order)
                 for po_id in po_ids:
                     # Delete client payments for this PO
@@ -1036,6 +1462,8 @@ def delete_project(project_name: str):
                 # 5. Delete vendor order data for this project
                 cur.execute("SAVEPOINT sp_vendor")
                 try:
+                    cur.execute("SELECT id FROM vendor_order WHERE project_id = %s", (project_id,))
+                    notify_invalidation(cur, vendor_orders=[row["id"] for row in cur.fetchall()])
                     cur.execute("""
                         DELETE FROM payment_vendor_link 
                         WHERE vendor_order_id IN (
@@ -1212,30 +1640,17 @@ def get_pos_aggregated_by_store(client_id: int = None):
                     bundles[store_key]["pi_dates"].append(po["pi_date"].isoformat())
                 if po["notes"]:
                     bundles[store_key]["notes_list"].append(po["notes"])
-                
-                # Fetch line items for this PO
-                cur.execute("""
-                    SELECT
-                        id,
-                        client_po_id,
-                        item_name,
-                        quantity,
-                        unit_price,
-                        total_price,
-                        hsn_code,
-                        unit,
-                        rate,
-                        gst_amount,
-                        gross_amount,
-                        taxable_amount,
-                        created_at
-                    FROM client_po_line_item
-                    WHERE client_po_id = %s
-                    ORDER BY id ASC
-                """, (po["id"],))
-                
-                line_items = cur.fetchall()
-                for item in line_items:
+            
+            # Fetch line items for every selected PO in bulk and attach them
+            # to their bundle (one query per batch instead of one per PO)
+            line_items_by_po = _get_line_items_for_pos(
+                cur,
+                [po["id"] for po in pos],
+                columns=LINE_ITEM_COLUMNS + ", taxable_amount, created_at"
+            )
+            for po in pos:
+                store_key = po["store_id"] or f"no_store_{po['id']}"
+                for item in line_items_by_po.get(po["id"], []):
                     line_item_dict = {
                         "id": item["id"],
                         "client_po_id": item["client_po_id"],
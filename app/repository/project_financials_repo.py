@@ -0,0 +1,155 @@
+"""
+Project Financials Repository
+Reads the project_financials rollup and checks/repairs it against the raw tables
+
+project_financials holds one row of aggregates per project, kept current by
+triggers on client_po, client_payment, po_project_mapping, billing_po,
+vendor_order and vendor_payment (migration 0015). project_financials_live
+computes the same columns from the raw tables; find_project_financials_drift()
+compares the two and rebuild_project_financials() recomputes rows from it.
+"""
+
+from app.database import get_db
+from app.async_database import get_async_db
+from typing import Dict, Iterable, List, Optional
+
+
+# ==========================================
+# ROLLUP COLUMNS
+# ==========================================
+
+FINANCIAL_COLUMNS = (
+    "original_po_value",
+    "original_tax",
+    "linked_po_count",
+    "linked_po_value",
+    "active_po_count",
+    "po_vendor_count",
+    "po_client_count",
+    "agreement_count",
+    "agreement_value",
+    "total_collected",
+    "total_tds",
+    "cleared_payments",
+    "pending_payments",
+    "bounced_payments",
+    "billed_value",
+    "billed_gst",
+    "billed_total",
+    "billing_po_count",
+    "vendor_count",
+    "vendor_order_count",
+    "vendor_order_value",
+    "vendor_paid",
+    "pending_vendor_orders",
+    "ongoing_vendor_orders",
+    "completed_vendor_orders",
+)
+
+PROJECT_FINANCIALS_QUERY = f"""
+    SELECT project_id, {", ".join(FINANCIAL_COLUMNS)}, updated_at
+    FROM project_financials
+    WHERE project_id = %s
+"""
+
+# Projects whose rollup row is missing or differs from the live aggregates
+PROJECT_FINANCIALS_DRIFT_QUERY = f"""
+    SELECT live.project_id,
+           stored.project_id IS NULL AS missing,
+           {", ".join(f"stored.{c} AS stored_{c}, live.{c} AS live_{c}" for c in FINANCIAL_COLUMNS)}
+    FROM project_financials_live live
+    LEFT JOIN project_financials stored ON stored.project_id = live.project_id
+    WHERE (%(project_ids)s::BIGINT[] IS NULL OR live.project_id = ANY(%(project_ids)s::BIGINT[]))
+      AND (stored.project_id IS NULL
+           OR ({", ".join(f"stored.{c}" for c in FINANCIAL_COLUMNS)})
+              IS DISTINCT FROM ({", ".join(f"live.{c}" for c in FINANCIAL_COLUMNS)}))
+    ORDER BY live.project_id
+"""
+
+
+def get_project_financials(project_id: int) -> Optional[Dict]:
+    """Get the rollup row for a project (None if the project does not exist)"""
+    conn = get_db()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(PROJECT_FINANCIALS_QUERY, (project_id,))
+                return cur.fetchone()
+    finally:
+        conn.close()
+
+
+async def get_project_financials_async(project_id: int) -> Optional[Dict]:
+    """Async variant of get_project_financials"""
+    async with get_async_db() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(PROJECT_FINANCIALS_QUERY, (project_id,))
+            return await cur.fetchone()
+
+
+# ==========================================
+# VERIFY / REBUILD
+# ==========================================
+
+def _format_drift(row) -> Dict:
+    """Shape a drift row as {project_id, missing, columns: {name: {stored, live}}}"""
+    columns = {
+        c: {"stored": row[f"stored_{c}"], "live": row[f"live_{c}"]}
+        for c in FINANCIAL_COLUMNS
+        if row["missing"] or row[f"stored_{c}"] != row[f"live_{c}"]
+    }
+    return {"project_id": row["project_id"], "missing": row["missing"], "columns": columns}
+
+
+def find_project_financials_drift(project_ids: Optional[Iterable[int]] = None) -> List[Dict]:
+    """
+    Compare project_financials with the live aggregates
+
+    Returns one entry per project whose rollup row is missing or out of
+    date, listing the columns that differ. Scans every project unless
+    project_ids is given.
+    """
+    ids = list(project_ids) if project_ids is not None else None
+    conn = get_db()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(PROJECT_FINANCIALS_DRIFT_QUERY, {"project_ids": ids})
+                return [_format_drift(row) for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+def rebuild_project_financials(project_ids: Optional[Iterable[int]] = None) -> List[int]:
+    """
+    Recompute rollup rows from the live aggregates
+
+    Adds rows for projects that have none and refreshes the given projects
+    (all projects when project_ids is None) through the same function the
+    triggers use, so a rebuild running alongside writes locks each project
+    like they do. Returns the ids of the projects refreshed.
+    """
+    ids = list(project_ids) if project_ids is not None else None
+    conn = get_db()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO project_financials (project_id)
+                    SELECT id FROM project
+                    WHERE %(project_ids)s::BIGINT[] IS NULL OR id = ANY(%(project_ids)s::BIGINT[])
+                    ON CONFLICT (project_id) DO NOTHING
+                """, {"project_ids": ids})
+
+                cur.execute("""
+                    SELECT project_id, refresh_project_financials(project_id)
+                    FROM (
+                        SELECT project_id FROM project_financials
+                        WHERE %(project_ids)s::BIGINT[] IS NULL OR project_id = ANY(%(project_ids)s::BIGINT[])
+                        ORDER BY project_id
+                    ) ids
+                """, {"project_ids": ids})
+
+                return [row["project_id"] for row in cur.fetchall()]
+    finally:
+        conn.close()
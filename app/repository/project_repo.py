@@ -1,27 +1,42 @@
 """
 Project repository - handles all project-related database operations
 """
+from psycopg2 import errors
 from app.database import get_db
+from app.async_database import get_async_db
+from app.exceptions import ConflictError
+from app.response_cache import notify_invalidation
 from typing import Optional, List, Dict
 
 
+ALL_PROJECTS_QUERY = """
+    SELECT id, name, location, city, state, country, latitude, longitude
+    FROM project
+    ORDER BY id DESC
+    OFFSET %s LIMIT %s
+"""
+
+
 def get_all_projects(skip: int = 0, limit: int = 50):
     """Get all projects with pagination"""
     conn = get_db()
     try:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT id, name, location, city, state, country, latitude, longitude
-                FROM project
-                ORDER BY id DESC
-                OFFSET %s LIMIT %s
-            """, (skip, limit))
+            cur.execute(ALL_PROJECTS_QUERY, (skip, limit))
             projects = cur.fetchall()
             return projects
     finally:
         conn.close()
 
 
+async def get_all_projects_async(skip: int = 0, limit: int = 50):
+    """Async variant of get_all_projects"""
+    async with get_async_db() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(ALL_PROJECTS_QUERY, (skip, limit))
+            return await cur.fetchall()
+
+
 def get_project_by_id(project_id: int):
     """Get a specific project by ID"""
     conn = get_db()
@@ -52,6 +67,21 @@ def get_project_by_name(name: str):
         conn.close()
 
 
+def _notify_project_change(cur, project_id: int):
+    """Invalidate cached responses built from a project, its POs and vendor orders (call before deleting them)"""
+    cur.execute("""
+        SELECT p.client_id,
+               ARRAY(SELECT id FROM client_po WHERE project_id = p.id) AS client_pos,
+               ARRAY(SELECT id FROM vendor_order WHERE project_id = p.id) AS vendor_orders
+        FROM project p
+        WHERE p.id = %s
+    """, (project_id,))
+    row = cur.fetchone()
+    if row:
+        notify_invalidation(cur, projects=[project_id], clients=[row["client_id"]],
+                            client_pos=row["client_pos"], vendor_orders=row["vendor_orders"])
+
+
 def create_project(name: str, location: Optional[str] = None, city: Optional[str] = None, 
                    state: Optional[str] = None, country: Optional[str] = None, 
                    latitude: Optional[float] = None, longitude: Optional[float] = None):
@@ -74,7 +104,11 @@ def create_project(name: str, location: Optional[str] = None, city: Optional[str
 
 
 def update_project(project_id: int, **kwargs):
-    """Update a project"""
+    """
+    Update a project
+
+    Raises: ConflictError if the client already has a project with the new name
+    """
     conn = get_db()
     try:
         with conn.cursor() as cur:
@@ -92,6 +126,8 @@ def update_project(project_id: int, **kwargs):
             set_clause = ", ".join([f"{k} = %s" for k in updates.keys()])
             values = list(updates.values()) + [project_id]
             
+            _notify_project_change(cur, project_id)
+            
             cur.execute(f"""
                 UPDATE project
                 SET {set_clause}
@@ -100,6 +136,9 @@ def update_project(project_id: int, **kwargs):
             """, values)
             conn.commit()
             return cur.fetchone()
+    except errors.UniqueViolation:
+        conn.rollback()
+        raise ConflictError(f"Project '{updates['name']}' already exists for this client")
     except Exception:
         conn.rollback()
         raise
@@ -117,6 +156,8 @@ def delete_project_by_id(project_id: int) -> bool:
             if not cur.fetchone():
                 return False
             
+            _notify_project_change(cur, project_id)
+            
             # Delete client payments for all POs in this project
             cur.execute("SAVEPOINT sp_payments")
             try:
@@ -193,6 +234,8 @@ def delete_project_by_name(name: str) -> bool:
             
             project_id = project['id']
             
+            _notify_project_change(cur, project_id)
+            
             # Delete client payments for all POs in this project
             cur.execute("SAVEPOINT sp_payments")
             try:
@@ -257,7 +300,7 @@ def delete_project_by_name(name: str) -> bool:
 
 
 def search_projects(search_term: str):
-    """Search projects by name or location"""
+    """Search projects by name or location (trigram-indexed, see migration 0017)"""
     conn = get_db()
     try:
         with conn.cursor() as cur:
@@ -0,0 +1,227 @@
+"""
+Unified search across projects, client POs, vendors and PO line items
+
+Every searched column has a pg_trgm GIN index (migration 0017), which
+serves both matches a search accepts:
+
+- substring: column ILIKE '%term%'
+- fuzzy: term <% column (word similarity above pg_trgm.word_similarity_threshold,
+  which catches typos in a whole word)
+
+and a btree on lower(column) text_pattern_ops (migration 0019) for exact
+and prefix matches.
+
+Results are ranked by score: 2 for an exact (case-insensitive) column
+match, 1 for a prefix match, plus the best word_similarity of the term
+to the entity's columns. Each entity type is searched by its own indexed
+branch that returns at most one page; the branches are merged and cut to
+the page in SQL. Pages are keyset-paginated on (score, type, id).
+
+A broad term can match a large share of a big table (line items run to
+millions of rows), so each branch scores a bounded candidate set instead
+of every match:
+
+- per column, the first SEARCH_CANDIDATES prefix matches in the btree's
+  own order (USING ~<~, the text_pattern_ops ordering), where an exact
+  match sorts before the longer values it prefixes. Exact and prefix hits outrank every other match,
+  so they are never crowded out by newer substring hits.
+- the newest SEARCH_CANDIDATES substring or fuzzy matches.
+
+The candidates are fixed for a given term, so paging through them stays
+consistent.
+
+Terms need at least MIN_TERM_LENGTH characters: shorter ones have no
+trigram to look up and would scan the whole index.
+"""
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, List, Optional
+
+from app.async_database import get_async_db
+from app.database import get_db
+from app.utils.pagination import decode_cursor, split_page
+
+MIN_TERM_LENGTH = 3
+
+# Rows per candidate pass of an entity type (see the module docstring)
+SEARCH_CANDIDATES = 1000
+
+# Entity type -> how to search and present it. "columns" are the indexed
+# columns of "table" a term is matched against; "joins" add what the title
+# and subtitle need once the candidates are chosen. "project_id" and
+# "client_po_id" let the UI link a hit to its project or PO.
+SEARCH_SOURCES = {
+    "project": {
+        "table": "project p",
+        "joins": "",
+        "id": "p.id",
+        "columns": ("p.name", "p.location"),
+        "title": "p.name",
+        "subtitle": "concat_ws(', ', p.location, p.city, p.state)",
+        "project_id": "p.id",
+        "client_po_id": "NULL::bigint",
+    },
+    "po": {
+        "table": "client_po cp",
+        "joins": "LEFT JOIN client c ON c.id = cp.client_id",
+        "id": "cp.id",
+        "columns": ("cp.po_number", "cp.pi_number", "cp.store_id"),
+        "title": "COALESCE(cp.po_number, cp.pi_number, 'PO-' || cp.id)",
+        "subtitle": "concat_ws(' / ', c.name, cp.store_id, cp.pi_number)",
+        "project_id": "cp.project_id",
+        "client_po_id": "cp.id",
+    },
+    "vendor": {
+        "table": "vendor v",
+        "joins": "",
+        "id": "v.id",
+        "columns": ("v.name",),
+        "title": "v.name",
+        "subtitle": "v.gstin",
+        "project_id": "NULL::bigint",
+        "client_po_id": "NULL::bigint",
+    },
+    "line_item": {
+        "table": "client_po_line_item li",
+        "joins": "JOIN client_po cp ON cp.id = li.client_po_id",
+        "id": "li.id",
+        "columns": ("li.item_name",),
+        "title": "li.item_name",
+        "subtitle": "cp.po_number",
+        "project_id": "cp.project_id",
+        "client_po_id": "li.client_po_id",
+    },
+}
+
+SEARCH_TYPES = tuple(SEARCH_SOURCES)
+
+_KEYSET = "(score, type, id) < (%(after_score)s, %(after_type)s, %(after_id)s)"
+_ORDER = "ORDER BY score DESC, type DESC, id DESC"
+
+
+def _like_escape(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _build_branch(entity_type: str, after: bool) -> str:
+    """One entity type's matches after the cursor, best first, at most one page"""
+    source = SEARCH_SOURCES[entity_type]
+    table, id_column, columns = source["table"], source["id"], source["columns"]
+    match = " OR ".join(
+        [f"{c} ILIKE %(pattern)s" for c in columns] + [f"%(term)s <%% {c}" for c in columns]
+    )
+    exact = " OR ".join(f"lower({c}) = lower(%(term)s)" for c in columns)
+    prefix = " OR ".join(f"{c} ILIKE %(prefix)s" for c in columns)
+    similarity = ", ".join(f"word_similarity(%(term)s, {c})" for c in columns)
+    candidates = " UNION ".join(
+        [f"""(SELECT {id_column} FROM {table} WHERE lower({c}) LIKE lower(%(prefix)s)
+              ORDER BY lower({c}) USING ~<~ LIMIT %(candidates)s)""" for c in columns]
+        + [f"""(SELECT {id_column} FROM {table} WHERE {match}
+                ORDER BY {id_column} DESC LIMIT %(candidates)s)"""]
+    )
+
+    return f"""
+        SELECT * FROM (
+            SELECT
+                '{entity_type}'::text AS type,
+                {source["id"]} AS id,
+                {source["title"]} AS title,
+                NULLIF({source["subtitle"]}, '') AS subtitle,
+                {source["project_id"]} AS project_id,
+                {source["client_po_id"]} AS client_po_id,
+                round((CASE WHEN {exact} THEN 2 WHEN {prefix} THEN 1 ELSE 0 END
+                       + COALESCE(GREATEST({similarity}), 0))::numeric, 4) AS score
+            FROM {table}
+            {source["joins"]}
+            WHERE {id_column} IN ({candidates})
+        ) m
+        {"WHERE " + _KEYSET if after else ""}
+        {_ORDER}
+        LIMIT %(limit)s
+    """
+
+
+def _decode_search_cursor(cursor: Optional[str]) -> Optional[Dict]:
+    values = decode_cursor(cursor, 3)
+    if values is None:
+        return None
+
+    score, entity_type, entity_id = values
+    if entity_type not in SEARCH_SOURCES or not isinstance(entity_id, int):
+        raise ValueError("Invalid pagination cursor")
+    try:
+        score = Decimal(score)
+    except (InvalidOperation, TypeError):
+        raise ValueError("Invalid pagination cursor")
+    return {"after_score": score, "after_type": entity_type, "after_id": entity_id}
+
+
+def _build_search_query(term: str, types: Optional[Iterable[str]] = None,
+                        cursor: str = None, limit: int = 20):
+    """Build the SQL and parameters for search"""
+    term = (term or "").strip()
+    if len(term) < MIN_TERM_LENGTH:
+        raise ValueError(f"Search term must be at least {MIN_TERM_LENGTH} characters")
+
+    types = list(dict.fromkeys(types)) if types else list(SEARCH_TYPES)
+    unknown = [t for t in types if t not in SEARCH_SOURCES]
+    if unknown:
+        raise ValueError(f"Unknown search type(s): {', '.join(unknown)}. Expected: {', '.join(SEARCH_TYPES)}")
+
+    after = _decode_search_cursor(cursor)
+    escaped = _like_escape(term)
+    params = {
+        "term": term,
+        "pattern": f"%{escaped}%",
+        "prefix": f"{escaped}%",
+        "candidates": SEARCH_CANDIDATES,
+        # One extra row to know whether another page exists
+        "limit": limit + 1,
+        **(after or {}),
+    }
+
+    branches = " UNION ALL ".join(f"({_build_branch(t, after is not None)})" for t in types)
+    query = f"""
+        SELECT type, id, title, subtitle, project_id, client_po_id, score
+        FROM ({branches}) results
+        {_ORDER}
+        LIMIT %(limit)s
+    """
+    return query, params
+
+
+def _format_search_page(rows, limit: int) -> Dict:
+    """Trim a search result to one page and compute next_cursor"""
+    rows, next_cursor = split_page(rows, limit, lambda row: [row["score"], row["type"], row["id"]])
+    return {"results": rows, "next_cursor": next_cursor}
+
+
+def search(term: str, types: Optional[List[str]] = None, cursor: str = None, limit: int = 20) -> Dict:
+    """
+    Ranked search over projects, client POs, vendors and PO line items.
+
+    types restricts the entity types searched (see SEARCH_TYPES). Each
+    result has type, id, title, subtitle, project_id, client_po_id and
+    score. Pass the returned next_cursor back in to fetch the next page.
+
+    Returns: Dict with "results" and "next_cursor" (None on the last page)
+
+    Raises: ValueError for a short term, an unknown type or a malformed cursor
+    """
+    query, params = _build_search_query(term, types, cursor, limit)
+    conn = get_db()
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            return _format_search_page(cur.fetchall(), limit)
+    finally:
+        conn.close()
+
+
+async def search_async(term: str, types: Optional[List[str]] = None, cursor: str = None, limit: int = 20) -> Dict:
+    """Async variant of search"""
+    query, params = _build_search_query(term, types, cursor, limit)
+    async with get_async_db() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, params)
+            return _format_search_page(await cur.fetchall(), limit)
@@ -4,6 +4,8 @@ Handles all database operations for vendor management, vendor orders, and paymen
 """
 
 from app.database import get_db
+from app.repository.project_financials_repo import get_project_financials
+from app.response_cache import notify_invalidation
 from datetime import date
 from typing import List, Dict, Optional
 
@@ -176,7 +178,9 @@ def create_vendor_order(vendor_id: int, project_id: int, po_number: str = None,
                               work_status, payment_status, description, created_at, client_po_id
                 """, (vendor_id, project_id, po_number, po_date, po_value, due_date, description, client_po_id))
                 
-                return cur.fetchone()
+                order = cur.fetchone()
+                notify_invalidation(cur, vendor_orders=[order["id"]])
+                return order
     finally:
         conn.close()
 
@@ -209,6 +213,7 @@ def bulk_create_vendor_orders(project_id: int, orders: List[Dict]):
                     
                     created_orders.append(cur.fetchone())
                 
+                notify_invalidation(cur, vendor_orders=[order["id"] for order in created_orders])
                 return created_orders
     finally:
         conn.close()
@@ -326,7 +331,10 @@ def update_vendor_order(vendor_order_id: int, updates: Dict):
                 query = f"UPDATE vendor_order SET {', '.join(update_fields)} WHERE id = %s RETURNING *"
                 cur.execute(query, values)
                 
-                return cur.fetchone()
+                order = cur.fetchone()
+                if order:
+                    notify_invalidation(cur, vendor_orders=[vendor_order_id])
+                return order
     finally:
         conn.close()
 
@@ -356,7 +364,10 @@ def update_vendor_order_status(vendor_order_id: int, work_status: str = None,
                 query = f"UPDATE vendor_order SET {', '.join(update_fields)} WHERE id = %s RETURNING *"
                 cur.execute(query, values)
                 
-                return cur.fetchone()
+                order = cur.fetchone()
+                if order:
+                    notify_invalidation(cur, vendor_orders=[vendor_order_id])
+                return order
     finally:
         conn.close()
 
@@ -367,6 +378,8 @@ def delete_vendor_order(vendor_order_id: int):
     try:
         with conn:
             with conn.cursor() as cur:
+                notify_invalidation(cur, vendor_orders=[vendor_order_id])
+                
                 # Delete associated payment links first (due to FK constraints)
                 cur.execute("DELETE FROM payment_vendor_link WHERE vendor_order_id = %s", (vendor_order_id,))
                 
@@ -414,6 +427,7 @@ def add_vendor_order_line_item(vendor_order_id: int, item_name: str, quantity: f
                     WHERE id = %s
                 """, (total_price, vendor_order_id))
                 
+                notify_invalidation(cur, vendor_orders=[vendor_order_id])
                 return line_item
     finally:
         conn.close()
@@ -479,6 +493,7 @@ def update_vendor_order_line_item(line_item_id: int, updates: Dict):
                         SET po_value = po_value + %s, updated_at = CURRENT_TIMESTAMP
                         WHERE id = %s
                     """, (difference, vendor_order_id))
+                    notify_invalidation(cur, vendor_orders=[vendor_order_id])
                 
                 if not update_fields:
                     return cur.execute("""
@@ -524,6 +539,7 @@ def delete_vendor_order_line_item(line_item_id: int):
                     WHERE id = %s
                 """, (total_price, vendor_order_id))
                 
+                notify_invalidation(cur, vendor_orders=[vendor_order_id])
                 return True
     finally:
         conn.close()
@@ -679,7 +695,9 @@ def create_vendor_payment(vendor_order_id: int, payment_date: date, amount: floa
                               reference_number, status, notes, created_at
                 """, (vendor_order_id, payment_date, amount, payment_mode, reference_number, notes))
                 
-                return cur.fetchone()
+                payment = cur.fetchone()
+                notify_invalidation(cur, vendor_orders=[vendor_order_id])
+                return payment
     finally:
         conn.close()
 
@@ -769,7 +787,10 @@ def update_vendor_payment(payment_id: int, updates: Dict):
                 query = f"UPDATE vendor_payment SET {', '.join(update_fields)} WHERE id = %s RETURNING *"
                 cur.execute(query, values)
                 
-                return cur.fetchone()
+                payment = cur.fetchone()
+                if payment:
+                    notify_invalidation(cur, vendor_orders=[payment["vendor_order_id"]])
+                return payment
     finally:
         conn.close()
 
@@ -780,7 +801,10 @@ def delete_vendor_payment(payment_id: int):
     try:
         with conn:
             with conn.cursor() as cur:
-                cur.execute("DELETE FROM vendor_payment WHERE id = %s", (payment_id,))
+                cur.execute("DELETE FROM vendor_payment WHERE id = %s RETURNING vendor_order_id", (payment_id,))
+                payment = cur.fetchone()
+                if payment:
+                    notify_invalidation(cur, vendor_orders=[payment["vendor_order_id"]])
                 return True
     finally:
         conn.close()
@@ -807,6 +831,7 @@ def delete_vendor(vendor_id: int):
                 
                 # Delete vendor
                 cur.execute("DELETE FROM vendor WHERE id = %s", (vendor_id,))
+                notify_invalidation(cur, vendors=[vendor_id])
                 return True
     finally:
         conn.close()
@@ -883,76 +908,22 @@ def get_vendor_payment_summary(vendor_id: int):
 
 
 def get_project_vendor_summary(project_id: int):
-    """Get aggregated vendor order statistics for a project"""
-    conn = get_db()
-    try:
-        with conn:
-            with conn.cursor() as cur:
-                # Verify project exists
-                cur.execute("SELECT id FROM project WHERE id = %s", (project_id,))
-                if not cur.fetchone():
-                    return None
-                
-                # Count vendors
-                cur.execute("""
-                    SELECT COUNT(DISTINCT vendor_id) as count FROM vendor_order
-                    WHERE project_id = %s
-                """, (project_id,))
-                
-                total_vendors = cur.fetchone()['count']
-                
-                # Count orders and total value
-                cur.execute("""
-                    SELECT COUNT(*) as count, COALESCE(SUM(po_value), 0) as total 
-                    FROM vendor_order
-                    WHERE project_id = %s
-                """, (project_id,))
-                
-                result = cur.fetchone()
-                total_orders = result['count']
-                total_value = float(result['total']) if result['total'] else 0
-                
-                # Total paid
-                cur.execute("""
-                    SELECT COALESCE(SUM(vp.amount), 0) as total FROM vendor_payment vp
-                    JOIN vendor_order vo ON vp.vendor_order_id = vo.id
-                    WHERE vo.project_id = %s AND vp.status = 'cleared'
-                """, (project_id,))
-                
-                row = cur.fetchone()
-                total_paid = float(row['total']) if row else 0
-                total_payable = total_value - total_paid
-                
-                # Status counts
-                cur.execute("""
-                    SELECT work_status, COUNT(*) as count FROM vendor_order
-                    WHERE project_id = %s
-                    GROUP BY work_status
-                """, (project_id,))
-                
-                status_counts = cur.fetchall()
-                pending_orders = 0
-                ongoing_orders = 0
-                completed_orders = 0
-                
-                for row in status_counts:
-                    if row['work_status'] == 'pending':
-                        pending_orders = row['count']
-                    elif row['work_status'] == 'ongoing':
-                        ongoing_orders = row['count']
-                    elif row['work_status'] == 'completed':
-                        completed_orders = row['count']
-                
-                return {
-                    'project_id': project_id,
-                    'total_vendors': total_vendors,
-                    'total_vendor_orders': total_orders,
-                    'total_order_value': total_value,
-                    'total_payable': total_payable,
-                    'total_paid': total_paid,
-                    'pending_orders': pending_orders,
-                    'ongoing_orders': ongoing_orders,
-                    'completed_orders': completed_orders
-                }
-    finally:
-        conn.close()
\ No newline at end of file
+    """Get aggregated vendor order statistics for a project (from the project_financials rollup)"""
+    totals = get_project_financials(project_id)
+    if not totals:
+        return None
+    
+    total_value = float(totals['vendor_order_value'])
+    total_paid = float(totals['vendor_paid'])
+    
+    return {
+        'project_id': project_id,
+        'total_vendors': totals['vendor_count'],
+        'total_vendor_orders': totals['vendor_order_count'],
+        'total_order_value': total_value,
+        'total_payable': total_value - total_paid,
+        'total_paid': total_paid,
+        'pending_orders': totals['pending_vendor_orders'],
+        'ongoing_orders': totals['ongoing_vendor_orders'],
+        'completed_orders': totals['completed_vendor_orders']
+    }
\ No newline at end of file
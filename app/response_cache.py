@@ -0,0 +1,281 @@
+"""
+Per-worker response cache for read-heavy summary endpoints
+
+Dashboards poll the project/vendor/client summaries with identical
+requests between writes. An endpoint decorated with cached_response()
+keeps its return value in a bounded LRU, tagged with the scopes it was
+built from ("project:7", "vendor:3", "client:2"):
+
+    @router.get("/projects/{project_id}/billing-summary")
+    @cached_response("billing-summary", lambda project_id: [f"project:{project_id}"])
+    def get_project_billing_summary_endpoint(project_id: int):
+
+Repository write paths call notify_invalidation(cur, ...) with the rows
+they changed. That runs pg_notify() in the write's transaction, so
+Postgres delivers the affected scopes on commit (and never on rollback)
+to every process LISTENing on the channel, this one included. Each worker
+runs an InvalidationListener that drops the matching entries.
+
+The cache only serves while its listener is connected: until the first
+LISTEN succeeds, and from a lost connection until it is re-established
+(the cache is cleared then), calls go straight to the endpoint. Entries
+also expire after RESPONSE_CACHE_TTL_SECONDS, which bounds staleness for
+writes that do not go through the hooked repositories.
+"""
+import asyncio
+import functools
+import inspect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import psycopg
+
+from app import metrics
+from app.async_database import _build_conninfo
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "response_cache"
+# Payload that clears everything (also sent when the scope list would not fit a notification)
+ALL_SCOPES = "*"
+
+# pg_notify payloads must be shorter than 8000 bytes
+_MAX_PAYLOAD = 7000
+
+_NOTIFY_QUERY = f"""
+    SELECT pg_notify(%(channel)s, CASE WHEN length(payload) > {_MAX_PAYLOAD} THEN '{ALL_SCOPES}' ELSE payload END)
+    FROM (
+        SELECT string_agg(DISTINCT scope, ',') AS payload
+        FROM (
+            SELECT 'project:' || id FROM unnest(%(projects)s::BIGINT[]) AS t(id)
+            UNION ALL
+            SELECT 'vendor:' || id FROM unnest(%(vendors)s::BIGINT[]) AS t(id)
+            UNION ALL
+            SELECT 'client:' || id FROM unnest(%(clients)s::BIGINT[]) AS t(id)
+            UNION ALL
+            SELECT 'project:' || project_id FROM client_po WHERE id = ANY(%(client_pos)s::BIGINT[])
+            UNION ALL
+            SELECT 'client:' || client_id FROM client_po WHERE id = ANY(%(client_pos)s::BIGINT[])
+            UNION ALL
+            SELECT 'project:' || project_id FROM po_project_mapping WHERE client_po_id = ANY(%(client_pos)s::BIGINT[])
+            UNION ALL
+            SELECT 'project:' || project_id FROM vendor_order WHERE id = ANY(%(vendor_orders)s::BIGINT[])
+            UNION ALL
+            SELECT 'vendor:' || vendor_id FROM vendor_order WHERE id = ANY(%(vendor_orders)s::BIGINT[])
+        ) scopes(scope)
+        WHERE scope IS NOT NULL
+    ) agg
+    WHERE payload IS NOT NULL
+"""
+
+
+def _ids(values: Iterable) -> List[int]:
+    return [v for v in values if v is not None]
+
+
+def notify_invalidation(cur, *, projects: Iterable[int] = (), vendors: Iterable[int] = (),
+                        clients: Iterable[int] = (), client_pos: Iterable[int] = (),
+                        vendor_orders: Iterable[int] = ()):
+    """
+    Queue invalidation of the cached responses a write affects
+
+    Pass the ids the write touched; client POs and vendor orders are
+    resolved to their projects, client and vendor in the same statement,
+    so call this while those rows still exist (before deleting them). The
+    notification goes out when cur's transaction commits.
+    """
+    cur.execute(_NOTIFY_QUERY, {
+        "channel": CHANNEL,
+        "projects": _ids(projects),
+        "vendors": _ids(vendors),
+        "clients": _ids(clients),
+        "client_pos": _ids(client_pos),
+        "vendor_orders": _ids(vendor_orders),
+    })
+
+
+class ResponseCache:
+    """Thread-safe LRU of endpoint results, indexed by scope for invalidation"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.live = False
+        self._lock = threading.Lock()
+        # key -> (expires_at, scopes, value)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Tuple[str, ...], object]]" = OrderedDict()
+        self._by_scope: Dict[str, set] = {}
+        # Bumped by every invalidation: a result computed across one is not stored
+        self.generation = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Tuple[bool, object]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                metrics.RESPONSE_CACHE_INVALIDATIONS.labels("expired").inc()
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[2]
+
+    def put(self, key: Hashable, scopes: Iterable[str], value, generation: int):
+        """Store value unless an invalidation happened since generation was read"""
+        scopes = tuple(scopes)
+        with self._lock:
+            if generation != self.generation or not self.live:
+                return
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, scopes, value)
+            for scope in scopes:
+                self._by_scope.setdefault(scope, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                metrics.RESPONSE_CACHE_INVALIDATIONS.labels("evicted").inc()
+            metrics.RESPONSE_CACHE_ENTRIES.set(len(self._entries))
+
+    def invalidate(self, scopes: Iterable[str]):
+        """Drop every entry tagged with one of scopes ("*" drops everything)"""
+        with self._lock:
+            self.generation += 1
+            scopes = list(scopes)
+            if ALL_SCOPES in scopes:
+                dropped = len(self._entries)
+                self._entries.clear()
+                self._by_scope.clear()
+            else:
+                dropped = 0
+                for scope in scopes:
+                    for key in list(self._by_scope.get(scope, ())):
+                        self._remove(key)
+                        dropped += 1
+            metrics.RESPONSE_CACHE_INVALIDATIONS.labels("notified").inc(dropped)
+            metrics.RESPONSE_CACHE_ENTRIES.set(len(self._entries))
+
+    def set_live(self, live: bool):
+        """Serve from the cache only while invalidations are being received"""
+        self.invalidate([ALL_SCOPES])
+        self.live = live
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for scope in entry[1]:
+            keys = self._by_scope.get(scope)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_scope[scope]
+
+
+cache = ResponseCache(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL_SECONDS)
+
+
+def cached_response(endpoint: str, scopes: Callable[..., Iterable[str]]) -> Callable:
+    """
+    Decorator caching a route function's return value
+
+    scopes is called with the route's keyword arguments and returns the
+    scope tags the response depends on. The key is the endpoint name plus
+    all keyword arguments, so query parameters get their own entries.
+    Exceptions (404s included) are never cached.
+    """
+    def decorator(func: Callable) -> Callable:
+        def lookup(kwargs):
+            key = (endpoint, tuple(sorted(kwargs.items())))
+            if not cache.live:
+                metrics.RESPONSE_CACHE_REQUESTS.labels(endpoint, "bypass").inc()
+                return key, False, None
+            hit, value = cache.get(key)
+            metrics.RESPONSE_CACHE_REQUESTS.labels(endpoint, "hit" if hit else "miss").inc()
+            return key, hit, value
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(**kwargs):
+                key, hit, value = lookup(kwargs)
+                if hit:
+                    return value
+                generation = cache.generation
+                value = await func(**kwargs)
+                cache.put(key, scopes(**kwargs), value, generation)
+                return value
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(**kwargs):
+            key, hit, value = lookup(kwargs)
+            if hit:
+                return value
+            generation = cache.generation
+            value = func(**kwargs)
+            cache.put(key, scopes(**kwargs), value, generation)
+            return value
+        return wrapper
+    return decorator
+
+
+class InvalidationListener:
+    """
+    LISTENs for invalidations on a dedicated autocommit connection and
+    applies them to this process's cache, reconnecting with backoff
+    """
+
+    def __init__(self, response_cache: ResponseCache, max_backoff: float = 30.0):
+        self.cache = response_cache
+        self.max_backoff = max_backoff
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        """Start listening on the current event loop"""
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        self.cache.set_live(False)
+
+    async def _connect(self):
+        return await psycopg.AsyncConnection.connect(_build_conninfo(), autocommit=True)
+
+    async def _run(self):
+        backoff = 1.0
+        while True:
+            try:
+                conn = await self._connect()
+                async with conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    # Anything written while we were not listening is unknown: start empty
+                    self.cache.set_live(True)
+                    logger.info("Response cache listening for invalidations")
+                    backoff = 1.0
+                    async for notify in conn.notifies():
+                        self.cache.invalidate(notify.payload.split(","))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Response cache invalidation listener disconnected: {e} (retrying in {backoff:.0f}s)")
+            finally:
+                self.cache.set_live(False)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+
+invalidation_listener = InvalidationListener(cache)
@@ -0,0 +1,201 @@
+"""
+Per-request SQL tracing and N+1 detection
+
+Every statement run on a get_db() or get_async_db() connection
+(InstrumentedCursor / InstrumentedAsyncCursor) is recorded into the
+trace of the request being served: its normalized text (literals and
+placeholders replaced by ?), duration and row count. When the request finishes, SqlTraceMiddleware
+
+- logs a summary if the request ran more than SQL_TRACE_MAX_QUERIES
+  statements, spent more than SQL_TRACE_MAX_DB_MS in the database, or
+  ran one statement shape SQL_TRACE_N_PLUS_ONE_THRESHOLD times or more
+  (a query in a loop: likely N+1)
+- adds X-DB-Query-Count, X-DB-Time-Ms and X-DB-N-Plus-One response
+  headers when SQL_TRACE_HEADERS is on (default in development)
+
+Outside a request (ingestion worker, scripts) nothing is recorded unless
+the caller opens a trace itself, which is also how tests pin the number
+of statements a hot path runs:
+
+    with trace_queries() as trace:
+        get_pos_aggregated_by_store(client_id=2)
+    assert trace.count <= 3
+"""
+import contextvars
+import logging
+import re
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+
+from app.config import settings
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# Long statements (execute_values batches) are normalized from their first part only
+MAX_STATEMENT_CHARS = 2000
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"%(?:\(\w+\))?s")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROW_LIST = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+_current_trace: contextvars.ContextVar[Optional["QueryTrace"]] = contextvars.ContextVar("sql_trace", default=None)
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(query: str) -> str:
+    """
+    Statement shape: literals and placeholders become ?, lists of them
+    collapse to (?) and whitespace to single spaces, so the same query
+    with different parameters (or batch sizes) has the same shape
+    """
+    shape = _STRING.sub("?", query)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("(?)", shape)
+    shape = _ROW_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryShape:
+    """Statements of one shape within a trace"""
+
+    __slots__ = ("sql", "count", "seconds", "rows")
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.count = 0
+        self.seconds = 0.0
+        self.rows = 0
+
+
+class QueryTrace:
+    """Statements run during one request (or one trace_queries block)"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.shapes: Dict[str, QueryShape] = {}
+
+    def record(self, query, seconds: float, rows: int = -1, cursor=None):
+        """Add a statement; query may be str, bytes or a psycopg sql object"""
+        if isinstance(query, bytes):
+            text = query[:MAX_STATEMENT_CHARS].decode("utf-8", "replace")
+        elif isinstance(query, str):
+            text = query[:MAX_STATEMENT_CHARS]
+        elif isinstance(getattr(cursor, "query", None), bytes):
+            # psycopg2 keeps the statement it sent, with sql.Composed already rendered
+            text = cursor.query[:MAX_STATEMENT_CHARS].decode("utf-8", "replace")
+        else:
+            text = str(query)[:MAX_STATEMENT_CHARS]
+
+        sql = normalize_sql(text)
+        shape = self.shapes.get(sql)
+        if shape is None:
+            shape = self.shapes[sql] = QueryShape(sql)
+        shape.count += 1
+        shape.seconds += seconds
+        self.count += 1
+        self.seconds += seconds
+        if rows and rows > 0:
+            shape.rows += rows
+            self.rows += rows
+
+    def repeated_shapes(self, threshold: int) -> List[QueryShape]:
+        """Shapes run threshold times or more, most frequent first: likely N+1 loops"""
+        repeated = [shape for shape in self.shapes.values() if shape.count >= threshold]
+        return sorted(repeated, key=lambda shape: shape.count, reverse=True)
+
+    def slowest_shapes(self, limit: int = 5) -> List[QueryShape]:
+        return sorted(self.shapes.values(), key=lambda shape: shape.seconds, reverse=True)[:limit]
+
+    def summary(self, n_plus_one_threshold: int, limit: int = 5) -> str:
+        lines = [f"{self.count} statements, {self.seconds * 1000:.1f} ms in DB, {self.rows} rows"]
+        for shape in self.repeated_shapes(n_plus_one_threshold)[:limit]:
+            lines.append(f"  likely N+1: {shape.count}x ({shape.seconds * 1000:.1f} ms) {_clip(shape.sql)}")
+        for shape in self.slowest_shapes(limit):
+            lines.append(f"  {shape.count}x {shape.seconds * 1000:.1f} ms, {shape.rows} rows: {_clip(shape.sql)}")
+        return "\n".join(lines)
+
+
+def _clip(sql: str, width: int = 200) -> str:
+    return sql if len(sql) <= width else sql[:width - 3] + "..."
+
+
+def current_trace() -> Optional[QueryTrace]:
+    return _current_trace.get()
+
+
+def record_statement(query, seconds: float, cursor=None):
+    """Called by the instrumented cursors after each statement; no-op outside a trace"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(query, seconds, getattr(cursor, "rowcount", -1), cursor)
+
+
+@contextmanager
+def trace_queries() -> Iterator[QueryTrace]:
+    """Record the statements run inside the block (in this context and threads it starts via run_in_threadpool)"""
+    trace = QueryTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+class SqlTraceMiddleware:
+    """ASGI middleware giving each HTTP request its own QueryTrace"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.SQL_TRACE_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        threshold = settings.SQL_TRACE_N_PLUS_ONE_THRESHOLD
+        start = time.perf_counter()
+
+        with trace_queries() as trace:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start" and settings.SQL_TRACE_HEADERS:
+                    # Statements run while the body streams are not counted here
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-query-count", str(trace.count).encode()),
+                        (b"x-db-time-ms", f"{trace.seconds * 1000:.1f}".encode()),
+                        (b"x-db-n-plus-one", str(len(trace.repeated_shapes(threshold))).encode()),
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                self._report(scope, trace, threshold, time.perf_counter() - start)
+
+    @staticmethod
+    def _report(scope, trace: QueryTrace, threshold: int, elapsed: float):
+        route = metrics.route_template(scope)
+        metrics.DB_QUERIES_PER_REQUEST.labels(route).observe(trace.count)
+        if not trace.count:
+            return
+
+        reasons = []
+        if trace.count > settings.SQL_TRACE_MAX_QUERIES:
+            reasons.append(f"more than {settings.SQL_TRACE_MAX_QUERIES} statements")
+        if trace.seconds * 1000 > settings.SQL_TRACE_MAX_DB_MS:
+            reasons.append(f"more than {settings.SQL_TRACE_MAX_DB_MS:g} ms in DB")
+        if trace.repeated_shapes(threshold):
+            reasons.append("repeated statements")
+        if reasons:
+            logger.warning(
+                f"SQL trace {scope['method']} {route} ({', '.join(reasons)}; request took {elapsed * 1000:.1f} ms): "
+                f"{trace.summary(threshold)}"
+            )
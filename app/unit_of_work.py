@@ -0,0 +1,239 @@
+"""
+Request-scoped database unit of work
+
+Repository functions each call get_db() / get_async_db() and close the
+connection when done, so an endpoint that calls three of them checks out
+three connections and reads three different snapshots. Inside a unit of
+work every such call in the request gets the same connection (one per
+driver: psycopg2 for get_db(), psycopg 3 for get_async_db()), checked
+out on first use and kept in one transaction until the request ends.
+Repository code does not change: commit(), close() and leaving
+`with conn:` on the lent connection do not end the transaction.
+
+Read-only endpoints opt in with a dependency:
+
+    @router.get("/projects/{project_id}/financial-summary", dependencies=[Depends(read_only_snapshot)])
+
+- read_only_snapshot: REPEATABLE READ, READ ONLY. Every query in the
+  request sees the same snapshot, for multi-query reports. If a statement
+  fails, the transaction is rolled back and a new read-only snapshot
+  started, so later reads stay read-only but see a newer snapshot.
+- transactional: read-write, as a decorator on the route function. The
+  transaction is committed when the function returns, before the response
+  is built, so a failed COMMIT is a 500 and never a success. It rolls back
+  if the function raises, and raises instead of committing if a statement
+  failed during the request. (A dependency cannot do this: its teardown
+  runs after the response is sent.)
+
+    @router.post("/client-po/{client_po_id}/line-items")
+    @transactional
+    def add_line_items(client_po_id: int, ...):
+
+Tasks started during the request (create_task copies the context) fall
+back to the pool once the unit of work has been closed.
+"""
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from psycopg2.extensions import TRANSACTION_STATUS_INERROR
+from psycopg.pq import TransactionStatus
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+READ_ONLY_SNAPSHOT = "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY"
+
+_current: contextvars.ContextVar[Optional["UnitOfWork"]] = contextvars.ContextVar("unit_of_work", default=None)
+
+
+def current() -> Optional["UnitOfWork"]:
+    """The request's open unit of work, if any"""
+    uow = _current.get()
+    return uow if uow is not None and not uow.closed else None
+
+
+class SharedConnection:
+    """
+    What get_db() returns inside a unit of work: the request's connection,
+    with the calls that would end its transaction turned into no-ops.
+    """
+
+    def __init__(self, conn, uow: "UnitOfWork"):
+        self._conn = conn
+        self._uow = uow
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return self._conn.cursor(*args, **kwargs)
+
+    def commit(self):
+        """Deferred to the end of the unit of work"""
+
+    def rollback(self):
+        self._uow.rollback_sync()
+
+    def close(self):
+        """Returned to the pool at the end of the unit of work"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # A failed statement aborts the whole transaction; roll it back so
+        # the request can keep querying, and roll back everything at the end
+        if exc_type and self._conn.get_transaction_status() == TRANSACTION_STATUS_INERROR:
+            self.rollback()
+        return False
+
+
+class UnitOfWork:
+    """One connection per driver and one transaction for the rest of the request"""
+
+    def __init__(self, read_only: bool = False):
+        self.read_only = read_only
+        self.failed = False
+        self.closed = False
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        self._async_conn = None
+        self._async_context = None
+        self._async_lock = asyncio.Lock()
+
+    def sync_connection(self) -> SharedConnection:
+        """The request's psycopg2 connection (checked out on first use)"""
+        from app.database import checkout_connection
+
+        with self._conn_lock:
+            if self._conn is None:
+                conn = checkout_connection()
+                if self.read_only:
+                    with conn.cursor() as cur:
+                        cur.execute(READ_ONLY_SNAPSHOT)
+                self._conn = conn
+        return SharedConnection(self._conn, self)
+
+    async def async_connection(self):
+        """The request's psycopg 3 async connection (checked out on first use)"""
+        from app.async_database import async_pool_connection
+
+        async with self._async_lock:
+            if self._async_conn is None:
+                context = await async_pool_connection()
+                conn = await context.__aenter__()
+                try:
+                    if self.read_only:
+                        await conn.execute(READ_ONLY_SNAPSHOT)
+                except BaseException:
+                    await context.__aexit__(None, None, None)
+                    raise
+                self._async_context = context
+                self._async_conn = conn
+        return self._async_conn
+
+    def rollback_sync(self):
+        """Roll back the aborted psycopg2 transaction; a read-only unit of work starts a new snapshot"""
+        self.failed = True
+        self._conn.rollback()
+        if self.read_only:
+            logger.warning("Statement failed in a read-only unit of work; continuing on a new snapshot")
+            with self._conn.cursor() as cur:
+                cur.execute(READ_ONLY_SNAPSHOT)
+
+    async def rollback_async(self):
+        """Roll back the aborted psycopg 3 transaction; a read-only unit of work starts a new snapshot"""
+        self.failed = True
+        await self._async_conn.rollback()
+        if self.read_only:
+            logger.warning("Statement failed in a read-only unit of work; continuing on a new snapshot")
+            await self._async_conn.execute(READ_ONLY_SNAPSHOT)
+
+    def async_transaction_aborted(self) -> bool:
+        """True when a statement on the async connection failed and its transaction must be rolled back"""
+        conn = self._async_conn
+        return conn is not None and conn.info.transaction_status == TransactionStatus.INERROR
+
+    async def close(self, failed: bool = False):
+        """End the transaction and return the connections to their pools"""
+        if self.closed:
+            return
+        self.closed = True
+        commit = not (failed or self.failed)
+
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            try:
+                await run_in_threadpool(self._end_sync_transaction, conn, commit)
+            finally:
+                conn.close()
+
+        if self._async_conn is not None:
+            context, self._async_context, self._async_conn = self._async_context, None, None
+            if commit:
+                await context.__aexit__(None, None, None)
+            else:
+                # Leaving with an error makes the pool roll back
+                error = RuntimeError("unit of work failed")
+                await context.__aexit__(type(error), error, None)
+
+    @staticmethod
+    def _end_sync_transaction(conn, commit: bool):
+        try:
+            if commit:
+                conn.commit()
+            else:
+                conn.rollback()
+        except Exception as e:
+            logger.error(f"Failed to {'commit' if commit else 'roll back'} unit of work: {e}")
+            raise
+
+
+@asynccontextmanager
+async def _open(read_only: bool):
+    uow = UnitOfWork(read_only=read_only)
+    token = _current.set(uow)
+    failed = False
+    try:
+        yield uow
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        _current.reset(token)
+        await uow.close(failed=failed)
+
+
+def transactional(func):
+    """
+    Route decorator: run the endpoint in one read-write transaction and
+    commit it before the response is returned (see the module docstring)
+    """
+    if inspect.iscoroutinefunction(func):
+        call = func
+    else:
+        async def call(*args, **kwargs):
+            return await run_in_threadpool(func, *args, **kwargs)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        # Leaving the block commits (or rolls back if this raises), so a
+        # failed COMMIT propagates before any response exists
+        async with _open(read_only=False) as uow:
+            result = await call(*args, **kwargs)
+            if uow.failed:
+                raise RuntimeError("Unit of work rolled back: a statement failed during the request")
+        return result
+    return wrapper
+
+
+async def read_only_snapshot():
+    """FastAPI dependency: one REPEATABLE READ, READ ONLY snapshot for the request"""
+    async with _open(read_only=True) as uow:
+        yield uow
@@ -2,6 +2,8 @@ import pdfplumber
 import re
 from datetime import datetime
 
+from app.metrics import observe_parser
+
 
 # =========================================================
 # ERRORS
@@ -212,6 +214,7 @@ def parse_bajaj_pdf_po(pdf_path):
 # FASTAPI SAFE WRAPPER
 # =========================================================
 
+@observe_parser("bajaj_po")
 def parse_bajaj_po(pdf_path, request_path="/api/po/upload"):
 
     try:
@@ -0,0 +1,113 @@
+"""
+Keyset (cursor) pagination helpers
+
+A cursor is an opaque, URL-safe token that encodes the sort key of the last
+row on a page. The next page is fetched with a `(sort key) < (cursor values)`
+predicate instead of OFFSET, so deep pages cost the same as the first one.
+
+A list query built with these helpers looks like:
+
+    values = decode_cursor(cursor, 2)
+    predicate, params = keyset_predicate(["sort_date", "id"], values)
+    ... WHERE <filters> AND <predicate> ORDER BY sort_date DESC, id DESC LIMIT <limit + 1>
+    rows, next_cursor = split_page(rows, limit, lambda row: [row["sort_date"], row["id"]])
+
+Totals come from estimated_count_query() (the planner's row estimate for the
+filtered query, no scan) unless the caller asks for an exact COUNT(*).
+"""
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+
+def _json_default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    raw = json.dumps(list(values), default=_json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[Any]]:
+    """
+    Decode a cursor produced by encode_cursor.
+    
+    Returns None for an empty cursor. Raises ValueError if the cursor is
+    malformed or does not hold exactly `size` values.
+    """
+    if not cursor:
+        return None
+    
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+    
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid pagination cursor")
+    
+    return values
+
+
+def keyset_predicate(columns: Sequence[str], values: Optional[List[Any]],
+                     descending: bool = True) -> Tuple[str, List[Any]]:
+    """
+    Row-comparison predicate selecting the rows after a decoded cursor.
+    
+    All columns must sort in the same direction (the ORDER BY of the query),
+    and the last one must be unique so the order is total. Returns
+    ("", []) for the first page.
+    """
+    if not values:
+        return "", []
+    
+    operator = "<" if descending else ">"
+    placeholders = ", ".join(["%s"] * len(columns))
+    return f"({', '.join(columns)}) {operator} ({placeholders})", list(values)
+
+
+def split_page(rows: List[Any], limit: Optional[int],
+               cursor_key: Callable[[Any], List[Any]]) -> Tuple[List[Any], Optional[str]]:
+    """
+    Trim rows fetched with LIMIT limit + 1 to one page.
+    
+    Returns the page and the cursor for the next one, or None when the extra
+    row was not there (last page) or limit is None (unpaginated).
+    """
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    
+    rows = rows[:limit]
+    return rows, encode_cursor(cursor_key(rows[-1]))
+
+
+def estimated_count_query(query: str) -> str:
+    """
+    EXPLAIN statement for a filtered SELECT whose row estimate stands in
+    for COUNT(*). Run it with the query's parameters and pass the result
+    to planned_rows.
+    """
+    return f"EXPLAIN (FORMAT JSON) {query}"
+
+
+def planned_rows(explain_result: Any) -> int:
+    """
+    Top-level row estimate from an EXPLAIN (FORMAT JSON) result: the
+    fetched row (tuple or dict cursor) or its already-decoded plan list.
+    """
+    if isinstance(explain_result, dict):
+        explain_result = next(iter(explain_result.values()))
+    elif isinstance(explain_result, tuple):
+        explain_result = explain_result[0]
+    if isinstance(explain_result, str):
+        explain_result = json.loads(explain_result)
+    return int(explain_result[0]["Plan"]["Plan Rows"])
@@ -2,6 +2,8 @@ from openpyxl import load_workbook
 import re
 from typing import Dict, Any, List, Tuple
 
+from app.metrics import observe_parser
+
 
 class ProformaInvoiceParserError(Exception):
     pass
@@ -389,6 +391,7 @@ def extract_summary(ws, start_row: int) -> Dict[str, float]:
 # Main parser
 # -----------------------------------------------------
 
+@observe_parser("proforma_invoice")
 def parse_proforma_invoice(path: str, debug: bool = False) -> Dict[str, Any]:
     wb = load_workbook(path, data_only=True)
     ws = wb.active
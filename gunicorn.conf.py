@@ -0,0 +1,33 @@
+"""
+Gunicorn configuration
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Runs uvicorn workers with Prometheus multiprocess mode, so /metrics on any
+worker reports the totals of all workers and parser processes.
+"""
+import multiprocessing
+import os
+import shutil
+
+# Must be set before prometheus_client is imported anywhere (workers inherit it)
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "prometheus")
+)
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+
+def on_starting(server):
+    # Values left over from a previous run would be added to the new totals
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Drop the live gauges (in-flight requests, pool connections) of a dead worker
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,17 @@
+-- Migration: 0010_add_po_listing_indexes.sql
+-- Purpose: Support keyset pagination of GET /api/po
+-- Description: Indexes matching the (store key, created_at, id) sort order used
+--              by po_management_repo.get_pos_page, plus its filter columns
+
+SET search_path TO "Finances";
+
+-- Sort key of the store-aggregated PO listing
+CREATE INDEX IF NOT EXISTS idx_client_po_store_key_created
+ON "client_po" ((COALESCE(store_id, '')) DESC, created_at DESC, id DESC);
+
+-- Filters
+CREATE INDEX IF NOT EXISTS idx_client_po_status ON "client_po"(status);
+CREATE INDEX IF NOT EXISTS idx_client_po_project_id ON "client_po"(project_id);
+CREATE INDEX IF NOT EXISTS idx_client_po_po_date ON "client_po"(po_date);
+
+COMMIT;
@@ -0,0 +1,46 @@
+-- Migration: 0011_create_ingestion_job_table.sql
+-- Purpose: Background PO ingestion jobs
+-- Description: Durable queue + status for POST /api/uploads/po/jobs. Workers
+--              claim queued rows with FOR UPDATE SKIP LOCKED, record per-stage
+--              progress in "stages" and heartbeat so jobs orphaned by a
+--              restart can be re-queued.
+
+SET search_path TO "Finances";
+
+CREATE TABLE IF NOT EXISTS ingestion_job (
+    id VARCHAR(36) PRIMARY KEY,
+    job_type VARCHAR(50) NOT NULL DEFAULT 'po_upload',
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',  -- queued, running, succeeded, failed
+    client_id INT NOT NULL,
+    session_id VARCHAR(255),
+    file_id VARCHAR(36),
+    file_hash VARCHAR(64),
+    dedup_key VARCHAR(255),
+    params JSONB NOT NULL DEFAULT '{}',
+    stages JSONB NOT NULL DEFAULT '{}',
+    result JSONB,
+    error TEXT,
+    attempts INT NOT NULL DEFAULT 0,
+    locked_by VARCHAR(100),
+    heartbeat_at TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Worker claim order
+CREATE INDEX IF NOT EXISTS idx_ingestion_job_queued
+    ON ingestion_job(created_at) WHERE status = 'queued';
+
+-- Stale-job recovery
+CREATE INDEX IF NOT EXISTS idx_ingestion_job_running
+    ON ingestion_job(heartbeat_at) WHERE status = 'running';
+
+-- A retried submit of the same upload joins the job already in flight
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ingestion_job_dedup_active
+    ON ingestion_job(dedup_key) WHERE status IN ('queued', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_ingestion_job_session_id ON ingestion_job(session_id);
+
+COMMIT;
@@ -0,0 +1,39 @@
+-- Migration: 0012_add_content_hash_dedup.sql
+-- Purpose: Content-addressed upload storage and parse result cache
+-- Description: Identical uploads (same SHA-256 file_hash) share one stored
+--              blob, reference-counted in upload_blob. Parse results are
+--              cached per (file_hash, client_id) together with the client_po
+--              created from them, so re-uploads skip parsing and inserting.
+
+SET search_path TO "Finances";
+
+-- Duplicate lookups by content hash
+CREATE INDEX IF NOT EXISTS idx_upload_file_file_hash ON upload_file(file_hash);
+
+-- One stored copy per distinct file content
+CREATE TABLE IF NOT EXISTS upload_blob (
+    file_hash VARCHAR(64) PRIMARY KEY,
+    storage_path TEXT NOT NULL,
+    storage_filename VARCHAR(500) NOT NULL,
+    file_size BIGINT NOT NULL,
+    compressed_size BIGINT,
+    is_compressed BOOLEAN NOT NULL DEFAULT TRUE,
+    compressed_hash VARCHAR(64),
+    ref_count INT NOT NULL DEFAULT 1,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_referenced_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Parser output per file content and client
+CREATE TABLE IF NOT EXISTS parse_result_cache (
+    file_hash VARCHAR(64) NOT NULL,
+    client_id INT NOT NULL,
+    parser_version INT NOT NULL,
+    parsed_data JSONB NOT NULL,
+    client_po_id INT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (file_hash, client_id)
+);
+
+COMMIT;
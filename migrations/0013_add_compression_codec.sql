@@ -0,0 +1,23 @@
+-- Migration: 0013_add_compression_codec.sql
+-- Purpose: Record which codec each stored upload was compressed with
+-- Description: Uploads are now compressed per format (zstd, gzip or not at
+--              all). compression_codec names the codec of the stored bytes;
+--              rows written before this were gzip when is_compressed.
+
+SET search_path TO "Finances";
+
+ALTER TABLE upload_file ADD COLUMN IF NOT EXISTS compression_codec VARCHAR(20);
+ALTER TABLE upload_blob ADD COLUMN IF NOT EXISTS compression_codec VARCHAR(20);
+
+UPDATE upload_file
+SET compression_codec = CASE WHEN is_compressed THEN 'gzip' ELSE 'none' END
+WHERE compression_codec IS NULL;
+
+UPDATE upload_blob
+SET compression_codec = CASE WHEN is_compressed THEN 'gzip' ELSE 'none' END
+WHERE compression_codec IS NULL;
+
+COMMENT ON COLUMN upload_file.compression_codec IS 'Codec of the stored bytes: none, gzip or zstd';
+COMMENT ON COLUMN upload_blob.compression_codec IS 'Codec of the stored bytes: none, gzip or zstd';
+
+COMMIT;
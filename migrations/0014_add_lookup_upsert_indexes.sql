@@ -0,0 +1,21 @@
+-- Migration: 0014_add_lookup_upsert_indexes.sql
+-- Purpose: Single-statement project/site lookups when inserting client POs
+-- Description: client_po_repo resolves the project (by client and name) and
+--              the site (by store_id) with INSERT ... ON CONFLICT ... RETURNING,
+--              which needs unique indexes on those keys. Vendors keep
+--              duplicate names (vendor master allows them), so vendor and
+--              name-only site lookups only get plain indexes.
+--              Creating the unique indexes fails if duplicates already exist;
+--              merge them first:
+--                SELECT client_id, name, count(*) FROM project GROUP BY 1, 2 HAVING count(*) > 1;
+--                SELECT store_id, count(*) FROM site WHERE store_id IS NOT NULL GROUP BY 1 HAVING count(*) > 1;
+
+SET search_path TO "Finances";
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_project_client_name ON project(client_id, name);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_site_store_id ON site(store_id) WHERE store_id IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_vendor_name ON vendor(name);
+CREATE INDEX IF NOT EXISTS idx_site_site_name ON site(site_name);
+
+COMMIT;
@@ -0,0 +1,338 @@
+-- Migration: 0015_create_project_financials.sql
+-- Purpose: One-row-per-project financial rollup for the project summary endpoints
+-- Description: financial-summary, billing-summary, pl-analysis and vendor-summary
+--              used to run several SUM/COUNT queries over client_po,
+--              client_payment, billing_po, vendor_order and vendor_payment on
+--              every call. project_financials keeps those aggregates per
+--              project and is read by primary key.
+--
+--              project_financials_live computes the same columns from the raw
+--              tables; it is the definition of every rollup column and what
+--              the rebuild/verify command compares against:
+--                python scripts/maintenance/rebuild_project_financials.py --verify
+--
+--              Row triggers on the source tables call
+--              refresh_project_financials() for each project a write touches
+--              (old and new project when a row moves). The refresh locks the
+--              project's rollup row before recomputing it, so concurrent
+--              writers to one project are serialised and the last one to
+--              commit always recomputes from the others' committed rows.
+--              Writes cost one indexed recompute of the project; reads cost
+--              one row.
+
+SET search_path TO "Finances";
+
+-- Foreign keys the recompute looks rows up by
+CREATE INDEX IF NOT EXISTS idx_client_payment_client_po_id ON client_payment(client_po_id);
+CREATE INDEX IF NOT EXISTS idx_billing_po_project_id ON billing_po(project_id);
+CREATE INDEX IF NOT EXISTS idx_vendor_order_project_id ON vendor_order(project_id);
+CREATE INDEX IF NOT EXISTS idx_vendor_payment_vendor_order_id ON vendor_payment(vendor_order_id);
+CREATE INDEX IF NOT EXISTS idx_po_project_mapping_project_id ON po_project_mapping(project_id);
+CREATE INDEX IF NOT EXISTS idx_po_project_mapping_client_po_id ON po_project_mapping(client_po_id);
+
+CREATE TABLE IF NOT EXISTS project_financials (
+    project_id BIGINT PRIMARY KEY REFERENCES project(id) ON DELETE CASCADE,
+    -- Client POs whose project_id is this project (billing summary baseline)
+    original_po_value NUMERIC NOT NULL DEFAULT 0,
+    original_tax NUMERIC NOT NULL DEFAULT 0,
+    -- Client POs linked by project_id or po_project_mapping (financial summary)
+    linked_po_count INTEGER NOT NULL DEFAULT 0,
+    linked_po_value NUMERIC NOT NULL DEFAULT 0,
+    active_po_count INTEGER NOT NULL DEFAULT 0,
+    po_vendor_count INTEGER NOT NULL DEFAULT 0,
+    po_client_count INTEGER NOT NULL DEFAULT 0,
+    agreement_count INTEGER NOT NULL DEFAULT 0,
+    agreement_value NUMERIC NOT NULL DEFAULT 0,
+    -- Client payments against the linked POs
+    total_collected NUMERIC NOT NULL DEFAULT 0,
+    total_tds NUMERIC NOT NULL DEFAULT 0,
+    cleared_payments INTEGER NOT NULL DEFAULT 0,
+    pending_payments INTEGER NOT NULL DEFAULT 0,
+    bounced_payments INTEGER NOT NULL DEFAULT 0,
+    -- FINAL billing POs
+    billed_value NUMERIC NOT NULL DEFAULT 0,
+    billed_gst NUMERIC NOT NULL DEFAULT 0,
+    billed_total NUMERIC NOT NULL DEFAULT 0,
+    billing_po_count INTEGER NOT NULL DEFAULT 0,
+    -- Vendor orders and cleared vendor payments
+    vendor_count INTEGER NOT NULL DEFAULT 0,
+    vendor_order_count INTEGER NOT NULL DEFAULT 0,
+    vendor_order_value NUMERIC NOT NULL DEFAULT 0,
+    vendor_paid NUMERIC NOT NULL DEFAULT 0,
+    pending_vendor_orders INTEGER NOT NULL DEFAULT 0,
+    ongoing_vendor_orders INTEGER NOT NULL DEFAULT 0,
+    completed_vendor_orders INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE VIEW project_financials_live AS
+SELECT
+    p.id AS project_id,
+    orig.original_po_value,
+    orig.original_tax,
+    linked.linked_po_count,
+    linked.linked_po_value,
+    linked.active_po_count,
+    linked.po_vendor_count,
+    linked.po_client_count,
+    agr.agreement_count,
+    agr.agreement_value,
+    pay.total_collected,
+    pay.total_tds,
+    pay.cleared_payments,
+    pay.pending_payments,
+    pay.bounced_payments,
+    bill.billed_value,
+    bill.billed_gst,
+    bill.billed_total,
+    bill.billing_po_count,
+    vo.vendor_count,
+    vo.vendor_order_count,
+    vo.vendor_order_value,
+    vp.vendor_paid,
+    vo.pending_vendor_orders,
+    vo.ongoing_vendor_orders,
+    vo.completed_vendor_orders
+FROM project p
+CROSS JOIN LATERAL (
+    SELECT COALESCE(SUM(po_value), 0) AS original_po_value,
+           COALESCE(SUM(total_tax), 0) AS original_tax
+    FROM client_po
+    WHERE project_id = p.id
+) orig
+CROSS JOIN LATERAL (
+    SELECT COALESCE(array_agg(po_id), '{}') AS po_ids
+    FROM (
+        SELECT id AS po_id FROM client_po WHERE project_id = p.id
+        UNION
+        SELECT client_po_id FROM po_project_mapping WHERE project_id = p.id
+    ) ids
+) link_ids
+CROSS JOIN LATERAL (
+    SELECT COUNT(*)::INTEGER AS linked_po_count,
+           COALESCE(SUM(po_value), 0) AS linked_po_value,
+           COUNT(*) FILTER (WHERE status = 'active')::INTEGER AS active_po_count,
+           COUNT(DISTINCT vendor_id)::INTEGER AS po_vendor_count,
+           COUNT(DISTINCT client_id)::INTEGER AS po_client_count
+    FROM client_po
+    WHERE id = ANY(link_ids.po_ids)
+) linked
+CROSS JOIN LATERAL (
+    SELECT COUNT(*)::INTEGER AS agreement_count,
+           COALESCE(SUM(cp.po_value), 0) AS agreement_value
+    FROM client_po cp
+    JOIN po_project_mapping ppm ON cp.id = ppm.client_po_id
+    WHERE ppm.project_id = p.id AND cp.po_type = 'verbal_agreement'
+) agr
+CROSS JOIN LATERAL (
+    SELECT COALESCE(SUM(CASE WHEN transaction_type = 'debit' THEN -amount ELSE amount END), 0) AS total_collected,
+           COALESCE(SUM(CASE WHEN is_tds_deducted AND status = 'cleared' THEN tds_amount ELSE 0 END), 0) AS total_tds,
+           COUNT(*) FILTER (WHERE status = 'cleared')::INTEGER AS cleared_payments,
+           COUNT(*) FILTER (WHERE status = 'pending')::INTEGER AS pending_payments,
+           COUNT(*) FILTER (WHERE status = 'bounced')::INTEGER AS bounced_payments
+    FROM client_payment
+    WHERE client_po_id = ANY(link_ids.po_ids)
+) pay
+CROSS JOIN LATERAL (
+    SELECT COALESCE(SUM(billed_value), 0) AS billed_value,
+           COALESCE(SUM(billed_gst), 0) AS billed_gst,
+           COALESCE(SUM(billed_total), 0) AS billed_total,
+           COUNT(*)::INTEGER AS billing_po_count
+    FROM billing_po
+    WHERE project_id = p.id AND status = 'FINAL'
+) bill
+CROSS JOIN LATERAL (
+    SELECT COUNT(DISTINCT vendor_id)::INTEGER AS vendor_count,
+           COUNT(*)::INTEGER AS vendor_order_count,
+           COALESCE(SUM(po_value), 0) AS vendor_order_value,
+           COUNT(*) FILTER (WHERE work_status = 'pending')::INTEGER AS pending_vendor_orders,
+           COUNT(*) FILTER (WHERE work_status = 'ongoing')::INTEGER AS ongoing_vendor_orders,
+           COUNT(*) FILTER (WHERE work_status = 'completed')::INTEGER AS completed_vendor_orders
+    FROM vendor_order
+    WHERE project_id = p.id
+) vo
+CROSS JOIN LATERAL (
+    SELECT COALESCE(SUM(pmt.amount), 0) AS vendor_paid
+    FROM vendor_payment pmt
+    JOIN vendor_order o ON pmt.vendor_order_id = o.id
+    WHERE o.project_id = p.id AND pmt.status = 'cleared'
+) vp;
+
+-- Recompute one project's rollup row from project_financials_live
+CREATE OR REPLACE FUNCTION refresh_project_financials(p_project_id BIGINT) RETURNS VOID AS $$
+BEGIN
+    IF p_project_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    -- Waits for any other transaction refreshing this project to finish.
+    -- The UPDATE below then takes a new snapshot that includes its rows.
+    PERFORM 1 FROM project_financials WHERE project_id = p_project_id FOR UPDATE;
+    IF NOT FOUND THEN
+        -- Project deleted (or created before the rollup existed: rebuild adds it)
+        RETURN;
+    END IF;
+
+    UPDATE project_financials pf
+    SET (original_po_value, original_tax,
+         linked_po_count, linked_po_value, active_po_count, po_vendor_count, po_client_count,
+         agreement_count, agreement_value,
+         total_collected, total_tds, cleared_payments, pending_payments, bounced_payments,
+         billed_value, billed_gst, billed_total, billing_po_count,
+         vendor_count, vendor_order_count, vendor_order_value, vendor_paid,
+         pending_vendor_orders, ongoing_vendor_orders, completed_vendor_orders,
+         updated_at) = (
+        SELECT original_po_value, original_tax,
+               linked_po_count, linked_po_value, active_po_count, po_vendor_count, po_client_count,
+               agreement_count, agreement_value,
+               total_collected, total_tds, cleared_payments, pending_payments, bounced_payments,
+               billed_value, billed_gst, billed_total, billing_po_count,
+               vendor_count, vendor_order_count, vendor_order_value, vendor_paid,
+               pending_vendor_orders, ongoing_vendor_orders, completed_vendor_orders,
+               CURRENT_TIMESTAMP
+        FROM project_financials_live
+        WHERE project_id = p_project_id
+    )
+    WHERE pf.project_id = p_project_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Refresh the project a client PO belongs to and every project it is mapped to
+CREATE OR REPLACE FUNCTION refresh_client_po_financials(p_client_po_id BIGINT, p_also_project_id BIGINT DEFAULT NULL) RETURNS VOID AS $$
+DECLARE
+    affected BIGINT;
+BEGIN
+    -- Lock projects in id order so concurrent multi-project writes cannot deadlock
+    FOR affected IN
+        SELECT project_id FROM client_po WHERE id = p_client_po_id
+        UNION
+        SELECT project_id FROM po_project_mapping WHERE client_po_id = p_client_po_id
+        UNION
+        SELECT p_also_project_id
+        ORDER BY 1
+    LOOP
+        PERFORM refresh_project_financials(affected);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION project_financials_trigger() RETURNS TRIGGER AS $$
+DECLARE
+    affected BIGINT;
+BEGIN
+    IF TG_TABLE_NAME = 'project' THEN
+        INSERT INTO project_financials (project_id) VALUES (NEW.id) ON CONFLICT DO NOTHING;
+    ELSIF TG_TABLE_NAME = 'client_po' THEN
+        PERFORM refresh_client_po_financials(COALESCE(NEW.id, OLD.id), OLD.project_id);
+    ELSIF TG_TABLE_NAME = 'client_payment' THEN
+        IF OLD.client_po_id IS DISTINCT FROM NEW.client_po_id THEN
+            PERFORM refresh_client_po_financials(OLD.client_po_id);
+        END IF;
+        PERFORM refresh_client_po_financials(COALESCE(NEW.client_po_id, OLD.client_po_id));
+    ELSIF TG_TABLE_NAME = 'vendor_payment' THEN
+        FOR affected IN
+            SELECT DISTINCT project_id FROM vendor_order
+            WHERE id IN (OLD.vendor_order_id, NEW.vendor_order_id)
+            ORDER BY 1
+        LOOP
+            PERFORM refresh_project_financials(affected);
+        END LOOP;
+    ELSE
+        -- billing_po, vendor_order and po_project_mapping carry project_id
+        FOR affected IN SELECT DISTINCT unnest(ARRAY[OLD.project_id, NEW.project_id]) ORDER BY 1 LOOP
+            PERFORM refresh_project_financials(affected);
+        END LOOP;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_project_financials ON project;
+CREATE TRIGGER trg_project_financials
+AFTER INSERT ON project
+FOR EACH ROW
+EXECUTE FUNCTION project_financials_trigger();
+
+-- Updates only fire when a column the rollup reads changes
+DROP TRIGGER IF EXISTS trg_project_financials ON client_po;
+CREATE TRIGGER trg_project_financials
+AFTER INSERT OR DELETE ON client_po
+FOR EACH ROW
+EXECUTE FUNCTION project_financials_trigger();
+
+DROP TRIGGER IF EXISTS trg_project_financials_update ON client_po;
+CREATE TRIGGER trg_project_financials_update
+AFTER UPDATE ON client_po
+FOR EACH ROW
+WHEN ((OLD.project_id, OLD.po_value, OLD.total_tax, OLD.status, OLD.po_type, OLD.vendor_id, OLD.client_id)
+      IS DISTINCT FROM (NEW.project_id, NEW.po_value, NEW.total_tax, NEW.status, NEW.po_type, NEW.vendor_id, NEW.client_id))
+EXECUTE FUNCTION project_financials_trigger();
+
+DROP TRIGGER IF EXISTS trg_project_financials ON client_payment;
+CREATE TRIGGER trg_project_financials
+AFTER INSERT OR DELETE ON client_payment
+FOR EACH ROW
+EXECUTE FUNCTION project_financials_trigger();
+
+DROP TRIGGER IF EXISTS trg_project_financials_update ON client_payment;
+CREATE TRIGGER trg_project_financials_update
+AFTER UPDATE ON client_payment
+FOR EACH ROW
+WHEN ((OLD.client_po_id, OLD.amount, OLD.status, OLD.transaction_type, OLD.is_tds_deducted, OLD.tds_amount)
+      IS DISTINCT FROM (NEW.client_po_id, NEW.amount, NEW.status, NEW.transaction_type, NEW.is_tds_deducted, NEW.tds_amount))
+EXECUTE FUNCTION project_financials_trigger();
+
+DROP TRIGGER IF EXISTS trg_project_financials ON po_project_mapping;
+CREATE TRIGGER trg_project_financials
+AFTER INSERT OR DELETE OR UPDATE ON po_project_mapping
+FOR EACH ROW
+EXECUTE FUNCTION project_financials_trigger();
+
+DROP TRIGGER IF EXISTS trg_project_financials ON billing_po;
+CREATE TRIGGER trg_project_financials
+AFTER INSERT OR DELETE ON billing_po
+FOR EACH ROW
+EXECUTE FUNCTION project_financials_trigger();
+
+DROP TRIGGER IF EXISTS trg_project_financials_update ON billing_po;
+CREATE TRIGGER trg_project_financials_update
+AFTER UPDATE ON billing_po
+FOR EACH ROW
+WHEN ((OLD.project_id, OLD.status, OLD.billed_value, OLD.billed_gst, OLD.billed_total)
+      IS DISTINCT FROM (NEW.project_id, NEW.status, NEW.billed_value, NEW.billed_gst, NEW.billed_total))
+EXECUTE FUNCTION project_financials_trigger();
+
+DROP TRIGGER IF EXISTS trg_project_financials ON vendor_order;
+CREATE TRIGGER trg_project_financials
+AFTER INSERT OR DELETE ON vendor_order
+FOR EACH ROW
+EXECUTE FUNCTION project_financials_trigger();
+
+DROP TRIGGER IF EXISTS trg_project_financials_update ON vendor_order;
+CREATE TRIGGER trg_project_financials_update
+AFTER UPDATE ON vendor_order
+FOR EACH ROW
+WHEN ((OLD.project_id, OLD.vendor_id, OLD.po_value, OLD.work_status)
+      IS DISTINCT FROM (NEW.project_id, NEW.vendor_id, NEW.po_value, NEW.work_status))
+EXECUTE FUNCTION project_financials_trigger();
+
+DROP TRIGGER IF EXISTS trg_project_financials ON vendor_payment;
+CREATE TRIGGER trg_project_financials
+AFTER INSERT OR DELETE ON vendor_payment
+FOR EACH ROW
+EXECUTE FUNCTION project_financials_trigger();
+
+DROP TRIGGER IF EXISTS trg_project_financials_update ON vendor_payment;
+CREATE TRIGGER trg_project_financials_update
+AFTER UPDATE ON vendor_payment
+FOR EACH ROW
+WHEN ((OLD.vendor_order_id, OLD.amount, OLD.status)
+      IS DISTINCT FROM (NEW.vendor_order_id, NEW.amount, NEW.status))
+EXECUTE FUNCTION project_financials_trigger();
+
+-- Backfill
+INSERT INTO project_financials
+SELECT *, CURRENT_TIMESTAMP FROM project_financials_live
+ON CONFLICT (project_id) DO NOTHING;
+
+COMMIT;
@@ -0,0 +1,15 @@
+-- Migration: 0016_add_payment_listing_index.sql
+-- Purpose: Support keyset pagination of GET /api/payments
+-- Description: Index matching the (payment_date, id) descending sort order used
+--              by payment_repo.get_payments_page. Undated payments sort as
+--              'epoch' so the key is never NULL.
+
+SET search_path TO "Finances";
+
+CREATE INDEX IF NOT EXISTS idx_client_payment_date_id
+ON "client_payment" ((COALESCE(payment_date, 'epoch'::date)) DESC, id DESC);
+
+-- Filters (client_po_id is indexed by 0015)
+CREATE INDEX IF NOT EXISTS idx_client_payment_status ON "client_payment"(status);
+
+COMMIT;
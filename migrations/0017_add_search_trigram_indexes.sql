@@ -0,0 +1,32 @@
+-- Migration: 0017_add_search_trigram_indexes.sql
+-- Purpose: Index-backed substring and fuzzy search for GET /api/search
+-- Description: search_repo matches a term against project names/locations,
+--              client PO numbers, PI numbers and store IDs, vendor names and
+--              client PO line-item names with ILIKE '%term%' and pg_trgm's
+--              word-similarity operator (term <% column). A btree cannot
+--              serve either, so each searched column gets a trigram GIN
+--              index; a search is a BitmapOr of index scans per entity.
+--              project_repo.search_projects (name/location ILIKE) uses the
+--              same indexes.
+--
+--              The extension is created in "Finances" because the
+--              application's search_path holds only that schema. If pg_trgm
+--              is already installed in another schema, move it first:
+--                ALTER EXTENSION pg_trgm SET SCHEMA "Finances";
+
+SET search_path TO "Finances";
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm SCHEMA "Finances";
+
+CREATE INDEX IF NOT EXISTS idx_project_name_trgm ON project USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_project_location_trgm ON project USING GIN (location gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_client_po_po_number_trgm ON client_po USING GIN (po_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_client_po_pi_number_trgm ON client_po USING GIN (pi_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_client_po_store_id_trgm ON client_po USING GIN (store_id gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_vendor_name_trgm ON vendor USING GIN (name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_client_po_line_item_name_trgm ON client_po_line_item USING GIN (item_name gin_trgm_ops);
+
+COMMIT;
@@ -0,0 +1,20 @@
+-- Migration: 0018_add_po_listing_group_index.sql
+-- Purpose: Let GET /api/po read one page of stores without grouping the table
+-- Description: po_management_repo.get_pos_page reads the next page of
+--              distinct store_ids straight from this index (store_id < cursor,
+--              or store_id = '' for the empty store), then aggregates only
+--              those stores' POs. POs without a store_id (NULLS LAST, sorted
+--              after every store) are read by a keyset scan of the same index
+--              on store_id IS NULL. Undated POs sort as 'epoch', as in the
+--              query. It replaces idx_client_po_store_key_created from 0010,
+--              whose COALESCE(store_id, '') key mixed the two and could not
+--              serve the grouped sort.
+
+SET search_path TO "Finances";
+
+CREATE INDEX IF NOT EXISTS idx_client_po_store_created
+ON "client_po" (store_id DESC NULLS LAST, (COALESCE(created_at, 'epoch'::timestamp)) DESC, id DESC);
+
+DROP INDEX IF EXISTS idx_client_po_store_key_created;
+
+COMMIT;
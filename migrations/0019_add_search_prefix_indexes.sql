@@ -0,0 +1,26 @@
+-- Migration: 0019_add_search_prefix_indexes.sql
+-- Purpose: Index-ordered exact and prefix matches for GET /api/search
+-- Description: search_repo ranks exact and prefix matches above every
+--              substring or fuzzy match. It reads them per column with
+--              lower(column) LIKE lower('term%')
+--              ORDER BY lower(column) USING ~<~, which these btrees serve
+--              as an ordered range scan that stops after one candidate
+--              window, however many rows start with the term.
+--              text_pattern_ops makes LIKE usable under any collation;
+--              USING ~<~ is its sort order (a plain ORDER BY sorts by the
+--              collation and would read and sort every prefix match).
+
+SET search_path TO "Finances";
+
+CREATE INDEX IF NOT EXISTS idx_project_name_lower ON project (lower(name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_project_location_lower ON project (lower(location) text_pattern_ops);
+
+CREATE INDEX IF NOT EXISTS idx_client_po_po_number_lower ON client_po (lower(po_number) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_client_po_pi_number_lower ON client_po (lower(pi_number) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_client_po_store_id_lower ON client_po (lower(store_id) text_pattern_ops);
+
+CREATE INDEX IF NOT EXISTS idx_vendor_name_lower ON vendor (lower(name) text_pattern_ops);
+
+CREATE INDEX IF NOT EXISTS idx_client_po_line_item_name_lower ON client_po_line_item (lower(item_name) text_pattern_ops);
+
+COMMIT;
@@ -0,0 +1,107 @@
+-- Migration: 0020_defer_project_financials_refresh.sql
+-- Purpose: Refresh each project's rollup once per transaction, at commit, in project id order
+-- Description: The 0015 row triggers refreshed (and FOR UPDATE locked) the
+--              project_financials row of every project each written row
+--              touched, in the order the rows were written. Two
+--              transactions writing the same projects in a different order
+--              deadlocked, and the first write to a project blocked every
+--              other writer to it until commit.
+--
+--              The row triggers now only record the affected project ids
+--              in project_financials_pending. A deferred constraint trigger
+--              on that table runs once the transaction commits, takes every
+--              id queued by the transaction and refreshes each project once,
+--              in ascending id order. Rollup rows are therefore locked only
+--              for the end of the commit, always in the same order, and a
+--              batch touching one project many times recomputes it once.
+--              Reads of the rollup inside the writing transaction see the
+--              values from before it until it commits.
+
+SET search_path TO "Finances";
+
+-- Per-transaction queue; rows only live until their transaction commits
+CREATE UNLOGGED TABLE IF NOT EXISTS project_financials_pending (
+    txid BIGINT NOT NULL,
+    project_id BIGINT NOT NULL,
+    PRIMARY KEY (txid, project_id)
+);
+
+CREATE OR REPLACE FUNCTION queue_project_financials(p_project_ids BIGINT[]) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO project_financials_pending (txid, project_id)
+    SELECT txid_current(), project_id
+    FROM unnest(p_project_ids) AS project_id
+    WHERE project_id IS NOT NULL
+    ON CONFLICT DO NOTHING;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Queue the project a client PO belongs to and every project it is mapped to
+CREATE OR REPLACE FUNCTION queue_client_po_financials(p_client_po_id BIGINT, p_also_project_id BIGINT DEFAULT NULL) RETURNS VOID AS $$
+BEGIN
+    PERFORM queue_project_financials(ARRAY(
+        SELECT project_id FROM client_po WHERE id = p_client_po_id
+        UNION
+        SELECT project_id FROM po_project_mapping WHERE client_po_id = p_client_po_id
+        UNION
+        SELECT p_also_project_id
+    ));
+END;
+$$ LANGUAGE plpgsql;
+
+DROP FUNCTION IF EXISTS refresh_client_po_financials(BIGINT, BIGINT);
+
+CREATE OR REPLACE FUNCTION project_financials_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'project' THEN
+        INSERT INTO project_financials (project_id) VALUES (NEW.id) ON CONFLICT DO NOTHING;
+    ELSIF TG_TABLE_NAME = 'client_po' THEN
+        PERFORM queue_client_po_financials(COALESCE(NEW.id, OLD.id), OLD.project_id);
+    ELSIF TG_TABLE_NAME = 'client_payment' THEN
+        IF OLD.client_po_id IS DISTINCT FROM NEW.client_po_id THEN
+            PERFORM queue_client_po_financials(OLD.client_po_id);
+        END IF;
+        PERFORM queue_client_po_financials(COALESCE(NEW.client_po_id, OLD.client_po_id));
+    ELSIF TG_TABLE_NAME = 'vendor_payment' THEN
+        PERFORM queue_project_financials(ARRAY(
+            SELECT project_id FROM vendor_order
+            WHERE id IN (OLD.vendor_order_id, NEW.vendor_order_id)
+        ));
+    ELSE
+        -- billing_po, vendor_order and po_project_mapping carry project_id
+        PERFORM queue_project_financials(ARRAY[OLD.project_id, NEW.project_id]);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fires at commit for each queued row; the first firing drains the whole
+-- transaction's queue, the rest find it empty
+CREATE OR REPLACE FUNCTION refresh_pending_project_financials() RETURNS TRIGGER AS $$
+DECLARE
+    pending BIGINT[];
+    affected BIGINT;
+BEGIN
+    WITH drained AS (
+        DELETE FROM project_financials_pending
+        WHERE txid = txid_current()
+        RETURNING project_id
+    )
+    SELECT array_agg(project_id ORDER BY project_id) INTO pending FROM drained;
+
+    -- Lock projects in id order so concurrent transactions cannot deadlock
+    FOREACH affected IN ARRAY COALESCE(pending, '{}') LOOP
+        PERFORM refresh_project_financials(affected);
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_project_financials_pending ON project_financials_pending;
+CREATE CONSTRAINT TRIGGER trg_project_financials_pending
+AFTER INSERT ON project_financials_pending
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+EXECUTE FUNCTION refresh_pending_project_financials();
+
+COMMIT;
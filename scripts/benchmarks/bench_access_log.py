@@ -0,0 +1,147 @@
+"""
+Benchmark: per-request overhead of access logging
+
+Calls a trivial Starlette endpoint directly through ASGI (no server, no
+HTTP client) and reports the mean time per request for:
+
+- none:    no logging middleware (the floor)
+- legacy:  the previous BaseHTTPMiddleware LoggingMiddleware writing to
+           JSON RotatingFileHandler + console handlers on the request path
+- asgi:    AccessLogMiddleware with the same handlers behind a
+           QueueHandler / QueueListener (what app/logger.py sets up)
+- sampled: as asgi, with LOG_ACCESS_SAMPLE_RATE=0.1
+
+Log files go to a temporary directory, console output to /dev/null.
+
+Usage:
+    python scripts/benchmarks/bench_access_log.py [--requests 20000]
+"""
+import argparse
+import asyncio
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from pythonjsonlogger import jsonlogger
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.access_log import AccessLogMiddleware
+from app.config import settings
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+def build_handlers(log_dir: str):
+    file_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(log_dir, "app.log"), maxBytes=10485760, backupCount=5, encoding="utf-8"
+    )
+    file_handler.setFormatter(jsonlogger.JsonFormatter(LOG_FORMAT))
+    console = logging.StreamHandler(open(os.devnull, "w"))
+    console.setFormatter(logging.Formatter(LOG_FORMAT))
+    return [file_handler, console]
+
+
+def configure(name: str, handlers):
+    bench_logger = logging.getLogger(name)
+    bench_logger.handlers = list(handlers)
+    bench_logger.setLevel(logging.INFO)
+    bench_logger.propagate = False
+    return bench_logger
+
+
+def build_app(middleware=None) -> Starlette:
+    async def endpoint(request):
+        return JSONResponse({"id": 1, "po_number": "PO-0001", "status": "active"})
+
+    app = Starlette(routes=[Route("/po", endpoint)])
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+
+async def run(app, requests: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/po", "raw_path": b"/po", "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+
+    async def send(message):
+        pass
+
+    async def request():
+        received = False
+
+        async def receive():
+            nonlocal received
+            if received:
+                # The client stays connected; BaseHTTPMiddleware waits on this until the response is done
+                await asyncio.Future()
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        await app(dict(scope), receive, send)
+
+    for _ in range(200):
+        await request()
+    start = time.perf_counter()
+    for _ in range(requests):
+        await request()
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        legacy_logger = configure("bench.legacy", build_handlers(log_dir))
+
+        class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+            async def dispatch(self, request, call_next):
+                start_time = time.time()
+                response = await call_next(request)
+                process_time = time.time() - start_time
+                legacy_logger.info(
+                    f"{request.method} {request.url.path} - Status: {response.status_code} - Time: {process_time:.3f}s"
+                )
+                response.headers["X-Process-Time"] = str(process_time)
+                return response
+
+        log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        listener = logging.handlers.QueueListener(log_queue, *build_handlers(log_dir), respect_handler_level=True)
+        configure("app.access", [logging.handlers.QueueHandler(log_queue)])
+        listener.start()
+
+        scenarios = [
+            ("none", build_app(), 1.0),
+            ("legacy", build_app(LegacyLoggingMiddleware), 1.0),
+            ("asgi", build_app(AccessLogMiddleware), 1.0),
+            ("sampled", build_app(AccessLogMiddleware), 0.1),
+        ]
+        results = {}
+        try:
+            for name, app, sample_rate in scenarios:
+                settings.LOG_ACCESS_SAMPLE_RATE = sample_rate
+                results[name] = asyncio.run(run(app, args.requests))
+        finally:
+            listener.stop()
+
+    floor = results["none"]
+    print(f"{'scenario':<10} {'us/request':>12} {'overhead us':>12}")
+    for name, seconds in results.items():
+        print(f"{name:<10} {seconds * 1e6:>12.1f} {(seconds - floor) * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
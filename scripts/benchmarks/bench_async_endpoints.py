@@ -0,0 +1,108 @@
+"""
+Benchmark: sync (threadpool + psycopg2 pool) vs async (psycopg AsyncConnectionPool)
+endpoint throughput under concurrent load
+
+Mounts two in-process routes that run the same query, one as a sync `def`
+endpoint on get_db() and one as an `async def` endpoint on get_async_db(),
+then drives each with N concurrent clients through httpx's ASGI transport.
+`pg_sleep` stands in for query latency so the numbers reflect how many
+requests can wait on the database at once, not Postgres CPU.
+
+Needs a reachable database configured through the usual DB_* settings.
+
+Usage:
+    python scripts/benchmarks/bench_async_endpoints.py [--query-ms 20] [--requests-per-client 5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import httpx
+from fastapi import FastAPI
+
+from app.async_database import get_async_db, init_async_pool, close_async_pool
+from app.database import get_db, init_connection_pool, close_pool
+
+CONCURRENCY_LEVELS = [50, 100, 250, 500]
+
+
+def build_app(query_ms: float) -> FastAPI:
+    app = FastAPI()
+    seconds = query_ms / 1000
+
+    @app.get("/sync")
+    def sync_endpoint():
+        conn = get_db()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_sleep(%s) IS NULL AS ok", (seconds,))
+                return cur.fetchone()
+        finally:
+            conn.close()
+
+    @app.get("/async")
+    async def async_endpoint():
+        async with get_async_db() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT pg_sleep(%s) IS NULL AS ok", (seconds,))
+                return await cur.fetchone()
+
+    return app
+
+
+async def drive(client: httpx.AsyncClient, path: str, clients: int, requests_per_client: int):
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for _ in range(requests_per_client):
+            try:
+                response = await client.get(path)
+                if response.status_code != 200:
+                    errors += 1
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    return clients * requests_per_client / elapsed, errors
+
+
+async def main_async(args):
+    init_connection_pool()
+    await init_async_pool()
+    app = build_app(args.query_ms)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            # Warm both pools so connection setup is not measured
+            await drive(client, "/sync", 20, 1)
+            await drive(client, "/async", 20, 1)
+
+            print(f"Simulated query time: {args.query_ms} ms, {args.requests_per_client} requests per client\n")
+            print(f"{'clients':>7} | {'sync req/s':>10} | {'sync errors':>11} | {'async req/s':>11} | {'async errors':>12}")
+            print("-" * 64)
+            for clients in CONCURRENCY_LEVELS:
+                sync_rps, sync_errors = await drive(client, "/sync", clients, args.requests_per_client)
+                async_rps, async_errors = await drive(client, "/async", clients, args.requests_per_client)
+                print(f"{clients:>7} | {sync_rps:>10.1f} | {sync_errors:>11} | {async_rps:>11.1f} | {async_errors:>12}")
+    finally:
+        await close_async_pool()
+        close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--query-ms", type=float, default=20.0, help="Server-side query latency (pg_sleep)")
+    parser.add_argument("--requests-per-client", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
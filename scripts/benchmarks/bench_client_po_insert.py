@@ -0,0 +1,171 @@
+"""
+Benchmark: writing parsed POs with client_po_repo._insert_client_po
+
+Inserts synthetic POs of --lines line items each (same vendor, one store
+per PO), the way insert_client_pos does for a bulk upload, twice:
+
+- before: select-then-insert vendor/site/project lookups on every PO and
+          one INSERT per line item (the previous implementation)
+- after:  upsert lookups memoized for the transaction and multi-row
+          execute_values line-item inserts
+
+Everything runs in a transaction that is rolled back, so the database is
+left unchanged. --rtt-ms adds a sleep per statement to model a database
+across the network (the dev database is on a local socket).
+
+Needs a reachable database configured through the usual DB_* settings,
+with migration 0014 applied.
+
+Usage:
+    python scripts/benchmarks/bench_client_po_insert.py [--pos 5] [--lines 1000] [--rtt-ms 0.5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.database import get_db, init_connection_pool, close_pool
+from app.repository import client_po_repo
+
+
+class LatencyCursor:
+    """Delegating cursor that counts statements and sleeps rtt seconds per round trip"""
+
+    def __init__(self, cur, rtt: float):
+        self._cur = cur
+        self._rtt = rtt
+        self.statements = 0
+
+    def execute(self, sql, params=None):
+        self.statements += 1
+        if self._rtt:
+            time.sleep(self._rtt)
+        return self._cur.execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+def legacy_get_or_create_vendor(cur, vendor_name, vendor_gstin=None, vendor_address=None, memo=None):
+    cur.execute("SELECT id FROM vendor WHERE name = %s", (vendor_name,))
+    result = cur.fetchone()
+    if result:
+        return result["id"]
+    cur.execute("INSERT INTO vendor (name, gstin, address) VALUES (%s, %s, %s) RETURNING id",
+                (vendor_name, vendor_gstin, vendor_address))
+    return cur.fetchone()["id"]
+
+
+def legacy_get_or_create_site(cur, store_id=None, site_name=None, address=None, memo=None):
+    for column, value in (("store_id", store_id), ("site_name", site_name)):
+        if value:
+            cur.execute(f"SELECT id FROM site WHERE {column} = %s", (value,))
+            result = cur.fetchone()
+            if result:
+                return result["id"]
+    cur.execute("INSERT INTO site (store_id, site_name, address) VALUES (%s, %s, %s) RETURNING id",
+                (store_id, site_name or store_id, address))
+    return cur.fetchone()["id"]
+
+
+def legacy_get_or_create_project_by_name(cur, project_name, client_id, memo=None):
+    cur.execute("SELECT id FROM project WHERE name = %s AND client_id = %s", (project_name, client_id))
+    result = cur.fetchone()
+    if result:
+        return result["id"]
+    cur.execute("INSERT INTO project (client_id, name, status) VALUES (%s, %s, 'Active') RETURNING id",
+                (client_id, project_name))
+    return cur.fetchone()["id"]
+
+
+def legacy_execute_values(cur, sql, rows, page_size=None):
+    single_row = sql.replace("VALUES %s", "VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)")
+    for row in rows:
+        cur.execute(single_row, row)
+
+
+LEGACY = {
+    "_get_or_create_vendor": legacy_get_or_create_vendor,
+    "_get_or_create_site": legacy_get_or_create_site,
+    "_get_or_create_project_by_name": legacy_get_or_create_project_by_name,
+    "execute_values": legacy_execute_values,
+}
+
+
+def synthetic_pos(po_count: int, lines: int):
+    pos = []
+    for p in range(po_count):
+        line_items = [
+            {
+                "boq_name": f"BENCH BOQ item {i} - gypsum false ceiling with framework",
+                "quantity": 12.5,
+                "unit": "SQFT",
+                "rate": 85.5,
+                "taxable_amount": 1068.75,
+                "hsn_code": "68091100",
+                "gst_amount": 192.38,
+                "gross_amount": 1261.13,
+            }
+            for i in range(lines)
+        ]
+        pos.append({
+            "po_details": {
+                "po_number": f"BENCH-PO-{p}",
+                "po_date": "2026-01-15",
+                "vendor_name": "BENCH Interiors Pvt Ltd",
+                "vendor_gstin": "27AAAAA0000A1Z5",
+                "store_id": f"BENCH-STORE-{p}",
+                "site_name": f"BENCH Store {p}",
+            },
+            "line_items": line_items,
+        })
+    return pos
+
+
+def run(pos, client_id: int, rtt: float, legacy: bool):
+    saved = {name: getattr(client_po_repo, name) for name in LEGACY}
+    if legacy:
+        for name, func in LEGACY.items():
+            setattr(client_po_repo, name, func)
+
+    conn = get_db()
+    try:
+        with conn.cursor() as raw_cur:
+            cur = LatencyCursor(raw_cur, rtt)
+            memo = None if legacy else {}
+            start = time.perf_counter()
+            for parsed in pos:
+                client_po_repo._insert_client_po(cur, parsed, client_id, memo=memo)
+            elapsed = time.perf_counter() - start
+        return elapsed, cur.statements
+    finally:
+        conn.rollback()
+        conn.close()
+        for name, func in saved.items():
+            setattr(client_po_repo, name, func)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pos", type=int, default=5)
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--rtt-ms", type=float, default=0.0)
+    parser.add_argument("--client-id", type=int, default=1)
+    args = parser.parse_args()
+
+    init_connection_pool()
+    try:
+        pos = synthetic_pos(args.pos, args.lines)
+        print(f"{args.pos} POs x {args.lines} lines, rtt {args.rtt_ms} ms")
+        print(f"{'variant':<8} {'statements':>11} {'seconds':>9} {'ms/PO':>8}")
+        for name, legacy in (("before", True), ("after", False)):
+            elapsed, statements = run(pos, args.client_id, args.rtt_ms / 1000, legacy)
+            print(f"{name:<8} {statements:>11} {elapsed:>9.3f} {elapsed * 1000 / args.pos:>8.1f}")
+    finally:
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
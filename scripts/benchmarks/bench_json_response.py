@@ -0,0 +1,125 @@
+"""
+Benchmark: serializing a large list response
+
+Builds a response of RealDictRow rows (dates, timestamps, Decimals, as
+psycopg2 returns them) and reports the time per response for:
+
+- legacy: rows converted field by field in Python (float(), isoformat()),
+          then FastAPI's jsonable_encoder + JSONResponse (json.dumps)
+- orjson: the raw rows rendered by ORJSONResponse (what ORJSONRoute does)
+
+It also serves both through a FastAPI app in-process to include routing
+and response overhead.
+
+Usage:
+    python scripts/benchmarks/bench_json_response.py [--rows 10000] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fastapi import APIRouter, FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from psycopg2.extras import RealDictRow
+from starlette.responses import JSONResponse
+
+from app.json_response import ORJSONResponse, ORJSONRoute
+
+
+def build_rows(count: int):
+    rows = []
+    for i in range(1, count + 1):
+        row = RealDictRow()
+        row.update({
+            "id": i,
+            "client_po_id": i // 5 + 1,
+            "payment_date": date(2026, 1, 1 + i % 28),
+            "amount": Decimal(f"{1000 + i}.50"),
+            "payment_mode": "neft",
+            "reference_number": f"UTR{i:010d}",
+            "status": "cleared",
+            "payment_stage": "advance",
+            "notes": None,
+            "is_tds_deducted": i % 2 == 0,
+            "tds_amount": Decimal("12.25"),
+            "received_by_account": "HDFC-01",
+            "transaction_type": "credit",
+            "created_at": datetime(2026, 1, 1, 10, i % 60, i % 60),
+        })
+        rows.append(row)
+    return rows
+
+
+def convert(row):
+    """The per-field conversion repositories used to do before returning"""
+    return {
+        **row,
+        "payment_date": row["payment_date"].isoformat() if row["payment_date"] else None,
+        "amount": float(row["amount"]) if row["amount"] else 0,
+        "tds_amount": float(row["tds_amount"]) if row["tds_amount"] else 0,
+        "created_at": row["created_at"].isoformat(),
+    }
+
+
+def legacy(rows) -> bytes:
+    content = {"status": "SUCCESS", "payments": [convert(row) for row in rows]}
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def fast(rows) -> bytes:
+    return ORJSONResponse({"status": "SUCCESS", "payments": rows}).body
+
+
+def timed(func, repeat: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def build_client(rows) -> TestClient:
+    app = FastAPI()
+    legacy_router = APIRouter()
+    fast_router = APIRouter(route_class=ORJSONRoute)
+
+    @legacy_router.get("/legacy")
+    def legacy_endpoint():
+        return {"status": "SUCCESS", "payments": [convert(row) for row in rows]}
+
+    @fast_router.get("/orjson")
+    def fast_endpoint():
+        return {"status": "SUCCESS", "payments": rows}
+
+    app.include_router(legacy_router)
+    app.include_router(fast_router)
+    return TestClient(app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = build_rows(args.rows)
+    client = build_client(rows)
+    results = [
+        ("legacy", timed(lambda: legacy(rows), args.repeat), timed(lambda: client.get("/legacy"), args.repeat)),
+        ("orjson", timed(lambda: fast(rows), args.repeat), timed(lambda: client.get("/orjson"), args.repeat)),
+    ]
+
+    print(f"{args.rows} rows, {len(fast(rows)) / 1024:.0f} KiB")
+    print(f"{'scenario':<10} {'ms/serialize':>14} {'ms/request':>12}")
+    for name, serialize, request in results:
+        print(f"{name:<10} {serialize * 1e3:>14.1f} {request * 1e3:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark: line-item loading for get_pos_aggregated_by_store
+
+Compares the old per-PO line item query (N+1) with the bulk loader
+(_get_line_items_for_pos) as the number of POs grows. Uses a fake connection
+with a simulated round-trip time so it runs without a database.
+
+Usage:
+    python scripts/benchmarks/bench_po_line_item_loading.py [--rtt-ms 1.0] [--items-per-po 5]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.repository import po_management_repo
+from fake_db import FakeConnection
+
+PO_COUNTS = [10, 100, 1000, 5000]
+
+
+def build_dataset(po_count: int, items_per_po: int):
+    pos = []
+    items = {}
+    item_id = 1
+    for po_id in range(1, po_count + 1):
+        pos.append({
+            "id": po_id,
+            "client_id": 2,
+            "project_id": 1,
+            "po_number": f"PO-{po_id}",
+            "po_date": date(2026, 1, 1),
+            "po_value": Decimal("1000.00"),
+            "receivable_amount": Decimal("1000.00"),
+            "status": "active",
+            "po_type": "standard",
+            "pi_number": None,
+            "pi_date": None,
+            "notes": None,
+            "created_at": datetime(2026, 1, 1),
+            "store_id": f"STORE-{po_id // 3}",
+            "client_name": "Dava India",
+            "project_name": "Rollout",
+        })
+        items[po_id] = []
+        for _ in range(items_per_po):
+            items[po_id].append({
+                "id": item_id,
+                "client_po_id": po_id,
+                "item_name": "Item",
+                "quantity": Decimal("1"),
+                "unit_price": Decimal("200.00"),
+                "total_price": Decimal("200.00"),
+                "hsn_code": None,
+                "unit": "NOS",
+                "rate": None,
+                "gst_amount": None,
+                "gross_amount": None,
+                "taxable_amount": None,
+                "created_at": datetime(2026, 1, 1),
+            })
+            item_id += 1
+    return pos, items
+
+
+def make_responder(pos, items):
+    def responder(sql, params):
+        if "FROM client_po cp" in sql:
+            return pos
+        if "client_po_id = ANY" in sql:
+            return [item for po_id in params[0] for item in items.get(po_id, [])]
+        if "FROM client_po_line_item" in sql:
+            return items.get(params[0], [])
+        return []
+    return responder
+
+
+def legacy_per_po_load(cur, po_ids):
+    """The pre-batching access pattern: one query per PO"""
+    grouped = {}
+    for po_id in po_ids:
+        cur.execute("""
+            SELECT id, client_po_id, item_name, quantity, unit_price, total_price
+            FROM client_po_line_item
+            WHERE client_po_id = %s
+            ORDER BY id ASC
+        """, (po_id,))
+        grouped[po_id] = cur.fetchall()
+    return grouped
+
+
+def run(po_count: int, items_per_po: int, rtt_ms: float):
+    pos, items = build_dataset(po_count, items_per_po)
+    responder = make_responder(pos, items)
+    results = {}
+
+    # Legacy: header query + one line-item query per PO
+    conn = FakeConnection(responder, rtt_ms)
+    start = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute("SELECT * FROM client_po cp")
+        legacy_per_po_load(cur, [po["id"] for po in cur.fetchall()])
+    results["per_po"] = (conn.query_count, time.perf_counter() - start)
+
+    # Bulk: the real repository function
+    conn = FakeConnection(responder, rtt_ms)
+    original_get_db = po_management_repo.get_db
+    po_management_repo.get_db = lambda: conn
+    try:
+        start = time.perf_counter()
+        bundles = po_management_repo.get_pos_aggregated_by_store(client_id=2)
+        results["bulk"] = (conn.query_count, time.perf_counter() - start)
+    finally:
+        po_management_repo.get_db = original_get_db
+
+    line_items = sum(len(b["line_items"]) for b in bundles)
+    assert line_items == po_count * items_per_po, "bulk loader dropped line items"
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="Simulated round trip per statement")
+    parser.add_argument("--items-per-po", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Simulated RTT: {args.rtt_ms} ms, {args.items_per_po} line items per PO\n")
+    print(f"{'POs':>6} | {'per-PO queries':>14} | {'per-PO time':>11} | {'bulk queries':>12} | {'bulk time':>9}")
+    print("-" * 66)
+    for po_count in PO_COUNTS:
+        results = run(po_count, args.items_per_po, args.rtt_ms)
+        legacy_q, legacy_t = results["per_po"]
+        bulk_q, bulk_t = results["bulk"]
+        print(f"{po_count:>6} | {legacy_q:>14} | {legacy_t:>10.3f}s | {bulk_q:>12} | {bulk_t:>8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
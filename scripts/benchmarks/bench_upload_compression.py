@@ -0,0 +1,105 @@
+"""
+Benchmark: stored-upload compression per codec
+
+For each file, compresses it with every codec/level the upload path can
+use and reports the compression ratio and CPU time to compress and
+decompress, plus the codec CompressionPolicy picks for it. Defaults to the
+sample POs in tests/*.xlsx and a synthetic CSV of line items (text, for
+contrast); pass paths to benchmark other files.
+
+Usage:
+    python scripts/benchmarks/bench_upload_compression.py [paths ...] [--iterations 20]
+"""
+import argparse
+import glob
+import io
+import mimetypes
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(ROOT)
+
+from app.modules.file_uploads.services.compression import (
+    CompressionPolicy,
+    GzipCodec,
+    NoneCodec,
+    ZstdCodec,
+    available_codecs,
+    byte_entropy,
+)
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def codec_variants():
+    variants = [("none", NoneCodec())]
+    variants += [(f"gzip-{level}", GzipCodec(level)) for level in (1, 6, 9)]
+    if "zstd" in available_codecs():
+        variants += [(f"zstd-{level}", ZstdCodec(level)) for level in (1, 3, 9)]
+    return variants
+
+
+def synthetic_csv(rows: int = 20000) -> bytes:
+    lines = ["item_code,description,unit,quantity,rate,amount"]
+    for i in range(rows):
+        lines.append(f"ITEM-{i:05d},False ceiling gypsum board type {i % 37},sqft,{i % 250 + 1}.00,85.50,{(i % 250 + 1) * 85.5:.2f}")
+    return "\n".join(lines).encode()
+
+
+def compress(codec, data: bytes) -> bytes:
+    out = io.BytesIO()
+    with codec.open_writer(out) as writer:
+        writer.write(data)
+    return out.getvalue()
+
+
+def cpu_ms(fn, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations * 1000
+
+
+def bench_file(name: str, data: bytes, mime_type: str, iterations: int, policy: CompressionPolicy):
+    sample = data[:policy.sample_size]
+    choice = policy.choose(mime_type, sample)
+    policy_ms = cpu_ms(lambda: policy.choose(mime_type, sample), iterations)
+    print(f"\n{name}: {len(data):,} bytes, {mime_type}, sample entropy {byte_entropy(sample):.2f} bits/byte")
+    print(f"  policy picks '{choice.name}' ({policy_ms:.2f} ms CPU)")
+    print(f"  {'codec':>8} | {'stored':>10} | {'ratio':>6} | {'compress':>11} | {'decompress':>11}")
+    print("  " + "-" * 58)
+    for label, codec in codec_variants():
+        stored = compress(codec, data)
+        compress_ms = cpu_ms(lambda: compress(codec, data), iterations)
+        decompress_ms = cpu_ms(lambda: codec.decompress(stored), iterations)
+        assert codec.decompress(stored) == data, f"{label} round trip failed"
+        print(
+            f"  {label:>8} | {len(stored):>10,} | {len(data) / len(stored):>5.2f}x | "
+            f"{compress_ms:>8.2f} ms | {decompress_ms:>8.2f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="Files to benchmark (default: tests/*.xlsx)")
+    parser.add_argument("--iterations", type=int, default=20, help="Runs per measurement")
+    args = parser.parse_args()
+
+    policy = CompressionPolicy()
+    print(f"Codecs available: {', '.join(available_codecs())}; CPU time averaged over {args.iterations} runs")
+
+    paths = args.paths or sorted(glob.glob(os.path.join(ROOT, "tests", "*.xlsx")))
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        mime_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        bench_file(os.path.basename(path), data, mime_type, args.iterations, policy)
+
+    if not args.paths:
+        bench_file("line_items.csv (synthetic)", synthetic_csv(), "text/csv", args.iterations, policy)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+In-memory stand-in for a pooled psycopg2 connection, used by the benchmarks.
+
+Every statement is counted and can be delayed by a simulated network round
+trip, so query-count and latency effects of a repository change can be
+measured without a running Postgres. Pass a `responder(sql, params)` callable
+that returns the rows (list of dicts) for each statement.
+"""
+import re
+import time
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace so statements can be grouped by shape"""
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self._conn = conn
+        self._rows = []
+        self.rowcount = -1
+
+    def execute(self, sql, params=None):
+        self._conn.record(sql, params)
+        self._rows = list(self._conn.responder(sql, params) or [])
+        self.rowcount = len(self._rows)
+
+    def executemany(self, sql, seq_of_params):
+        for params in seq_of_params:
+            self.execute(sql, params)
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+class FakeConnection:
+    """Counts statements and sleeps `rtt_ms` per round trip"""
+
+    def __init__(self, responder, rtt_ms: float = 0.0):
+        self.responder = responder
+        self.rtt = rtt_ms / 1000.0
+        self.queries = []
+
+    def record(self, sql, params):
+        self.queries.append(normalize_sql(sql))
+        if self.rtt:
+            time.sleep(self.rtt)
+
+    @property
+    def query_count(self) -> int:
+        return len(self.queries)
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
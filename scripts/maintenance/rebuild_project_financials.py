@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Verify and repair the project_financials rollup
+
+Compares each project's rollup row with the aggregates computed from the
+raw tables (project_financials_live) and recomputes the projects that
+drifted. Drift means a write bypassed the triggers (triggers disabled,
+TRUNCATE, a restore that loaded data before migration 0015) or a bug in
+the rollup definition.
+
+Usage:
+    python scripts/maintenance/rebuild_project_financials.py --verify      # report only, exit 1 on drift
+    python scripts/maintenance/rebuild_project_financials.py               # repair drifted projects
+    python scripts/maintenance/rebuild_project_financials.py --all         # recompute every project
+    python scripts/maintenance/rebuild_project_financials.py --project 12 --project 15
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.database import init_connection_pool, close_pool
+from app.repository.project_financials_repo import find_project_financials_drift, rebuild_project_financials
+
+
+def report(drift):
+    for entry in drift:
+        if entry["missing"]:
+            print(f"  project {entry['project_id']}: no rollup row")
+            continue
+        print(f"  project {entry['project_id']}:")
+        for column, values in entry["columns"].items():
+            print(f"    {column}: stored {values['stored']} != live {values['live']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verify", action="store_true", help="report drift without repairing it")
+    parser.add_argument("--all", action="store_true", help="recompute every project, drifted or not")
+    parser.add_argument("--project", type=int, action="append", dest="project_ids", help="limit to this project (repeatable)")
+    args = parser.parse_args()
+
+    init_connection_pool()
+    try:
+        if args.all and not args.verify:
+            refreshed = rebuild_project_financials(args.project_ids)
+            print(f"Recomputed {len(refreshed)} project(s)")
+            return 0
+
+        drift = find_project_financials_drift(args.project_ids)
+        if not drift:
+            print("✓ project_financials matches the raw tables")
+            return 0
+
+        print(f"✗ {len(drift)} project(s) out of date:")
+        report(drift)
+        if args.verify:
+            return 1
+
+        refreshed = rebuild_project_financials([entry["project_id"] for entry in drift])
+        remaining = find_project_financials_drift(refreshed)
+        if remaining:
+            print(f"✗ {len(remaining)} project(s) still differ after rebuild (concurrent writes?):")
+            report(remaining)
+            return 1
+        print(f"✓ Repaired {len(refreshed)} project(s)")
+        return 0
+    finally:
+        close_pool()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
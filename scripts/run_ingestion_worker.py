@@ -0,0 +1,55 @@
+"""
+Run the background PO ingestion worker as its own local process.
+
+Use this with INGESTION_WORKER_ENABLED=false on the API so parsing and
+inserts run outside the web workers. Any number of these can run next to
+each other; jobs are claimed with FOR UPDATE SKIP LOCKED.
+
+Usage:
+    python scripts/run_ingestion_worker.py [--concurrency 2]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.database import close_pool
+from app.modules.file_uploads.services.ingestion_service import IngestionWorker
+from app.modules.file_uploads.services.parser_executor import parser_executor
+
+
+async def main_async(concurrency: int):
+    worker = IngestionWorker(
+        concurrency=concurrency,
+        poll_interval=settings.INGESTION_POLL_SECONDS,
+        stale_after_seconds=settings.INGESTION_STALE_SECONDS,
+        max_attempts=settings.INGESTION_MAX_ATTEMPTS
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await worker.start()
+    print(f"Ingestion worker {worker.worker_id} running with {concurrency} runners (Ctrl+C to stop)")
+    try:
+        await stop.wait()
+    finally:
+        await worker.stop()
+        parser_executor.shutdown()
+        close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=settings.INGESTION_WORKER_CONCURRENCY)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Shared fakes for the repository tests that run without a database
+"""
+import pytest
+
+
+class _Encoding:
+    encoding = "UTF8"
+
+
+class RecordingCursor:
+    """
+    Fake psycopg2 cursor: records every statement (whitespace collapsed) and
+    answers it with one fresh id per VALUES tuple, as RETURNING id would
+
+    respond(sql, params) may return the rows for a statement instead; None
+    falls back to fresh ids and raising fails the statement.
+    """
+
+    # execute_values encodes the statement with the connection's encoding
+    connection = _Encoding()
+
+    def __init__(self, respond=None):
+        self.respond = respond
+        self.executed = []
+        self.next_id = 1
+        self._rows = []
+
+    def mogrify(self, template, args):
+        return repr(tuple(args)).encode()
+
+    def execute(self, sql, params=None):
+        sql = sql.decode() if isinstance(sql, bytes) else sql
+        sql = " ".join(sql.split())
+        self.executed.append((sql, params))
+        rows = self.respond(sql, params) if self.respond else None
+        if rows is None:
+            count = sql.count("),(") + 1
+            rows = [{"id": self.next_id + i} for i in range(count)]
+            self.next_id += count
+        self._rows = rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def statements(self, prefix):
+        return [sql for sql, _ in self.executed if sql.startswith(prefix)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    """Stands in for get_db(): hands out one cursor, commits and closes nothing"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def recording_cursor():
+    """RecordingCursor factory: recording_cursor(respond=None)"""
+    return RecordingCursor
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """fake_db(module, cursor): serve module.get_db() from a FakeConnection around cursor"""
+    def use(module, cursor):
+        monkeypatch.setattr(module, "get_db", lambda: FakeConnection(cursor))
+        return cursor
+    return use
@@ -0,0 +1,129 @@
+"""
+Tests for the access log middleware and the queued log pipeline (no database required)
+"""
+import json
+import logging
+import queue
+import sys
+
+import pytest
+from pythonjsonlogger import jsonlogger
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app import logger as app_logger
+from app.access_log import AccessLogMiddleware
+from app.config import settings
+from app.metrics import LOG_RECORDS_DROPPED
+
+
+def access_records(caplog):
+    return [record for record in caplog.records if record.name == "app.access"]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # app.logger stops "app" propagating to the root logger, where caplog listens
+    monkeypatch.setattr(logging.getLogger("app"), "propagate", True)
+    monkeypatch.setattr(settings, "LOG_ACCESS_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "LOG_SLOW_REQUEST_MS", 1000)
+
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    async def fail(request):
+        return PlainTextResponse("down", status_code=503)
+
+    async def stream(request):
+        async def chunks():
+            for i in range(3):
+                yield f"chunk-{i}\n".encode()
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app = Starlette(routes=[Route("/ok", ok), Route("/fail", fail), Route("/stream", stream)])
+    app.add_middleware(AccessLogMiddleware)
+    return TestClient(app)
+
+
+def test_logs_request_and_sets_process_time(client, caplog):
+    with caplog.at_level(logging.INFO, logger="app.access"):
+        r = client.get("/ok")
+
+    assert float(r.headers["x-process-time"]) >= 0
+    [record] = access_records(caplog)
+    assert record.getMessage().startswith("GET /ok - Status: 200 - Time: ")
+    assert record.status_code == 200
+    assert record.duration_ms >= 0
+
+
+def test_streaming_responses_pass_through(client, caplog):
+    with caplog.at_level(logging.INFO, logger="app.access"):
+        r = client.get("/stream")
+
+    assert r.text == "chunk-0\nchunk-1\nchunk-2\n"
+    assert "x-process-time" in r.headers
+    assert len(access_records(caplog)) == 1
+
+
+def test_sampling_keeps_errors_and_slow_requests(client, caplog, monkeypatch):
+    monkeypatch.setattr(settings, "LOG_ACCESS_SAMPLE_RATE", 0.0)
+
+    with caplog.at_level(logging.INFO, logger="app.access"):
+        client.get("/ok")
+        client.get("/fail")
+        monkeypatch.setattr(settings, "LOG_SLOW_REQUEST_MS", 0)
+        client.get("/ok")
+
+    assert [record.status_code for record in access_records(caplog)] == [503, 200]
+
+
+def test_queue_handler_drops_when_full():
+    handler = app_logger._DroppingQueueHandler(queue.Queue(maxsize=1))
+    before = LOG_RECORDS_DROPPED._value.get()
+
+    for i in range(3):
+        handler.handle(logging.makeLogRecord({"msg": "record %d", "args": (i,), "levelno": logging.INFO}))
+
+    assert handler.queue.qsize() == 1
+    assert handler.queue.get_nowait().getMessage() == "record 0"
+    assert LOG_RECORDS_DROPPED._value.get() == before + 2
+
+
+def test_queued_records_keep_tracebacks_for_json():
+    handler = app_logger._DroppingQueueHandler(queue.Queue())
+    try:
+        raise ValueError("bad row")
+    except ValueError:
+        record = logging.getLogger("app.test").makeRecord(
+            "app.test", logging.ERROR, __file__, 1, "parse failed for %s", ("po.xlsx",), sys.exc_info()
+        )
+    handler.handle(record)
+
+    queued = handler.queue.get_nowait()
+    payload = json.loads(jsonlogger.JsonFormatter(app_logger.LOG_FORMAT).format(queued))
+    assert payload["message"] == "parse failed for po.xlsx"
+    assert "ValueError: bad row" in payload["exc_info"]
+
+
+def test_app_loggers_write_through_the_queue():
+    for name in ("", "app", "uvicorn.access"):
+        # pytest adds its own capture handlers to the root logger
+        handlers = [h for h in logging.getLogger(name).handlers if not type(h).__module__.startswith("_pytest")]
+        assert len(handlers) == 1
+        assert isinstance(handlers[0], app_logger._DroppingQueueHandler)
+    assert all(pipeline.started for pipeline in app_logger._pipelines)
+
+
+def test_listeners_are_rebuilt_after_fork():
+    old = [(p.listener, p.queue_handler.queue) for p in app_logger._pipelines]
+    app_logger.stop_log_listener()
+
+    app_logger._restart_after_fork()
+
+    for pipeline, (listener, log_queue) in zip(app_logger._pipelines, old):
+        assert pipeline.started
+        assert pipeline.listener is not listener
+        assert pipeline.queue_handler.queue is not log_queue
+        assert pipeline.listener.queue is pipeline.queue_handler.queue
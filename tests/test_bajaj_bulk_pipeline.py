@@ -0,0 +1,87 @@
+"""
+Tests for the pipelined Bajaj bulk ingest (no database or parser processes)
+"""
+import asyncio
+
+from app.apis import bajaj_po
+from app.utils.bajaj_po_parser import BajajPOParserError
+
+
+class FakeParserExecutor:
+    max_workers = 2
+
+    async def run(self, func, path):
+        await asyncio.sleep(0)
+        if "broken" in path:
+            raise BajajPOParserError("no PO number")
+        return {
+            "po_details": {"po_number": path, "po_value": 100, "store_id": "S1"},
+            "line_items": [{"amount": 100}],
+            "line_item_count": 1,
+        }
+
+
+class FakeArchiveExecutor:
+    def __init__(self):
+        self.archived = []
+
+    def submit(self, func, entry, client_po_id, project_id):
+        self.archived.append((entry["filename"], client_po_id))
+
+
+def collect(entries, monkeypatch, insert):
+    archive = FakeArchiveExecutor()
+    monkeypatch.setattr(bajaj_po, "parser_executor", FakeParserExecutor())
+    monkeypatch.setattr(bajaj_po, "insert_client_pos", insert)
+    monkeypatch.setattr(bajaj_po, "_archive_executor", archive)
+
+    async def run():
+        return [event async for event in bajaj_po._ingest_bajaj_files(entries, 1, None)]
+
+    return asyncio.run(run()), archive
+
+
+def make_entries(*names):
+    return [
+        {"index": i, "filename": name, "temp_path": f"/nonexistent/{name}", "content_type": None}
+        for i, name in enumerate(names)
+    ]
+
+
+def test_pipeline_reports_each_file_and_a_summary(monkeypatch):
+    batches = []
+
+    def insert(parsed_pos, client_id, project_id):
+        batches.append(len(parsed_pos))
+        return [1000 + i for i in range(len(parsed_pos))]
+
+    entries = make_entries("a.pdf", "broken.pdf", "c.pdf")
+    entries.append({"index": 3, "filename": "notes.txt", "error": "Only PDF and Excel files are allowed. Got .txt"})
+    events, archive = collect(entries, monkeypatch, insert)
+
+    files = {e["filename"]: e for e in events if e["type"] == "file"}
+    assert files["a.pdf"]["status"] == "SUCCESS"
+    assert files["c.pdf"]["status"] == "SUCCESS"
+    assert files["broken.pdf"]["error"] == "Parse error: no PO number"
+    assert files["notes.txt"]["status"] == "FAILED"
+    assert events[-1] == {"type": "summary", "total_files": 4, "successful": 2, "failed": 2}
+    # Two parsed POs reached the database, possibly in one batch
+    assert sum(batches) == 2
+    assert sorted(name for name, _ in archive.archived) == ["a.pdf", "c.pdf"]
+
+
+def test_insert_failures_are_reported_per_file(monkeypatch):
+    def insert(parsed_pos, client_id, project_id):
+        return [
+            ValueError("duplicate PO") if parsed["po_details"]["po_number"].endswith("b.pdf") else 7
+            for parsed in parsed_pos
+        ]
+
+    events, archive = collect(make_entries("a.pdf", "b.pdf"), monkeypatch, insert)
+
+    files = {e["filename"]: e for e in events if e["type"] == "file"}
+    assert files["a.pdf"]["client_po_id"] == 7
+    assert files["b.pdf"] == {
+        "type": "file", "status": "FAILED", "index": 1, "filename": "b.pdf", "error": "duplicate PO"
+    }
+    assert [name for name, _ in archive.archived] == ["a.pdf"]
@@ -0,0 +1,118 @@
+"""
+Tests for batched writes in client_po_repo (no database required)
+"""
+import pytest
+
+from app.repository import client_po_repo
+
+
+def _fail_po_numbers(*po_numbers):
+    """respond hook: INSERT INTO client_po fails for these PO numbers"""
+    def respond(sql, params):
+        if sql.startswith("INSERT INTO client_po (") and params[2] in po_numbers:
+            raise ValueError(f"duplicate PO {params[2]}")
+    return respond
+
+
+def _parsed(po_number, store_id, lines=3):
+    return {
+        "po_details": {"po_number": po_number, "vendor_name": "Acme Interiors", "store_id": store_id},
+        "line_items": [
+            {"description": f"Item {i}", "quantity": 1, "rate": 10, "amount": 10, "gross_amount": 11.8}
+            for i in range(lines)
+        ],
+    }
+
+
+def test_line_items_are_inserted_in_pages(monkeypatch, recording_cursor):
+    monkeypatch.setattr(client_po_repo, "LINE_ITEM_PAGE_SIZE", 400)
+    cur = recording_cursor()
+
+    client_po_repo._insert_client_po(cur, _parsed("PO-1", "S-1", lines=1000), client_id=2)
+
+    inserts = cur.statements("INSERT INTO client_po_line_item")
+    assert len(inserts) == 3
+    assert sum(sql.count("'Item ") for sql in inserts) == 1000
+    # project, vendor, site, client_po, 3 line-item pages, cache invalidation
+    assert len(cur.executed) == 8
+    assert "pg_notify" in cur.executed[-1][0] and cur.executed[-1][1]["clients"] == [2]
+
+
+def test_lookups_are_single_statement_upserts(recording_cursor):
+    cur = recording_cursor()
+
+    client_po_repo._insert_client_po(cur, _parsed("PO-1", "S-1"), client_id=2)
+
+    [project, vendor, site] = [sql for sql, _ in cur.executed[:3]]
+    assert "ON CONFLICT (client_id, name)" in project
+    assert vendor.startswith("WITH existing AS") and "INSERT INTO vendor" in vendor
+    assert "ON CONFLICT (store_id)" in site
+
+
+@pytest.mark.parametrize("resolve,args,table", [
+    (client_po_repo._get_or_create_project_by_name, ("Store 7", 2), "project"),
+    (client_po_repo._get_or_create_site, ("S-1",), "site"),
+])
+def test_existing_row_is_read_back_after_do_nothing(resolve, args, table, recording_cursor):
+    cur = recording_cursor(respond=lambda sql, params: [] if "DO NOTHING" in sql else None)
+
+    assert resolve(cur, *args) == 1
+    [insert, select] = [sql for sql, _ in cur.executed]
+    assert f"INSERT INTO {table}" in insert and "DO UPDATE" not in insert
+    assert select.startswith(f"SELECT id FROM {table}")
+
+
+def test_batch_resolves_each_vendor_and_site_once(recording_cursor, fake_db):
+    cur = fake_db(client_po_repo, recording_cursor())
+
+    results = client_po_repo.insert_client_pos(
+        [_parsed("PO-1", "S-1"), _parsed("PO-2", "S-1"), _parsed("PO-3", "S-2")], client_id=2
+    )
+
+    assert all(isinstance(r, int) for r in results)
+    assert len([sql for sql, _ in cur.executed if "INSERT INTO vendor" in sql]) == 1
+    assert len([sql for sql, _ in cur.executed if "INSERT INTO site" in sql]) == 2
+    assert len(cur.statements("INSERT INTO project")) == 2
+
+
+def test_rolled_back_po_does_not_leave_memoized_ids(recording_cursor, fake_db):
+    cur = fake_db(client_po_repo, recording_cursor(respond=_fail_po_numbers("PO-1")))
+
+    results = client_po_repo.insert_client_pos([_parsed("PO-1", "S-1"), _parsed("PO-2", "S-1")], client_id=2)
+
+    assert isinstance(results[0], ValueError)
+    assert isinstance(results[1], int)
+    # The vendor and site created for PO-1 were rolled back with its savepoint, so PO-2 resolves them again
+    assert len([sql for sql, _ in cur.executed if "INSERT INTO vendor" in sql]) == 2
+    assert len([sql for sql, _ in cur.executed if "INSERT INTO site" in sql]) == 2
+
+
+def test_without_memo_every_call_resolves(recording_cursor):
+    cur = recording_cursor()
+
+    first = client_po_repo._get_or_create_vendor(cur, "Acme Interiors")
+    second = client_po_repo._get_or_create_vendor(cur, "Acme Interiors")
+
+    assert first != second
+    assert len(cur.executed) == 2
+
+
+@pytest.mark.parametrize("store_id,site_name,expected", [
+    ("S-1", None, "ON CONFLICT (store_id)"),
+    # A new store_id reuses a site that already has the name
+    ("S-1", "Andheri West", "site_name = %(site_name)s"),
+    (None, "Andheri West", "WITH existing AS"),
+])
+def test_site_lookup_by_store_id_or_name(store_id, site_name, expected, recording_cursor):
+    cur = recording_cursor()
+
+    assert client_po_repo._get_or_create_site(cur, store_id, site_name) == 1
+    assert expected in cur.executed[0][0]
+
+
+def test_get_or_create_project_id_upserts_in_one_transaction(recording_cursor, fake_db):
+    cur = fake_db(client_po_repo, recording_cursor())
+
+    assert client_po_repo.get_or_create_project_id(2, "Store 7") == 1
+    [insert] = [sql for sql, _ in cur.executed]
+    assert "ON CONFLICT (client_id, name) DO NOTHING" in insert
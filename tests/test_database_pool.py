@@ -0,0 +1,116 @@
+"""
+Tests for connection pool bookkeeping in app.database (no database required)
+"""
+import threading
+
+import pytest
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+
+from app.database import BlockingConnectionPool, PoolStats, PoolTimeoutError, PooledConnection
+
+
+class FakeRawConnection:
+    def __init__(self, status):
+        self.status = status
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = TRANSACTION_STATUS_IDLE
+
+
+class FakePool:
+    def __init__(self):
+        self.returned = []
+
+    def putconn(self, conn, close=False):
+        self.returned.append((conn, close))
+
+
+def test_pool_stats_tracks_in_use_and_wait():
+    stats = PoolStats()
+    stats.record_checkout(0.002)
+    stats.record_checkout(0.004)
+    stats.record_return()
+
+    snapshot = stats.snapshot()
+    assert snapshot["checkouts"] == 2
+    assert snapshot["in_use"] == 1
+    assert snapshot["peak_in_use"] == 2
+    assert snapshot["avg_wait_ms"] == 3.0
+    assert snapshot["max_wait_ms"] == 4.0
+
+
+def test_close_rolls_back_only_open_transactions():
+    pool = FakePool()
+    idle = FakeRawConnection(TRANSACTION_STATUS_IDLE)
+    open_txn = FakeRawConnection(TRANSACTION_STATUS_INTRANS)
+
+    PooledConnection(idle, pool).close()
+    PooledConnection(open_txn, pool).close()
+
+    assert idle.rollbacks == 0
+    assert open_txn.rollbacks == 1
+    assert pool.returned == [(idle, False), (open_txn, False)]
+
+
+class FakeDriverConnection(FakeRawConnection):
+    def __init__(self):
+        super().__init__(TRANSACTION_STATUS_IDLE)
+        self.closed = 0
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeBlockingPool(BlockingConnectionPool):
+    def _connect(self):
+        return FakeDriverConnection()
+
+
+def test_blocking_pool_waits_for_a_returned_connection():
+    pool = FakeBlockingPool(minconn=1, maxconn=1, timeout=2)
+    held = pool.getconn()
+    threading.Timer(0.05, pool.putconn, args=(held,)).start()
+
+    assert pool.getconn() is held
+    assert pool.status()["waits"] == 1
+    pool.closeall()
+
+
+def test_blocking_pool_times_out_when_exhausted():
+    pool = FakeBlockingPool(minconn=0, maxconn=1, max_overflow=1, timeout=0.05)
+    pool.getconn()
+    pool.getconn()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+    assert pool.status()["timeouts"] == 1
+    pool.closeall()
+
+
+def test_blocking_pool_reaps_idle_overflow_connections():
+    pool = FakeBlockingPool(minconn=0, maxconn=1, max_overflow=2, overflow_idle_seconds=0)
+    conns = [pool.getconn() for _ in range(3)]
+    assert pool.status()["overflow"] == 2
+    for conn in conns:
+        pool.putconn(conn)
+
+    assert pool.reap_idle() == 2
+    assert pool.status()["size"] == 1
+    pool.closeall()
+
+
+def test_blocking_pool_replaces_broken_connections():
+    pool = FakeBlockingPool(minconn=1, maxconn=1, timeout=0.05)
+    broken = pool.getconn()
+    broken.closed = 1
+    pool.putconn(broken)
+
+    conn = pool.getconn()
+    assert conn is not broken
+    assert pool.status()["size"] == 1
+    pool.closeall()
@@ -0,0 +1,197 @@
+"""
+Tests for background PO ingestion job processing (no database required)
+"""
+import asyncio
+import hashlib
+import io
+import time
+from datetime import datetime, timedelta
+
+from app.modules.file_uploads.services import ingestion_service
+from app.modules.file_uploads.services.ingestion_service import IngestionWorker, format_job
+
+
+class FakeJobRepository:
+    def __init__(self, lease_lost_at=None, heartbeats_held=None):
+        self.stages = {}
+        self.finished = None
+        self.heartbeats = 0
+        self.lease_lost_at = lease_lost_at
+        self.heartbeats_held = heartbeats_held
+
+    def update_stage(self, job_id, worker_id, stage, info):
+        if (stage, info["status"]) == self.lease_lost_at:
+            return False
+        self.stages.setdefault(stage, []).append(info["status"])
+        return True
+
+    def heartbeat(self, job_id, worker_id):
+        self.heartbeats += 1
+        return self.heartbeats_held is None or self.heartbeats <= self.heartbeats_held
+
+    def finish_job(self, job_id, worker_id, status, result=None, error=None):
+        self.finished = (status, result, error)
+        return True
+
+
+class FakeFileRepository:
+    @staticmethod
+    def get_file(file_id):
+        return {"original_filename": "po.pdf", "storage_path": "sess", "storage_filename": "x.gz"}
+
+
+class FakeStorage:
+    def get_file(self, path, name):
+        return b"content"
+
+
+class FakeFileService:
+    storage = FakeStorage()
+
+
+class FakeParsingService:
+    save_parsed_po = None
+
+    @staticmethod
+    async def parse_uploaded_file(file_content, filename, client_id, session_id, file_id, file_hash=None):
+        return {"po_details": {"po_number": "PO-1"}, "line_item_count": 2, "client_name": "Bajaj"}
+
+
+def run_job(monkeypatch, insert, params=None, repo=None, stale_after_seconds=60):
+    repo = repo or FakeJobRepository()
+    monkeypatch.setattr(ingestion_service, "IngestionJobRepository", repo)
+    monkeypatch.setattr(ingestion_service, "UploadFileRepository", FakeFileRepository)
+    monkeypatch.setattr(ingestion_service, "file_service", FakeFileService())
+    monkeypatch.setattr(ingestion_service, "FileParsingService", FakeParsingService)
+    monkeypatch.setattr(FakeParsingService, "save_parsed_po", staticmethod(insert) if insert else None)
+
+    worker = IngestionWorker(concurrency=1, poll_interval=1, stale_after_seconds=stale_after_seconds, max_attempts=3)
+    job = {"id": "job-1", "client_id": 1, "session_id": "sess", "file_id": "file-1", "params": params or {}}
+    asyncio.run(worker.process_job(job))
+    return repo
+
+
+def test_job_runs_all_stages_and_records_result(monkeypatch):
+    repo = run_job(monkeypatch, lambda parsed, client_id, project_id, project_name: 42)
+
+    assert repo.stages == {
+        "load": ["running", "succeeded"],
+        "parse": ["running", "succeeded"],
+        "insert": ["running", "succeeded"],
+    }
+    status, result, error = repo.finished
+    assert status == "succeeded"
+    assert result["client_po_id"] == 42
+    assert result["line_item_count"] == 2
+    assert error is None
+
+
+def test_failed_stage_fails_the_job(monkeypatch):
+    def insert(parsed, client_id, project_id, project_name):
+        raise ValueError("PO number is required in po_details")
+
+    repo = run_job(monkeypatch, insert)
+
+    assert repo.stages["insert"] == ["running", "failed"]
+    assert repo.finished == ("failed", None, "insert failed: PO number is required in po_details")
+
+
+def test_insert_stage_skipped_without_auto_save(monkeypatch):
+    repo = run_job(monkeypatch, None, params={"auto_save": False})
+
+    assert repo.stages["insert"] == ["skipped"]
+    assert repo.finished[0] == "succeeded"
+
+
+def test_lost_lease_stops_the_job_without_finishing_it(monkeypatch):
+    inserts = []
+    repo = FakeJobRepository(lease_lost_at=("parse", "succeeded"))
+
+    run_job(monkeypatch, lambda *args: inserts.append(args), repo=repo)
+
+    assert repo.stages == {"load": ["running", "succeeded"], "parse": ["running"]}
+    assert inserts == []
+    assert repo.finished is None
+
+
+def test_slow_stage_heartbeats_and_stops_when_the_job_is_requeued(monkeypatch):
+    def slow_insert(parsed, client_id, project_id, project_name):
+        time.sleep(0.5)
+        return 42
+
+    held = run_job(monkeypatch, slow_insert, stale_after_seconds=0.3)
+    lost = run_job(monkeypatch, slow_insert, repo=FakeJobRepository(heartbeats_held=1), stale_after_seconds=0.3)
+
+    assert held.heartbeats >= 2
+    assert held.finished[0] == "succeeded"
+    assert lost.stages["insert"] == ["running"]
+    assert lost.finished is None
+
+
+def test_duplicate_submit_removes_its_upload_when_another_job_won(monkeypatch):
+    deleted = []
+    existing = {"id": "job-1"}
+
+    class JobRepository:
+        find_active_job = staticmethod(lambda dedup_key: None)
+        create_job = staticmethod(lambda **kwargs: (existing, False))
+
+    class Sessions:
+        create_session = staticmethod(lambda metadata, ttl_hours: {"session_id": "sess-2"})
+        delete_session = staticmethod(deleted.append)
+
+    class Files:
+        def upload_file(self, **kwargs):
+            return {"id": "file-2"}
+
+    monkeypatch.setattr(ingestion_service, "IngestionJobRepository", JobRepository)
+    monkeypatch.setattr(ingestion_service, "SessionService", Sessions)
+    monkeypatch.setattr(ingestion_service, "file_service", Files())
+    monkeypatch.setattr(ingestion_service.ParserFactory, "get_parser_for_client",
+                        staticmethod(lambda client_id: {"name": "Bajaj", "parser_type": "po"}))
+
+    job, created = ingestion_service.IngestionJobService.submit_po_job(io.BytesIO(b"po"), "po.pdf", client_id=1)
+
+    assert (job, created) == (existing, False)
+    assert deleted == ["sess-2"]
+
+
+def test_idempotency_key_is_hashed_per_client(monkeypatch):
+    seen = []
+
+    class JobRepository:
+        @staticmethod
+        def find_active_job(dedup_key):
+            seen.append(dedup_key)
+            return {"id": "job-1"}
+
+    monkeypatch.setattr(ingestion_service, "IngestionJobRepository", JobRepository)
+    monkeypatch.setattr(ingestion_service.ParserFactory, "get_parser_for_client",
+                        staticmethod(lambda client_id: {"name": "Bajaj", "parser_type": "po"}))
+
+    for client_id, key in ((1, "retry-7"), (2, "retry-7"), (1, "k" * 1000)):
+        ingestion_service.IngestionJobService.submit_po_job(
+            io.BytesIO(b"po"), "po.pdf", client_id=client_id, idempotency_key=key
+        )
+
+    assert seen[0] == hashlib.sha256(b"po_upload:1:retry-7").hexdigest()
+    assert seen[1] != seen[0]
+    assert all(len(key) == 64 for key in seen)
+
+
+def test_format_job_lists_every_stage_in_order():
+    started = datetime(2026, 1, 1, 10, 0, 0)
+    job = {
+        "id": "job-1", "job_type": "po_upload", "status": "running", "client_id": 1,
+        "params": {"original_filename": "po.pdf"},
+        "stages": {"load": {"status": "succeeded", "duration_ms": 4.0}},
+        "attempts": 1, "created_at": started, "started_at": started,
+        "finished_at": started + timedelta(seconds=2),
+    }
+
+    formatted = format_job(job)
+
+    assert [s["name"] for s in formatted["stages"]] == ["load", "parse", "insert"]
+    assert formatted["stages"][1] == {"name": "parse", "status": "pending"}
+    assert formatted["duration_ms"] == 2000.0
+    assert formatted["original_filename"] == "po.pdf"
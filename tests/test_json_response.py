@@ -0,0 +1,101 @@
+"""
+Tests for the orjson response class and route class
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+import orjson
+from fastapi import APIRouter, FastAPI, Response
+from fastapi.testclient import TestClient
+from psycopg2.extras import RealDictRow
+from pydantic import BaseModel
+
+from app import json_response
+from app.json_response import ORJSONResponse, ORJSONRoute
+
+
+class Item(BaseModel):
+    name: str
+    price: float
+
+
+def _row(**values):
+    row = RealDictRow()
+    row.update(values)
+    return row
+
+
+def test_renders_rows_dates_and_decimals():
+    body = ORJSONResponse({
+        "rows": [_row(id=1, amount=Decimal("10.50"), po_date=date(2026, 1, 2), created_at=datetime(2026, 1, 2, 3, 4, 5))],
+        1: None,
+    }).body
+
+    assert orjson.loads(body) == {
+        "rows": [{"id": 1, "amount": 10.5, "po_date": "2026-01-02", "created_at": "2026-01-02T03:04:05"}],
+        "1": None,
+    }
+
+
+def test_falls_back_to_jsonable_encoder():
+    body = ORJSONResponse({"item": Item(name="cable", price=2.5), "tags": frozenset(["a"])}).body
+
+    assert orjson.loads(body) == {"item": {"name": "cable", "price": 2.5}, "tags": ["a"]}
+
+
+def _client(monkeypatch, encoded):
+    def spy(value, *args, **kwargs):
+        encoded.append(value)
+        return original(value, *args, **kwargs)
+
+    original = json_response.jsonable_encoder
+    monkeypatch.setattr("fastapi.routing.jsonable_encoder", spy)
+
+    router = APIRouter(route_class=ORJSONRoute)
+
+    @router.get("/rows")
+    def rows():
+        return {"rows": [_row(id=1, amount=Decimal("1.25"))]}
+
+    @router.post("/rows", status_code=201)
+    async def create():
+        return {"id": 2}
+
+    @router.get("/model", response_model=Item)
+    def model():
+        return {"name": "cable", "price": "2.5"}
+
+    @router.get("/header")
+    def header(response: Response):
+        response.headers["X-Test"] = "1"
+        return {"ok": True}
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_plain_returns_skip_jsonable_encoder(monkeypatch):
+    encoded = []
+    client = _client(monkeypatch, encoded)
+
+    response = client.get("/rows")
+    created = client.post("/rows")
+
+    assert response.json() == {"rows": [{"id": 1, "amount": 1.25}]}
+    assert created.status_code == 201
+    assert created.json() == {"id": 2}
+    assert encoded == []
+
+
+def test_response_model_and_response_param_routes_keep_default_path(monkeypatch):
+    encoded = []
+    client = _client(monkeypatch, encoded)
+
+    model = client.get("/model")
+    header = client.get("/header")
+
+    assert model.json() == {"name": "cable", "price": 2.5}
+    assert header.json() == {"ok": True}
+    assert header.headers["X-Test"] == "1"
+    assert encoded == [{"ok": True}]
@@ -0,0 +1,92 @@
+"""
+Tests for Prometheus instrumentation in app.metrics (no database required)
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+from prometheus_client import REGISTRY
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.metrics import PrometheusMiddleware, metrics_payload, observe_parser, query_operation
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.parametrize("query,operation", [
+    ("SELECT 1", "select"),
+    ("\n  select * from client_po", "select"),
+    ("(SELECT 1) UNION (SELECT 2)", "select"),
+    (b"INSERT INTO client_po_line_item VALUES (1), (2)", "insert"),
+    ("WITH t AS (SELECT 1) SELECT * FROM t", "with"),
+    ("VACUUM client_po", "other"),
+    ("", "other"),
+    (object(), "other"),
+])
+def test_query_operation(query, operation):
+    assert query_operation(query) == operation
+
+
+def test_observe_parser_counts_outcomes():
+    @observe_parser("test_parser")
+    def parse(kind):
+        if kind == "raise":
+            raise ValueError("bad file")
+        if kind == "error":
+            return {"status": "ERROR", "message": "no header"}
+        return {"po_details": {}}
+
+    parse("ok")
+    parse("error")
+    with pytest.raises(ValueError):
+        parse("raise")
+
+    assert sample("parser_runs_total", parser="test_parser", outcome="success") == 1
+    assert sample("parser_runs_total", parser="test_parser", outcome="error") == 2
+    assert sample("parser_duration_seconds_count", parser="test_parser") == 3
+
+
+def test_middleware_labels_requests_by_route_template():
+    async def get_po(request):
+        if request.path_params["po_id"] == "0":
+            raise RuntimeError("boom")
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/metrics-test/po/{po_id}", get_po)])
+    app.add_middleware(PrometheusMiddleware)
+    client = TestClient(app, raise_server_exceptions=False)
+
+    before = sample("http_request_duration_seconds_count", method="GET", route="/metrics-test/po/{po_id}", status="200")
+    client.get("/metrics-test/po/1")
+    client.get("/metrics-test/po/2")
+    client.get("/metrics-test/po/0")
+    client.get("/metrics-test/nowhere")
+
+    assert sample(
+        "http_request_duration_seconds_count", method="GET", route="/metrics-test/po/{po_id}", status="200"
+    ) == before + 2
+    assert sample(
+        "http_request_duration_seconds_count", method="GET", route="/metrics-test/po/{po_id}", status="500"
+    ) >= 1
+    assert sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") >= 1
+    assert sample("http_requests_in_progress") == 0
+
+
+def test_multiprocess_mode_sums_all_processes(tmp_path, monkeypatch):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path), "PYTHONPATH": ROOT}
+    script = "from app.metrics import UPLOAD_BYTES; UPLOAD_BYTES.labels('received').inc(1000)"
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", script], env=env, cwd=ROOT, check=True)
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    payload = metrics_payload().decode()
+
+    assert 'upload_bytes_total{kind="received"} 2000.0' in payload
@@ -0,0 +1,83 @@
+"""
+Tests for keyset pagination cursor helpers
+"""
+from datetime import datetime
+
+import pytest
+
+from app.utils.pagination import (
+    decode_cursor,
+    encode_cursor,
+    estimated_count_query,
+    keyset_predicate,
+    planned_rows,
+    split_page,
+)
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(["STORE-9", datetime(2026, 3, 1, 12, 30), 42])
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 3) == ["STORE-9", "2026-03-01T12:30:00", 42]
+
+
+def test_empty_cursor_is_first_page():
+    assert decode_cursor(None, 3) is None
+    assert decode_cursor("", 3) is None
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor([1, 2])])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 3)
+
+
+def test_keyset_predicate_first_page_is_unfiltered():
+    assert keyset_predicate(["sort_date", "id"], None) == ("", [])
+
+
+def test_keyset_predicate_compares_rows_in_sort_direction():
+    assert keyset_predicate(["sort_date", "id"], ["2026-03-01", 9]) == ("(sort_date, id) < (%s, %s)", ["2026-03-01", 9])
+    assert keyset_predicate(["name", "id"], ["b", 2], descending=False) == ("(name, id) > (%s, %s)", ["b", 2])
+
+
+def test_split_page_trims_extra_row_and_points_cursor_at_last_row():
+    rows = [{"id": i} for i in (5, 4, 3)]
+
+    page, next_cursor = split_page(rows, 2, lambda row: [row["id"]])
+
+    assert page == rows[:2]
+    assert decode_cursor(next_cursor, 1) == [4]
+    assert split_page(rows, 3, lambda row: [row["id"]]) == (rows, None)
+    assert split_page(rows, None, lambda row: [row["id"]]) == (rows, None)
+
+
+@pytest.mark.parametrize("row", [
+    ([{"Plan": {"Node Type": "Seq Scan", "Plan Rows": 1234}}],),
+    {"QUERY PLAN": [{"Plan": {"Plan Rows": 1234}}]},
+    ('[{"Plan": {"Plan Rows": 1234}}]',),
+])
+def test_planned_rows_reads_top_level_estimate(row):
+    assert planned_rows(row) == 1234
+
+
+def test_estimated_count_query_explains_the_filtered_select():
+    assert estimated_count_query("SELECT 1 FROM t WHERE a = %s") == "EXPLAIN (FORMAT JSON) SELECT 1 FROM t WHERE a = %s"
+
+
+@pytest.mark.parametrize("cursor,storeless_keyset", [
+    (None, False),
+    (encode_cursor(["S-10", "2026-01-01T00:00:00", 7]), False),
+    (encode_cursor(["", "2026-01-01T00:00:00", 7]), True),
+])
+def test_po_page_groups_only_the_stores_on_the_page(cursor, storeless_keyset):
+    from app.repository.po_management_repo import _build_pos_page_query
+
+    query, params = _build_pos_page_query(client_id=2, status="active", cursor=cursor, limit=20)
+
+    assert query.count("%s") == len(params)
+    # Store keys and store-less POs are each cut to one page before grouping
+    assert query.count("LIMIT %s") == 3 and params.count(21) == 3
+    assert "cp.store_id IN (SELECT store_key FROM store_keys)" in query
+    assert ("(COALESCE(cp.created_at, 'epoch'::timestamp), cp.id) < (%s, %s)" in query) == storeless_keyset
@@ -0,0 +1,76 @@
+"""
+Tests for the parser process pool (no database required)
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.modules.file_uploads.services.parser_executor import (
+    ParserBusyError,
+    ParserExecutor,
+    ParserTimeoutError,
+)
+
+
+def square(value):
+    return value * value
+
+
+def slow_square(value, seconds):
+    time.sleep(seconds)
+    return value * value
+
+
+def fail(message):
+    raise ValueError(message)
+
+
+@pytest.fixture
+def executor():
+    executor = ParserExecutor(max_workers=1, max_queue_depth=1, timeout=30)
+    yield executor
+    executor.shutdown()
+
+
+def test_run_returns_result_from_worker_process(executor):
+    assert asyncio.run(executor.run(square, 7)) == 49
+    assert executor.stats()["completed"] == 1
+    assert executor.stats()["running"] == 0
+
+
+def test_parser_exceptions_propagate_with_their_type(executor):
+    with pytest.raises(ValueError, match="bad file"):
+        asyncio.run(executor.run(fail, "bad file"))
+    assert executor.stats()["failed"] == 1
+
+
+def test_queue_depth_limit_rejects_extra_jobs(executor):
+    async def scenario():
+        # One job runs, one waits; the third exceeds workers + queue depth
+        running = asyncio.ensure_future(executor.run(slow_square, 2, 0.5))
+        queued = asyncio.ensure_future(executor.run(slow_square, 3, 0))
+        await asyncio.sleep(0)
+        with pytest.raises(ParserBusyError):
+            await executor.run(square, 4)
+        return await asyncio.gather(running, queued)
+
+    assert asyncio.run(scenario()) == [4, 9]
+    assert executor.stats()["rejected"] == 1
+
+
+def test_timeout_cancels_queued_job(executor):
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(slow_square, 2, 0.5))
+        await asyncio.sleep(0)
+        # Cannot start before the running job frees the only worker
+        with pytest.raises(ParserTimeoutError):
+            await executor.run(square, 3, timeout=0.05)
+        return await running
+
+    assert asyncio.run(scenario()) == 4
+    stats = executor.stats()
+    assert stats["timed_out"] == 1
+    assert stats["cancelled"] == 1
+    assert stats["running"] == 0
+    assert stats["queued"] == 0
@@ -0,0 +1,108 @@
+"""
+Tests for keyset pagination of GET /api/payments (no database required)
+"""
+from datetime import date
+from decimal import Decimal
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.apis import payments
+from app.repository import payment_repo
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def _row(payment_id, payment_date):
+    return {
+        "id": payment_id, "client_po_id": 3, "payment_date": payment_date, "amount": Decimal("100.00"),
+        "payment_mode": "neft", "status": "cleared", "payment_stage": "other", "notes": None,
+        "is_tds_deducted": False, "tds_amount": Decimal("0"), "received_by_account": None,
+        "transaction_type": "credit", "reference_number": None,
+        "sort_payment_date": payment_date or date(1970, 1, 1),
+    }
+
+
+def test_page_query_applies_filters_and_cursor():
+    cursor = encode_cursor([date(2026, 3, 1), 40])
+
+    query, params = payment_repo._build_payments_page_query(
+        status="cleared", client_po_id=3, date_from=date(2026, 1, 1), cursor=cursor, limit=25
+    )
+
+    assert "OFFSET" not in query
+    assert "status = %s AND client_po_id = %s AND payment_date >= %s" in query
+    assert "(COALESCE(payment_date, 'epoch'::date), id) < (%s, %s)" in query
+    assert "ORDER BY COALESCE(payment_date, 'epoch'::date) DESC, id DESC" in query
+    assert params == ["cleared", 3, date(2026, 1, 1), "2026-03-01", 40, 26]
+
+
+def test_count_is_estimated_unless_exact_requested():
+    estimate, params = payment_repo._build_payment_count_query(payment_mode="upi")
+    exact, _ = payment_repo._build_payment_count_query(payment_mode="upi", exact=True)
+
+    assert estimate.startswith("EXPLAIN (FORMAT JSON) SELECT 1 FROM client_payment WHERE payment_mode = %s")
+    assert exact.startswith("SELECT COUNT(*)")
+    assert params == ["upi"]
+
+
+def test_page_cursor_points_at_last_returned_row():
+    rows = [_row(9, date(2026, 3, 2)), _row(8, None), _row(7, None)]
+
+    page = payment_repo._format_payments_page(rows, 2)
+
+    assert [p["id"] for p in page["payments"]] == [9, 8]
+    assert page["payments"][1]["payment_date"] is None
+    assert decode_cursor(page["next_cursor"], 2) == ["1970-01-01", 8]
+
+
+def _client(monkeypatch, page, estimate, calls):
+    async def get_page(**kwargs):
+        calls.append(("page", kwargs))
+        return page
+
+    async def get_count(**kwargs):
+        calls.append(("count", kwargs))
+        return estimate
+
+    monkeypatch.setattr(payment_repo, "get_payments_page_async", get_page)
+    monkeypatch.setattr(payment_repo, "get_payment_count_async", get_count)
+    app = FastAPI()
+    app.include_router(payments.router)
+    return TestClient(app)
+
+
+def test_endpoint_returns_estimate_and_next_cursor(monkeypatch):
+    calls = []
+    page = {"payments": [{"id": 9}, {"id": 8}], "next_cursor": "abc"}
+    client = _client(monkeypatch, page, 1500, calls)
+
+    body = client.get("/api/payments?status=cleared&po_id=3&limit=2").json()
+
+    assert body["total_count"] == 1500
+    assert body["total_count_exact"] is False
+    assert body["next_cursor"] == "abc" and body["has_more"] is True
+    assert calls[0][1] == {"cursor": None, "limit": 2, "status": "cleared", "payment_mode": None,
+                           "client_po_id": 3, "date_from": None, "date_to": None}
+    assert calls[1][1]["exact"] is False
+
+
+def test_endpoint_counts_single_page_exactly(monkeypatch):
+    client = _client(monkeypatch, {"payments": [{"id": 9}], "next_cursor": None}, 40, [])
+
+    body = client.get("/api/payments").json()
+
+    assert body["total_count"] == 1
+    assert body["total_count_exact"] is True
+
+
+def test_endpoint_rejects_malformed_cursor(monkeypatch):
+    async def get_count(**kwargs):
+        return 0
+
+    monkeypatch.setattr(payment_repo, "get_payment_count_async", get_count)
+    app = FastAPI()
+    app.include_router(payments.router)
+
+    response = TestClient(app).get("/api/payments?cursor=not-a-cursor")
+
+    assert response.status_code == 400
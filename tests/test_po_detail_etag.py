@@ -0,0 +1,73 @@
+"""
+Tests for the single-statement PO detail document and its conditional GET (no database required)
+"""
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.apis import po_management
+from app.repository import po_management_repo
+
+DOCUMENT = json.dumps({"id": 7, "po_value": 1000.5, "line_items": [{"line_item_id": 1}], "line_item_count": 1})
+
+
+def _client(monkeypatch, calls, version="abc123"):
+    def get_po_document(po_id, known_versions=(), with_payments=False):
+        calls.append((po_id, list(known_versions), with_payments))
+        if po_id != 7:
+            return None
+        return {"version": version, "document": None if version in known_versions else DOCUMENT}
+
+    monkeypatch.setattr(po_management, "get_po_document", get_po_document)
+    app = FastAPI()
+    app.include_router(po_management.router)
+    return TestClient(app)
+
+
+def test_detail_returns_postgres_document_with_weak_etag(monkeypatch):
+    calls = []
+    response = _client(monkeypatch, calls).get("/api/po/7")
+
+    assert response.status_code == 200
+    assert response.headers["etag"] == 'W/"abc123"'
+    assert response.json() == {"status": "SUCCESS", "data": json.loads(DOCUMENT)}
+    assert calls == [(7, [], False)]
+
+
+def test_matching_etag_gets_304_without_document(monkeypatch):
+    calls = []
+    client = _client(monkeypatch, calls)
+
+    for header in ('W/"abc123"', '"old", W/"abc123"'):
+        response = client.get("/api/po/7/details", headers={"If-None-Match": header})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == 'W/"abc123"'
+
+    assert calls[1] == (7, ["old", "abc123"], True)
+
+
+def test_stale_etag_gets_fresh_document(monkeypatch):
+    response = _client(monkeypatch, []).get("/api/po/7", headers={"If-None-Match": 'W/"old"'})
+
+    assert response.status_code == 200
+    assert response.json()["data"]["line_item_count"] == 1
+
+
+def test_unknown_po_is_404(monkeypatch):
+    response = _client(monkeypatch, []).get("/api/po/8/details")
+
+    assert response.status_code == 404
+
+
+def test_document_query_is_one_statement_with_optional_payments():
+    base = po_management_repo.PO_DOCUMENT_QUERY
+    details = po_management_repo.PO_DETAILS_DOCUMENT_QUERY
+
+    assert base.count("json_build_object(") == 2
+    assert "json_agg(" in base
+    assert "client_payment" not in base
+    assert "'outstanding_amount'" in details and "pay.row_versions" in details
+    keys = [key for key, _ in po_management_repo._PO_DOCUMENT_FIELDS]
+    assert keys[:2] == ["id", "client_po_id"] and keys[-2:] == ["line_items", "line_item_count"]
@@ -0,0 +1,52 @@
+"""
+Tests for bulk line-item loading in po_management_repo (no database required)
+"""
+from app.repository import po_management_repo
+from app.repository.po_management_repo import _get_line_items_for_pos
+
+
+class RecordingCursor:
+    """Minimal cursor that answers `client_po_id = ANY(%s)` from a dict"""
+
+    def __init__(self, items_by_po):
+        self.items_by_po = items_by_po
+        self.executed = []
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        self._rows = [item for po_id in params[0] for item in self.items_by_po.get(po_id, [])]
+
+    def fetchall(self):
+        return self._rows
+
+
+def _items(po_id, count):
+    return [{"id": po_id * 100 + i, "client_po_id": po_id} for i in range(count)]
+
+
+def test_groups_line_items_by_po_in_one_query():
+    cur = RecordingCursor({1: _items(1, 2), 2: _items(2, 3)})
+
+    grouped = _get_line_items_for_pos(cur, [1, 2, 3])
+
+    assert len(cur.executed) == 1
+    assert [i["id"] for i in grouped[1]] == [100, 101]
+    assert len(grouped[2]) == 3
+    assert 3 not in grouped
+
+
+def test_batches_large_id_lists(monkeypatch):
+    monkeypatch.setattr(po_management_repo, "LINE_ITEM_BATCH_SIZE", 2)
+    cur = RecordingCursor({i: _items(i, 1) for i in range(1, 6)})
+
+    grouped = _get_line_items_for_pos(cur, [1, 2, 2, 3, 4, 5, None])
+
+    assert len(cur.executed) == 3
+    assert sorted(grouped) == [1, 2, 3, 4, 5]
+
+
+def test_empty_id_list_runs_no_query():
+    cur = RecordingCursor({})
+    assert _get_line_items_for_pos(cur, []) == {}
+    assert cur.executed == []
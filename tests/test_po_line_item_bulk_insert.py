@@ -0,0 +1,77 @@
+"""
+Tests for the set-based bulk line-item insert (no database required)
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.apis import po_management
+from app.repository import po_management_repo
+
+
+def _po_total_update(po_exists=True):
+    """respond hook: the PO total UPDATE returns the PO id, or nothing when the PO is missing"""
+    def respond(sql, params):
+        if "UPDATE client_po" in sql:
+            return [{"id": params[2]}] if po_exists else []
+    return respond
+
+
+def _items(count):
+    return [{"item_name": f"Item {i}", "quantity": 2, "unit_price": 10.0} for i in range(count)]
+
+
+def test_bulk_insert_updates_po_total_once(monkeypatch, recording_cursor, fake_db):
+    cur = fake_db(po_management_repo, recording_cursor(respond=_po_total_update()))
+    monkeypatch.setattr(po_management_repo, "LINE_ITEM_INSERT_PAGE_SIZE", 40)
+
+    created = po_management_repo.add_line_items_bulk(7, _items(100))
+
+    updates = [params for sql, params in cur.executed if "UPDATE client_po" in sql]
+    inserts = [sql for sql, params in cur.executed if "INSERT INTO client_po_line_item" in sql]
+    assert updates == [(2000.0, 2000.0, 7)]
+    assert len(inserts) == 3
+    assert [item["line_item_id"] for item in created] == list(range(1, 101))
+    assert created[5] == {"line_item_id": 6, "item_name": "Item 5", "quantity": 2, "unit_price": 10.0, "total_price": 20.0}
+
+
+def test_bulk_insert_missing_po_inserts_nothing(recording_cursor, fake_db):
+    cur = fake_db(po_management_repo, recording_cursor(respond=_po_total_update(po_exists=False)))
+
+    assert po_management_repo.add_line_items_bulk(7, _items(3)) is None
+    assert len(cur.executed) == 1
+
+
+def test_endpoint_reports_invalid_items_by_index(monkeypatch):
+    calls = []
+
+    def fake_bulk(client_po_id, items):
+        calls.append(items)
+        return [{"line_item_id": 100 + i, **item, "total_price": item["quantity"] * item["unit_price"]}
+                for i, item in enumerate(items)]
+
+    monkeypatch.setattr(po_management, "add_line_items_bulk", fake_bulk)
+    app = FastAPI()
+    app.include_router(po_management.router)
+    items = [{"item_name": f"Item {i}", "quantity": 1, "unit_price": 5} for i in range(150)]
+    items[1]["quantity"] = 0
+    items[2] = {"description": "  Cement  ", "quantity": 3, "unit_price": 4}
+    items[4]["unit_price"] = -1
+
+    body = TestClient(app).post("/api/po/7/line-items/bulk", json={"items": items}).json()
+
+    assert len(calls) == 1 and len(calls[0]) == 148
+    assert body["status"] == "PARTIAL_SUCCESS"
+    assert [failed["index"] for failed in body["failed_items"]] == [1, 4]
+    assert body["line_items"][1] == {
+        "index": 2, "line_item_id": 101, "item_name": "Cement", "quantity": 3.0, "unit_price": 4.0, "total_price": 12.0
+    }
+
+
+def test_endpoint_returns_404_for_missing_po(monkeypatch):
+    monkeypatch.setattr(po_management, "add_line_items_bulk", lambda client_po_id, items: None)
+    app = FastAPI()
+    app.include_router(po_management.router)
+
+    r = TestClient(app).post("/api/po/7/line-items/bulk", json={"items": _items(2)})
+
+    assert r.status_code == 404
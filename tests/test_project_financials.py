@@ -0,0 +1,149 @@
+"""
+Tests for the project_financials rollup readers (no database required)
+"""
+import os
+import re
+from decimal import Decimal
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.apis import po_management
+from app.repository import billing_po_repo, project_financials_repo, vendor_order_repo
+from app.repository.project_financials_repo import FINANCIAL_COLUMNS
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+MIGRATION = os.path.join(MIGRATIONS, "0015_create_project_financials.sql")
+DEFERRED_REFRESH = os.path.join(MIGRATIONS, "0020_defer_project_financials_refresh.sql")
+
+
+def _totals(**values):
+    row = dict.fromkeys(FINANCIAL_COLUMNS, 0)
+    row.update(project_id=7, **values)
+    return row
+
+
+def test_rollup_columns_match_migration():
+    with open(MIGRATION) as f:
+        sql = f.read()
+    table = sql[sql.index("CREATE TABLE IF NOT EXISTS project_financials"):sql.index("CREATE OR REPLACE VIEW")]
+    view = sql[sql.index("CREATE OR REPLACE VIEW"):sql.index("FROM project p")]
+
+    table_columns = re.findall(r"^\s+(\w+) (?:BIGINT|NUMERIC|INTEGER|TIMESTAMP)", table, re.M)
+    view_columns = re.findall(r"\.(\w+),?$", view, re.M)
+
+    assert table_columns == ["project_id", *FINANCIAL_COLUMNS, "updated_at"]
+    assert view_columns == list(FINANCIAL_COLUMNS)
+
+
+def test_row_triggers_only_queue_and_refresh_runs_at_commit_in_id_order():
+    with open(DEFERRED_REFRESH) as f:
+        sql = f.read()
+    row_trigger = sql[sql.index("FUNCTION project_financials_trigger()"):sql.index("FUNCTION refresh_pending_project_financials()")]
+    deferred = sql[sql.index("FUNCTION refresh_pending_project_financials()"):]
+
+    assert "refresh_project_financials" not in row_trigger
+    assert "array_agg(project_id ORDER BY project_id)" in deferred
+    assert "DEFERRABLE INITIALLY DEFERRED" in deferred
+
+
+def test_billing_summary_reads_rollup_row(monkeypatch):
+    monkeypatch.setattr(billing_po_repo, "get_project_financials", lambda project_id: _totals(
+        original_po_value=Decimal("1000"), original_tax=Decimal("180"),
+        billed_value=Decimal("1000"), billed_gst=Decimal("200"), billed_total=Decimal("1200"), billing_po_count=2,
+        vendor_order_value=Decimal("900"),
+    ))
+
+    summary = billing_po_repo.get_project_billing_summary(7)
+
+    assert summary["original_po"] == {"value": 1000, "tax": 180, "total": 1000}
+    assert summary["billing_po"]["count"] == 2
+    assert summary["vendor_costs"]["total"] == 900
+    assert summary["financial_summary"]["profit"] == 300
+    assert summary["financial_summary"]["profit_margin_percent"] == 25
+    assert summary["financial_summary"]["delta_percent"] == 20
+
+
+def test_summaries_return_none_for_unknown_project(monkeypatch):
+    monkeypatch.setattr(billing_po_repo, "get_project_financials", lambda project_id: None)
+    monkeypatch.setattr(vendor_order_repo, "get_project_financials", lambda project_id: None)
+
+    assert billing_po_repo.get_project_billing_summary(404) is None
+    assert vendor_order_repo.get_project_vendor_summary(404) is None
+
+
+def test_vendor_summary_reads_rollup_row(monkeypatch):
+    monkeypatch.setattr(vendor_order_repo, "get_project_financials", lambda project_id: _totals(
+        vendor_count=2, vendor_order_count=3, vendor_order_value=Decimal("500.50"), vendor_paid=Decimal("200.25"),
+        pending_vendor_orders=1, completed_vendor_orders=2,
+    ))
+
+    summary = vendor_order_repo.get_project_vendor_summary(7)
+
+    assert summary == {
+        "project_id": 7,
+        "total_vendors": 2,
+        "total_vendor_orders": 3,
+        "total_order_value": 500.5,
+        "total_payable": 300.25,
+        "total_paid": 200.25,
+        "pending_orders": 1,
+        "ongoing_orders": 0,
+        "completed_orders": 2,
+    }
+
+
+def test_drift_lists_only_differing_columns():
+    row = {"project_id": 7, "missing": False}
+    for c in FINANCIAL_COLUMNS:
+        row[f"stored_{c}"] = row[f"live_{c}"] = 0
+    row["stored_total_collected"], row["live_total_collected"] = Decimal("0"), Decimal("100.00")
+
+    drift = project_financials_repo._format_drift(row)
+
+    assert drift == {"project_id": 7, "missing": False, "columns": {"total_collected": {"stored": 0, "live": 100}}}
+
+
+def _financial_summary_client(monkeypatch, calls):
+    async def totals(project_id):
+        calls.append("totals")
+        return _totals(linked_po_count=1, linked_po_value=Decimal("1000"), agreement_count=1,
+                       agreement_value=Decimal("500"), total_collected=Decimal("600"), active_po_count=1)
+
+    async def pos(project_id):
+        calls.append("pos")
+        return [{"po_id": 1, "po_value": 1000.0}]
+
+    async def agreements(project_id):
+        calls.append("agreements")
+        return [{"agreement_id": 2, "value": 500.0}]
+
+    monkeypatch.setattr(po_management, "get_project_financials_async", totals)
+    monkeypatch.setattr(po_management, "get_all_pos_for_project_async", pos)
+    monkeypatch.setattr(po_management, "get_verbal_agreements_for_project_async", agreements)
+    app = FastAPI()
+    app.include_router(po_management.router)
+    return TestClient(app)
+
+
+def test_financial_summary_totals_come_from_rollup(monkeypatch):
+    calls = []
+    response = _financial_summary_client(monkeypatch, calls).get("/api/projects/7/financial-summary")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["financial_summary"]["total_project_value"] == 1500
+    assert body["financial_summary"]["outstanding_amount"] == 900
+    assert body["purchase_orders"] == {"count": 1, "total_value": 1000, "orders": [{"po_id": 1, "po_value": 1000.0}]}
+    assert sorted(calls) == ["agreements", "pos", "totals"]
+
+
+def test_financial_summary_without_orders_reads_one_row(monkeypatch):
+    calls = []
+    response = _financial_summary_client(monkeypatch, calls).get("/api/projects/7/financial-summary?include_orders=false")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["purchase_orders"] == {"count": 1, "total_value": 1000}
+    assert body["verbal_agreements"] == {"count": 1, "total_value": 500}
+    assert calls == ["totals"]
@@ -0,0 +1,23 @@
+"""
+Tests for renaming projects (no database required)
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.apis import projects
+from app.exceptions import ConflictError
+
+
+def test_rename_to_an_existing_name_is_a_conflict(monkeypatch):
+    def update_project(project_id, **kwargs):
+        raise ConflictError(f"Project '{kwargs['name']}' already exists for this client")
+
+    monkeypatch.setattr(projects, "get_project_by_id", lambda project_id: {"id": project_id})
+    monkeypatch.setattr(projects, "update_project", update_project)
+    app = FastAPI()
+    app.include_router(projects.router)
+
+    response = TestClient(app).put("/api/projects/3", json={"name": "Store 7"})
+
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Project 'Store 7' already exists for this client"
@@ -0,0 +1,293 @@
+"""
+Tests for the per-worker response cache (no database required)
+"""
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import response_cache
+from app.apis import po_management
+from app.repository import client_po_repo
+from app.response_cache import ALL_SCOPES, CHANNEL, ResponseCache, cached_response, notify_invalidation
+
+
+def _live_cache(max_entries=10, ttl=60):
+    cache = ResponseCache(max_entries, ttl)
+    cache.set_live(True)
+    return cache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = _live_cache(max_entries=2)
+    cache.put("a", ["project:1"], 1, cache.generation)
+    cache.put("b", ["project:2"], 2, cache.generation)
+    assert cache.get("a") == (True, 1)
+
+    cache.put("c", ["project:3"], 3, cache.generation)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+    assert "project:2" not in cache._by_scope
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = _live_cache(ttl=60)
+    cache.put("a", ["project:1"], 1, cache.generation)
+
+    now[0] += 59
+    assert cache.get("a") == (True, 1)
+    now[0] += 1
+    assert cache.get("a") == (False, None)
+    assert len(cache) == 0
+
+
+def test_invalidate_drops_only_matching_scopes():
+    cache = _live_cache()
+    cache.put("summary-1", ["project:1"], 1, cache.generation)
+    cache.put("summary-2", ["project:2"], 2, cache.generation)
+    cache.put("vendor-3", ["vendor:3"], 3, cache.generation)
+
+    cache.invalidate(["project:1", "vendor:3", "client:9"])
+
+    assert cache.get("summary-1") == (False, None)
+    assert cache.get("vendor-3") == (False, None)
+    assert cache.get("summary-2") == (True, 2)
+
+    cache.invalidate([ALL_SCOPES])
+    assert len(cache) == 0
+
+
+def test_result_computed_across_an_invalidation_is_not_stored():
+    cache = _live_cache()
+    generation = cache.generation
+    cache.invalidate(["project:1"])
+
+    cache.put("summary-1", ["project:1"], "stale", generation)
+
+    assert cache.get("summary-1") == (False, None)
+
+
+def test_nothing_is_stored_while_not_listening():
+    cache = ResponseCache(10, 60)
+    cache.put("a", ["project:1"], 1, cache.generation)
+    assert len(cache) == 0
+
+    cache.set_live(True)
+    cache.put("a", ["project:1"], 1, cache.generation)
+    cache.set_live(False)
+    assert len(cache) == 0
+
+
+def _client(monkeypatch, calls, live=True):
+    cache = ResponseCache(10, 60)
+    cache.set_live(live)
+    monkeypatch.setattr(response_cache, "cache", cache)
+
+    app = FastAPI()
+
+    @app.get("/projects/{project_id}/summary")
+    @cached_response("summary", lambda project_id, detailed: [f"project:{project_id}"])
+    def summary(project_id: int, detailed: bool = False):
+        calls.append(("summary", project_id, detailed))
+        return {"project_id": project_id, "calls": len(calls)}
+
+    @app.get("/vendors/{vendor_id}/summary")
+    @cached_response("vendor-summary", lambda vendor_id: [f"vendor:{vendor_id}"])
+    async def vendor_summary(vendor_id: int):
+        calls.append(("vendor", vendor_id))
+        return {"vendor_id": vendor_id, "calls": len(calls)}
+
+    return cache, TestClient(app)
+
+
+def test_decorated_endpoints_serve_hits_until_invalidated(monkeypatch):
+    calls = []
+    cache, client = _client(monkeypatch, calls)
+
+    first = client.get("/projects/7/summary").json()
+    assert client.get("/projects/7/summary").json() == first
+    assert client.get("/projects/7/summary?detailed=true").json() != first
+    vendor = client.get("/vendors/3/summary").json()
+    assert client.get("/vendors/3/summary").json() == vendor
+    assert len(calls) == 3
+
+    cache.invalidate(["project:7"])
+    assert client.get("/projects/7/summary").json() != first
+    assert client.get("/vendors/3/summary").json() == vendor
+    assert len(calls) == 4
+
+
+def test_decorated_endpoints_bypass_cache_when_not_listening(monkeypatch):
+    calls = []
+    _, client = _client(monkeypatch, calls, live=False)
+
+    client.get("/projects/7/summary")
+    client.get("/projects/7/summary")
+
+    assert len(calls) == 2
+
+
+def test_errors_are_not_cached(monkeypatch):
+    cache = ResponseCache(10, 60)
+    cache.set_live(True)
+    monkeypatch.setattr(response_cache, "cache", cache)
+    calls = []
+
+    @cached_response("failing", lambda project_id: [f"project:{project_id}"])
+    def failing(project_id: int):
+        calls.append(project_id)
+        raise ValueError("boom")
+
+    for _ in range(2):
+        try:
+            failing(project_id=1)
+        except ValueError:
+            pass
+    assert calls == [1, 1]
+    assert len(cache) == 0
+
+
+class _FakeCursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+
+def test_notify_invalidation_sends_ids_in_one_statement():
+    cur = _FakeCursor()
+
+    notify_invalidation(cur, projects=[7], client_pos=[11, None], vendor_orders=[5])
+
+    assert len(cur.executed) == 1
+    query, params = cur.executed[0]
+    assert "pg_notify" in query
+    assert params == {
+        "channel": CHANNEL,
+        "projects": [7],
+        "vendors": [],
+        "clients": [],
+        "client_pos": [11],
+        "vendor_orders": [5],
+    }
+
+
+def test_listener_applies_notifications_and_goes_offline_on_stop(monkeypatch):
+    cache = ResponseCache(10, 60)
+
+    class Notify:
+        def __init__(self, payload):
+            self.payload = payload
+
+    class FakeConnection:
+        def __init__(self):
+            self.executed = []
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, query):
+            self.executed.append(query)
+
+        async def notifies(self):
+            cache.put("summary-1", ["project:1"], 1, cache.generation)
+            cache.put("summary-2", ["project:2"], 2, cache.generation)
+            yield Notify("project:1,vendor:4")
+            await asyncio.Event().wait()
+
+    conn = FakeConnection()
+    listener = response_cache.InvalidationListener(cache)
+
+    async def connect():
+        return conn
+
+    monkeypatch.setattr(listener, "_connect", connect)
+
+    async def scenario():
+        await listener.start()
+        for _ in range(100):
+            await asyncio.sleep(0)
+        assert conn.executed == [f"LISTEN {CHANNEL}"]
+        assert cache.live
+        assert cache.get("summary-1") == (False, None)
+        assert cache.get("summary-2") == (True, 2)
+        await listener.stop()
+
+    asyncio.run(scenario())
+    assert not cache.live
+    assert len(cache) == 0
+
+
+class _UploadConnection:
+    """
+    Fake connection for client_po_repo writes that behaves like Postgres
+    plus this process's listener: scopes sent with pg_notify reach the
+    cache when the transaction commits
+    """
+
+    encoding = "UTF8"
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.pending = []
+        self.next_id = 1
+
+    def cursor(self):
+        return self
+
+    def mogrify(self, template, args):
+        return repr(tuple(args)).encode()
+
+    def execute(self, sql, params=None):
+        sql = sql.decode() if isinstance(sql, bytes) else sql
+        if "pg_notify" in sql:
+            self.pending += [f"client:{c}" for c in params["clients"]]
+        self._row = {"id": self.next_id}
+        self.next_id += 1
+
+    def fetchone(self):
+        return self._row
+
+    @property
+    def connection(self):
+        return self
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None and self.pending:
+            self.cache.invalidate(self.pending)
+        self.pending = []
+        return False
+
+
+def test_uploading_a_po_drops_the_cached_by_store_summary(monkeypatch):
+    cache = _live_cache()
+    monkeypatch.setattr(response_cache, "cache", cache)
+    calls = []
+    monkeypatch.setattr(po_management, "get_all_pos", lambda client_id: calls.append(client_id) or [])
+    monkeypatch.setattr(client_po_repo, "get_db", lambda: _UploadConnection(cache))
+
+    po_management.get_aggregated_pos_by_store(client_id=2)
+    po_management.get_aggregated_pos_by_store(client_id=2)
+    assert calls == [2]
+
+    client_po_repo.insert_client_po({
+        "po_details": {"po_number": "PO-1", "vendor_name": "Acme Interiors", "store_id": "S-1"},
+        "line_items": [{"description": "Fan", "quantity": 1, "rate": 10, "amount": 10}],
+    }, client_id=2)
+
+    po_management.get_aggregated_pos_by_store(client_id=2)
+    assert calls == [2, 2]
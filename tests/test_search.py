@@ -0,0 +1,109 @@
+"""
+Tests for the unified search query builder and GET /api/search (no database required)
+"""
+import os
+import re
+from decimal import Decimal
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.apis import search
+from app.repository import search_repo
+from app.utils.pagination import decode_cursor, encode_cursor
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+
+
+def _indexed(migration, pattern):
+    with open(os.path.join(MIGRATIONS, migration)) as f:
+        return set(re.findall(pattern, f.read()))
+
+
+def test_every_searched_column_has_trigram_and_prefix_indexes():
+    trigram = _indexed("0017_add_search_trigram_indexes.sql", r"ON (\w+) USING GIN \((\w+) gin_trgm_ops\)")
+    prefix = _indexed("0019_add_search_prefix_indexes.sql", r"ON (\w+) \(lower\((\w+)\) text_pattern_ops\)")
+
+    for source in search_repo.SEARCH_SOURCES.values():
+        table, alias = source["table"].split()
+        for column in source["columns"]:
+            column_alias, name = column.split(".")
+            assert column_alias == alias and (table, name) in trigram and (table, name) in prefix
+
+
+def test_query_searches_requested_types_with_escaped_patterns():
+    query, params = search_repo._build_search_query(" 50%_off ", types=["vendor", "po", "vendor"], limit=10)
+
+    assert query.count("UNION ALL") == 1
+    assert "'vendor'::text" in query and "'po'::text" in query and "'project'::text" not in query
+    assert "cp.store_id ILIKE %(pattern)s" in query
+    assert "%(term)s <%% v.name" in query
+    assert "%(after_score)s" not in query
+    # Per type: a prefix pass per column plus one pass over the newest matches
+    assert query.count("LIMIT %(candidates)s") == 1 + 1 + 3 + 1
+    assert "WHERE lower(cp.store_id) LIKE lower(%(prefix)s) ORDER BY lower(cp.store_id) USING ~<~" in " ".join(query.split())
+    assert params == {"term": "50%_off", "pattern": "%50\\%\\_off%", "prefix": "50\\%\\_off%",
+                      "candidates": search_repo.SEARCH_CANDIDATES, "limit": 11}
+
+
+def test_cursor_continues_after_last_row():
+    rows = [
+        {"type": "po", "id": 4, "score": Decimal("2.9000")},
+        {"type": "line_item", "id": 9, "score": Decimal("0.8000")},
+        {"type": "line_item", "id": 7, "score": Decimal("0.8000")},
+    ]
+
+    page = search_repo._format_search_page(rows, 2)
+    query, params = search_repo._build_search_query("fan", cursor=page["next_cursor"])
+
+    assert [r["id"] for r in page["results"]] == [4, 9]
+    assert decode_cursor(page["next_cursor"], 3) == ["0.8000", "line_item", 9]
+    assert query.count("(score, type, id) < (%(after_score)s, %(after_type)s, %(after_id)s)") == 4
+    assert (params["after_score"], params["after_type"], params["after_id"]) == (Decimal("0.8000"), "line_item", 9)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"term": "ab"},
+    {"term": "fan", "types": ["invoice"]},
+    {"term": "fan", "cursor": "not-a-cursor"},
+    {"term": "fan", "cursor": encode_cursor(["0.5", "invoice", 1])},
+    {"term": "fan", "cursor": encode_cursor(["high", "po", 1])},
+])
+def test_invalid_input_raises_value_error(kwargs):
+    with pytest.raises(ValueError):
+        search_repo._build_search_query(**kwargs)
+
+
+def _client(monkeypatch, page, calls):
+    async def search_async(term, **kwargs):
+        calls.append((term, kwargs))
+        if kwargs["types"] and "invoice" in kwargs["types"]:
+            raise ValueError("Unknown search type(s): invoice")
+        return page
+
+    monkeypatch.setattr(search_repo, "search_async", search_async)
+    app = FastAPI()
+    app.include_router(search.router)
+    return TestClient(app)
+
+
+def test_endpoint_returns_typed_page(monkeypatch):
+    calls = []
+    results = [{"type": "po", "id": 4, "title": "4100130800", "subtitle": "Bajaj / FY26",
+                "project_id": 1, "client_po_id": 4, "score": Decimal("1.9000")}]
+    client = _client(monkeypatch, {"results": results, "next_cursor": "abc"}, calls)
+
+    body = client.get("/api/search?q=4100&type=po&type=line_item&limit=1").json()
+
+    assert body["results"] == [{**results[0], "score": 1.9}]
+    assert body["result_count"] == 1
+    assert body["next_cursor"] == "abc" and body["has_more"] is True
+    assert calls == [("4100", {"types": ["po", "line_item"], "cursor": None, "limit": 1})]
+
+
+def test_endpoint_rejects_short_terms_and_unknown_types(monkeypatch):
+    client = _client(monkeypatch, {"results": [], "next_cursor": None}, [])
+
+    assert client.get("/api/search?q=ab").status_code == 422
+    assert client.get("/api/search?q=fan&type=invoice").status_code == 400
@@ -0,0 +1,162 @@
+"""
+Tests for per-request SQL tracing and N+1 detection (no database required)
+"""
+import logging
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app import sql_trace
+from app.config import settings
+from app.repository import po_management_repo
+from app.sql_trace import SqlTraceMiddleware, normalize_sql, record_statement, trace_queries
+
+
+class TracedCursor:
+    """Fake cursor that reports to the active trace the way InstrumentedCursor does"""
+
+    def __init__(self, responder):
+        self.responder = responder
+        self.rowcount = -1
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        start = time.perf_counter()
+        self._rows = list(self.responder(sql, params))
+        self.rowcount = len(self._rows)
+        record_statement(sql, time.perf_counter() - start, self)
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class TracedConnection:
+    def __init__(self, responder):
+        self.responder = responder
+
+    def cursor(self):
+        return TracedCursor(self.responder)
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("sql,shape", [
+    ("SELECT *\n  FROM client_po\n  WHERE id = %s", "SELECT * FROM client_po WHERE id = ?"),
+    ("SELECT * FROM client_po WHERE id = 42", "SELECT * FROM client_po WHERE id = ?"),
+    ("UPDATE vendor SET name = 'O''Brien' WHERE id = %(id)s", "UPDATE vendor SET name = ? WHERE id = ?"),
+    ("SELECT * FROM t WHERE id IN (%s, %s, %s)", "SELECT * FROM t WHERE id IN (?)"),
+    ("INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y'), (3, 'z')", "INSERT INTO t (a, b) VALUES (?)"),
+    ("SELECT col1, t2.price FROM t2 LIMIT 10 OFFSET 20", "SELECT col1, t2.price FROM t2 LIMIT ? OFFSET ?"),
+])
+def test_normalize_sql(sql, shape):
+    assert normalize_sql(sql) == shape
+
+
+def test_trace_groups_statements_by_shape():
+    with trace_queries() as trace:
+        for po_id in range(6):
+            record_statement(f"SELECT * FROM client_po_line_item WHERE client_po_id = {po_id}", 0.002)
+        record_statement(b"SELECT count(*) FROM client_po", 0.010)
+
+    assert trace.count == 7
+    assert trace.seconds == pytest.approx(0.022)
+    [repeated] = trace.repeated_shapes(5)
+    assert repeated.count == 6
+    assert repeated.sql == "SELECT * FROM client_po_line_item WHERE client_po_id = ?"
+    assert "likely N+1: 6x" in trace.summary(5)
+
+
+def test_nothing_is_recorded_outside_a_trace():
+    record_statement("SELECT 1", 0.001)
+    assert sql_trace.current_trace() is None
+
+
+def test_get_pos_aggregated_by_store_runs_a_fixed_number_of_statements(monkeypatch):
+    """Guards the bulk line-item load: statement count must not grow with the number of POs"""
+    pos = [
+        {"id": i, "client_id": 2, "project_id": 1, "po_number": f"PO-{i}", "po_date": date(2026, 1, 1),
+         "po_value": Decimal("100"), "receivable_amount": Decimal("100"), "status": "active", "po_type": "standard",
+         "pi_number": None, "pi_date": None, "notes": None, "created_at": datetime(2026, 1, 1),
+         "store_id": f"S-{i % 4}", "client_name": "Dava India", "project_name": "Rollout"}
+        for i in range(1, 41)
+    ]
+
+    def responder(sql, params):
+        if "ANY(" in sql:
+            return [{"id": po_id * 10, "client_po_id": po_id, "item_name": "Item", "quantity": Decimal("1"),
+                     "unit_price": Decimal("100"), "total_price": Decimal("100"), "hsn_code": None, "unit": "NOS",
+                     "rate": None, "gst_amount": None, "gross_amount": None, "taxable_amount": None}
+                    for po_id in params[0]]
+        return pos
+
+    monkeypatch.setattr(po_management_repo, "get_db", lambda: TracedConnection(responder))
+
+    with trace_queries() as trace:
+        bundles = po_management_repo.get_pos_aggregated_by_store(client_id=2)
+
+    assert len(bundles) == 4
+    assert trace.count <= 2
+    assert not trace.repeated_shapes(2)
+
+
+@pytest.fixture
+def traced_client(monkeypatch):
+    # app.logger stops "app" propagating to the root logger, where caplog listens
+    monkeypatch.setattr(logging.getLogger("app"), "propagate", True)
+    monkeypatch.setattr(settings, "SQL_TRACE_ENABLED", True)
+    monkeypatch.setattr(settings, "SQL_TRACE_HEADERS", True)
+    monkeypatch.setattr(settings, "SQL_TRACE_MAX_QUERIES", 50)
+    monkeypatch.setattr(settings, "SQL_TRACE_MAX_DB_MS", 500)
+    monkeypatch.setattr(settings, "SQL_TRACE_N_PLUS_ONE_THRESHOLD", 5)
+
+    def load(n):
+        # Sync repository code runs in the threadpool, like FastAPI's def endpoints
+        for po_id in range(n):
+            record_statement("SELECT * FROM payment WHERE client_po_id = %s", 0.001)
+
+    async def endpoint(request):
+        await run_in_threadpool(load, int(request.path_params["n"]))
+        return JSONResponse({"ok": True})
+
+    app = Starlette(routes=[Route("/pos/{n}", endpoint)])
+    app.add_middleware(SqlTraceMiddleware)
+    return TestClient(app)
+
+
+def test_middleware_adds_counts_and_flags_n_plus_one(traced_client, caplog):
+    with caplog.at_level(logging.WARNING, logger="app.sql_trace"):
+        r = traced_client.get("/pos/8")
+
+    assert r.headers["x-db-query-count"] == "8"
+    assert r.headers["x-db-n-plus-one"] == "1"
+    assert float(r.headers["x-db-time-ms"]) >= 0
+    [record] = caplog.records
+    assert "GET /pos/{n}" in record.getMessage()
+    assert "likely N+1: 8x" in record.getMessage()
+
+
+def test_middleware_stays_quiet_under_thresholds(traced_client, caplog):
+    with caplog.at_level(logging.WARNING, logger="app.sql_trace"):
+        r = traced_client.get("/pos/2")
+
+    assert r.headers["x-db-query-count"] == "2"
+    assert r.headers["x-db-n-plus-one"] == "0"
+    assert not caplog.records
@@ -0,0 +1,235 @@
+"""
+Tests for the request-scoped unit of work (no database required)
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INERROR
+
+from app import async_database, database
+from app.database import get_db
+from app.async_database import get_async_db
+from app.unit_of_work import READ_ONLY_SNAPSHOT, read_only_snapshot, transactional
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append(sql)
+        if sql == "SELECT missing_column":
+            self.conn.status = TRANSACTION_STATUS_INERROR
+            raise RuntimeError("column does not exist")
+
+    def fetchone(self):
+        return {"id": 1}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    """Stands in for the pooled psycopg2 connection checkout_connection() returns"""
+
+    fail_commit = False
+
+    def __init__(self, log):
+        self.log = log
+        self.executed = []
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.log.append("commit")
+        if self.fail_commit:
+            raise RuntimeError("could not serialize access")
+
+    def rollback(self):
+        self.log.append("rollback")
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.log.append("close")
+
+    def get_transaction_status(self):
+        return self.status
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.commit()
+        return False
+
+
+class FakeAsyncConnection:
+    def __init__(self, log):
+        self.log = log
+        self.executed = []
+
+    async def execute(self, sql, params=None):
+        self.executed.append(sql)
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    log = []
+    checkouts = []
+
+    def checkout():
+        conn = FakeConnection(log)
+        checkouts.append(conn)
+        return conn
+
+    @asynccontextmanager
+    async def pool_connection():
+        conn = FakeAsyncConnection(log)
+        checkouts.append(conn)
+        try:
+            yield conn
+        except BaseException:
+            log.append("async rollback")
+            raise
+        else:
+            log.append("async commit")
+        finally:
+            log.append("async return")
+
+    async def async_pool_connection():
+        return pool_connection()
+
+    monkeypatch.setattr(database, "checkout_connection", checkout)
+    monkeypatch.setattr(async_database, "async_pool_connection", async_pool_connection)
+    return log, checkouts
+
+
+def _read(label):
+    conn = get_db()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT {label}")
+    finally:
+        conn.close()
+
+
+def _client(dependency):
+    app = FastAPI()
+    route = dependency if dependency is transactional else (lambda func: func)
+    dependencies = [] if dependency is transactional else [Depends(dependency)]
+
+    @app.get("/sync", dependencies=dependencies)
+    @route
+    def sync_report():
+        for label in ("pos", "agreements", "payments"):
+            _read(label)
+        return {"ok": True}
+
+    @app.get("/async", dependencies=dependencies)
+    @route
+    async def async_report():
+        async def read(label):
+            async with get_async_db() as conn:
+                await conn.execute(f"SELECT {label}")
+        await asyncio.gather(read("pos"), read("agreements"), read("payments"))
+        return {"ok": True}
+
+    @app.get("/missing", dependencies=dependencies)
+    @route
+    def missing():
+        _read("project")
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    @app.get("/fallback", dependencies=dependencies)
+    @route
+    def fallback():
+        # A repository that tries a query and falls back to another on error
+        try:
+            _read("missing_column")
+        except RuntimeError:
+            pass
+        _read("project")
+        return {"ok": True}
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_snapshot_shares_one_connection_across_repository_calls(pools):
+    log, checkouts = pools
+
+    assert _client(read_only_snapshot).get("/sync").status_code == 200
+
+    [conn] = checkouts
+    assert conn.executed == [READ_ONLY_SNAPSHOT, "SELECT pos", "SELECT agreements", "SELECT payments"]
+    assert log == ["commit", "close"]
+
+
+def test_snapshot_shares_one_async_connection_across_concurrent_reads(pools):
+    log, checkouts = pools
+
+    assert _client(read_only_snapshot).get("/async").status_code == 200
+
+    [conn] = checkouts
+    assert conn.executed[0] == READ_ONLY_SNAPSHOT
+    assert sorted(conn.executed[1:]) == ["SELECT agreements", "SELECT payments", "SELECT pos"]
+    assert log == ["async commit", "async return"]
+
+
+def test_read_write_unit_of_work_skips_snapshot(pools):
+    log, checkouts = pools
+
+    assert _client(transactional).get("/sync").status_code == 200
+
+    [conn] = checkouts
+    assert READ_ONLY_SNAPSHOT not in conn.executed
+    assert log == ["commit", "close"]
+
+
+def test_failed_request_rolls_back(pools):
+    log, checkouts = pools
+
+    assert _client(transactional).get("/missing").status_code == 404
+    assert log == ["rollback", "close"]
+
+
+def test_without_unit_of_work_each_call_checks_out(pools):
+    log, checkouts = pools
+
+    _read("pos")
+    _read("payments")
+
+    assert len(checkouts) == 2
+    assert all(READ_ONLY_SNAPSHOT not in conn.executed for conn in checkouts)
+
+
+def test_transactional_commits_before_responding(pools, monkeypatch):
+    log, checkouts = pools
+    monkeypatch.setattr(FakeConnection, "fail_commit", True)
+
+    assert _client(transactional).get("/sync").status_code == 500
+    assert log == ["commit", "close"]
+
+
+def test_transactional_does_not_commit_after_a_failed_statement(pools):
+    log, checkouts = pools
+
+    assert _client(transactional).get("/fallback").status_code == 500
+    assert "commit" not in log
+
+
+def test_snapshot_stays_read_only_after_a_failed_statement(pools):
+    log, checkouts = pools
+
+    assert _client(read_only_snapshot).get("/fallback").status_code == 200
+
+    [conn] = checkouts
+    assert conn.executed == [READ_ONLY_SNAPSHOT, "SELECT missing_column", READ_ONLY_SNAPSHOT, "SELECT project"]
@@ -0,0 +1,89 @@
+"""
+Tests for the stored-upload compression policy and codecs (no database required)
+"""
+import hashlib
+import io
+import os
+
+import pytest
+
+from app.modules.file_uploads.services.compression import (
+    CompressionPolicy,
+    byte_entropy,
+    detect_codec,
+    get_codec,
+    stored_codec,
+)
+from app.modules.file_uploads.services.file_service import FileService
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+TEXT = b"ITEM-0001 | False ceiling gypsum board | 120.00 sqft | 85.50 | 10260.00\n" * 2000
+
+
+def test_policy_skips_precompressed_formats_without_sampling():
+    policy = CompressionPolicy()
+
+    assert policy.choose(XLSX_MIME, TEXT).name == "none"
+    assert policy.choose("image/png", TEXT).name == "none"
+
+
+def test_policy_samples_other_formats():
+    policy = CompressionPolicy()
+
+    assert policy.choose("application/pdf", TEXT).name == "zstd"
+    # A PDF made of deflated streams looks random
+    assert policy.choose("application/pdf", os.urandom(64 * 1024)).name == "none"
+
+
+def test_policy_prefers_configured_codec():
+    assert CompressionPolicy(preferred_codec="gzip").choose("text/csv", TEXT).name == "gzip"
+    assert CompressionPolicy(preferred_codec="brotli").choose("text/csv", TEXT).name == "gzip"
+
+
+def test_byte_entropy_bounds():
+    assert byte_entropy(b"") == 0.0
+    assert byte_entropy(b"a" * 100) == 0.0
+    assert byte_entropy(bytes(range(256)) * 4) == pytest.approx(8.0)
+
+
+@pytest.mark.parametrize("name", ["none", "gzip", "zstd"])
+def test_codec_round_trip_and_detection(name):
+    codec = get_codec(name)
+    out = io.BytesIO()
+    with codec.open_writer(out) as writer:
+        writer.write(TEXT)
+
+    assert not out.closed
+    stored = out.getvalue()
+    assert codec.decompress(stored) == TEXT
+    assert detect_codec(stored).name == name
+    with codec.open_reader(io.BytesIO(stored)) as reader:
+        assert reader.read() == TEXT
+
+
+def test_rows_without_a_codec_are_gzip():
+    assert stored_codec(True, None).name == "gzip"
+    assert stored_codec(False, None).name == "none"
+    with pytest.raises(ValueError):
+        get_codec("lz4")
+
+
+@pytest.mark.parametrize("codec,content,expected", [
+    ("zstd", TEXT, "zstd"),
+    ("gzip", TEXT, "gzip"),
+    # Falls back to the original bytes when compression saves 10% or less
+    ("zstd", os.urandom(32 * 1024), "none"),
+    ("none", TEXT, "none"),
+])
+def test_write_stream_records_codec(codec, content, expected):
+    out = io.BytesIO()
+    file_hash = hashlib.sha256(content).hexdigest()
+
+    size, codec_name, stored_hash = FileService._write_stream(
+        io.BytesIO(content), out, file_hash, len(content), get_codec(codec)
+    )
+
+    assert codec_name == expected
+    assert size == len(out.getvalue())
+    assert stored_hash == hashlib.sha256(out.getvalue()).hexdigest()
+    assert get_codec(codec_name).decompress(out.getvalue()) == content
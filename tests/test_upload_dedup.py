@@ -0,0 +1,174 @@
+"""
+Tests for content-hash deduplication of uploads (no database required)
+"""
+import hashlib
+import io
+
+from app.modules.file_uploads.services import file_service as file_service_module
+from app.modules.file_uploads.services import parsing_service
+from app.modules.file_uploads.services.file_service import FileService
+from app.modules.file_uploads.services.parsing_service import FileParsingService
+
+
+class FakeBlobRepository:
+    """In-memory stand-in for UploadBlobRepository"""
+
+    def __init__(self):
+        self.blobs = {}
+
+    def add_reference(self, file_hash):
+        blob = self.blobs.get(file_hash)
+        if blob:
+            blob["ref_count"] += 1
+        return blob
+
+    def create_or_add_reference(self, file_hash, storage_path, storage_filename, file_size,
+                                compressed_size, is_compressed, compressed_hash, compression_codec):
+        if file_hash in self.blobs:
+            return self.add_reference(file_hash)
+        self.blobs[file_hash] = {
+            "file_hash": file_hash, "storage_path": storage_path, "storage_filename": storage_filename,
+            "file_size": file_size, "compressed_size": compressed_size, "is_compressed": is_compressed,
+            "compressed_hash": compressed_hash, "compression_codec": compression_codec, "ref_count": 1,
+        }
+        return self.blobs[file_hash]
+
+    def update_stored_file(self, file_hash, compressed_size, is_compressed, compressed_hash, compression_codec):
+        blob = self.blobs.get(file_hash)
+        if blob:
+            blob.update(compressed_size=compressed_size, is_compressed=is_compressed,
+                        compressed_hash=compressed_hash, compression_codec=compression_codec)
+        return blob
+
+    def release(self, file_hash, on_last_reference):
+        blob = self.blobs.get(file_hash)
+        if not blob:
+            return None
+        blob["ref_count"] -= 1
+        if blob["ref_count"] == 0:
+            del self.blobs[file_hash]
+            on_last_reference(blob)
+        return blob["ref_count"]
+
+
+class FakeStorage:
+    def __init__(self):
+        self.files = {}
+        self.writes = 0
+
+    def write_file(self, path, name, writer):
+        out = io.BytesIO()
+        result = writer(out)
+        self.files[(path, name)] = out.getvalue()
+        self.writes += 1
+        return result
+
+    def file_exists(self, path, name):
+        return (path, name) in self.files
+
+    def delete_file(self, path, name):
+        return self.files.pop((path, name), None) is not None
+
+
+def make_service(monkeypatch):
+    repo = FakeBlobRepository()
+    monkeypatch.setattr(file_service_module, "UploadBlobRepository", repo)
+    service = FileService()
+    service.storage = FakeStorage()
+    return service, repo
+
+
+def test_identical_content_is_stored_once_and_reference_counted(monkeypatch):
+    service, repo = make_service(monkeypatch)
+    content = b"%PDF-1.4 purchase order " * 200
+    file_hash = hashlib.sha256(content).hexdigest()
+
+    first, first_dedup = service._store_blob(io.BytesIO(content), file_hash, len(content))
+    second, second_dedup = service._store_blob(io.BytesIO(content), file_hash, len(content))
+
+    assert (first_dedup, second_dedup) == (False, True)
+    assert first["storage_path"] == f"blobs/{file_hash[:2]}"
+    assert first["storage_filename"] == file_hash
+    assert service.storage.writes == 1
+    assert repo.blobs[file_hash]["ref_count"] == 2
+
+    service.release_storage(file_hash, first["storage_path"], first["storage_filename"])
+    assert service.storage.file_exists(first["storage_path"], first["storage_filename"])
+
+    service.release_storage(file_hash, first["storage_path"], first["storage_filename"])
+    assert not service.storage.files
+    assert file_hash not in repo.blobs
+
+
+def test_missing_blob_file_is_restored(monkeypatch):
+    service, repo = make_service(monkeypatch)
+    content = b"line items " * 100
+    file_hash = hashlib.sha256(content).hexdigest()
+
+    blob, _ = service._store_blob(io.BytesIO(content), file_hash, len(content))
+    service.storage.files.clear()
+
+    _, deduplicated = service._store_blob(io.BytesIO(content), file_hash, len(content))
+
+    assert deduplicated is False
+    assert service.storage.file_exists(blob["storage_path"], blob["storage_filename"])
+    assert repo.blobs[file_hash]["ref_count"] == 2
+
+
+def test_restored_blob_file_matches_its_row(monkeypatch):
+    service, repo = make_service(monkeypatch)
+    content = b"line items " * 100
+    file_hash = hashlib.sha256(content).hexdigest()
+
+    # Row written as plain bytes: the restore keeps that codec
+    blob, _ = service._store_blob(io.BytesIO(content), file_hash, len(content))
+    key = (blob["storage_path"], blob["storage_filename"])
+    blob.update(is_compressed=False, compression_codec="none", compressed_size=len(content))
+    service.storage.files.clear()
+
+    restored, _ = service._store_blob(io.BytesIO(content), file_hash, len(content))
+
+    assert service.storage.files[key] == content
+    assert restored["compression_codec"] == "none" and restored["compressed_size"] == len(content)
+
+    # Row codec not installed here: a new one is chosen and recorded on the row
+    restored.update(is_compressed=True, compression_codec="lz-unknown")
+    service.storage.files.clear()
+
+    restored, _ = service._store_blob(io.BytesIO(content), file_hash, len(content))
+
+    assert restored is repo.blobs[file_hash]
+    assert restored["compression_codec"] != "lz-unknown"
+    assert restored["compressed_size"] == len(service.storage.files[key])
+
+
+def test_legacy_files_are_deleted_directly(monkeypatch):
+    service, _ = make_service(monkeypatch)
+    service.storage.files[("sess_abc", "file.pdf")] = b"x"
+
+    service.release_storage("somehash", "sess_abc", "file.pdf")
+
+    assert not service.storage.files
+
+
+def test_save_parsed_po_reuses_client_po_from_same_content(monkeypatch):
+    inserted = []
+
+    def insert(parsed, client_id, project_id, project_name):
+        inserted.append(project_id)
+        return 99
+
+    monkeypatch.setattr(parsing_service, "insert_client_po", insert)
+    monkeypatch.setattr(parsing_service.ParseResultRepository, "set_client_po_id", staticmethod(lambda *a: True))
+    monkeypatch.setattr(parsing_service, "find_project_id_by_name", lambda client_id, name: {"Store 7": 7, "Store 8": 8}.get(name))
+
+    cached = {"file_hash": "abc", "cached_client_po_id": 42, "cached_client_po_project_id": 7}
+    assert FileParsingService.save_parsed_po(cached, 1) == 42
+    assert FileParsingService.save_parsed_po(cached, 1, project_id=7) == 42
+    assert FileParsingService.save_parsed_po(cached, 1, project_name="Store 7") == 42
+    # A different project, by id or by name, gets its own client_po
+    assert FileParsingService.save_parsed_po(cached, 1, project_id=8) == 99
+    assert FileParsingService.save_parsed_po(cached, 1, project_name="Store 8") == 99
+    assert FileParsingService.save_parsed_po(cached, 1, project_name="New store") == 99
+    assert FileParsingService.save_parsed_po({"file_hash": "abc"}, 1) == 99
+    assert inserted == [8, None, None, None]
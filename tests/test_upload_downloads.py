@@ -0,0 +1,166 @@
+"""
+Tests for streaming upload downloads: Range, ETag/304 and compressed blobs (no database required)
+"""
+import gzip
+import hashlib
+import os
+
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.modules.file_uploads.services.compression import get_codec
+from app.modules.file_uploads.utils.downloads import (
+    RangeNotSatisfiable,
+    accepts_encoding,
+    build_download_response,
+    iter_decompressed,
+    parse_range,
+)
+
+CONTENT = os.urandom(300_000)
+FILE_HASH = hashlib.sha256(CONTENT).hexdigest()
+ETAG = f'"{FILE_HASH}"'
+
+
+@pytest.fixture
+def client(tmp_path):
+    raw_path = tmp_path / "raw"
+    raw_path.write_bytes(CONTENT)
+    gz_path = tmp_path / "blob.gz"
+    with gzip.open(gz_path, "wb") as gz:
+        gz.write(CONTENT)
+    zst_path = tmp_path / "blob.zst"
+    with open(zst_path, "wb") as out, get_codec("zstd").open_writer(out) as writer:
+        writer.write(CONTENT)
+    blobs = {"raw": (raw_path, "none"), "gz": (gz_path, "gzip"), "zst": (zst_path, "zstd")}
+
+    async def download(request):
+        path, codec = blobs[request.path_params["kind"]]
+        return build_download_response(
+            request,
+            path=str(path),
+            size=len(CONTENT),
+            codec=get_codec(codec),
+            file_hash=FILE_HASH,
+        )
+
+    # Behind GZipMiddleware like the app; TestClient sends Accept-Encoding: gzip
+    return TestClient(Starlette(
+        routes=[Route("/{kind}", download)],
+        middleware=[Middleware(GZipMiddleware, minimum_size=1000)],
+    ))
+
+
+@pytest.mark.parametrize("kind", ["raw", "gz", "zst"])
+def test_full_download_has_etag_and_length(client, kind):
+    r = client.get(f"/{kind}", headers={"Accept-Encoding": "identity"})
+
+    assert r.status_code == 200
+    assert r.content == CONTENT
+    assert r.headers["etag"] == ETAG
+    assert r.headers["content-length"] == str(len(CONTENT))
+    assert r.headers["accept-ranges"] == "bytes"
+    assert r.headers["content-encoding"] == "identity"
+
+
+def test_gzip_blob_is_sent_precompressed_to_gzip_clients(client, tmp_path):
+    r = client.get("/gz", headers={"Accept-Encoding": "gzip"})
+
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["content-length"] == str((tmp_path / "blob.gz").stat().st_size)
+    assert r.headers["etag"] == f'"{FILE_HASH}-gzip"'
+    assert r.content == CONTENT
+
+    r = client.get("/gz", headers={"Accept-Encoding": "gzip", "If-None-Match": r.headers["etag"]})
+    assert r.status_code == 304
+
+
+@pytest.mark.parametrize("kind", ["raw", "gz", "zst"])
+@pytest.mark.parametrize("header,start,end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=70000-200000", 70000, 200000),
+    ("bytes=299990-", 299990, 299999),
+    ("bytes=-10", 299990, 299999),
+    ("bytes=100-999999", 100, 299999),
+])
+def test_range_requests(client, kind, header, start, end):
+    r = client.get(f"/{kind}", headers={"Range": header})
+
+    assert r.status_code == 206
+    assert r.headers["content-encoding"] == "identity"
+    assert r.content == CONTENT[start:end + 1]
+    assert r.headers["content-range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert r.headers["content-length"] == str(end - start + 1)
+
+
+def test_zstd_blob_is_sent_precompressed_to_zstd_clients(client, tmp_path):
+    r = client.get("/zst", headers={"Accept-Encoding": "gzip, zstd"})
+
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "zstd"
+    assert r.headers["etag"] == f'"{FILE_HASH}-zstd"'
+    assert r.content == (tmp_path / "blob.zst").read_bytes()
+
+    # A client that only takes gzip gets the original bytes
+    r = client.get("/zst", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "identity"
+    assert r.content == CONTENT
+
+
+def test_matching_etag_returns_304(client):
+    r = client.get("/gz", headers={"If-None-Match": f'W/"other", {ETAG}'})
+
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["etag"] == ETAG
+
+
+def test_unsatisfiable_range_returns_416(client):
+    r = client.get("/raw", headers={"Range": "bytes=300000-"})
+
+    assert r.status_code == 416
+    assert r.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_stale_if_range_sends_whole_file(client):
+    r = client.get("/raw", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert r.status_code == 200
+    assert r.content == CONTENT
+
+    r = client.get("/raw", headers={"Range": "bytes=0-9", "If-Range": ETAG})
+    assert r.status_code == 206
+
+
+def test_parse_range_ignores_what_it_cannot_serve():
+    assert parse_range(None, 10) is None
+    assert parse_range("items=0-1", 10) is None
+    assert parse_range("bytes=0-1,4-5", 10) is None
+    assert parse_range("bytes=5-2", 10) is None
+    assert parse_range("bytes=a-b", 10) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=-0", 10)
+
+
+def test_accepts_encoding_honours_q_zero():
+    assert accepts_encoding("gzip, deflate, br, zstd", "zstd")
+    assert accepts_encoding("GZIP;q=0.5", "gzip")
+    assert not accepts_encoding("gzip;q=0, zstd", "gzip")
+    assert not accepts_encoding("x-gzip", "gzip")
+    assert not accepts_encoding(None, "gzip")
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+def test_iter_decompressed_reads_in_chunks(tmp_path, codec):
+    path = tmp_path / "blob"
+    with open(path, "wb") as out, get_codec(codec).open_writer(out) as writer:
+        writer.write(CONTENT)
+
+    chunks = list(iter_decompressed(str(path), get_codec(codec), 1000, 250_000, chunk_size=4096))
+
+    assert b"".join(chunks) == CONTENT[1000:250_001]
+    assert max(len(c) for c in chunks) <= 4096
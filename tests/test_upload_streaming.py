@@ -0,0 +1,108 @@
+"""
+Memory profile of the streaming upload path (no database required)
+
+Uploads are hashed, compressed and written in UPLOAD_CHUNK_SIZE_BYTES
+chunks, so peak Python memory must stay a few MB regardless of file size.
+"""
+import hashlib
+import os
+import tempfile
+import tracemalloc
+
+import pytest
+
+from app.modules.file_uploads.services import file_service as file_service_module
+from app.modules.file_uploads.services.compression import get_codec
+from app.modules.file_uploads.services.file_service import FileService
+from app.modules.file_uploads.storage.local_storage import LocalStorageProvider
+
+FILE_SIZE = 48 * 1024 * 1024
+PEAK_LIMIT = 8 * 1024 * 1024
+
+
+class FakeBlobRepository:
+    @staticmethod
+    def add_reference(file_hash):
+        return None
+
+    @staticmethod
+    def create_or_add_reference(**blob):
+        return {**blob, "ref_count": 1}
+
+
+class FakeFileRepository:
+    @staticmethod
+    def get_session_file_count(session_id):
+        return 0
+
+    @staticmethod
+    def create_file(**fields):
+        return dict(fields)
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    monkeypatch.setattr(file_service_module, "UploadBlobRepository", FakeBlobRepository)
+    monkeypatch.setattr(file_service_module, "UploadFileRepository", FakeFileRepository)
+    monkeypatch.setattr(file_service_module.SessionService, "validate_session", staticmethod(lambda s: (True, None)))
+    service = FileService()
+    service.storage = LocalStorageProvider(str(tmp_path / "storage"))
+    monkeypatch.setattr(service.rate_limiter, "check_upload_limit", lambda *a: True)
+    return service
+
+
+def make_upload(chunk_factory):
+    """Write FILE_SIZE bytes to a temp file (outside the measured section)"""
+    upload = tempfile.TemporaryFile()
+    digest = hashlib.sha256()
+    written = 0
+    while written < FILE_SIZE:
+        chunk = chunk_factory()
+        upload.write(chunk)
+        digest.update(chunk)
+        written += len(chunk)
+    upload.seek(0)
+    return upload, written, digest.hexdigest()
+
+
+def upload_and_measure(service, upload):
+    tracemalloc.start()
+    try:
+        metadata = service.upload_file(
+            session_id="sess_test", file_content=upload, original_filename="big_po.pdf"
+        )
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return metadata, peak
+
+
+def test_compressible_upload_streams_in_bounded_memory(service):
+    line = b"ITEM-0001 | False ceiling gypsum board | 120.00 sqft | 85.50 | 10260.00\n"
+    upload, size, expected_hash = make_upload(lambda: line * 8192)
+
+    metadata, peak = upload_and_measure(service, upload)
+
+    assert peak < PEAK_LIMIT, f"peak {peak / 1e6:.1f} MB for a {size / 1e6:.0f} MB upload"
+    assert metadata["file_hash"] == expected_hash
+    assert metadata["is_compressed"] is True
+    stored = service.storage.base_path / metadata["storage_path"] / metadata["storage_filename"]
+    assert stored.stat().st_size == metadata["compressed_size"] < size
+    digest = hashlib.sha256()
+    with open(stored, "rb") as src, get_codec(metadata["compression_codec"]).open_reader(src) as reader:
+        for chunk in iter(lambda: reader.read(1024 * 1024), b""):
+            digest.update(chunk)
+    assert digest.hexdigest() == expected_hash
+
+
+def test_incompressible_upload_is_stored_raw_in_bounded_memory(service):
+    upload, size, expected_hash = make_upload(lambda: os.urandom(1024 * 1024))
+
+    metadata, peak = upload_and_measure(service, upload)
+
+    assert peak < PEAK_LIMIT, f"peak {peak / 1e6:.1f} MB for a {size / 1e6:.0f} MB upload"
+    assert metadata["is_compressed"] is False
+    assert metadata["compression_codec"] == "none"
+    stored = service.storage.base_path / metadata["storage_path"] / metadata["storage_filename"]
+    assert stored.stat().st_size == size
+    assert not [p for p in stored.parent.iterdir() if p.name.endswith(".tmp")]